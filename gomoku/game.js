@@ -58,9 +58,9 @@ const heartbeat = new HeartbeatManager(socket, {
             isSinglePlayer = state.isSinglePlayer;
             aiDifficulty = state.aiDifficulty || 'medium';
             
-            // 重新加入房间
+            // 重新加入房间（只同步缺失的走法）
             if (roomId && !isSinglePlayer) {
-                socket.emit('rejoin_room', { room_id: roomId });
+                stateSync.rejoin(roomId);
             }
             
             drawBoard();
@@ -70,6 +70,31 @@ const heartbeat = new HeartbeatManager(socket, {
     }
 });
 
+// 落子事件使用二进制帧
+const eventCodec = new EventCodec(socket);
+
+// 重连状态同步：少量缺失走法按增量应用，否则使用压缩棋盘快照
+const stateSync = new StateSync(socket, {
+    codec: eventCodec,
+    applySnapshot: applyBoardSnapshot,
+    deltaHandlers: {
+        move_made: onMoveMade,
+        game_over: onGameOver
+    }
+});
+
+function applyBoardSnapshot(snapshot) {
+    for (let r = 0; r < SIZE; r++) {
+        for (let c = 0; c < SIZE; c++) {
+            board[r][c] = +snapshot.board[r * SIZE + c];
+        }
+    }
+    current = snapshot.current;
+    isOver = snapshot.finished;
+    drawBoard();
+    showInfo();
+}
+
 function updateConnectionStatus(status, attempts) {
     if (status === 'connected') {
         console.log('已连接到服务器');
@@ -127,20 +152,24 @@ socket.on('game_start', () => {
     showStartEffect();
 });
 
-socket.on('move_made', (data) => {
+function onMoveMade(data) {
     board[data.row][data.col] = data.color;
     current = 3 - data.color;
     drawBoard();
     showPieceEffect(data.row, data.col);
     showInfo();
-});
+}
 
-socket.on('game_over', (data) => {
+function onGameOver(data) {
     isOver = true;
     drawBoard();
     gameInfo.innerText = `玩家 ${data.winner === 1 ? '黑子' : '白子'} 获胜！`;
     showWinEffect();
-});
+}
+
+eventCodec.on('move_made', onMoveMade);
+
+socket.on('game_over', onGameOver);
 
 socket.on('player_left', () => {
     gameInfo.innerText = '对手已离开';
@@ -156,7 +185,7 @@ socket.on('error', (data) => {
 });
 
 function createRoom() {
-    socket.emit('create_room');
+    socket.emit('create_room', { game: 'gomoku' });
 }
 
 function joinRoom() {
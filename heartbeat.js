@@ -7,11 +7,13 @@ class HeartbeatManager {
     constructor(socket, options = {}) {
         this.socket = socket;
         this.pingInterval = options.pingInterval || 30000; // 30秒发送一次心跳
+        this.idleInterval = options.idleInterval || this.pingInterval; // 空闲超过此时间才发送心跳
         this.pongTimeout = options.pongTimeout || 5000; // 5秒未收到响应视为超时
         this.maxReconnectAttempts = options.maxReconnectAttempts || 3;
         
         this.pingTimer = null;
         this.pongTimer = null;
+        this.lastSent = Date.now(); // 最近一次向服务端发送任意事件的时间
         this.reconnectAttempts = 0;
         this.isConnected = false;
         this.onConnectionChange = options.onConnectionChange || (() => {});
@@ -27,6 +29,17 @@ class HeartbeatManager {
     }
     
     init() {
+        // 游戏事件本身即可证明连接存活：发送任意事件都会在服务端刷新心跳，
+        // 收到任意事件都视为连接正常
+        this.onOutgoing = () => {
+            this.lastSent = Date.now();
+        };
+        this.onIncoming = () => {
+            this.clearPongTimer();
+        };
+        this.socket.onAnyOutgoing(this.onOutgoing);
+        this.socket.onAny(this.onIncoming);
+        
         // 监听连接事件
         this.socket.on('connect', () => {
             this.isConnected = true;
@@ -86,11 +99,12 @@ class HeartbeatManager {
     startHeartbeat() {
         this.stopHeartbeat();
         
+        // 以半个周期检查，保证空闲连接最迟在1.5个周期内发送心跳
         this.pingTimer = setInterval(() => {
-            if (this.isConnected) {
+            if (this.isConnected && Date.now() - this.lastSent >= this.idleInterval) {
                 this.sendPing();
             }
-        }, this.pingInterval);
+        }, this.pingInterval / 2);
     }
     
     stopHeartbeat() {
@@ -102,6 +116,9 @@ class HeartbeatManager {
     }
     
     sendPing() {
+        if (this.pongTimer) {
+            return; // 上一次心跳仍在等待响应
+        }
         this.socket.emit('ping', { timestamp: Date.now() });
         
         // 设置超时定时器
@@ -179,6 +196,8 @@ class HeartbeatManager {
             clearTimeout(this.reconnectTimer);
         }
         
+        this.socket.offAnyOutgoing(this.onOutgoing);
+        this.socket.offAny(this.onIncoming);
         this.socket.off('connect');
         this.socket.off('disconnect');
         this.socket.off('pong');
@@ -188,6 +207,127 @@ class HeartbeatManager {
     }
 }
 
+/**
+ * 紧凑事件编码模块
+ * 连接后协商二进制编码，高频事件以定长二进制帧接收并在此解码
+ */
+class EventCodec {
+    constructor(socket, options = {}) {
+        this.socket = socket;
+        this.enabled = options.binary !== false;
+        this.active = false; // 服务端是否已确认二进制编码
+        
+        this.socket.on('connect', () => {
+            this.active = false;
+            if (this.enabled) {
+                this.socket.emit('set_codec', { codec: 'binary' });
+            }
+        });
+        
+        this.socket.on('codec_set', (data) => {
+            this.active = data.codec === 'binary';
+        });
+    }
+    
+    decode(event, payload) {
+        const layout = EventCodec.LAYOUTS[event];
+        if (!layout || !(payload instanceof ArrayBuffer)) {
+            return payload;
+        }
+        
+        const view = new DataView(payload);
+        const data = {};
+        let offset = 0;
+        layout.forEach(([field, type]) => {
+            if (type === 'u8') {
+                data[field] = view.getUint8(offset);
+                offset += 1;
+            } else {
+                data[field] = view.getUint32(offset, true);
+                offset += 4;
+            }
+        });
+        // 版本号0表示未携带版本
+        if (!data.version) {
+            delete data.version;
+        }
+        return data;
+    }
+    
+    on(event, handler) {
+        this.socket.on(event, (payload) => handler(this.decode(event, payload)));
+    }
+}
+
+// 与服务端 event_codec.FRAME_LAYOUTS 保持一致（小端）
+EventCodec.LAYOUTS = {
+    move_made: [['row', 'u8'], ['col', 'u8'], ['color', 'u8'], ['version', 'u32']],
+    score_update: [['position', 'u8'], ['score', 'u32'], ['version', 'u32']],
+    player_finished: [['position', 'u8'], ['score', 'u32'], ['version', 'u32']]
+};
+
+/**
+ * 房间状态同步模块
+ * 记录服务端下发的状态版本号，重连时只请求缺失的增量；
+ * 服务器重启前下发的座位令牌在重连时带上，由新进程交还原座位
+ */
+class StateSync {
+    constructor(socket, options = {}) {
+        this.socket = socket;
+        this.codec = options.codec || null;
+        this.version = null; // 已应用的服务端状态版本
+        this.applySnapshot = options.applySnapshot || (() => {});
+        this.deltaHandlers = options.deltaHandlers || {}; // {event: fn(data)}
+        this.seatTokens = {}; // {roomId: 座位令牌}
+        
+        // 所有携带版本号的事件都会推进本地版本
+        this.socket.onAny((event, payload) => {
+            const data = this.codec ? this.codec.decode(event, payload) : payload;
+            if (data && typeof data.version === 'number') {
+                this.version = data.version;
+            }
+        });
+        
+        this.socket.on('state_sync', (data) => this.handleSync(data));
+        
+        this.socket.on('server_draining', (data) => {
+            if (data && data.token) {
+                this.seatTokens[data.room_id] = data.token;
+            }
+        });
+    }
+    
+    rejoin(roomId) {
+        const payload = { room_id: roomId };
+        if (this.version !== null) {
+            payload.version = this.version;
+        }
+        if (this.seatTokens[roomId]) {
+            payload.token = this.seatTokens[roomId];
+            delete this.seatTokens[roomId];
+        }
+        this.socket.emit('rejoin_room', payload);
+    }
+    
+    handleSync(data) {
+        if (data.snapshot) {
+            this.applySnapshot(data.snapshot);
+        } else if (data.deltas) {
+            data.deltas.forEach(([event, payload]) => {
+                const handler = this.deltaHandlers[event];
+                if (handler) {
+                    handler(payload);
+                }
+            });
+        }
+        this.version = data.version;
+    }
+    
+    reset() {
+        this.version = null;
+    }
+}
+
 // 创建连接状态指示器
 function createConnectionIndicator() {
     const indicator = document.createElement('div');
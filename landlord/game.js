@@ -55,7 +55,7 @@ const heartbeat = new HeartbeatManager(socket, {
             bombCount = state.bombCount;
             
             if (roomId && !isSingleMode) {
-                socket.emit('rejoin_room', { room_id: roomId });
+                stateSync.rejoin(roomId);
             }
             
             if (gameStarted) {
@@ -67,6 +67,48 @@ const heartbeat = new HeartbeatManager(socket, {
     }
 });
 
+// 重连状态同步：少量缺失事件按增量应用，否则使用快照
+const stateSync = new StateSync(socket, {
+    applySnapshot: applyLandlordSnapshot,
+    deltaHandlers: {
+        game_start: onGameStart,
+        landlord_decided: onLandlordDecided,
+        update_cards: onUpdateCards,
+        bid_turn: onBidTurn,
+        play_turn: onPlayTurn,
+        cards_played: onCardsPlayed,
+        game_over: onGameOver
+    }
+});
+
+function applyLandlordSnapshot(snapshot) {
+    if (!snapshot.game_started) return;
+    
+    onGameStart({ cards: snapshot.cards });
+    if (snapshot.landlord !== null) {
+        onLandlordDecided({
+            landlord: snapshot.landlord,
+            bottom_cards: snapshot.bottom_cards,
+            bid_multiplier: snapshot.bid_multiplier
+        });
+    }
+    Object.entries(snapshot.card_counts).forEach(([position, count]) => {
+        updateCardCount(+position, count);
+    });
+    if (snapshot.last_play.length > 0) {
+        document.getElementById('last-play').classList.remove('hidden');
+        renderLastPlay(snapshot.last_play, snapshot.last_play_position);
+    }
+    if (snapshot.bidding) {
+        // 叫牌阶段重连：显示叫牌区而不是出牌按钮
+        if (snapshot.bid_turn !== null) {
+            onBidTurn({ position: snapshot.bid_turn });
+        }
+    } else if (snapshot.current_turn !== null) {
+        onPlayTurn({ position: snapshot.current_turn, can_pass: snapshot.last_play.length > 0 });
+    }
+}
+
 let roomId = null;
 let myPosition = null;
 let myCards = [];
@@ -149,13 +191,15 @@ socket.on('player_joined', (data) => {
     updatePlayerSeats(data.players);
 });
 
-socket.on('game_start', (data) => {
+function onGameStart(data) {
     gameStarted = true;
     document.getElementById('room-panel').classList.add('hidden');
     myCards = data.cards;
     renderMyCards();
     document.querySelector('.action-buttons').classList.remove('hidden');
-});
+}
+
+socket.on('game_start', onGameStart);
 
 function updatePlayerSeats(playerCount = 1) {
     const seats = [
@@ -181,13 +225,15 @@ function updatePlayerSeats(playerCount = 1) {
     }
 }
 
-socket.on('bid_turn', (data) => {
+function onBidTurn(data) {
     if (data.position === myPosition) {
         document.getElementById('bid-area').classList.remove('hidden');
     }
-});
+}
 
-socket.on('landlord_decided', (data) => {
+socket.on('bid_turn', onBidTurn);
+
+function onLandlordDecided(data) {
     document.getElementById('bid-area').classList.add('hidden');
     document.getElementById('landlord-cards').classList.remove('hidden');
     renderBottomCards(data.bottom_cards);
@@ -211,12 +257,16 @@ socket.on('landlord_decided', (data) => {
         isLandlord = true;
         showEffect('你是地主', 'landlord');
     }
-});
+}
+
+socket.on('landlord_decided', onLandlordDecided);
 
-socket.on('update_cards', (data) => {
+function onUpdateCards(data) {
     myCards = data.cards;
     renderMyCards();
-});
+}
+
+socket.on('update_cards', onUpdateCards);
 
 socket.on('player_bid', (data) => {
     showEffect(`玩家${data.position + 1}叫${data.bid}分`, 'normal');
@@ -231,15 +281,17 @@ socket.on('player_passed', (data) => {
     showEffect(`玩家${data.position + 1}不出`, 'normal');
 });
 
-socket.on('play_turn', (data) => {
+function onPlayTurn(data) {
     currentTurn = data.position;
     if (data.position === myPosition) {
         document.getElementById('play-btn').disabled = false;
         document.getElementById('pass-btn').disabled = data.can_pass === false;
     }
-});
+}
+
+socket.on('play_turn', onPlayTurn);
 
-socket.on('cards_played', (data) => {
+function onCardsPlayed(data) {
     document.getElementById('last-play').classList.remove('hidden');
     renderLastPlay(data.cards, data.position);
     updateCardCount(data.position, data.remaining);
@@ -253,9 +305,11 @@ socket.on('cards_played', (data) => {
     } else if (cardType.type === 'plane') {
         showEffect('飞机', 'plane');
     }
-});
+}
 
-socket.on('game_over', (data) => {
+socket.on('cards_played', onCardsPlayed);
+
+function onGameOver(data) {
     const winner = data.winner === myPosition ? '你赢了！' : '你输了！';
     const multiplier = data.multiplier || 1;
     const msg = data.spring ? `${winner} (春天 ${multiplier}倍)` : `${winner} (${multiplier}倍)`;
@@ -264,7 +318,9 @@ socket.on('game_over', (data) => {
     setTimeout(() => {
         location.reload();
     }, 3000);
-});
+}
+
+socket.on('game_over', onGameOver);
 
 socket.on('error', (data) => {
     alert(data.msg);
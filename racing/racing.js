@@ -44,7 +44,7 @@ const heartbeat = new HeartbeatManager(socket, {
             score = state.score;
             
             if (roomId && !isAIMode) {
-                socket.emit('rejoin_room', { room_id: roomId });
+                stateSync.rejoin(roomId);
             }
             
             if (state.gameRunning) {
@@ -56,6 +56,23 @@ const heartbeat = new HeartbeatManager(socket, {
     }
 });
 
+// 分数事件使用二进制帧
+const eventCodec = new EventCodec(socket);
+
+// 重连状态同步：只补发缺失的分数变化
+const stateSync = new StateSync(socket, {
+    codec: eventCodec,
+    applySnapshot: (snapshot) => {
+        Object.entries(snapshot.scores || {}).forEach(([position, value]) => {
+            onScoreUpdate({ position: +position, score: value });
+        });
+    },
+    deltaHandlers: {
+        score_update: onScoreUpdate,
+        player_finished: onPlayerFinished
+    }
+});
+
 const canvas = document.getElementById('gameCanvas');
 const ctx = canvas.getContext('2d');
 const scoreEl = document.getElementById('score');
@@ -202,18 +219,22 @@ socket.on('game_start', () => {
     startGame();
 });
 
-socket.on('score_update', (data) => {
+function onScoreUpdate(data) {
     if (data.position !== myPosition) {
         opponentScore = data.score;
         opponentScoreEl.textContent = `对手: ${Math.floor(opponentScore / 10)}`;
     }
-});
+}
 
-socket.on('player_finished', (data) => {
+function onPlayerFinished(data) {
     if (data.position !== myPosition && gameRunning) {
         opponentScore = data.score;
     }
-});
+}
+
+eventCodec.on('score_update', onScoreUpdate);
+
+eventCodec.on('player_finished', onPlayerFinished);
 
 socket.on('player_left', () => {
     alert('对手已离开');
@@ -1,10 +1,17 @@
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_socketio import SocketIO
 import os
 import sys
+import hmac
 import logging
 from heartbeat import HeartbeatHandler
+from asgi_server import AsyncSocketIO
+from replay import BLOCKING_EVENTS
+from asset_pipeline import AssetPipeline
+from game_registry import GameRegistry
+from metrics import METRICS, CONTENT_TYPE
+from profiler import SAMPLER, SLOW_EVENTS
 
 # 配置日志
 logging.basicConfig(
@@ -13,12 +20,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def create_app(config):
+def create_app(config, client_manager=None, asgi=False):
     """
     创建并配置Flask应用
     
     Args:
         config: 配置对象
+        client_manager: SocketIO客户端管理器（集群模式下为 cluster.ClusterManager）
+        asgi: 为True时使用异步服务器（asgi_server.AsyncSocketIO），Flask应用只处理HTTP请求
         
     Returns:
         tuple: (app, socketio, heartbeat_handler) Flask应用、SocketIO实例和心跳处理器
@@ -29,13 +38,21 @@ def create_app(config):
     _configure_cors(app, config)
     
     # 配置SocketIO
-    socketio = _configure_socketio(app, config)
+    socketio = _configure_socketio(app, config, client_manager, asgi)
     
     # 配置心跳检测
     heartbeat_handler = _configure_heartbeat(socketio, config)
     
+    # 构建静态资源和游戏注册表
+    assets = _build_assets(config)
+    registry = _build_registry(config)
+    app.extensions['game_registry'] = registry
+    
     # 注册路由
-    _register_routes(app)
+    _register_routes(app, assets, registry)
+    if getattr(config, 'METRICS_ENABLED', True):
+        _register_metrics_route(app)
+    _register_admin_routes(app, getattr(config, 'ADMIN_TOKEN', ''))
     
     # 注册错误处理器
     _register_error_handlers(app)
@@ -59,14 +76,28 @@ def _configure_cors(app, config):
     #         logger.error("生产环境必须设置ALLOWED_ORIGINS环境变量")
     #         sys.exit(1)
 
-def _configure_socketio(app, config):
+def _configure_socketio(app, config, client_manager=None, asgi=False):
     """配置SocketIO实时通信"""
     cors_origins = config.ALLOWED_ORIGINS if config.ALLOWED_ORIGINS else "*"
+    options = {'client_manager': client_manager} if client_manager is not None else {}
+    if asgi:
+        socketio = AsyncSocketIO(
+            app,
+            blocking_events=BLOCKING_EVENTS,
+            executor_workers=getattr(config, 'DB_EXECUTOR_WORKERS', 4),
+            cors_allowed_origins=cors_origins,
+            logger=config.DEBUG,
+            engineio_logger=config.DEBUG,
+            **options
+        )
+        logger.info(f"SocketIO配置: 异步服务器模式，CORS源 {cors_origins}")
+        return socketio
     socketio = SocketIO(
         app,
         cors_allowed_origins=cors_origins,
         logger=config.DEBUG,
-        engineio_logger=config.DEBUG
+        engineio_logger=config.DEBUG,
+        **options
     )
     logger.info(f"SocketIO配置: CORS源 {cors_origins}")
     return socketio
@@ -79,38 +110,108 @@ def _configure_heartbeat(socketio, config):
     logger.info(f"心跳检测配置: 超时时间 {heartbeat_timeout}秒")
     return heartbeat_handler
 
-def _register_routes(app):
+PROJECT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def _build_assets(config):
+    """构建静态资源管线（预压缩、内容哈希）"""
+    assets = AssetPipeline(PROJECT_ROOT, auto_reload=config.DEBUG).build()
+    logger.info(f"静态资源管线: 游戏目录 {assets.game_dirs}")
+    return assets
+
+def _build_registry(config):
+    """发现并校验游戏插件目录"""
+    return GameRegistry(PROJECT_ROOT, auto_reload=config.DEBUG).load()
+
+def _register_routes(app, assets, registry):
     """注册HTTP路由"""
     
+    def serve_asset(path):
+        response = assets.respond(path, request.headers)
+        if response is None:
+            return jsonify({'error': '文件不存在'}), 404
+        return response
+    
     @app.route('/')
     def index():
         """主页"""
-        try:
-            return send_from_directory('..', 'index.html')
-        except Exception as e:
-            logger.error(f"加载主页失败: {e}")
-            return jsonify({'error': '加载主页失败'}), 500
+        return serve_asset('index.html')
+    
+    @app.route('/api/games')
+    def game_manifest():
+        """游戏清单（所有已校验的游戏配置）"""
+        return registry.respond(request.headers)
     
     @app.route('/<game>/<path:path>')
     def game_files(game, path):
         """游戏文件"""
-        try:
-            return send_from_directory(f'../{game}', path)
-        except Exception as e:
-            logger.error(f"加载游戏文件失败 {game}/{path}: {e}")
-            return jsonify({'error': '文件不存在'}), 404
+        return serve_asset(f'{game}/{path}')
     
     @app.route('/<path:path>')
     def static_files(path):
         """静态文件"""
-        try:
-            return send_from_directory('..', path)
-        except Exception as e:
-            logger.error(f"加载静态文件失败 {path}: {e}")
-            return jsonify({'error': '文件不存在'}), 404
+        return serve_asset(path)
     
     logger.info("HTTP路由注册完成")
 
+def _register_metrics_route(app):
+    """注册运行指标路由（采集函数由 main 在各组件创建后登记）"""
+    
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus 文本格式的运行指标"""
+        return METRICS.render(), 200, {'Content-Type': CONTENT_TYPE}
+    
+    logger.info("运行指标路由注册完成: /metrics")
+
+# 临时采样剖析的最长时间（秒）
+MAX_PROFILE_SECONDS = 60
+
+def _register_admin_routes(app, admin_token):
+    """
+    注册管理路由（性能剖析结果）
+    
+    只在设置了 ADMIN_TOKEN 时注册，请求须携带相同的 X-Admin-Token 请求头。
+    不按来源地址放行：经本机反向代理转发的外部请求的来源地址也是本机。
+    """
+    if not admin_token:
+        logger.info("未设置 ADMIN_TOKEN，不注册管理路由 /admin/*")
+        return
+    
+    @app.before_request
+    def check_admin():
+        if request.path.startswith('/admin/') and not hmac.compare_digest(
+                request.headers.get('X-Admin-Token', '').encode('utf-8'), admin_token.encode('utf-8')):
+            return jsonify({'error': '无权访问'}), 403
+    
+    @app.route('/admin/profile')
+    def admin_profile():
+        """采样剖析的折叠栈；指定 seconds 时临时采样该时长（不需要开启持续采样）"""
+        seconds = request.args.get('seconds', type=float)
+        if seconds is not None:
+            if not 0 < seconds <= MAX_PROFILE_SECONDS:
+                return jsonify({'error': f'seconds 须在 0~{MAX_PROFILE_SECONDS} 之间'}), 400
+            return SAMPLER.profile_for(seconds), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+        if not SAMPLER.running and not SAMPLER.samples:
+            return jsonify({'error': '采样剖析未开启（PROFILER_ENABLED），可使用 ?seconds= 临时采样'}), 404
+        return SAMPLER.collapsed(), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    
+    @app.route('/admin/profile/reset', methods=['POST'])
+    def admin_profile_reset():
+        """清空采样结果"""
+        SAMPLER.reset()
+        return jsonify(SAMPLER.get_stats())
+    
+    @app.route('/admin/slow_events')
+    def admin_slow_events():
+        """慢事件捕获（最新的在前）和剖析状态"""
+        return jsonify({
+            'sampler': SAMPLER.get_stats(),
+            'slow_events': SLOW_EVENTS.get_stats(),
+            'captures': SLOW_EVENTS.get_captures(),
+        })
+    
+    logger.info("管理路由注册完成: /admin/*（令牌验证）")
+
 def _register_error_handlers(app):
     """注册全局错误处理器"""
     
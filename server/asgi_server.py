@@ -0,0 +1,386 @@
+"""
+异步服务器模式（ASGI）
+
+基于 python-socketio 的 AsyncServer，单进程用一个事件循环承载大量长连接
+（线程模式下每个连接占用一个线程）。游戏管理器、弹幕管理器、心跳和插件逻辑与线程模式共用：
+
+- AsyncSocketIO 提供插件使用的 Flask-SocketIO 接口（on/emit/join_room/server），
+  事件处理器在事件循环中执行，处理期间推入 Flask 请求上下文（request.sid/namespace 可用）；
+  处理器可以是协程函数（GamePlugin.on 注册的 async def 处理器直接在事件循环中等待）
+- 同步接口的发送放入发送队列，由一个任务按调用顺序依次发送；其他线程（心跳回收、回放调度）
+  的发送经 call_soon_threadsafe 进入同一队列
+- 数据库调用经 storage.ExecutorBackend 在有界线程池中执行，blocking_events 中的事件
+  （需要同步查询数据库的处理器）整体在线程池中执行
+- 普通HTTP请求（静态资源、游戏清单、插件HTTP路由）在线程池中交给 Flask 应用处理
+
+uvicorn 为可选依赖，只在 SERVER_MODE=asgi 时需要。集群模式只支持线程模式。
+"""
+
+import asyncio
+import inspect
+import io
+import logging
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+from flask import request
+from werkzeug.test import EnvironBuilder
+
+try:
+    import uvicorn
+except ImportError:  # uvicorn为可选依赖，缺失时只能使用线程模式
+    uvicorn = None
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSocketIO:
+    """以 Flask-SocketIO 的接口包装 AsyncServer"""
+
+    async_mode = 'asgi'
+
+    def __init__(self, app, blocking_events=(), executor_workers=8, **server_options):
+        """
+        Args:
+            app: Flask应用（提供请求上下文、注册表和HTTP路由）
+            blocking_events: 在线程池中执行的事件（处理器中有同步数据库查询）
+            executor_workers: 线程池大小
+            **server_options: AsyncServer 参数（cors_allowed_origins、client_manager等）
+        """
+        self.app = app
+        self.sio = socketio.AsyncServer(async_mode='asgi', **server_options)
+        self.server = _SyncServer(self)
+        self.blocking_events = set(blocking_events)
+        self.executor = ThreadPoolExecutor(executor_workers, thread_name_prefix='asgi')
+        self.loop = None
+        self._loop_thread = None
+        self._outbox = []
+        self._sender = None
+        self._pending_tasks = []
+        self._environ = EnvironBuilder(path='/socket.io/').get_environ()
+        app.extensions['socketio'] = self
+
+    def attach(self, loop=None):
+        """绑定事件循环（服务器启动时调用，启动此前登记的协程后台任务）"""
+        self.loop = loop or asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        pending, self._pending_tasks = self._pending_tasks, []
+        for target, args, kwargs in pending:
+            self.loop.create_task(target(*args, **kwargs))
+
+    def on(self, event, namespace=None):
+        """
+        注册事件处理器的装饰器（与 Flask-SocketIO 相同，同一事件后注册的处理器生效）
+
+        connect 处理器接收认证数据（处理器不带参数时不传），返回False拒绝连接。
+        """
+        namespace = namespace or '/'
+
+        def decorator(handler):
+            if event == 'connect':
+                takes_auth = bool(inspect.signature(handler).parameters)
+
+                async def trigger(sid, environ, auth=None):
+                    return await self._call(event, handler, sid, namespace, (auth,) if takes_auth else ())
+            else:
+                async def trigger(sid, *args):
+                    return await self._call(event, handler, sid, namespace, args)
+
+            self.sio.on(event, trigger, namespace=namespace)
+            return handler
+        return decorator
+
+    async def _call(self, event, handler, sid, namespace, args):
+        """在请求上下文中执行处理器"""
+        if self.loop is None:
+            self.attach()
+        if event in self.blocking_events:
+            return await self.loop.run_in_executor(self.executor, self._call_blocking, event, handler, sid,
+                                                   namespace, args)
+        with self.app.request_context(dict(self._environ)):
+            request.sid = sid
+            request.namespace = namespace
+            try:
+                result = handler(*args)
+                if inspect.isawaitable(result):
+                    result = await result
+                return result
+            except Exception as e:
+                logger.error(f"事件 {event} 处理失败: {e}", exc_info=True)
+
+    def _call_blocking(self, event, handler, sid, namespace, args):
+        with self.app.request_context(dict(self._environ)):
+            request.sid = sid
+            request.namespace = namespace
+            try:
+                return handler(*args)
+            except Exception as e:
+                logger.error(f"事件 {event} 处理失败: {e}", exc_info=True)
+
+    def emit(self, event, *args, **kwargs):
+        """发送事件（参数与 Flask-SocketIO 的 SocketIO.emit 相同，实际发送由发送队列完成）"""
+        namespace = kwargs.pop('namespace', None) or '/'
+        to = kwargs.pop('to', None) or kwargs.pop('room', None)
+        skip_sid = kwargs.pop('skip_sid', None)
+        if not kwargs.pop('include_self', True) and not skip_sid:
+            skip_sid = request.sid
+        data = args[0] if len(args) == 1 else (args or None)
+        self.schedule(self.sio.emit(event, data, to=to, skip_sid=skip_sid, namespace=namespace,
+                                    callback=kwargs.pop('callback', None),
+                                    ignore_queue=kwargs.pop('ignore_queue', False)))
+
+    def schedule(self, coro):
+        """
+        把 AsyncServer 的协程调用放入发送队列（按调用顺序执行，可在任意线程调用）
+
+        Args:
+            coro: 协程对象
+        """
+        if self.loop is None:
+            coro.close()
+            logger.warning("异步服务器尚未启动，丢弃发送")
+        elif threading.get_ident() == self._loop_thread:
+            self._enqueue(coro)
+        else:
+            self.loop.call_soon_threadsafe(self._enqueue, coro)
+
+    def _enqueue(self, coro):
+        self._outbox.append(coro)
+        if self._sender is None:
+            self._sender = self.loop.create_task(self._send_all())
+
+    async def _send_all(self):
+        try:
+            while self._outbox:
+                batch, self._outbox = self._outbox, []
+                for coro in batch:
+                    try:
+                        await coro
+                    except Exception as e:
+                        logger.error(f"发送失败: {e}")
+        finally:
+            self._sender = None
+
+    async def flush(self):
+        """等待发送队列清空"""
+        while self._sender is not None:
+            await self._sender
+
+    def sleep(self, seconds=0):
+        """后台任务中的等待（同步后台任务在线程中执行）"""
+        time.sleep(seconds)
+
+    def start_background_task(self, target, *args, **kwargs):
+        """
+        启动后台任务：协程函数在事件循环中执行，普通函数在守护线程中执行
+
+        Returns:
+            threading.Thread 或 None
+        """
+        if asyncio.iscoroutinefunction(target):
+            if self.loop is None:
+                self._pending_tasks.append((target, args, kwargs))
+            else:
+                self.loop.call_soon_threadsafe(lambda: self.loop.create_task(target(*args, **kwargs)))
+            return None
+        thread = threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True)
+        thread.start()
+        return thread
+
+    async def run_blocking(self, fn, *args):
+        """在线程池中执行阻塞调用（协程处理器中使用）"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, lambda: fn(*args))
+
+    def asgi_app(self):
+        """
+        创建ASGI应用：Socket.IO 请求交给 AsyncServer，其他HTTP请求交给 Flask 应用
+
+        Returns:
+            socketio.ASGIApp
+        """
+        return socketio.ASGIApp(self.sio, other_asgi_app=WSGIBridge(self.app, self.executor),
+                                on_startup=self.attach)
+
+
+class _SyncServer:
+    """
+    AsyncServer 的同步接口（广播器、编码协商、心跳回收按 Flask-SocketIO 的 socketio.server 调用）
+
+    发送和断开放入发送队列；加入/离开房间只修改客户端管理器的内存结构，立即生效。
+    """
+
+    def __init__(self, socketio):
+        self._socketio = socketio
+        self._server = socketio.sio
+        self.eio = _SyncEngineIO(socketio)
+
+    @property
+    def manager(self):
+        return self._server.manager
+
+    @property
+    def packet_class(self):
+        return self._server.packet_class
+
+    def emit(self, event, data=None, **kwargs):
+        self._socketio.schedule(self._server.emit(event, data, **kwargs))
+
+    def enter_room(self, sid, room, namespace=None):
+        self._server.manager.basic_enter_room(sid, namespace or '/', room)
+
+    def leave_room(self, sid, room, namespace=None):
+        self._server.manager.basic_leave_room(sid, namespace or '/', room)
+
+    def disconnect(self, sid, namespace=None, ignore_queue=False):
+        self._socketio.schedule(self._server.disconnect(sid, namespace=namespace, ignore_queue=ignore_queue))
+
+    def __getattr__(self, name):
+        return getattr(self._server, name)
+
+
+class _SyncEngineIO:
+    """AsyncServer.eio 的同步发送接口（广播器发送已编码的数据包，放入发送队列）"""
+
+    def __init__(self, socketio):
+        self._socketio = socketio
+
+    def send_packet(self, eio_sid, pkt):
+        self._socketio.schedule(self._socketio.sio.eio.send_packet(eio_sid, pkt))
+
+
+class WSGIBridge:
+    """在线程池中执行 WSGI 应用，作为 ASGI 应用处理普通HTTP请求"""
+
+    def __init__(self, app, executor):
+        """
+        Args:
+            app: WSGI应用（Flask应用）
+            executor: 执行WSGI应用的线程池
+        """
+        self.app = app
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            if scope['type'] == 'websocket':
+                await send({'type': 'websocket.close'})
+            return
+
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        loop = asyncio.get_running_loop()
+        status, headers, payload = await loop.run_in_executor(self.executor, self._run, wsgi_environ(scope, body))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': payload})
+
+    def _run(self, environ):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+        result = self.app(environ, start_response)
+        try:
+            payload = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], payload
+
+
+def wsgi_environ(scope, body):
+    """
+    将ASGI的HTTP请求转换为WSGI environ
+
+    Args:
+        scope: ASGI连接信息
+        body: 请求体
+
+    Returns:
+        dict: WSGI environ
+    """
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('127.0.0.1', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def serve(socketio, host, port, drain_controller=None, log_level='info'):
+    """
+    使用 uvicorn 运行异步服务器（阻塞到服务器退出）
+
+    SIGTERM 时先排空房间并等待提示消息发出，再让 uvicorn 关闭连接退出。
+
+    Args:
+        socketio: AsyncSocketIO
+        host: 监听地址
+        port: 监听端口
+        drain_controller: DrainController（可选）
+        log_level: uvicorn 日志级别
+
+    Returns:
+        bool: uvicorn 未安装时返回False
+    """
+    if uvicorn is None:
+        logger.error("异步服务器模式需要安装 uvicorn（pip install uvicorn）")
+        return False
+
+    class DrainingServer(uvicorn.Server):
+        """收到 SIGTERM 时先排空再退出的 uvicorn 服务器"""
+
+        draining = False
+
+        def handle_exit(self, sig, frame):
+            if sig != signal.SIGTERM or drain_controller is None or self.draining or socketio.loop is None:
+                return super().handle_exit(sig, frame)
+            self.draining = True
+            socketio.loop.call_soon_threadsafe(lambda: socketio.loop.create_task(self.drain()))
+
+        async def drain(self):
+            logger.info("收到停止信号，开始排空")
+            try:
+                drain_controller.drain()
+            except Exception as e:
+                logger.error(f"排空失败: {e}")
+            await socketio.flush()
+            await asyncio.sleep(drain_controller.grace)
+            self.should_exit = True
+
+    config = uvicorn.Config(socketio.asgi_app(), host=host, port=port, log_level=log_level)
+    DrainingServer(config).run()
+    return True
@@ -0,0 +1,296 @@
+"""
+静态资源管线
+
+启动时扫描主页、公共资源和各游戏目录，在内存中预先计算 gzip/brotli
+压缩版本和强ETag。HTML中引用的资源被改写为带内容哈希的URL，
+哈希URL永久缓存，其余URL通过ETag协商返回304。
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖，缺失时只提供gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# 根目录下需要提供的公共资源
+ROOT_ASSETS = ('index.html', 'shared-styles.css', 'heartbeat.js')
+
+# 游戏目录中允许提供的文件类型
+ASSET_EXTENSIONS = {
+    '.html', '.js', '.css', '.json', '.png', '.jpg', '.jpeg', '.gif',
+    '.svg', '.ico', '.webp', '.mp3', '.ogg', '.wav', '.woff', '.woff2'
+}
+
+# 值得压缩的文件类型
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# 小于此大小的文件不压缩
+COMPRESS_MIN_SIZE = 256
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# HTML中的本地资源引用
+REFERENCE_PATTERN = re.compile(r'''(\b(?:src|href)=["'])([^"'#?]+)(["'])''')
+
+
+def discover_game_dirs(root):
+    """发现根目录下包含 game.json 的游戏目录"""
+    return sorted(
+        name for name in os.listdir(root)
+        if not name.startswith('.') and os.path.isfile(os.path.join(root, name, 'game.json'))
+    )
+
+
+class Asset:
+    """内存中的静态资源及其预压缩版本"""
+
+    __slots__ = ('path', 'source', 'content_type', 'body', 'digest', 'hashed_path', 'variants', 'mtime')
+
+    def __init__(self, path, source, body, mtime=0):
+        self.path = path
+        self.source = source
+        self.mtime = mtime
+        self.content_type = _guess_type(path)
+        self.set_body(body)
+
+    def set_body(self, body):
+        """设置内容并重新计算哈希、压缩版本和ETag"""
+        self.body = body
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+
+        name, ext = posixpath.splitext(self.path)
+        self.hashed_path = f'{name}.{self.digest[:8]}{ext}'
+
+        # {编码: (内容, ETag)}，不同编码的表示使用不同的强ETag
+        self.variants = {'identity': (body, f'"{self.digest}"')}
+        if len(body) >= COMPRESS_MIN_SIZE and self.content_type.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.variants['gzip'] = (compressed, f'"{self.digest}-gz"')
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    self.variants['br'] = (compressed, f'"{self.digest}-br"')
+
+    def select(self, accept_encoding):
+        """
+        按客户端支持的编码选择最优表示
+
+        Returns:
+            tuple: (编码, 内容, ETag)
+        """
+        accepted = _parse_accept_encoding(accept_encoding)
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and encoding in accepted:
+                return (encoding,) + self.variants[encoding]
+        return ('identity',) + self.variants['identity']
+
+    def etags(self):
+        """该资源所有表示的ETag"""
+        return {etag for _, etag in self.variants.values()}
+
+
+class AssetPipeline:
+    """静态资源管线"""
+
+    def __init__(self, root, auto_reload=False):
+        """
+        初始化资源管线
+
+        Args:
+            root: 项目根目录（包含 index.html 和各游戏目录）
+            auto_reload: 源文件变化时自动重建（开发模式使用）
+        """
+        self.root = os.path.abspath(root)
+        self.auto_reload = auto_reload
+        self.assets = {}  # {url路径: Asset}，同时包含原始路径和哈希路径
+        self.game_dirs = []
+        self._built_mtime = 0
+        self._lock = threading.Lock()
+
+    def _source_files(self):
+        """列出需要提供的源文件 {url路径: 文件路径}"""
+        files = {}
+        for name in ROOT_ASSETS:
+            source = os.path.join(self.root, name)
+            if os.path.isfile(source):
+                files[name] = source
+
+        for game_dir in self.game_dirs:
+            base = os.path.join(self.root, game_dir)
+            for dirpath, dirnames, filenames in os.walk(base):
+                dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+                for filename in filenames:
+                    if filename.startswith('.') or posixpath.splitext(filename)[1].lower() not in ASSET_EXTENSIONS:
+                        continue
+                    source = os.path.join(dirpath, filename)
+                    files[os.path.relpath(source, self.root).replace(os.sep, '/')] = source
+        return files
+
+    def build(self):
+        """
+        扫描并构建所有资源
+
+        Returns:
+            AssetPipeline: self，便于链式调用
+        """
+        self.game_dirs = discover_game_dirs(self.root)
+        assets = {}
+        built_mtime = 0
+        for path, source in self._source_files().items():
+            with open(source, 'rb') as f:
+                body = f.read()
+            mtime = os.path.getmtime(source)
+            built_mtime = max(built_mtime, mtime)
+            assets[path] = Asset(path, source, body, mtime)
+
+        # 先计算非HTML资源的哈希，再改写HTML中的引用
+        for asset in assets.values():
+            if asset.content_type == 'text/html':
+                asset.set_body(self._rewrite_references(asset, assets))
+
+        index = {}
+        for asset in assets.values():
+            index[asset.path] = asset
+            index[asset.hashed_path] = asset
+
+        with self._lock:
+            self.assets = index
+            self._built_mtime = built_mtime
+
+        total = sum(len(a.body) for a in assets.values())
+        logger.info(f"静态资源构建完成: {len(assets)} 个文件, {total} 字节, brotli={'启用' if brotli else '未安装'}")
+        return self
+
+    def _rewrite_references(self, html_asset, assets):
+        """将HTML中的本地资源引用改写为带哈希的绝对URL"""
+        base = posixpath.dirname(html_asset.path)
+
+        def replace(match):
+            ref = match.group(2)
+            if '://' in ref or ref.startswith('//') or ref.startswith('data:'):
+                return match.group(0)
+            path = posixpath.normpath(ref.lstrip('/') if ref.startswith('/') else posixpath.join(base, ref))
+            target = assets.get(path)
+            if not target or target.content_type == 'text/html':
+                return match.group(0)
+            return f'{match.group(1)}/{target.hashed_path}{match.group(3)}'
+
+        return REFERENCE_PATTERN.sub(replace, html_asset.body.decode('utf-8')).encode('utf-8')
+
+    def _reload_if_changed(self):
+        """开发模式下源文件变化时重建"""
+        try:
+            latest = max(os.path.getmtime(a.source) for a in self.assets.values())
+        except (OSError, ValueError):
+            latest = float('inf')
+        if latest > self._built_mtime or discover_game_dirs(self.root) != self.game_dirs:
+            self.build()
+
+    def get(self, path):
+        """
+        查找资源
+
+        Returns:
+            tuple: (Asset, 是否为哈希URL)，不存在返回 (None, False)
+        """
+        if self.auto_reload:
+            self._reload_if_changed()
+        asset = self.assets.get(path)
+        if asset is None:
+            return None, False
+        return asset, path == asset.hashed_path and path != asset.path
+
+    def respond(self, path, headers):
+        """
+        生成资源响应
+
+        Args:
+            path: URL路径（不含开头的/）
+            headers: 请求头
+
+        Returns:
+            Response: 资源响应或304，资源不存在返回None
+        """
+        asset, immutable = self.get(path)
+        if asset is None:
+            return None
+        return asset_response(asset, headers, immutable)
+
+
+def asset_response(asset, headers, immutable=False):
+    """
+    按请求头生成资源响应（编码协商、条件请求）
+
+    Args:
+        asset: Asset实例
+        headers: 请求头
+        immutable: 是否为永久缓存的哈希URL
+
+    Returns:
+        Response: 资源响应或304
+    """
+    encoding, body, etag = asset.select(headers.get('Accept-Encoding', ''))
+    response_headers = {
+        'ETag': etag,
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+        'Vary': 'Accept-Encoding',
+    }
+
+    if_none_match = headers.get('If-None-Match')
+    if if_none_match and _etag_matches(if_none_match, asset.etags()):
+        return Response(status=304, headers=response_headers)
+
+    if encoding != 'identity':
+        response_headers['Content-Encoding'] = encoding
+    response = Response(body, mimetype=asset.content_type, headers=response_headers)
+    if asset.content_type.startswith('text/') or asset.content_type in ('application/javascript', 'application/json'):
+        response.charset = 'utf-8'
+    return response
+
+
+def _guess_type(path):
+    """根据扩展名推断MIME类型"""
+    content_type, _ = mimetypes.guess_type(path)
+    if path.endswith('.js'):
+        return 'application/javascript'
+    return content_type or 'application/octet-stream'
+
+
+def _parse_accept_encoding(header):
+    """解析 Accept-Encoding，返回可接受的编码集合（忽略 q=0）"""
+    accepted = set()
+    for part in header.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        if params.replace(' ', '').lower() in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(token)
+    return accepted
+
+
+def _etag_matches(if_none_match, etags):
+    """If-None-Match 是否匹配任一表示的ETag（弱比较）"""
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate in etags:
+            return True
+    return False
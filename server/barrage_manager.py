@@ -42,6 +42,9 @@ class BarrageManager:
         # 房间弹幕历史: {room_id: deque([{text, user_id, timestamp}, ...])}
         self.room_history = defaultdict(lambda: deque(maxlen=max_history))
         
+        # 处理计数（按结果，供运行指标计算速率）
+        self.counters = {'sent': 0, 'rate_limited': 0, 'filtered': 0, 'duplicate': 0}
+        
         # 敏感词列表（可扩展）
         self.blocked_words = set([
             # 添加需要过滤的敏感词
@@ -73,7 +76,8 @@ class BarrageManager:
             # 计算需要等待的时间
             oldest_time = user_record[0]
             cooldown = self.time_window - (current_time - oldest_time)
-            logger.warning(f"用户 {user_id} 发送弹幕过于频繁，需等待 {cooldown:.1f}秒")
+            self.counters['rate_limited'] += 1
+            logger.warning("用户 %s 发送弹幕过于频繁，需等待 %.1f秒", user_id, cooldown)
             return False, cooldown
         
         # 记录本次发送
@@ -100,12 +104,14 @@ class BarrageManager:
         # 检查敏感词
         for word in self.blocked_words:
             if word in text:
-                logger.warning(f"弹幕包含敏感词: {word}")
+                logger.warning("弹幕包含敏感词: %s", word)
+                self.counters['filtered'] += 1
                 return False, "", f"弹幕包含敏感词"
         
         # 检查是否全是重复字符
         if len(set(text)) == 1 and len(text) > 5:
-            logger.warning(f"弹幕内容无效: 全是重复字符")
+            logger.warning("弹幕内容无效: 全是重复字符")
+            self.counters['filtered'] += 1
             return False, "", "弹幕内容无效"
         
         return True, text, ""
@@ -136,7 +142,8 @@ class BarrageManager:
             
             # 检查是否为同一用户发送的相同内容
             if record['user_id'] == user_id and record['text'] == text:
-                logger.warning(f"用户 {user_id} 发送重复弹幕: {text}")
+                logger.warning("用户 %s 发送重复弹幕: %s", user_id, text)
+                self.counters['duplicate'] += 1
                 return True
         
         return False
@@ -155,6 +162,7 @@ class BarrageManager:
             'user_id': user_id,
             'timestamp': time.time()
         })
+        self.counters['sent'] += 1
     
     def get_room_history(self, room_id, limit=50):
         """
@@ -179,8 +187,35 @@ class BarrageManager:
         """
         if room_id in self.room_history:
             del self.room_history[room_id]
-            logger.info(f"已清除房间 {room_id} 的弹幕历史")
-    
+            logger.info("已清除房间 %s 的弹幕历史", room_id)
+
+    def export_history(self, room_ids, limit=20):
+        """
+        导出房间弹幕历史的尾部（停机交接用）
+
+        Args:
+            room_ids: 房间ID集合
+            limit: 每个房间保留的最大数量
+
+        Returns:
+            dict: {room_id: [弹幕]}，没有弹幕的房间不包含
+        """
+        return {
+            room_id: list(history)[-limit:]
+            for room_id, history in list(self.room_history.items())
+            if room_id in room_ids and history
+        }
+
+    def import_history(self, histories):
+        """
+        导入弹幕历史（替换同名房间的历史）
+
+        Args:
+            histories: {room_id: [弹幕]}
+        """
+        for room_id, items in histories.items():
+            self.room_history[room_id] = deque(items, maxlen=self.max_history)
+
     def clear_user_records(self, user_id):
         """
         清除用户发送记录
@@ -212,5 +247,6 @@ class BarrageManager:
             return {
                 'total_rooms': len(self.room_history),
                 'total_users': len(self.user_records),
-                'total_barrages': sum(len(h) for h in self.room_history.values())
+                'total_barrages': sum(len(h) for h in self.room_history.values()),
+                'counters': dict(self.counters)
             }
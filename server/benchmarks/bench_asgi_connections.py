@@ -0,0 +1,189 @@
+"""
+异步服务器连接扩展基准
+
+在一个新进程中建立 N 个模拟连接，比较两种服务器模式每个连接的内存和建立耗时：
+- asgi：AsyncServer 上的 Engine.IO/Socket.IO 会话（每个连接一个 AsyncSocket 和两个等待中的
+  读写任务，对应 websocket 传输的读写协程），连接事件经心跳处理器登记
+- threads：线程模式下每个 websocket 连接占用的两个线程（请求线程和 simple-websocket 读线程），
+  线程阻塞在 Event 上，只计入线程本身的开销
+
+asgi 模式还在这些连接上两两进行五子棋，测量连接数增加时的事件处理吞吐量
+（同步处理事件，发送只计数不经过网络）。uvicorn 未安装时同样可以运行。
+
+用法: python benchmarks/bench_asgi_connections.py [--connections 1000,5000,10000] [--moves 20000]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import logging
+logging.disable(logging.WARNING)
+
+# 黑白棋子各自隔一格放置，不会连成五子
+MOVES_PER_GAME = 30
+
+
+def _move(index):
+    stone = index // 2
+    return {'row': (stone // 7) * 2 + index % 2, 'col': (stone % 7) * 2}
+
+
+def rss_kb():
+    """当前进程常驻内存（KB）"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+async def run_asgi(count, moves):
+    from engineio.async_socket import AsyncSocket
+    from flask import Flask
+    from asgi_server import AsyncSocketIO
+    from game_manager import GameManager
+    from heartbeat import HeartbeatHandler
+    from plugin_loader import PluginLoader
+
+    app = Flask('bench-asgi')
+    socketio = AsyncSocketIO(app, async_handlers=False)
+    socketio.attach()
+    sio = socketio.sio
+    registry = SimpleNamespace(games={'gomoku': {'id': 'gomoku', 'server': {
+        'enabled': True, 'plugin': 'plugins.gomoku:GomokuPlugin',
+        'events': ['create_room', 'join_room', 'make_move', 'disconnect']}}})
+    game_manager = GameManager()
+    heartbeat = HeartbeatHandler(socketio, timeout=60)
+    heartbeat.register_events()
+    PluginLoader(registry, app, socketio, None, game_manager, heartbeat_handler=heartbeat,
+                 default_game='gomoku').register_events()
+
+    async def reader(closed):
+        await closed.wait()
+
+    async def writer(socket):
+        while True:
+            await socket.queue.get()
+
+    gc.collect()
+    base = rss_kb()
+    start = time.perf_counter()
+    sockets, tasks = [], []
+    closed = asyncio.Event()
+    for i in range(count):
+        eio_sid = f'e{i}'
+        socket = AsyncSocket(sio.eio, eio_sid)
+        sio.eio.sockets[eio_sid] = socket
+        tasks.append(asyncio.ensure_future(reader(closed)))
+        tasks.append(asyncio.ensure_future(writer(socket)))
+        await sio._handle_eio_connect(eio_sid, {'REMOTE_ADDR': '127.0.0.1'})
+        await sio._handle_eio_message(eio_sid, '0')
+        sockets.append(socket)
+    await socketio.flush()
+    await asyncio.sleep(0)
+    connect_seconds = time.perf_counter() - start
+    gc.collect()
+    per_connection = (rss_kb() - base) * 1024 / count
+
+    # 事件吞吐量：发送只计数
+    sent = [0]
+
+    async def count_packet(eio_sid, pkt):
+        sent[0] += 1
+
+    sio.eio.send_packet = count_packet
+    for n in range(count // 2):
+        await sio._handle_eio_message(f'e{n * 2}', '2["create_room",{}]')
+    room_ids = list(game_manager.rooms)
+    for n, room_id in enumerate(room_ids):
+        await sio._handle_eio_message(f'e{n * 2 + 1}', '2' + json.dumps(['join_room', {'room_id': room_id}]))
+    await socketio.flush()
+
+    messages = []
+    for index in range(MOVES_PER_GAME):
+        for n, room_id in enumerate(room_ids):
+            payload = json.dumps(['make_move', {'room_id': room_id, **_move(index)}])
+            messages.append((f'e{n * 2 + index % 2}', f'2{payload}'))
+            if len(messages) >= moves:
+                break
+        if len(messages) >= moves:
+            break
+    start = time.perf_counter()
+    for eio_sid, data in messages:
+        await sio._handle_eio_message(eio_sid, data)
+    await socketio.flush()
+    move_seconds = time.perf_counter() - start
+
+    closed.set()
+    for task in tasks:
+        task.cancel()
+    return {'per_connection': per_connection, 'connect_seconds': connect_seconds,
+            'moves': len(messages), 'moves_per_second': len(messages) / move_seconds, 'sent': sent[0]}
+
+
+def run_threads(count):
+    stop = threading.Event()
+    gc.collect()
+    base = rss_kb()
+    start = time.perf_counter()
+    threads = []
+    try:
+        for _ in range(count * 2):
+            thread = threading.Thread(target=stop.wait, daemon=True)
+            thread.start()
+            threads.append(thread)
+    except RuntimeError:
+        stop.set()
+        return {'per_connection': None, 'connect_seconds': None, 'started': len(threads) // 2}
+    connect_seconds = time.perf_counter() - start
+    per_connection = (rss_kb() - base) * 1024 / count
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {'per_connection': per_connection, 'connect_seconds': connect_seconds, 'started': count}
+
+
+def measure(mode, count, moves):
+    """在新进程中测量一种模式，返回结果字典"""
+    output = subprocess.run([sys.executable, __file__, '--measure', mode, '--connections', str(count),
+                             '--moves', str(moves)], check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='异步服务器连接扩展基准')
+    parser.add_argument('--connections', default='1000,5000,10000')
+    parser.add_argument('--moves', type=int, default=20000)
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        count = int(args.connections)
+        result = asyncio.run(run_asgi(count, args.moves)) if args.measure == 'asgi' else run_threads(count)
+        print(json.dumps(result))
+        return
+
+    print(f"{'连接数':>8} {'asgi每连接':>10} {'asgi建立':>10} {'落子/秒':>10} {'线程每连接':>10} {'线程建立':>10}")
+    for count in [int(c) for c in args.connections.split(',')]:
+        asgi = measure('asgi', count, args.moves)
+        threads = measure('threads', count, args.moves)
+        if threads['per_connection'] is None:
+            thread_columns = f"{'失败':>10} {threads['started']:>8}个"
+        else:
+            thread_columns = (f"{threads['per_connection'] / 1024:>8.1f}KB "
+                              f"{threads['connect_seconds'] * 1000:>8.0f}ms")
+        print(f"{count:>8} {asgi['per_connection'] / 1024:>8.1f}KB {asgi['connect_seconds'] * 1000:>8.0f}ms "
+              f"{asgi['moves_per_second']:>10.0f} {thread_columns}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+广播吞吐基准
+
+对比按接收者逐个 emit（旧实现）与一次编码广播（Broadcaster）的每秒发送量。
+Engine.IO 发送被替换为空操作，只测量序列化和分发开销。
+
+用法: python benchmarks/bench_broadcast.py
+"""
+
+import sys
+import os
+import time
+from unittest.mock import Mock
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import socketio
+from broadcaster import Broadcaster
+
+PAYLOAD = {'position': 1, 'cards': [{'suit': '♠', 'value': str(v)} for v in range(3, 10)], 'remaining': 10}
+
+
+def make_server(recipient_count):
+    """创建带有指定数量已连接客户端的服务端"""
+    server = socketio.Server()
+    server.eio.send_packet = lambda eio_sid, pkt: None
+    sids = [server.manager.connect(f'eio-{i}', '/') for i in range(recipient_count)]
+    return server, sids
+
+
+def bench_per_recipient(server, sids, duration):
+    """旧实现：每个接收者单独 emit，每次都重新序列化"""
+    broadcasts = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for sid in sids:
+            server.emit('cards_played', PAYLOAD, to=sid)
+        broadcasts += 1
+    return broadcasts
+
+
+def bench_encode_once(server, sids, duration):
+    """新实现：编码一次后发送给所有接收者"""
+    broadcaster = Broadcaster(Mock(server=server))
+    broadcasts = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        broadcaster.emit('cards_played', PAYLOAD, sids=sids)
+        broadcasts += 1
+    return broadcasts
+
+
+def main(duration=1.0):
+    print(f"{'接收者':>6} {'实现':>12} {'广播/秒':>12} {'消息/秒':>12}")
+    for count in (2, 3, 500):
+        server, sids = make_server(count)
+        for name, bench in (('逐个emit', bench_per_recipient), ('一次编码', bench_encode_once)):
+            broadcasts = bench(server, sids, duration)
+            rate = broadcasts / duration
+            print(f"{count:>6} {name:>12} {rate:>12.0f} {rate * count:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+集群扩展基准
+
+启动本地消息代理和 N 个工作进程，每个工作进程是一个完整的服务器实例（ClusterManager
+经消息代理同步），在本进程内用模拟连接同时进行多局五子棋，统计所有进程合计的每秒落子数。
+房间都创建在本进程（房间归属），热路径上只有发往消息代理的跨进程 emit。
+
+扩展效率 = 合计落子/秒 ÷ (N × 单进程落子/秒)，CPU核数少于工作进程数时无法线性扩展。
+
+用法: python benchmarks/bench_cluster.py [--workers 1,2,4] [--duration 3]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import logging
+logging.disable(logging.WARNING)
+
+GAMES_PER_WORKER = 20
+# 黑白棋子各自隔一格放置，不会连成五子，一局固定 MOVES_PER_GAME 步
+MOVES_PER_GAME = 30
+
+
+def _move(index):
+    stone = index // 2
+    return {'row': (stone // 7) * 2 + index % 2, 'col': (stone % 7) * 2}
+
+
+def run_worker(worker_id, workers, url, duration, results):
+    from flask import Flask, request
+    from flask_socketio import SocketIO
+    from cluster import ClusterManager, RespPubSub, RoomAffinity
+    from game_manager import GameManager
+    from plugin_loader import PluginLoader
+
+    registry = SimpleNamespace(games={'gomoku': {'id': 'gomoku', 'server': {
+        'enabled': True, 'plugin': 'plugins.gomoku:GomokuPlugin',
+        'events': ['create_room', 'join_room', 'make_move', 'disconnect']}}})
+    app = Flask(f'worker{worker_id}')
+    cluster = ClusterManager(RespPubSub(url), RoomAffinity(worker_id, workers))
+    socketio = SocketIO(app, client_manager=cluster)
+    socketio.server.eio.send_packet = lambda eio_sid, pkt: None
+    cluster.initialize()
+    socketio.server.manager_initialized = True
+    game_manager = GameManager(affinity=cluster.affinity)
+    loader = PluginLoader(registry, app, socketio, None, game_manager, default_game='gomoku', cluster=cluster)
+    loader.register_events()
+    routes = loader.routes
+    manager = socketio.server.manager
+
+    def send(sid, event, *args):
+        request.sid = sid
+        request.namespace = '/'
+        routes[event](*args)
+
+    def new_game(index):
+        players = [manager.connect(f'w{worker_id}-g{index}-{n}-{time.perf_counter_ns()}', '/') for n in (0, 1)]
+        send(players[0], 'create_room', {})
+        room_id = game_manager.player_status[players[0]]['room_id']
+        send(players[1], 'join_room', {'room_id': room_id})
+        return {'players': players, 'room_id': room_id, 'moves': 0}
+
+    moves = 0
+    with app.test_request_context('/socket.io/'):
+        games = [new_game(i) for i in range(GAMES_PER_WORKER)]
+        start = time.perf_counter()
+        deadline = start + duration
+        while time.perf_counter() < deadline:
+            for i, game in enumerate(games):
+                player = game['players'][game['moves'] % 2]
+                send(player, 'make_move', dict(_move(game['moves']), room_id=game['room_id']))
+                game['moves'] += 1
+                moves += 1
+                if game['moves'] >= MOVES_PER_GAME:
+                    for sid in game['players']:
+                        send(sid, 'disconnect')
+                    games[i] = new_game(i)
+        elapsed = time.perf_counter() - start
+    stats = cluster.get_stats()
+    cluster.close()
+    results.put((worker_id, moves, elapsed, stats['published'], stats['received']))
+
+
+def run(workers, url, duration):
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_worker, args=(i, workers, url, duration, results))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    rows = [results.get(timeout=duration + 60) for _ in processes]
+    for process in processes:
+        process.join()
+    moves = sum(row[1] for row in rows)
+    elapsed = max(row[2] for row in rows)
+    return moves / elapsed, sum(row[3] for row in rows), sum(row[4] for row in rows)
+
+
+def main():
+    from resp import RespBroker
+
+    parser = argparse.ArgumentParser(description='集群扩展基准')
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--duration', type=float, default=3.0)
+    args = parser.parse_args()
+
+    broker = RespBroker().start()
+    print(f"CPU核数: {os.cpu_count()}")
+    print(f"{'进程数':>6} {'落子/秒':>10} {'每进程':>10} {'扩展效率':>8} {'发布':>10} {'接收':>10}")
+    baseline = None
+    try:
+        for workers in (int(n) for n in args.workers.split(',')):
+            rate, published, received = run(workers, broker.url, args.duration)
+            baseline = baseline or rate
+            efficiency = rate / (baseline * workers)
+            print(f"{workers:>6} {rate:>10.0f} {rate / workers:>10.0f} {efficiency:>8.0%} "
+                  f"{published:>10} {received:>10}")
+    finally:
+        broker.close()
+
+
+if __name__ == '__main__':
+    main()
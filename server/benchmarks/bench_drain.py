@@ -0,0 +1,118 @@
+"""
+停机交接基准
+
+构造 N 个进行中的房间（五子棋/斗地主/极速狂飙按 2:1:1，每个房间带增量日志和弹幕），
+测量排空（生成令牌并写快照）的耗时和快照大小，然后在新的进程中测量恢复耗时。
+
+用法: python benchmarks/bench_drain.py [--rooms 10000]
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import logging
+logging.disable(logging.WARNING)
+
+from barrage_manager import BarrageManager
+from drain import DrainController
+from game_manager import GameManager, RoomStatus
+
+
+def gomoku_room(game_manager, rng):
+    board = [[0] * 15 for _ in range(15)]
+    room_id = game_manager.create_room('gomoku', {'board': board, 'current': 1, 'moves': []})
+    room = game_manager.rooms[room_id]
+    for i in range(rng.randint(10, 80)):
+        r, c = rng.randrange(15), rng.randrange(15)
+        board[r][c] = i % 2 + 1
+        room['state']['moves'].append([r, c])
+        game_manager.record_delta(room_id, 'move_made', {'row': r, 'col': c, 'color': i % 2 + 1})
+    return room_id
+
+
+def landlord_room(game_manager, rng):
+    deck = [{'suit': s, 'value': v} for s in '♠♥♣♦' for v in ('3', '4', '5', '6', '7', '8', '9', '10',
+                                                              'J', 'Q', 'K', 'A', '2')]
+    rng.shuffle(deck)
+    state = {'cards': [deck[0:17], deck[17:34], deck[34:51]], 'bottom_cards': deck[51:], 'bids': {0: 1, 1: 0, 2: 2},
+             'landlord': 2, 'current_turn': 0, 'last_play': deck[:2], 'last_play_position': 1, 'pass_count': 0,
+             'bid_multiplier': 2, 'moves': []}
+    room_id = game_manager.create_room('landlord', state)
+    for i in range(rng.randint(5, 30)):
+        game_manager.record_delta(room_id, 'cards_played', {'position': i % 3, 'cards': deck[i:i + 2],
+                                                            'remaining': 17 - i // 3})
+    return room_id
+
+
+def racing_room(game_manager, rng):
+    room_id = game_manager.create_room('racing', {'scores': {0: 0, 1: 0}, 'finished': [], 'moves': []})
+    for i in range(rng.randint(5, 40)):
+        game_manager.record_delta(room_id, 'score_update', {'position': i % 2, 'score': i * 10})
+    return room_id
+
+
+def build(count, seed=1):
+    rng = random.Random(seed)
+    game_manager = GameManager()
+    barrage_manager = BarrageManager()
+    builders = (gomoku_room, gomoku_room, landlord_room, racing_room)
+    for i in range(count):
+        room_id = builders[i % 4](game_manager, rng)
+        players = 3 if game_manager.rooms[room_id]['game_type'] == 'landlord' else 2
+        for p in range(players):
+            game_manager.add_player(room_id, f'sid-{i}-{p}')
+        game_manager.add_spectator(room_id, f'spec-{i}')
+        game_manager.update_room_status(room_id, RoomStatus.PLAYING)
+        for j in range(rng.randint(0, 30)):
+            barrage_manager.room_history[room_id].append(
+                {'text': f'弹幕{j}', 'user_id': f'sid-{i}-0', 'timestamp': time.time()})
+    return game_manager, barrage_manager
+
+
+# 不发送任何消息的 SocketIO 替身，只测量排空本身
+SOCKETIO = SimpleNamespace(emit=lambda *args, **kwargs: None)
+
+
+def restore(path):
+    """在本进程中恢复快照，返回 (房间数, 耗时)"""
+    game_manager = GameManager()
+    start = time.perf_counter()
+    count = DrainController(SOCKETIO, game_manager, BarrageManager(), path=path).restore()
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='停机交接基准')
+    parser.add_argument('--rooms', type=int, default=10000)
+    parser.add_argument('--restore', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.restore:
+        count, seconds = restore(args.restore)
+        print(f'{count} {seconds}')
+        return
+
+    game_manager, barrage_manager = build(args.rooms)
+    path = os.path.join(tempfile.mkdtemp(), 'room_snapshot.bin')
+    controller = DrainController(SOCKETIO, game_manager, barrage_manager, path=path, grace=0)
+    result = controller.drain()
+
+    output = subprocess.run([sys.executable, __file__, '--restore', path], check=True,
+                            capture_output=True, text=True).stdout.split()
+    restored, seconds = int(output[0]), float(output[1])
+    os.rmdir(os.path.dirname(path))
+
+    print(f"{'房间数':>8} {'快照大小':>10} {'排空耗时':>10} {'恢复耗时':>10} {'每房间恢复':>10}")
+    print(f"{restored:>8} {result['bytes'] / 1024 / 1024:>8.1f}MB {result['seconds'] * 1000:>8.0f}ms "
+          f"{seconds * 1000:>8.0f}ms {seconds / max(restored, 1) * 1e6:>8.1f}us")
+
+
+if __name__ == '__main__':
+    main()
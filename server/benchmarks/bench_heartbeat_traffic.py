@@ -0,0 +1,55 @@
+"""
+心跳流量估算
+
+模拟客户端在一局游戏中的发送节奏，对比固定周期ping与空闲时才ping
+两种策略下每个连接的应用层心跳消息数（ping + pong）。
+规则与 heartbeat.js 中 HeartbeatManager 一致。
+
+用法: python benchmarks/bench_heartbeat_traffic.py
+"""
+
+PING_INTERVAL = 30.0
+
+
+def fixed_pings(duration):
+    """旧策略：每个周期固定发送一次ping"""
+    return int(duration // PING_INTERVAL)
+
+
+def idle_pings(event_times, duration):
+    """新策略：每半个周期检查一次，距上次发送超过一个周期才ping"""
+    events = sorted(event_times)
+    last_sent = 0.0
+    pings = 0
+    idx = 0
+    t = PING_INTERVAL / 2
+    while t <= duration:
+        while idx < len(events) and events[idx] <= t:
+            last_sent = events[idx]
+            idx += 1
+        if t - last_sent >= PING_INTERVAL:
+            pings += 1
+            last_sent = t
+        t += PING_INTERVAL / 2
+    return pings
+
+
+def main():
+    duration = 600.0  # 10分钟
+    scenarios = {
+        '五子棋玩家(每10秒落子)': [i * 10.0 for i in range(60)],
+        '斗地主玩家(每20秒操作)': [i * 20.0 for i in range(30)],
+        '赛车玩家(每秒上报分数)': [float(i) for i in range(600)],
+        '前5分钟对局后空闲': [i * 10.0 for i in range(30)],
+        '完全空闲(观战)': [],
+    }
+    print(f"{'场景':<24} {'旧(消息/10分钟)':>16} {'新(消息/10分钟)':>16} {'减少':>8}")
+    for name, events in scenarios.items():
+        old = fixed_pings(duration) * 2
+        new = idle_pings(events, duration) * 2
+        reduction = (old - new) / old * 100 if old else 0
+        print(f"{name:<24} {old:>16} {new:>16} {reduction:>7.0f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,687 @@
+"""
+Socket.IO 负载生成器
+
+在本机启动一个服务器进程（或连接 --url 指定的服务器），用 asyncio 模拟大量游戏客户端：
+- 五子棋：两个机器人交替落子（同色棋子互不相邻，不会提前结束），98步后换新房间
+- 斗地主：三个机器人随机叫分，轮到时出最小的单张或过牌，一局结束后换新房间
+- 极速狂飙：两个机器人按固定间隔上报分数，若干次后完赛，换新房间
+- 每个房间的观战者接收广播，并按设定速率发送弹幕
+
+房间在 --ramp 秒内均匀启动，全部启动后再运行 --duration 秒。报告：
+- 事件延迟（p50/p95/p99）：发送操作到收到自己操作的广播；fanout 为同一广播到达房间内其他连接的延迟；
+  comment 为弹幕往返；ping 为应用层心跳往返
+- 客户端发送/接收事件数每秒、服务器发来的错误
+- 服务器进程的CPU占用和常驻内存（读取 /proc，psutil 不是依赖）
+
+客户端默认使用 wsproto 实现的 Engine.IO websocket 传输和 python-socketio 的数据包编解码；
+安装了 aiohttp 时可以用 --client socketio 改用 socketio.AsyncClient。
+
+用法: python benchmarks/bench_load.py [--games gomoku,landlord,racing] [--rooms 30] [--spectators 2]
+          [--comment-rate 0.2] [--ramp 5] [--duration 20] [--think 0.2] [--mode threading|asgi] [--url URL --pid PID]
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import pty
+import random
+import re
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+from engineio import packet as eio_packet
+from socketio import packet as sio_packet
+from wsproto import ConnectionType, WSConnection
+from wsproto.events import (AcceptConnection, CloseConnection, Ping, RejectConnection, Request,
+                            TextMessage)
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 五子棋：黑白棋子各自隔一格放置，98步内不会连成五子
+GOMOKU_MOVES = 98
+# 极速狂飙：每个玩家上报的次数和间隔（秒）
+RACING_UPDATES = 30
+RACING_INTERVAL = 0.2
+# 应用层心跳间隔（秒，小于服务器心跳超时）
+PING_INTERVAL = 20
+
+
+def gomoku_move(index):
+    stone = index // 2
+    return (stone // 7) * 2 + index % 2, (stone % 7) * 2
+
+
+class WSTransport:
+    """Engine.IO v4 websocket 客户端（wsproto），Socket.IO 数据包使用 python-socketio 的编解码"""
+
+    def __init__(self, url, on_event):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.on_event = on_event
+        self.ws = WSConnection(ConnectionType.CLIENT)
+        self.reader = self.writer = None
+        self.connected = None
+        self.closed = False
+        self._task = None
+
+    async def connect(self, timeout=10):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.connected = asyncio.get_running_loop().create_future()
+        self.writer.write(self.ws.send(Request(host=f'{self.host}:{self.port}',
+                                               target='/socket.io/?EIO=4&transport=websocket')))
+        self._task = asyncio.ensure_future(self._read_loop())
+        await asyncio.wait_for(self.connected, timeout)
+
+    async def emit(self, event, data):
+        if self.closed:
+            raise ConnectionError('连接已关闭')
+        pkt = sio_packet.Packet(sio_packet.EVENT, data=[event, data])
+        self._send(eio_packet.Packet(eio_packet.MESSAGE, pkt.encode()).encode())
+        await self.writer.drain()
+
+    async def close(self):
+        if self.closed or self.writer is None:
+            return
+        self.closed = True
+        try:
+            self.writer.write(self.ws.send(CloseConnection(code=1000)))
+            self.writer.close()
+        except Exception:
+            pass
+        if self._task:
+            self._task.cancel()
+
+    def _send(self, text):
+        self.writer.write(self.ws.send(TextMessage(data=text)))
+
+    async def _read_loop(self):
+        parts = []
+        try:
+            while True:
+                data = await self.reader.read(65536)
+                if not data:
+                    break
+                self.ws.receive_data(data)
+                for event in self.ws.events():
+                    if isinstance(event, TextMessage):
+                        parts.append(event.data)
+                        if event.message_finished:
+                            self._on_packet(''.join(parts))
+                            parts.clear()
+                    elif isinstance(event, Ping):
+                        self.writer.write(self.ws.send(event.response()))
+                    elif isinstance(event, RejectConnection):
+                        raise ConnectionError(f'websocket握手被拒绝: {event.status_code}')
+                    elif isinstance(event, CloseConnection):
+                        self.closed = True
+                        return
+                    elif not isinstance(event, AcceptConnection):
+                        continue
+        except Exception as e:
+            if not self.connected.done():
+                self.connected.set_exception(e)
+        finally:
+            self.closed = True
+            if not self.connected.done():
+                self.connected.set_exception(ConnectionError('连接已关闭'))
+
+    def _on_packet(self, text):
+        pkt = eio_packet.Packet(encoded_packet=text)
+        if pkt.packet_type == eio_packet.OPEN:
+            self._send(eio_packet.Packet(eio_packet.MESSAGE, '0').encode())
+        elif pkt.packet_type == eio_packet.PING:
+            self._send(eio_packet.Packet(eio_packet.PONG).encode())
+        elif pkt.packet_type == eio_packet.MESSAGE:
+            message = sio_packet.Packet(encoded_packet=pkt.data)
+            if message.packet_type == sio_packet.CONNECT and not self.connected.done():
+                self.connected.set_result(True)
+            elif message.packet_type == sio_packet.CONNECT_ERROR and not self.connected.done():
+                self.connected.set_exception(ConnectionError(f'连接被拒绝: {message.data}'))
+            elif message.packet_type == sio_packet.EVENT:
+                self.on_event(message.data[0], message.data[1] if len(message.data) > 1 else None)
+
+
+class AsyncClientTransport:
+    """socketio.AsyncClient 传输（需要 aiohttp）"""
+
+    def __init__(self, url, on_event):
+        import socketio
+        self.url = url
+        self.client = socketio.AsyncClient(reconnection=False)
+        self.client.on('*', on_event)
+
+    async def connect(self, timeout=10):
+        await self.client.connect(self.url, transports=['websocket'], wait_timeout=timeout)
+
+    async def emit(self, event, data):
+        await self.client.emit(event, data)
+
+    async def close(self):
+        await self.client.disconnect()
+
+
+class Metrics:
+    """客户端侧统计"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)  # {类别: [秒]}
+        self.emits = 0
+        self.received = 0
+        self.connections = 0
+        self.games = Counter()
+        self.errors = Counter()
+        self.recording = False
+
+    def record(self, label, seconds):
+        if self.recording:
+            self.latencies[label].append(seconds)
+
+    def summary(self):
+        """
+        Returns:
+            list: [(类别, 次数, p50, p95, p99)]，延迟单位毫秒
+        """
+        rows = []
+        for label in sorted(self.latencies):
+            values = sorted(self.latencies[label])
+            pick = lambda q: values[min(len(values) - 1, int(len(values) * q))] * 1000
+            rows.append((label, len(values), pick(0.50), pick(0.95), pick(0.99)))
+        return rows
+
+
+class Bot:
+    """模拟客户端（玩家或观战者）"""
+
+    def __init__(self, harness, table, position=None):
+        self.harness = harness
+        self.table = table
+        self.position = position
+        self.rng = harness.rng
+        self.own = set()  # 自己发出、等待广播的操作
+        self.transport = harness.transport_class(harness.url, self.dispatch)
+        self.joined = None
+        self.closed = False
+        self._ping_sent = None
+        self._pinger = None
+
+    async def connect(self):
+        self.joined = asyncio.get_running_loop().create_future()
+        await self.transport.connect()
+        self.harness.metrics.connections += 1
+        self._pinger = asyncio.ensure_future(self._ping_loop())
+
+    async def close(self):
+        self.closed = True
+        if self._pinger:
+            self._pinger.cancel()
+        await self.transport.close()
+
+    async def emit(self, event, data, key=None):
+        if self.closed:
+            return
+        if key is not None:
+            self.table.sent[key] = time.perf_counter()
+            self.own.add(key)
+        self.harness.metrics.emits += 1
+        try:
+            await self.transport.emit(event, data)
+        except (ConnectionError, OSError):
+            self.harness.metrics.errors['连接断开'] += 1
+
+    def later(self, delay, coro_fn, *args):
+        """延迟执行一个操作（模拟思考时间）"""
+        async def run():
+            await asyncio.sleep(delay)
+            if not self.table.finished:
+                await coro_fn(*args)
+        asyncio.ensure_future(run())
+
+    def dispatch(self, event, data):
+        self.harness.metrics.received += 1
+        data = data if isinstance(data, dict) else {}
+        key = self.table.broadcast_key(event, data)
+        if key is not None:
+            self.observe(key)
+        handler = getattr(self, f'on_{event}', None)
+        if handler is not None:
+            handler(data)
+
+    def observe(self, key):
+        """记录广播延迟：自己的操作按游戏和事件分类，其他连接的操作计入 fanout"""
+        sent = self.table.sent.get(key)
+        if sent is None:
+            return
+        if key in self.own:
+            self.own.discard(key)
+            label = 'comment' if key[0] == 'new_comment' else f'{self.table.game}.{key[0]}'
+        else:
+            label = 'fanout'
+        self.harness.metrics.record(label, time.perf_counter() - sent)
+
+    async def _ping_loop(self):
+        while True:
+            await asyncio.sleep(PING_INTERVAL * (0.5 + self.rng.random()))
+            self._ping_sent = time.perf_counter()
+            await self.emit('ping', {'timestamp': int(time.time() * 1000)})
+
+    def on_pong(self, data):
+        if self._ping_sent is not None:
+            self.harness.metrics.record('ping', time.perf_counter() - self._ping_sent)
+            self._ping_sent = None
+
+    def on_error(self, data):
+        # 合并只有数字不同的错误消息（如限流等待秒数）
+        self.harness.metrics.errors[re.sub(r'\d+', 'N', str(data.get('msg', '')))] += 1
+
+    def on_room_created(self, data):
+        self.table.room_id = data['room_id']
+        self._joined()
+
+    def on_room_joined(self, data):
+        self._joined()
+
+    def on_spectator_joined(self, data):
+        self._joined()
+
+    def on_player_left(self, data):
+        self.table.finish()
+
+    def _joined(self):
+        if not self.joined.done():
+            self.joined.set_result(True)
+
+
+class SpectatorBot(Bot):
+    """观战者：接收广播并按速率发送弹幕"""
+
+    def __init__(self, harness, table, name):
+        super().__init__(harness, table)
+        self.name = name
+        self._spam = None
+
+    def start_comments(self, rate):
+        if rate > 0:
+            self._spam = asyncio.ensure_future(self._comment_loop(rate))
+
+    async def _comment_loop(self, rate):
+        for seq in itertools.count():
+            await asyncio.sleep(self.rng.expovariate(rate))
+            if self.table.finished:
+                return
+            text = f'{self.name}弹幕{seq}'
+            await self.emit('send_comment', {'room_id': self.table.room_id, 'comment': text},
+                            key=('new_comment', text))
+
+    async def close(self):
+        if self._spam:
+            self._spam.cancel()
+        await super().close()
+
+
+class GomokuBot(Bot):
+    """五子棋：轮到自己时按固定序列落子"""
+
+    def __init__(self, harness, table, position):
+        super().__init__(harness, table, position)
+        self.moves = 0
+
+    def on_game_start(self, data):
+        if self.position == 0:
+            self.later(self.harness.think, self.move)
+
+    def on_move_made(self, data):
+        self.moves += 1
+        if data.get('color') != self.position + 1:
+            self.later(self.harness.think, self.move)
+
+    async def move(self):
+        if self.moves >= GOMOKU_MOVES:
+            self.table.finish()
+            return
+        row, col = gomoku_move(self.moves)
+        await self.emit('make_move', {'room_id': self.table.room_id, 'row': row, 'col': col},
+                        key=('move_made', row, col))
+
+
+class LandlordBot(Bot):
+    """斗地主：随机叫分，轮到时出最小的单张或过牌"""
+
+    def __init__(self, harness, table, position):
+        super().__init__(harness, table, position)
+        self.cards = []
+
+    def on_game_start(self, data):
+        self.cards = list(data.get('cards', []))
+
+    def on_update_cards(self, data):
+        self.cards = list(data.get('cards', []))
+
+    def on_bid_turn(self, data):
+        if data.get('position') == self.position:
+            bid = self.rng.choice((0, 1, 2, 3)) if self.position < 2 else 3
+            self.later(self.harness.think, self.emit, 'bid', {'room_id': self.table.room_id, 'bid': bid},
+                       ('player_bid', self.position, bid))
+
+    def on_play_turn(self, data):
+        if data.get('position') != self.position:
+            return
+        if data.get('can_pass') and self.rng.random() < 0.6:
+            self.later(self.harness.think, self.emit, 'pass', {'room_id': self.table.room_id},
+                       ('player_passed', self.position))
+            return
+        card = self.cards.pop(0)
+        self.later(self.harness.think, self.emit, 'play_cards', {'room_id': self.table.room_id, 'cards': [card]},
+                   ('cards_played', self.position, len(self.cards)))
+
+    def on_game_over(self, data):
+        self.table.finish()
+
+    def on_no_landlord(self, data):
+        self.table.finish()
+
+
+class RacingBot(Bot):
+    """极速狂飙：开始后按间隔上报分数，最后完赛"""
+
+    def on_game_start(self, data):
+        asyncio.ensure_future(self.race())
+
+    async def race(self):
+        score = 0
+        for _ in range(RACING_UPDATES):
+            await asyncio.sleep(RACING_INTERVAL * (0.5 + self.rng.random()))
+            if self.table.finished:
+                return
+            score += self.rng.randint(1, 50)
+            await self.emit('update_score', {'room_id': self.table.room_id, 'score': score},
+                            key=('score_update', self.position, score))
+        await self.emit('game_over', {'room_id': self.table.room_id, 'score': score},
+                        key=('player_finished', self.position, score))
+
+    def on_player_finished(self, data):
+        self.table.finished_players.add(data.get('position'))
+        if len(self.table.finished_players) == 2:
+            self.table.finish()
+
+
+class Table:
+    """一个房间：玩家和观战者连续进行多局"""
+
+    PLAYERS = {'gomoku': (GomokuBot, 2), 'landlord': (LandlordBot, 3), 'racing': (RacingBot, 2)}
+
+    def __init__(self, harness, game, index):
+        self.harness = harness
+        self.game = game
+        self.index = index
+        self.reset()
+
+    def reset(self):
+        self.room_id = None
+        self.sent = {}  # {广播标识: 发送时间}
+        self.finished_players = set()
+        self.finished = False
+        self.done = asyncio.get_running_loop().create_future()
+
+    def finish(self):
+        if not self.finished:
+            self.finished = True
+            self.harness.metrics.games[self.game] += 1
+            self.done.set_result(True)
+
+    @staticmethod
+    def broadcast_key(event, data):
+        """从广播内容得到与发送时相同的标识"""
+        if event == 'move_made':
+            return event, data.get('row'), data.get('col')
+        if event == 'player_bid':
+            return event, data.get('position'), data.get('bid')
+        if event == 'player_passed':
+            return event, data.get('position')
+        if event == 'cards_played':
+            return event, data.get('position'), data.get('remaining')
+        if event in ('score_update', 'player_finished'):
+            return event, data.get('position'), data.get('score')
+        if event == 'new_comment':
+            return event, data.get('comment')
+        return None
+
+    async def run(self, delay):
+        await asyncio.sleep(delay)
+        while not self.harness.stopping:
+            try:
+                await self.play_one()
+            except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+                self.harness.metrics.errors[f'{type(e).__name__}: {e}'] += 1
+                await asyncio.sleep(1)
+            self.reset()
+
+    async def play_one(self):
+        bot_class, count = self.PLAYERS[self.game]
+        players = [bot_class(self.harness, self, position) for position in range(count)]
+        spectators = [SpectatorBot(self.harness, self, f'观众{self.index}-{i}')
+                      for i in range(self.harness.spectators)]
+        bots = players + spectators
+        try:
+            await asyncio.gather(*(bot.connect() for bot in bots))
+            await players[0].emit('create_room', {'game': self.game})
+            await asyncio.wait_for(players[0].joined, 10)
+            # 按加入顺序分配座位，逐个加入
+            for bot in players[1:]:
+                await bot.emit('join_room', {'game': self.game, 'room_id': self.room_id})
+                await asyncio.wait_for(bot.joined, 10)
+            for bot in spectators:
+                await bot.emit('join_room', {'game': self.game, 'room_id': self.room_id, 'spectator': True})
+            await asyncio.gather(*(asyncio.wait_for(bot.joined, 10) for bot in spectators))
+            for bot in spectators:
+                bot.start_comments(self.harness.comment_rate)
+            stop = asyncio.ensure_future(self.harness.stopped.wait())
+            await asyncio.wait([self.done, stop], return_when=asyncio.FIRST_COMPLETED)
+            stop.cancel()
+        finally:
+            self.finished = True
+            await asyncio.gather(*(bot.close() for bot in bots), return_exceptions=True)
+
+
+class ProcessMonitor:
+    """按 /proc 采样进程的CPU时间和常驻内存"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.samples = []  # [(时间, CPU秒, RSS字节)]
+
+    def sample(self):
+        try:
+            with open(f'/proc/{self.pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            cpu = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+            with open(f'/proc/{self.pid}/status') as f:
+                rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmRSS:'))
+        except (OSError, StopIteration):
+            return
+        self.samples.append((time.perf_counter(), cpu, rss))
+
+    async def run(self, interval=0.5):
+        while True:
+            self.sample()
+            await asyncio.sleep(interval)
+
+    def summary(self, since):
+        """
+        Returns:
+            dict: cpu（测量期间的平均占用百分比）、rss_end、rss_peak（字节），没有采样时为None
+        """
+        window = [s for s in self.samples if s[0] >= since]
+        if len(window) < 2:
+            return None
+        (t0, c0, _), (t1, c1, rss_end) = window[0], window[-1]
+        return {'cpu': (c1 - c0) / (t1 - t0) * 100, 'rss_end': rss_end, 'rss_peak': max(s[2] for s in window)}
+
+
+class LocalServer:
+    """在临时目录中启动一个本地服务器进程"""
+
+    def __init__(self, mode='threading'):
+        self.mode = mode
+        self.tmpdir = tempfile.mkdtemp(prefix='gamehub-load-')
+        self.process = None
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            self.port = s.getsockname()[1]
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+    def start(self, timeout=30):
+        env = dict(os.environ, HOST='127.0.0.1', PORT=str(self.port), SERVER_MODE=self.mode,
+                   STORAGE_BACKEND='sqlite', SQLITE_PATH=os.path.join(self.tmpdir, 'gamehub.db'),
+                   DRAIN_SNAPSHOT_PATH=os.path.join(self.tmpdir, 'room_snapshot.bin'), WORKERS='1')
+        # Werkzeug开发服务器要求标准输入是终端
+        master, slave = pty.openpty()
+        self.log = open(os.path.join(self.tmpdir, 'server.log'), 'w')
+        self.process = subprocess.Popen([sys.executable, 'main.py'], cwd=SERVER_DIR, env=env, stdin=slave,
+                                        stdout=self.log, stderr=subprocess.STDOUT)
+        os.close(slave)
+        self._master = master
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'服务器启动失败，日志: {self.log.name}')
+            try:
+                socket.create_connection(('127.0.0.1', self.port), 0.2).close()
+                return self
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError(f'服务器 {timeout} 秒内没有开始监听')
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        os.close(self._master)
+        self.log.close()
+
+
+class Harness:
+    """负载生成器"""
+
+    def __init__(self, args, url, transport_class):
+        self.url = url
+        self.transport_class = transport_class
+        self.games = args.games.split(',')
+        self.rooms = args.rooms
+        self.spectators = args.spectators
+        self.comment_rate = args.comment_rate
+        self.ramp = args.ramp
+        self.duration = args.duration
+        self.think = args.think
+        self.rng = random.Random(args.seed)
+        self.metrics = Metrics()
+        self.stopping = False
+        self.stopped = None
+
+    async def run(self, pid=None):
+        self.stopped = asyncio.Event()
+        monitor = ProcessMonitor(pid) if pid else None
+        monitor_task = asyncio.ensure_future(monitor.run()) if monitor else None
+        count = self.rooms * len(self.games)
+        tables = [Table(self, self.games[i % len(self.games)], i) for i in range(count)]
+        tasks = [asyncio.ensure_future(table.run(self.ramp * i / count)) for i, table in enumerate(tables)]
+
+        await asyncio.sleep(self.ramp)
+        # 全部房间启动后开始统计
+        self.metrics.recording = True
+        start = time.perf_counter()
+        emits, received = self.metrics.emits, self.metrics.received
+        cpu_start = resource.getrusage(resource.RUSAGE_SELF)
+        await asyncio.sleep(self.duration)
+        elapsed = time.perf_counter() - start
+        cpu_end = resource.getrusage(resource.RUSAGE_SELF)
+        self.metrics.recording = False
+        self.stopping = True
+        self.stopped.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if monitor_task:
+            monitor_task.cancel()
+
+        return {
+            'elapsed': elapsed,
+            'emits': (self.metrics.emits - emits) / elapsed,
+            'received': (self.metrics.received - received) / elapsed,
+            'client_cpu': ((cpu_end.ru_utime + cpu_end.ru_stime) - (cpu_start.ru_utime + cpu_start.ru_stime))
+            / elapsed * 100,
+            'server': monitor.summary(start) if monitor else None,
+        }
+
+
+def report(harness, result):
+    metrics = harness.metrics
+    print(f"连接 {metrics.connections}，完成对局 {dict(metrics.games)}，测量 {result['elapsed']:.1f}s")
+    print(f"{'类别':<24} {'次数':>8} {'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9}")
+    for label, count, p50, p95, p99 in metrics.summary():
+        print(f"{label:<24} {count:>8} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f}")
+    print(f"客户端发送 {result['emits']:.0f}/s，接收 {result['received']:.0f}/s，"
+          f"负载生成器CPU {result['client_cpu']:.0f}%")
+    server = result['server']
+    if server:
+        print(f"服务器CPU {server['cpu']:.0f}%，RSS {server['rss_end'] / 1024 / 1024:.1f}MB"
+              f"（峰值 {server['rss_peak'] / 1024 / 1024:.1f}MB）")
+    for msg, count in metrics.errors.most_common(5):
+        print(f"错误 x{count}: {msg}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket.IO 负载生成器')
+    parser.add_argument('--games', default='gomoku,landlord,racing')
+    parser.add_argument('--rooms', type=int, default=30, help='每种游戏的房间数')
+    parser.add_argument('--spectators', type=int, default=2, help='每个房间的观战者数')
+    parser.add_argument('--comment-rate', type=float, default=0.2, help='每个观战者每秒发送的弹幕数')
+    parser.add_argument('--ramp', type=float, default=5.0, help='房间逐步启动的时间（秒）')
+    parser.add_argument('--duration', type=float, default=20.0, help='全部启动后的测量时间（秒）')
+    parser.add_argument('--think', type=float, default=0.2, help='玩家每步的思考时间（秒）')
+    parser.add_argument('--mode', default='threading', choices=('threading', 'asgi'), help='本地服务器模式')
+    parser.add_argument('--url', help='连接已运行的服务器（不启动本地服务器）')
+    parser.add_argument('--pid', type=int, help='--url 指定的服务器进程ID（采样CPU/RSS）')
+    parser.add_argument('--client', default='wsproto', choices=('wsproto', 'socketio'))
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    transport_class = WSTransport
+    if args.client == 'socketio':
+        try:
+            import aiohttp  # noqa: F401  socketio.AsyncClient 的依赖
+        except ImportError:
+            sys.exit('--client socketio 需要安装 aiohttp')
+        transport_class = AsyncClientTransport
+
+    # 每个连接一个套接字
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    server = None
+    url, pid = args.url, args.pid
+    if url is None:
+        server = LocalServer(args.mode).start()
+        url, pid = server.url, server.process.pid
+    try:
+        harness = Harness(args, url, transport_class)
+        result = asyncio.run(harness.run(pid))
+        report(harness, result)
+    finally:
+        if server:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
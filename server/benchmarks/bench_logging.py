@@ -0,0 +1,142 @@
+"""
+日志开销基准
+
+日志级别为 INFO 时，测量五子棋插件的弹幕事件（send_comment 处理器：验证、限流、过滤、广播，
+每次一条 INFO 日志）和观战者加入/离开（各一条 INFO 日志）的单次处理耗时，对比：
+- 同步写文件：根记录器直接挂文件处理器（原来的 basicConfig 方式），格式化和写入都在处理器线程中
+- 队列：logging_setup 的队列处理器，格式化和写入在后台线程中
+- 队列+限流：同上，并按消息模板限流（默认配置）
+- 队列+限流+JSON：同上，输出JSON
+
+另外测量级别未开启的调试日志：调用前用 f-string 格式化与传入参数延迟格式化的单次耗时。
+广播被替换为空操作，日志写入临时文件。
+
+用法: python benchmarks/bench_logging.py [--events 20000]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from unittest.mock import Mock, patch
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from barrage_manager import BarrageManager
+from game_manager import GameManager
+from logging_setup import TEXT_FORMAT, setup_logging
+from plugins.gomoku import GomokuPlugin
+
+
+def make_plugin():
+    """创建五子棋插件和一个有两名玩家的房间（插件初始化日志不计入结果）"""
+    logging.disable(logging.WARNING)
+    game_manager = GameManager()
+    barrage_manager = BarrageManager(rate_limit=10 ** 9)
+    plugin = GomokuPlugin(Mock(), Mock(), None, game_manager, barrage_manager, routed=True, game_id='gomoku')
+    logging.disable(logging.NOTSET)
+    room_id = game_manager.create_room('gomoku', {'board': [], 'current': 1, 'moves': []})
+    game_manager.add_player(room_id, 'p1')
+    game_manager.add_player(room_id, 'p2')
+    return plugin, room_id
+
+
+def install_sync(path):
+    """原来的配置方式：根记录器直接写文件"""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.FileHandler(path, encoding='utf-8')
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    return handler.close
+
+
+def install_queue(path, fmt='text', rate=0):
+    stream = open(path, 'a', encoding='utf-8')
+    installed = setup_logging('INFO', fmt, rate=rate, stream=stream)
+
+    def close():
+        installed.stop()
+        stream.close()
+    return close
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run_events(plugin, room_id, events):
+    """依次处理弹幕和观战进出事件，返回每次处理的耗时（秒）"""
+    comment = plugin.handlers['send_comment']
+    request = Mock(sid='p1')
+    timings = []
+    with patch('plugins.gomoku.request', new=request), patch('plugins.base.request', new=request), \
+            patch('plugins.base.emit', new=lambda *args, **kwargs: None):
+        for i in range(events):
+            start = time.perf_counter()
+            if i % 4 == 3:
+                sid = f'spectator-{i}'
+                plugin.handle_spectator_join(room_id, sid)
+                plugin.handle_spectator_leave(room_id, sid)
+            else:
+                request.sid = f'user-{i}'
+                comment({'room_id': room_id, 'comment': f'好棋 {i}'})
+            timings.append(time.perf_counter() - start)
+    return sorted(timings)
+
+
+def bench_disabled_debug(calls=200000):
+    """级别未开启的调试日志：f-string 与延迟格式化的单次耗时（纳秒）"""
+    logger = logging.getLogger('bench.disabled')
+    logger.setLevel(logging.INFO)
+    field, value = 'room_id', 'ab12cd34'
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        logger.debug(f"验证成功: {field}={value}")
+    eager = (time.perf_counter() - start) / calls
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        logger.debug("验证成功: %s=%s", field, value)
+    lazy = (time.perf_counter() - start) / calls
+    return eager * 1e9, lazy * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description='日志开销基准')
+    parser.add_argument('--events', type=int, default=20000, help='每种配置处理的事件数')
+    args = parser.parse_args()
+
+    configs = (
+        ('同步写文件', install_sync),
+        ('队列', install_queue),
+        ('队列+限流', lambda path: install_queue(path, rate=20)),
+        ('队列+限流+JSON', lambda path: install_queue(path, 'json', rate=20)),
+    )
+    print(f"{'配置':<16} {'p50(µs)':>9} {'p99(µs)':>9} {'平均(µs)':>9} {'日志行数':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, install in configs:
+            path = os.path.join(directory, f'{len(os.listdir(directory))}.log')
+            plugin, room_id = make_plugin()
+            close = install(path)
+            try:
+                run_events(plugin, room_id, 500)  # 预热
+                timings = run_events(plugin, room_id, args.events)
+            finally:
+                close()
+            with open(path, encoding='utf-8') as f:
+                lines = sum(1 for _ in f)
+            print(f"{name:<16} {percentile(timings, 0.5) * 1e6:>9.1f} {percentile(timings, 0.99) * 1e6:>9.1f} "
+                  f"{statistics.fmean(timings) * 1e6:>9.1f} {lines:>9}")
+
+    eager, lazy = bench_disabled_debug()
+    print(f"\n未开启的调试日志: f-string {eager:.0f}ns/次，延迟格式化 {lazy:.0f}ns/次")
+
+
+if __name__ == '__main__':
+    main()
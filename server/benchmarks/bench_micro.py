@@ -0,0 +1,549 @@
+"""
+热点路径微基准
+
+覆盖五子棋胜负判断、斗地主牌型识别和比较、弹幕限流/过滤/查重、输入验证、事件数据模式、
+GameManager 在 1万/10万 房间规模下的建房/进出/清理、心跳超时检查，以及使用假连接的数据库连接池。
+
+每个用例先校准每轮的调用次数（每轮不少于10毫秒），再重复多轮，统计单次调用耗时
+（min/median/mean/stddev/ops）。测量期间关闭垃圾回收，避免大规模房间数据的回收停顿混入结果。
+结果的 JSON 格式与 pytest-benchmark 的保存格式一致（machine_info + benchmarks[].stats），
+pytest-benchmark 不是依赖。
+
+与基准线比较时默认按最小值判断（共享机器上受干扰最小，可用 --stat 改为 median/mean），
+超过 --threshold（默认 20%）视为回归，退出码为 1。
+基准线与机器相关，机器信息不一致时给出提示。
+
+用法: python benchmarks/bench_micro.py [-k 名称片段] [--save [路径]] [--compare [路径]]
+          [--threshold 0.2] [--stat min]
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import logging
+logging.disable(logging.WARNING)
+
+from barrage_manager import BarrageManager
+from database import Database
+from game_manager import GameManager
+from heartbeat import HeartbeatHandler
+from plugins.gomoku import MAKE_MOVE, GomokuPlugin
+from plugins.landlord import BID, PLAY_CARDS
+from plugins.landlord_pattern import analyze_card_type, can_beat
+from plugins.racing import SCORE
+from schemas import JOIN_ROOM
+from validators import InputValidator, ValidationError
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'micro.json')
+SCALES = (10000, 100000)
+
+# 用例注册表: [(分组, 名称, 准备函数)]，准备函数返回被计时的无参函数
+CASES = []
+
+
+def case(group, name):
+    def decorator(setup):
+        CASES.append((group, name, setup))
+        return setup
+    return decorator
+
+
+def cases_at_scales(group, name):
+    """按房间/连接规模注册同一个用例"""
+    def decorator(setup):
+        for scale in SCALES:
+            CASES.append((group, f'{name}[{scale // 1000}k]', lambda scale=scale: setup(scale)))
+        return setup
+    return decorator
+
+
+def measure(fn, round_time=0.01, max_time=0.5, min_rounds=5):
+    """
+    测量单次调用耗时
+
+    Returns:
+        dict: pytest-benchmark 格式的统计（秒）
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        return _measure(fn, round_time, max_time, min_rounds)
+    finally:
+        gc.enable()
+
+
+def _measure(fn, round_time, max_time, min_rounds):
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= round_time:
+            break
+        iterations *= 10 if elapsed < round_time / 10 else 2
+
+    samples = []
+    deadline = time.perf_counter() + max_time
+    while len(samples) < min_rounds or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        samples.append((time.perf_counter() - start) / iterations)
+
+    mean = statistics.fmean(samples)
+    return {
+        'min': min(samples),
+        'max': max(samples),
+        'mean': mean,
+        'median': statistics.median(samples),
+        'stddev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'rounds': len(samples),
+        'iterations': iterations,
+        'ops': 1 / mean,
+    }
+
+
+# ---------------------------------------------------------------- 五子棋
+
+def gomoku_board(stones):
+    board = [[0] * 15 for _ in range(15)]
+    for r, c, color in stones:
+        board[r][c] = color
+    return board
+
+
+# 胜负判断不使用插件实例的状态
+CHECK_WIN = GomokuPlugin.check_win
+
+
+@case('gomoku', 'check_win[open]')
+def bench_check_win_open():
+    # 中盘局面，落子没有形成五连，四个方向都要检查
+    board = gomoku_board([(7, c, 1) for c in range(5, 9)] + [(r, 7, 2) for r in range(8, 11)] + [(6, 6, 1)])
+    return lambda: CHECK_WIN(None, board, 7, 7, 1)
+
+
+@case('gomoku', 'check_win[five]')
+def bench_check_win_five():
+    board = gomoku_board([(r, r, 2) for r in range(3, 8)])
+    return lambda: CHECK_WIN(None, board, 7, 7, 2)
+
+
+# ---------------------------------------------------------------- 斗地主
+
+def cards(*values, suit='♠'):
+    return [{'suit': suit, 'value': v} for v in values]
+
+
+@case('landlord', 'analyze_card_type[single]')
+def bench_analyze_single():
+    hand = cards('K')
+    return lambda: analyze_card_type(hand)
+
+
+@case('landlord', 'analyze_card_type[straight8]')
+def bench_analyze_straight():
+    hand = cards('3', '4', '5', '6', '7', '8', '9', '10')
+    return lambda: analyze_card_type(hand)
+
+
+@case('landlord', 'analyze_card_type[plane_wings]')
+def bench_analyze_plane():
+    hand = cards('5', '5', '5', '6', '6', '6', '7', '7', '7', '9', 'J', 'K')
+    return lambda: analyze_card_type(hand)
+
+
+@case('landlord', 'analyze_card_type[invalid]')
+def bench_analyze_invalid():
+    hand = cards('3', '5', '7', '9', 'J')
+    return lambda: analyze_card_type(hand)
+
+
+@case('landlord', 'can_beat[straight]')
+def bench_can_beat_straight():
+    current, last = cards('4', '5', '6', '7', '8', '9'), cards('3', '4', '5', '6', '7', '8')
+    return lambda: can_beat(current, last)
+
+
+@case('landlord', 'can_beat[bomb_vs_pair]')
+def bench_can_beat_bomb():
+    current = [{'suit': s, 'value': '9'} for s in '♠♥♣♦']
+    last = cards('A', 'A')
+    return lambda: can_beat(current, last)
+
+
+# ---------------------------------------------------------------- 弹幕
+
+@case('barrage', 'check_rate_limit[allowed]')
+def bench_rate_limit_allowed():
+    manager = BarrageManager()
+    users = (f'user-{i}' for i in itertools.count())
+    return lambda: manager.check_rate_limit(next(users))
+
+
+@case('barrage', 'check_rate_limit[limited]')
+def bench_rate_limit_limited():
+    manager = BarrageManager()
+    for _ in range(manager.rate_limit):
+        manager.check_rate_limit('spammer')
+    return lambda: manager.check_rate_limit('spammer')
+
+
+@case('barrage', 'filter_content')
+def bench_filter_content():
+    manager = BarrageManager()
+    manager.blocked_words.update(f'敏感词{i}' for i in range(50))
+    text = '  这一步棋下得太妙了，白棋已经没有退路了！666  '
+    return lambda: manager.filter_content(text)
+
+
+@case('barrage', 'check_duplicate[history100]')
+def bench_check_duplicate():
+    manager = BarrageManager()
+    for i in range(manager.max_history):
+        manager.add_barrage('room', f'user-{i % 10}', f'弹幕{i}')
+    return lambda: manager.check_duplicate('room', 'user-3', '新的弹幕')
+
+
+# ---------------------------------------------------------------- 输入验证
+
+@case('validators', 'validate_game_id')
+def bench_validate_game_id():
+    return lambda: InputValidator.validate_game_id('landlord')
+
+
+@case('validators', 'validate_room_id')
+def bench_validate_room_id():
+    return lambda: InputValidator.validate_room_id('a1b2c3d4')
+
+
+@case('validators', 'validate_room_id[invalid]')
+def bench_validate_room_id_invalid():
+    def run():
+        try:
+            InputValidator.validate_room_id('../etc/x')
+        except ValidationError:
+            pass
+    return run
+
+
+@case('validators', 'sanitize_comment')
+def bench_sanitize_comment():
+    comment = '<b>好棋</b> 这一步太妙了 & 白棋已经没有退路了 "666"'
+    return lambda: InputValidator.sanitize_comment(comment)
+
+
+@case('validators', 'validate_coordinates')
+def bench_validate_coordinates():
+    return lambda: InputValidator.validate_coordinates(7, 8)
+
+
+@case('validators', 'validate_player_name')
+def bench_validate_player_name():
+    return lambda: InputValidator.validate_player_name(' 玩家_Alice ')
+
+
+@case('validators', 'validate_position')
+def bench_validate_position():
+    return lambda: InputValidator.validate_position(2, 3)
+
+
+@case('validators', 'validate_dict_field')
+def bench_validate_dict_field():
+    data = {'room_id': 'a1b2c3d4', 'row': 7, 'col': 8}
+    return lambda: InputValidator.validate_dict_field(data, 'room_id', field_type=str)
+
+
+# ---------------------------------------------------------------- 事件数据模式
+
+@case('schemas', 'make_move')
+def bench_schema_make_move():
+    data = {'room_id': 'a1b2c3d4', 'row': 7, 'col': 8}
+    return lambda: MAKE_MOVE.validate(data)
+
+
+@case('schemas', 'join_room')
+def bench_schema_join_room():
+    data = {'room_id': 'a1b2c3d4', 'spectator': True}
+    return lambda: JOIN_ROOM.validate(data)
+
+
+@case('schemas', 'bid')
+def bench_schema_bid():
+    data = {'room_id': 'a1b2c3d4', 'bid': 2}
+    return lambda: BID.validate(data)
+
+
+@case('schemas', 'play_cards[5]')
+def bench_schema_play_cards():
+    data = {'room_id': 'a1b2c3d4', 'cards': cards('3', '4', '5', '6', '7')}
+    return lambda: PLAY_CARDS.validate(data)
+
+
+@case('schemas', 'update_score')
+def bench_schema_update_score():
+    data = {'room_id': 'a1b2c3d4', 'score': 12345}
+    return lambda: SCORE.validate(data)
+
+
+@case('schemas', 'make_move[invalid]')
+def bench_schema_make_move_invalid():
+    data = {'room_id': 'a1b2c3d4', 'row': 7, 'col': 99}
+
+    def run():
+        try:
+            MAKE_MOVE.validate(data)
+        except ValidationError:
+            pass
+    return run
+
+
+# ---------------------------------------------------------------- 房间管理
+
+def populated_manager(scale):
+    game_manager = GameManager()
+    for i in range(scale):
+        room_id = game_manager.create_room('gomoku', {'board': None, 'current': 1, 'moves': []})
+        game_manager.add_player(room_id, f'p{i}')
+    return game_manager
+
+
+@cases_at_scales('game_manager', 'create_room')
+def bench_create_room(scale):
+    game_manager = populated_manager(scale)
+    return lambda: game_manager.create_room('gomoku', {'board': None, 'current': 1, 'moves': []})
+
+
+@cases_at_scales('game_manager', 'add_remove_player')
+def bench_add_remove_player(scale):
+    game_manager = populated_manager(scale)
+    room_ids = itertools.cycle(list(game_manager.rooms))
+
+    def run():
+        room_id = next(room_ids)
+        game_manager.add_player(room_id, 'guest')
+        game_manager.remove_player(room_id, 'guest')
+    return run
+
+
+@cases_at_scales('game_manager', 'cleanup_inactive_rooms')
+def bench_cleanup(scale):
+    # 没有超时的房间，测量每次清理扫描的开销
+    game_manager = populated_manager(scale)
+    return game_manager.cleanup_inactive_rooms
+
+
+# ---------------------------------------------------------------- 心跳
+
+@cases_at_scales('heartbeat', 'check_timeouts[steady]')
+def bench_check_timeouts_steady(scale):
+    # 连接的到期时间均匀分布在超时窗口内，每秒检查一次，超时的连接重新登记（模拟新连接）
+    handler = HeartbeatHandler(None, timeout=60)
+    now = [time.time()]
+    for i in range(scale):
+        handler._wheel.schedule(f'sid-{i}', now[0] + 1 + i % handler.timeout)
+
+    def run():
+        now[0] += 1
+        for sid in handler.check_timeouts(now[0]):
+            handler._wheel.schedule(sid, now[0] + handler.timeout)
+    return run
+
+
+@cases_at_scales('heartbeat', 'check_timeouts[idle]')
+def bench_check_timeouts_idle(scale):
+    # 全部连接远未到期，只有推进和层级下沉的开销
+    handler = HeartbeatHandler(None, timeout=60)
+    now = [time.time()]
+    for i in range(scale):
+        handler._wheel.schedule(f'sid-{i}', now[0] + 10 ** 9)
+
+    def run():
+        now[0] += 1
+        handler.check_timeouts(now[0])
+    return run
+
+
+# ---------------------------------------------------------------- 数据库连接池
+
+class FakeCursor:
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """不访问网络的 pymysql 连接替身，只保留连接池用到的方法"""
+
+    def ping(self, reconnect=False):
+        pass
+
+    def cursor(self, cursor_class=None):
+        return FakeCursor()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeDatabase(Database):
+    def _create_connection(self):
+        return FakeConnection()
+
+
+def fake_database(pool_size=5):
+    return FakeDatabase({}, pool_size=pool_size, max_overflow=10, pool_timeout=1, health_check_interval=3600)
+
+
+@case('database', 'get_connection')
+def bench_get_connection():
+    db = fake_database()
+
+    def run():
+        with db.get_connection():
+            pass
+    return run
+
+
+@case('database', 'write')
+def bench_write():
+    db = fake_database()
+    statements = [('INSERT INTO game_records (game_type, winner) VALUES (%s, %s)', ('gomoku', 1))]
+    return lambda: db.write(statements)
+
+
+@case('database', 'query')
+def bench_query():
+    db = fake_database()
+    return lambda: db.query('SELECT 1')
+
+
+@case('database', 'get_connection[8threads]')
+def bench_get_connection_contended():
+    # 8个线程争用5个连接，每次调用为所有线程各取还100次连接
+    db = fake_database(pool_size=5)
+
+    def worker():
+        for _ in range(100):
+            with db.get_connection():
+                pass
+
+    def run():
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return run
+
+
+# ---------------------------------------------------------------- 运行与比较
+
+def machine_info():
+    return {
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'python_implementation': platform.python_implementation(),
+        'python_version': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_cases(keyword=None, max_time=0.5):
+    results = []
+    for group, name, setup in CASES:
+        fullname = f'{group}.{name}'
+        if keyword and keyword not in fullname:
+            continue
+        stats = measure(setup(), max_time=max_time)
+        results.append({'group': group, 'name': name, 'fullname': fullname, 'stats': stats})
+        print(f"{fullname:<45} {stats['median'] * 1e6:>12.2f} {stats['min'] * 1e6:>12.2f} "
+              f"{stats['stddev'] / stats['mean'] * 100:>7.1f}% {stats['ops']:>12.0f}")
+    return results
+
+
+def compare(results, baseline, threshold, stat='min'):
+    """
+    与基准线比较
+
+    Args:
+        results: 本次结果
+        baseline: 基准线（保存的JSON）
+        threshold: 变慢超过该比例视为回归
+        stat: 比较的统计量（min/median/mean）
+
+    Returns:
+        list: 回归的用例 [(名称, 基准值, 当前值)]
+    """
+    previous = {bench['fullname']: bench['stats'] for bench in baseline['benchmarks']}
+    if baseline.get('machine_info') != machine_info():
+        print('提示: 基准线来自不同的机器或Python版本，比较结果仅供参考')
+    print(f"\n{'用例':<45} {'基准(us)':>12} {'当前(us)':>12} {'变化':>8}")
+    regressions = []
+    for bench in results:
+        old = previous.get(bench['fullname'])
+        if old is None:
+            continue
+        new = bench['stats'][stat]
+        change = new / old[stat] - 1
+        mark = ''
+        if change > threshold:
+            regressions.append((bench['fullname'], old[stat], new))
+            mark = ' 回归'
+        print(f"{bench['fullname']:<45} {old[stat] * 1e6:>12.2f} {new * 1e6:>12.2f} {change * 100:>+7.1f}%{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='热点路径微基准')
+    parser.add_argument('-k', dest='keyword', help='只运行名称包含该片段的用例')
+    parser.add_argument('--save', nargs='?', const=BASELINE_PATH, help='保存结果为基准线')
+    parser.add_argument('--compare', nargs='?', const=BASELINE_PATH, help='与基准线比较')
+    parser.add_argument('--threshold', type=float, default=0.2, help='变慢超过该比例视为回归')
+    parser.add_argument('--stat', default='min', choices=('min', 'median', 'mean'), help='比较的统计量')
+    parser.add_argument('--max-time', type=float, default=0.5, help='每个用例的测量时间（秒）')
+    args = parser.parse_args()
+
+    print(f"{'用例':<45} {'中位数(us)':>12} {'最小(us)':>12} {'离散':>8} {'次/秒':>12}")
+    results = run_cases(args.keyword, args.max_time)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'machine_info': machine_info(), 'datetime': datetime.now(timezone.utc).isoformat(),
+                       'benchmarks': results}, f, ensure_ascii=False, indent=2)
+        print(f'\n已保存基准线: {args.save}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.stat)
+        if regressions:
+            print(f'\n{len(regressions)} 个用例变慢超过 {args.threshold:.0%}')
+            sys.exit(1)
+        print('\n没有回归')
+
+
+if __name__ == '__main__':
+    main()
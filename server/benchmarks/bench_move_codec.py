@@ -0,0 +1,127 @@
+"""
+走法编码存储基准
+
+在合成的对局数据集（默认100万条，五子棋/斗地主/极速狂飙混合）上对比
+JSON TEXT（旧实现）与按游戏紧凑编码的BLOB：存储字节数、编码速度和插入吞吐。
+插入使用内存SQLite的 executemany，只衡量行大小对写入的影响，不代表MySQL的绝对数值。
+
+用法: python benchmarks/bench_move_codec.py [记录数]
+"""
+
+import sys
+import os
+import json
+import random
+import sqlite3
+import time
+from itertools import islice, cycle
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from move_codec import encode_moves, LandlordMoveCodec
+
+# 不同对局的样本数，数据集按比例循环使用样本
+SAMPLE_GAMES = 3000
+GAME_MIX = (('gomoku', 0.5), ('landlord', 0.35), ('racing', 0.15))
+INSERT_BATCH = 1000
+
+
+def gomoku_game(rng):
+    cells = rng.sample(range(225), rng.randint(15, 90))
+    return [{'row': c // 15, 'col': c % 15, 'color': ('black', 'white')[i % 2]} for i, c in enumerate(cells)]
+
+
+def landlord_game(rng):
+    deck = [{'suit': s, 'value': v} for s in LandlordMoveCodec.SUITS for v in LandlordMoveCodec.VALUES]
+    deck += [{'suit': '', 'value': 'joker'}, {'suit': '', 'value': 'JOKER'}]
+    rng.shuffle(deck)
+    moves = []
+    position = 0
+    while deck and len(moves) < 60:
+        count = 0 if rng.random() < 0.3 else min(len(deck), rng.choice((1, 1, 2, 3, 4, 5)))
+        moves.append({'position': position, 'cards': [deck.pop() for _ in range(count)]})
+        position = (position + 1) % 3
+    return moves
+
+
+def racing_game(rng):
+    moves = []
+    scores = [0, 0]
+    t = 0
+    for _ in range(rng.randint(60, 240)):
+        t += rng.randint(200, 700)
+        position = rng.randint(0, 1)
+        scores[position] += 30
+        moves.append({'position': position, 'score': scores[position], 't': t})
+    for position in (0, 1):
+        moves.append({'position': position, 'score': scores[position], 't': t, 'finished': True})
+    return moves
+
+
+GENERATORS = {'gomoku': gomoku_game, 'landlord': landlord_game, 'racing': racing_game}
+
+
+def make_samples(rng):
+    samples = []
+    for game_type, share in GAME_MIX:
+        samples += [(game_type, GENERATORS[game_type](rng)) for _ in range(int(SAMPLE_GAMES * share))]
+    rng.shuffle(samples)
+    return samples
+
+
+def encode_rate(samples, encode):
+    start = time.perf_counter()
+    for game_type, moves in samples:
+        encode(game_type, moves)
+    return len(samples) / (time.perf_counter() - start)
+
+
+def insert_rate(rows, records, column_type):
+    """向内存SQLite分批插入，返回每秒行数"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute(f'CREATE TABLE game_records (id INTEGER PRIMARY KEY, game_type TEXT, '
+                 f'moves {column_type} NOT NULL, moves_codec INTEGER NOT NULL DEFAULT 0)')
+    source = cycle(rows)
+    start = time.perf_counter()
+    remaining = records
+    while remaining > 0:
+        batch = list(islice(source, min(INSERT_BATCH, remaining)))
+        conn.executemany('INSERT INTO game_records (game_type, moves, moves_codec) VALUES (?, ?, ?)', batch)
+        conn.commit()
+        remaining -= len(batch)
+    rate = records / (time.perf_counter() - start)
+    conn.close()
+    return rate
+
+
+def main(records=1_000_000):
+    rng = random.Random(42)
+    samples = make_samples(rng)
+
+    json_rows = [(t, json.dumps(m, ensure_ascii=False), 0) for t, m in samples]
+    codec_rows = [(t, payload, codec_id) for t, m in samples for codec_id, payload in [encode_moves(t, m)]]
+
+    scale = records / len(samples)
+    print(f"数据集: {records} 条记录（{len(samples)} 局样本循环）")
+    print(f"{'游戏':<10}{'JSON字节/局':>14}{'编码字节/局':>14}{'压缩比':>8}")
+    json_total = codec_total = 0
+    for game_type, _ in GAME_MIX:
+        j = [len(r[1].encode('utf-8')) for r in json_rows if r[0] == game_type]
+        c = [len(r[1]) for r in codec_rows if r[0] == game_type]
+        json_total += sum(j)
+        codec_total += sum(c)
+        print(f"{game_type:<10}{sum(j) / len(j):>14.0f}{sum(c) / len(c):>14.1f}{sum(j) / sum(c):>7.1f}x")
+    print(f"{'合计':<10}{json_total * scale / 2 ** 20:>12.0f}MB{codec_total * scale / 2 ** 20:>12.0f}MB"
+          f"{json_total / codec_total:>7.1f}x")
+
+    json_encode = encode_rate(samples, lambda t, m: json.dumps(m, ensure_ascii=False))
+    codec_encode = encode_rate(samples, encode_moves)
+    print(f"编码速度: JSON {json_encode:.0f} 局/s，紧凑编码 {codec_encode:.0f} 局/s")
+
+    json_insert = insert_rate(json_rows, records, 'TEXT')
+    codec_insert = insert_rate(codec_rows, records, 'BLOB')
+    print(f"插入吞吐: JSON TEXT {json_insert:.0f} 行/s，BLOB {codec_insert:.0f} 行/s"
+          f"（{codec_insert / json_insert:.2f}x）")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
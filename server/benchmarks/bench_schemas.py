@@ -0,0 +1,127 @@
+"""
+事件数据验证基准
+
+对比各事件处理器原来逐字段调用 InputValidator 的验证代码（旧实现，照搬自插件）
+与编译后的事件数据模式（schemas.Schema）每秒的验证次数。
+两种实现交替运行多轮，各取最快的一轮（共享机器上受干扰最小）。
+
+用法: python benchmarks/bench_schemas.py
+"""
+
+import sys
+import os
+import timeit
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import logging
+logging.disable(logging.WARNING)
+
+from plugins.gomoku import MAKE_MOVE
+from plugins.landlord import BID, PLAY_CARDS
+from plugins.racing import SCORE
+from schemas import JOIN_ROOM, SEND_COMMENT, REJOIN_ROOM
+from validators import InputValidator, ValidationError
+
+ROOM_ID = 'ab12cd34'
+CARDS = [{'suit': '♠', 'value': str(v)} for v in range(3, 8)]
+
+
+def old_make_move(data):
+    room_id = InputValidator.validate_room_id(data.get('room_id'))
+    r, c = InputValidator.validate_coordinates(data.get('row'), data.get('col'))
+    return room_id, r, c
+
+
+def old_join_room(data):
+    room_id = InputValidator.validate_room_id(data.get('room_id'))
+    return data.get('game'), room_id, data.get('spectator', False)
+
+
+def old_send_comment(data):
+    room_id = InputValidator.validate_room_id(data.get('room_id'))
+    comment = InputValidator.sanitize_comment(data.get('comment'))
+    return room_id, comment
+
+
+def old_rejoin_room(data):
+    room_id = InputValidator.validate_room_id(data.get('room_id'))
+    version = InputValidator.validate_dict_field(data, 'version', required=False, field_type=int)
+    return room_id, version
+
+
+def old_bid(data):
+    room_id = InputValidator.validate_room_id(data.get('room_id'))
+    bid = InputValidator.validate_dict_field(data, 'bid', required=True, field_type=int)
+    if bid < 0 or bid > 3:
+        raise ValidationError("叫牌值必须在0-3之间", 'bid', bid)
+    return room_id, bid
+
+
+def old_play_cards(data):
+    room_id = InputValidator.validate_room_id(data.get('room_id'))
+    cards = InputValidator.validate_dict_field(data, 'cards', required=True, field_type=list)
+    if not cards:
+        raise ValidationError("出牌不能为空", 'cards', cards)
+    if len(cards) > 20:
+        raise ValidationError("出牌数量过多", 'cards', cards)
+    for card in cards:
+        if not isinstance(card, dict):
+            raise ValidationError("牌格式错误", 'cards', card)
+        if 'suit' not in card or 'value' not in card:
+            raise ValidationError("牌缺少必需字段", 'cards', card)
+    return room_id, cards
+
+
+def old_score(data):
+    room_id = InputValidator.validate_room_id(data.get('room_id'))
+    score = InputValidator.validate_dict_field(data, 'score', required=True, field_type=int)
+    if score < 0:
+        raise ValidationError("分数不能为负数", 'score', score)
+    if score > 1000000:
+        raise ValidationError("分数超出合理范围", 'score', score)
+    return room_id, score
+
+
+# (名称, 数据, 旧实现, 模式)
+CASES = [
+    ('make_move', {'room_id': ROOM_ID, 'row': 7, 'col': 8}, old_make_move, MAKE_MOVE),
+    ('join_room', {'room_id': ROOM_ID, 'spectator': True}, old_join_room, JOIN_ROOM),
+    ('send_comment', {'room_id': ROOM_ID, 'comment': ' 这步棋妙啊 '}, old_send_comment, SEND_COMMENT),
+    ('send_comment[标签]', {'room_id': ROOM_ID, 'comment': '这步棋<b>妙</b>啊'}, old_send_comment, SEND_COMMENT),
+    ('rejoin_room', {'room_id': ROOM_ID, 'version': 42}, old_rejoin_room, REJOIN_ROOM),
+    ('bid', {'room_id': ROOM_ID, 'bid': 2}, old_bid, BID),
+    ('play_cards(5张)', {'room_id': ROOM_ID, 'cards': CARDS}, old_play_cards, PLAY_CARDS),
+    ('update_score', {'room_id': ROOM_ID, 'score': 12345}, old_score, SCORE),
+    ('make_move[无效]', {'room_id': ROOM_ID, 'row': 7, 'col': 99}, old_make_move, MAKE_MOVE),
+]
+
+
+def timer(fn, data):
+    """计时函数（无效数据计入抛出异常的开销）"""
+    def run():
+        try:
+            fn(data)
+        except ValidationError:
+            pass
+    return timeit.Timer(run).timeit
+
+
+def rates(old, new, data, number=20000, repeat=7):
+    """两种实现交替运行多轮，各取最快的一轮，返回每秒验证次数"""
+    timers = (timer(old, data), timer(new, data))
+    best = [float('inf')] * len(timers)
+    for _ in range(repeat):
+        for i, run in enumerate(timers):
+            best[i] = min(best[i], run(number))
+    return [number / seconds for seconds in best]
+
+
+def main():
+    print(f"{'事件':<16} {'旧(次/秒)':>12} {'模式(次/秒)':>12} {'加速':>8}")
+    for name, data, old, schema in CASES:
+        old_rate, new_rate = rates(old, schema.validate, data)
+        print(f"{name:<16} {old_rate:>12.0f} {new_rate:>12.0f} {new_rate / old_rate:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
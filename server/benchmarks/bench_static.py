@@ -0,0 +1,79 @@
+"""
+静态资源吞吐基准
+
+对比 send_from_directory 逐次读盘（旧实现）与内存资源管线的每秒请求数。
+使用Flask测试客户端，只测量服务端处理开销，不含网络传输。
+
+用法: python benchmarks/bench_static.py
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from flask import Flask, send_from_directory, request
+from asset_pipeline import AssetPipeline
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+CASES = [
+    ('主页', '/index.html', {}),
+    ('game.js gzip', '/landlord/game.js', {'Accept-Encoding': 'gzip, br'}),
+    ('game.js 条件请求', '/landlord/game.js', {'Accept-Encoding': 'gzip, br', 'If-None-Match': None}),
+]
+
+
+def make_legacy_app():
+    """旧实现：每次请求从磁盘读取"""
+    app = Flask(__name__)
+
+    @app.route('/<path:path>')
+    def static_files(path):
+        return send_from_directory(ROOT, path)
+
+    return app
+
+
+def make_pipeline_app():
+    """新实现：内存中预压缩资源"""
+    app = Flask(__name__)
+    pipeline = AssetPipeline(ROOT).build()
+
+    @app.route('/<path:path>')
+    def static_files(path):
+        return pipeline.respond(path, request.headers) or ('', 404)
+
+    return app
+
+
+def bench(client, url, headers, duration):
+    """返回每秒请求数和响应字节数"""
+    if 'If-None-Match' in headers:
+        etag = client.get(url, headers={k: v for k, v in headers.items() if v}).headers.get('ETag')
+        headers = {**headers, 'If-None-Match': etag or ''}
+
+    count = 0
+    size = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        response = client.get(url, headers=headers)
+        size = len(response.data)
+        count += 1
+    return count / (time.perf_counter() - start), size, response.status_code
+
+
+def main(duration=2.0):
+    legacy = make_legacy_app().test_client()
+    pipeline = make_pipeline_app().test_client()
+
+    print(f"{'场景':<16}{'旧 req/s':>12}{'新 req/s':>12}{'倍数':>8}{'旧字节':>10}{'新字节':>10}")
+    for name, url, headers in CASES:
+        old_rate, old_size, old_status = bench(legacy, url, headers, duration)
+        new_rate, new_size, new_status = bench(pipeline, url, headers, duration)
+        print(f"{name:<16}{old_rate:>12.0f}{new_rate:>12.0f}{new_rate / old_rate:>7.1f}x"
+              f"{old_size:>10}{new_size:>10}  ({old_status}/{new_status})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+SQLite存储后端写入基准
+
+对比游戏线程调用 write() 的耗时：异步入队（写线程批量提交）与逐条同步提交。
+写入内容为 save_game_record 的两条语句（游戏记录 + 每日汇总）。
+
+用法: python benchmarks/bench_storage.py [写入次数]
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from plugins.base import INSERT_GAME_RECORD, UPSERT_GAME_STATS_DAILY
+from sqlite_storage import SQLiteBackend
+
+def statements(i):
+    now = datetime.now()
+    return [
+        (INSERT_GAME_RECORD, ('gomoku', f'r{i}', bytes(range(40)), 1, 'black', 2, 0, 120, now)),
+        (UPSERT_GAME_STATS_DAILY, (now.date(), 'gomoku', 120, 2, 0)),
+    ]
+
+
+def bench(path, count, wait):
+    # 队列容量足够容纳全部写入，测量写线程的持续提交速度
+    storage = SQLiteBackend(path, wait_for_commit=wait, queue_size=count + 1)
+    storage.migrate()
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        t = time.perf_counter()
+        storage.write(statements(i))
+        latencies.append(time.perf_counter() - t)
+    storage.flush()
+    elapsed = time.perf_counter() - start
+    stats = storage.get_stats()
+    storage.close()
+    latencies.sort()
+    return count / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)], stats
+
+
+def main(count=20000):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        print(f"{'模式':<10}{'行/s':>10}{'p50 μs':>10}{'p99 μs':>10}{'事务数':>10}")
+        for name, wait in (('同步', True), ('异步批量', False)):
+            rate, p50, p99, stats = bench(os.path.join(tmpdir, f'{name}.db'), count, wait)
+            print(f"{name:<10}{rate:>10.0f}{p50 * 1e6:>10.1f}{p99 * 1e6:>10.1f}{stats['batches']:>10}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
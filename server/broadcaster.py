@@ -0,0 +1,104 @@
+"""
+一次编码广播模块
+
+将事件序列化为Engine.IO数据包一次，再把同一组数据包发送给所有接收者，
+避免按接收者逐个调用 socketio.emit 时的重复序列化。
+数据包经 Engine.IO 服务端的公开接口 server.eio.send_packet 发送，不使用 python-socketio 的内部方法
+（python-engineio 4.x 的 Server.send_packet，版本在 requirements.txt 中固定）；
+服务端对象没有该接口时与集群模式一样退回为 socketio.emit。
+集群模式（消息队列客户端管理器）下改为经 socketio.emit 发送，由各进程分别投递。
+"""
+
+import logging
+from engineio import packet as eio_packet
+from socketio import packet, PubSubManager
+
+logger = logging.getLogger(__name__)
+
+
+class Broadcaster:
+    """一次编码、多路发送的广播器"""
+
+    def __init__(self, socketio, namespace='/'):
+        """
+        初始化广播器
+
+        Args:
+            socketio: SocketIO实例
+            namespace: 命名空间
+        """
+        self.socketio = socketio
+        self.namespace = namespace
+
+    def encode(self, event, data):
+        """
+        将事件编码为Engine.IO数据包（二进制数据会拆分为多个附件包）
+
+        Args:
+            event: 事件名称
+            data: 事件数据
+
+        Returns:
+            list: Engine.IO数据包列表
+        """
+        server = self.socketio.server
+        pkt = server.packet_class(packet.EVENT, namespace=self.namespace, data=[event, data])
+        encoded = pkt.encode()
+        if not isinstance(encoded, list):
+            encoded = [encoded]
+        return [eio_packet.Packet(eio_packet.MESSAGE, p) for p in encoded]
+
+    def send(self, eio_packets, sids=None, room=None, exclude=()):
+        """
+        发送已编码的数据包
+
+        Args:
+            eio_packets: encode() 返回的数据包列表
+            sids: 明确的接收者sid集合（与room二选一）
+            room: SocketIO房间ID
+            exclude: 需要排除的sid集合
+
+        Returns:
+            int: 实际发送的接收者数量
+        """
+        server = self.socketio.server
+        manager = server.manager
+        send_packet = server.eio.send_packet
+        if sids is not None:
+            recipients = ((sid, manager.eio_sid_from_sid(sid, self.namespace)) for sid in sids)
+        else:
+            recipients = manager.get_participants(self.namespace, room)
+
+        sent = 0
+        for sid, eio_sid in recipients:
+            if eio_sid is None or sid in exclude:
+                continue
+            for p in eio_packets:
+                send_packet(eio_sid, p)
+            sent += 1
+        return sent
+
+    def emit(self, event, data, sids=None, room=None, exclude=()):
+        """
+        编码一次并发送给一组接收者
+
+        Args:
+            event: 事件名称
+            data: 事件数据
+            sids: 明确的接收者sid集合（与room二选一）
+            room: SocketIO房间ID
+            exclude: 需要排除的sid集合
+
+        Returns:
+            int: 实际发送的接收者数量（集群模式下为指定的接收者数量，按房间发送时为0）
+        """
+        if sids is not None and not sids:
+            return 0
+        server = self.socketio.server
+        if isinstance(server.manager, PubSubManager) or not hasattr(getattr(server, 'eio', None), 'send_packet'):
+            # 集群模式：接收者可能连接在其他进程，经客户端管理器的消息队列发送
+            # （没有 Engine.IO 发送接口时同样交给 emit，由 python-socketio 逐个接收者编码）
+            recipients = room if sids is None else list(sids)
+            server.emit(event, data, to=recipients, skip_sid=list(exclude) or None, namespace=self.namespace)
+            return len(recipients) if sids is not None else 0
+        return self.send(self.encode(event, data), sids=sids, room=room, exclude=exclude)
@@ -0,0 +1,336 @@
+"""
+多进程集群模式
+
+每个工作进程是一个完整的服务器，进程之间通过发布/订阅后端同步：
+- 跨进程发送：ClusterManager 是 python-socketio 的 PubSubManager，发往房间或其他进程
+  连接的事件经消息队列送达连接所在的进程
+- 房间归属：房间ID按哈希映射到唯一的工作进程，房间状态只存在于该进程的 GameManager 中，
+  其他进程收到带 room_id 的事件时转发给归属进程处理
+- 发布/订阅后端可替换：LocalPubSub（进程内，用于测试）、RespPubSub（Redis或本地代理）
+
+消息以JSON编码（json_codec：python-socketio 消息队列管理器的JSON消息格式，
+元组参数和二进制数据按类型标记显式编码），接收时不会执行消息中的代码。
+
+启动: python cluster.py [--workers N]，工作进程 i 监听 PORT + i，前端负载均衡需要会话粘滞。
+"""
+
+import argparse
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import zlib
+
+import socketio
+
+import json_codec
+from resp import RespBroker, RespClient, RespSubscriber
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNEL = 'gamehub'
+
+# 订阅连接断开后重连的最大等待（秒）
+RECONNECT_MAX_DELAY = 5.0
+
+
+class PubSubBackend:
+    """发布/订阅后端接口"""
+
+    def publish(self, channel, message):
+        """
+        发布消息
+
+        Args:
+            channel: 频道名
+            message: bytes
+        """
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """
+        订阅频道（返回前订阅已生效）
+
+        Returns:
+            Subscription: 可迭代得到消息bytes，close() 后迭代结束
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class _QueueSubscription:
+    """进程内订阅"""
+
+    def __init__(self, hub, channel):
+        self.hub = hub
+        self.channel = channel
+        self.queue = queue.Queue()
+
+    def __iter__(self):
+        while True:
+            message = self.queue.get()
+            if message is None:
+                return
+            yield message
+
+    def close(self):
+        self.hub._unsubscribe(self)
+        self.queue.put(None)
+
+
+class LocalPubSub(PubSubBackend):
+    """进程内发布/订阅（同一进程中的多个服务器实例，用于测试）"""
+
+    def __init__(self):
+        self._subscriptions = {}  # {频道: [订阅]}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.queue.put(message)
+        return len(subscriptions)
+
+    def subscribe(self, channel):
+        subscription = _QueueSubscription(self, channel)
+        with self._lock:
+            self._subscriptions.setdefault(channel, []).append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+
+
+class _RespSubscription:
+    """Redis协议订阅，连接断开后按指数退避重新订阅"""
+
+    def __init__(self, client, channel):
+        self.client = client
+        self.channel = channel
+        self.closed = False
+        self.subscriber = RespSubscriber(client, channel)
+
+    def __iter__(self):
+        delay = 0.1
+        while not self.closed:
+            for _, message in self.subscriber:
+                delay = 0.1
+                yield message
+            while not self.closed:
+                time.sleep(delay)
+                try:
+                    self.subscriber = RespSubscriber(self.client, self.channel)
+                    logger.info("已重新订阅频道 %s", self.channel)
+                    break
+                except OSError as e:
+                    logger.warning("重新订阅频道 %s 失败: %s", self.channel, e)
+                    delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def close(self):
+        self.closed = True
+        self.subscriber.close()
+
+
+class RespPubSub(PubSubBackend):
+    """Redis协议发布/订阅（Redis服务或本地 RespBroker）"""
+
+    def __init__(self, url):
+        self.client = RespClient.from_url(url)
+
+    def publish(self, channel, message):
+        return self.client.execute('PUBLISH', channel, message)
+
+    def subscribe(self, channel):
+        return _RespSubscription(self.client, channel)
+
+    def close(self):
+        self.client.close()
+
+
+def create_pubsub(url):
+    """
+    按地址创建发布/订阅后端
+
+    Args:
+        url: local:// 或 redis://主机:端口/库
+    """
+    if url.startswith('local:'):
+        return LocalPubSub()
+    return RespPubSub(url)
+
+
+class RoomAffinity:
+    """房间归属：房间ID按CRC32映射到工作进程"""
+
+    def __init__(self, worker_id=0, workers=1):
+        if not 0 <= worker_id < workers:
+            raise ValueError(f'无效的工作进程编号 {worker_id}/{workers}')
+        self.worker_id = worker_id
+        self.workers = workers
+
+    def owner(self, room_id):
+        """房间所属的工作进程编号"""
+        return zlib.crc32(room_id.encode('utf-8')) % self.workers
+
+    def is_local(self, room_id):
+        return self.workers == 1 or self.owner(room_id) == self.worker_id
+
+    def new_room_id(self):
+        """生成归属当前进程的房间ID（平均尝试 workers 次）"""
+        while True:
+            room_id = str(uuid.uuid4())[:8]
+            if self.is_local(room_id):
+                return room_id
+
+
+class ClusterManager(socketio.PubSubManager):
+    """
+    集群客户端管理器
+
+    在 PubSubManager 的跨进程 emit/加入房间/断开之外，增加 route 消息：
+    把事件转发给房间所属的工作进程，由 router 在该进程中执行。
+    """
+
+    name = 'gamehub-cluster'
+
+    def __init__(self, pubsub, affinity=None, channel=DEFAULT_CHANNEL, write_only=False):
+        """
+        Args:
+            pubsub: PubSubBackend
+            affinity: RoomAffinity（默认单进程）
+            channel: 频道名（所有工作进程相同）
+            write_only: 只发送不接收
+        """
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.pubsub = pubsub
+        self.affinity = affinity or RoomAffinity()
+        self.router = None  # router(event, args, sid, namespace)
+        self.stats = {'published': 0, 'received': 0, 'forwarded': 0, 'routed': 0, 'local': 0}
+        # 构造时即订阅，初始化前发布的消息不会丢失
+        self._subscription = None if write_only else pubsub.subscribe(channel)
+
+    def emit(self, event, data, namespace=None, room=None, skip_sid=None, callback=None, **kwargs):
+        """只发给本进程连接（按sid）的事件直接发送，不经消息队列"""
+        if callback is None and not kwargs.get('ignore_queue') and self._is_local_target(room, namespace or '/'):
+            self.stats['local'] += 1
+            return socketio.Manager.emit(self, event, data, namespace=namespace or '/', room=room,
+                                         skip_sid=skip_sid)
+        return super().emit(event, data, namespace=namespace, room=room, skip_sid=skip_sid,
+                            callback=callback, **kwargs)
+
+    def _is_local_target(self, room, namespace):
+        rooms = [room] if isinstance(room, str) else room
+        return bool(rooms) and all(isinstance(r, str) and self.is_connected(r, namespace) for r in rooms)
+
+    def _publish(self, data):
+        self.stats['published'] += 1
+        self.pubsub.publish(self.channel, json_codec.dumps(data))
+
+    def _listen(self):
+        for raw in self._subscription:
+            self.stats['received'] += 1
+            try:
+                message = json_codec.loads(raw)
+            except Exception as e:
+                logger.error(f"无法解析集群消息: {e}")
+                continue
+            if not isinstance(message, dict):
+                # 基类对非字典消息会尝试 pickle 解码，不交给基类
+                logger.error("忽略格式错误的集群消息: %s", type(message).__name__)
+                continue
+            if message.get('method') == 'route':
+                self._handle_route(message)
+                continue
+            yield message
+
+    def forward(self, worker, event, args, sid, namespace='/'):
+        """
+        把事件转发给指定工作进程处理
+
+        Args:
+            worker: 工作进程编号，None表示除自己外的所有进程
+        """
+        self.stats['forwarded'] += 1
+        self._publish({'method': 'route', 'worker': worker, 'event': event, 'args': list(args),
+                       'sid': sid, 'namespace': namespace, 'host_id': self.host_id})
+
+    def _handle_route(self, message):
+        worker = message.get('worker')
+        if worker is None:
+            if message.get('host_id') == self.host_id:
+                return
+        elif worker != self.affinity.worker_id:
+            return
+        if self.router is None:
+            logger.warning("收到转发事件 %s，但没有设置路由", message.get('event'))
+            return
+        self.stats['routed'] += 1
+        try:
+            self.router(message['event'], message['args'], message['sid'], message.get('namespace') or '/')
+        except Exception as e:
+            logger.error(f"处理转发事件 {message.get('event')} 出错: {e}")
+
+    def close(self):
+        if self._subscription is not None:
+            self._subscription.close()
+        self.pubsub.close()
+
+    def get_stats(self):
+        return dict(self.stats, worker=self.affinity.worker_id, workers=self.affinity.workers)
+
+
+def run_cluster(workers, base_port, pubsub_url=None):
+    """
+    启动工作进程并等待退出
+
+    未指定 pubsub_url 时在本进程内启动 RespBroker 作为消息代理。
+    """
+    broker = None
+    if not pubsub_url:
+        broker = RespBroker().start()
+        pubsub_url = broker.url
+
+    main_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    processes = []
+    for worker_id in range(workers):
+        env = dict(os.environ, WORKERS=str(workers), WORKER_ID=str(worker_id),
+                   PORT=str(base_port + worker_id), PUBSUB_URL=pubsub_url)
+        processes.append(subprocess.Popen([sys.executable, main_py], env=env))
+        logger.info(f"工作进程 {worker_id} 已启动，端口 {base_port + worker_id}")
+
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+    finally:
+        if broker:
+            broker.close()
+
+
+def main(argv=None):
+    from config import Config
+    parser = argparse.ArgumentParser(description='多进程启动游戏服务器')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--port', type=int, default=Config.PORT)
+    parser.add_argument('--pubsub-url', default=os.getenv('PUBSUB_URL', ''))
+    args = parser.parse_args(argv)
+    run_cluster(args.workers, args.port, args.pubsub_url)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
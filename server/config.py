@@ -17,11 +17,69 @@ class Config:
         'charset': 'utf8mb4',
     }
     
+    # 存储后端: auto（优先MySQL，不可用时使用SQLite）、mysql、sqlite
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'auto').lower()
+    SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gamehub.db'))
+    
+    # 慢查询阈值（毫秒），超过时记录警告日志
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+    
+    # 游戏记录保留的完整月份数（按月分区整体删除），0表示永久保留
+    RECORD_RETENTION_MONTHS = int(os.getenv('RECORD_RETENTION_MONTHS', 0))
+    
+    # 对局回放：缓存已解码走法的对局数、1倍速下每步间隔（毫秒，带时间戳的走法按记录的时间）
+    REPLAY_CACHE_SIZE = int(os.getenv('REPLAY_CACHE_SIZE', 128))
+    REPLAY_MOVE_INTERVAL_MS = int(os.getenv('REPLAY_MOVE_INTERVAL_MS', 800))
+    
+    # 集群模式：工作进程数、本进程编号、发布/订阅后端地址（redis://主机:端口/库）
+    WORKERS = int(os.getenv('WORKERS', 1))
+    WORKER_ID = int(os.getenv('WORKER_ID', 0))
+    PUBSUB_URL = os.getenv('PUBSUB_URL', '')
+    
+    # 房间状态后端：空表示只在内存中，redis://主机:端口/库 表示保存到键值存储（重启后恢复）；
+    # 同一房间的修改最多每 ROOM_STATE_FLUSH_MS 毫秒写入一次
+    ROOM_STATE_URL = os.getenv('ROOM_STATE_URL', '')
+    ROOM_STATE_FLUSH_MS = int(os.getenv('ROOM_STATE_FLUSH_MS', 200))
+    
+    # 停机交接：SIGTERM 时房间快照的文件路径（集群模式下追加工作进程编号）、退出前等待提示发出的时间
+    DRAIN_SNAPSHOT_PATH = os.getenv('DRAIN_SNAPSHOT_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'room_snapshot.bin'))
+    DRAIN_GRACE_MS = int(os.getenv('DRAIN_GRACE_MS', 500))
+    
+    # 服务器模式：threading（Flask-SocketIO，每个连接一个线程）或 asgi（异步服务器，需要 uvicorn）；
+    # 异步服务器模式下数据库调用在有界线程池中执行：线程数、最多等待执行的写入数
+    SERVER_MODE = os.getenv('SERVER_MODE', 'threading').lower()
+    DB_EXECUTOR_WORKERS = int(os.getenv('DB_EXECUTOR_WORKERS', 4))
+    DB_EXECUTOR_MAX_PENDING = int(os.getenv('DB_EXECUTOR_MAX_PENDING', 1000))
+    
+    # 运行指标：是否提供 /metrics 路由（Prometheus 文本格式）
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    
+    # 性能剖析（排查问题时开启）：采样剖析的开关和间隔（毫秒）；慢事件捕获的阈值（毫秒，0表示关闭，
+    # 开启后所有事件处理器在 cProfile 下运行）和保留的捕获数；/admin 路由的令牌（为空时不注册 /admin 路由）
+    PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'False').lower() == 'true'
+    PROFILER_INTERVAL_MS = float(os.getenv('PROFILER_INTERVAL_MS', 10))
+    SLOW_EVENT_MS = float(os.getenv('SLOW_EVENT_MS', 0))
+    SLOW_EVENT_CAPTURES = int(os.getenv('SLOW_EVENT_CAPTURES', 20))
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    
+    # 日志：级别、输出格式（text 或 json，每行一条JSON）；同一消息模板每 LOG_RATE_INTERVAL 秒最多输出
+    # LOG_RATE_LIMIT 条（0表示不限流），超出后每 LOG_SAMPLE_EVERY 条输出一条（0表示丢弃）；
+    # 日志由后台线程写入，队列超过 LOG_QUEUE_SIZE 条时丢弃新记录
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+    LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', 20))
+    LOG_RATE_INTERVAL = float(os.getenv('LOG_RATE_INTERVAL', 10))
+    LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', 100))
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    
     # 服务器配置
     HOST = os.getenv('HOST', '0.0.0.0')
     PORT = int(os.getenv('PORT', 5000))
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
     
+    # 未携带game字段的旧客户端事件默认路由到的游戏
+    DEFAULT_GAME = os.getenv('DEFAULT_GAME', 'gomoku')
+    
     # CORS配置
     ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', '').split(',') if os.getenv('ALLOWED_ORIGINS') else []
     
@@ -43,6 +101,48 @@ class Config:
         if not (1 <= cls.MYSQL_CONFIG['port'] <= 65535):
             errors.append(f"无效的数据库端口: {cls.MYSQL_CONFIG['port']}")
         
+        if cls.STORAGE_BACKEND not in ('auto', 'mysql', 'sqlite'):
+            errors.append(f"无效的存储后端: {cls.STORAGE_BACKEND}")
+        
+        if cls.RECORD_RETENTION_MONTHS < 0:
+            errors.append(f"无效的记录保留月数: {cls.RECORD_RETENTION_MONTHS}")
+        
+        if cls.REPLAY_CACHE_SIZE < 0 or cls.REPLAY_MOVE_INTERVAL_MS <= 0:
+            errors.append(f"无效的回放配置: 缓存 {cls.REPLAY_CACHE_SIZE}，间隔 {cls.REPLAY_MOVE_INTERVAL_MS}ms")
+        
+        if cls.WORKERS < 1 or not 0 <= cls.WORKER_ID < cls.WORKERS:
+            errors.append(f"无效的工作进程编号: {cls.WORKER_ID}/{cls.WORKERS}")
+        elif cls.WORKERS > 1 and not cls.PUBSUB_URL:
+            errors.append("多进程模式必须设置 PUBSUB_URL")
+        
+        if cls.ROOM_STATE_FLUSH_MS <= 0:
+            errors.append(f"无效的房间状态写入间隔: {cls.ROOM_STATE_FLUSH_MS}ms")
+        
+        if cls.DRAIN_GRACE_MS < 0:
+            errors.append(f"无效的停机等待时间: {cls.DRAIN_GRACE_MS}ms")
+        
+        if cls.SERVER_MODE not in ('threading', 'asgi'):
+            errors.append(f"无效的服务器模式: {cls.SERVER_MODE}")
+        elif cls.SERVER_MODE == 'asgi' and cls.WORKERS > 1:
+            errors.append("异步服务器模式不支持多进程集群")
+        
+        if cls.DB_EXECUTOR_WORKERS < 1 or cls.DB_EXECUTOR_MAX_PENDING < 1:
+            errors.append(f"无效的数据库线程池配置: {cls.DB_EXECUTOR_WORKERS} 线程，"
+                          f"{cls.DB_EXECUTOR_MAX_PENDING} 等待写入")
+        
+        if cls.PROFILER_INTERVAL_MS <= 0 or cls.SLOW_EVENT_MS < 0 or cls.SLOW_EVENT_CAPTURES < 1:
+            errors.append(f"无效的剖析配置: 采样间隔 {cls.PROFILER_INTERVAL_MS}ms，慢事件阈值 {cls.SLOW_EVENT_MS}ms，"
+                          f"保留 {cls.SLOW_EVENT_CAPTURES} 个捕获")
+        
+        if cls.LOG_LEVEL not in ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'):
+            errors.append(f"无效的日志级别: {cls.LOG_LEVEL}")
+        if cls.LOG_FORMAT not in ('text', 'json'):
+            errors.append(f"无效的日志格式: {cls.LOG_FORMAT}")
+        if (cls.LOG_RATE_LIMIT < 0 or cls.LOG_RATE_INTERVAL <= 0 or cls.LOG_SAMPLE_EVERY < 0
+                or cls.LOG_QUEUE_SIZE < 1):
+            errors.append(f"无效的日志限流配置: 每 {cls.LOG_RATE_INTERVAL}s {cls.LOG_RATE_LIMIT} 条，"
+                          f"采样间隔 {cls.LOG_SAMPLE_EVERY}，队列 {cls.LOG_QUEUE_SIZE}")
+        
         # 清理空字符串
         if cls.ALLOWED_ORIGINS:
             cls.ALLOWED_ORIGINS = [origin.strip() for origin in cls.ALLOWED_ORIGINS if origin.strip()]
@@ -61,6 +161,17 @@ class Config:
         logger.info("=== 应用配置 ===")
         logger.info(f"服务器: {cls.HOST}:{cls.PORT}")
         logger.info(f"调试模式: {cls.DEBUG}")
+        logger.info(f"服务器模式: {cls.SERVER_MODE}")
         logger.info(f"CORS源: {cls.ALLOWED_ORIGINS if cls.ALLOWED_ORIGINS else '所有源（开发模式）'}")
+        logger.info(f"存储后端: {cls.STORAGE_BACKEND}")
+        logger.info(f"日志: {cls.LOG_LEVEL}，{cls.LOG_FORMAT} 格式，"
+                    f"{f'每 {cls.LOG_RATE_INTERVAL:g}s 每条消息 {cls.LOG_RATE_LIMIT} 条' if cls.LOG_RATE_LIMIT else '不限流'}")
+        if cls.PROFILER_ENABLED or cls.SLOW_EVENT_MS:
+            logger.info(f"性能剖析: 采样 {'开启' if cls.PROFILER_ENABLED else '关闭'}，"
+                        f"慢事件阈值 {f'{cls.SLOW_EVENT_MS:g}ms' if cls.SLOW_EVENT_MS else '关闭'}")
+        if cls.WORKERS > 1:
+            logger.info(f"集群: 工作进程 {cls.WORKER_ID}/{cls.WORKERS}，消息队列 {cls.PUBSUB_URL}")
+        logger.info(f"房间状态: {cls.ROOM_STATE_URL or '内存'}")
         logger.info(f"数据库: {cls.MYSQL_CONFIG['host']}:{cls.MYSQL_CONFIG['port']}/{cls.MYSQL_CONFIG['database']}")
+        logger.info(f"记录保留: {f'{cls.RECORD_RETENTION_MONTHS}个月' if cls.RECORD_RETENTION_MONTHS else '永久'}")
         logger.info("================")
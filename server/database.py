@@ -1,14 +1,16 @@
 import pymysql
 from contextlib import contextmanager
-from pymysql.cursors import DictCursor
+from pymysql.cursors import DictCursor, SSCursor
 import logging
 import time
 from queue import Queue, Empty
 import threading
 
+from storage import StorageBackend
+
 logger = logging.getLogger(__name__)
 
-class Database:
+class Database(StorageBackend):
     def __init__(self, config, pool_size=5, max_overflow=10, pool_timeout=30, health_check_interval=60):
         """
         初始化数据库连接池
@@ -79,7 +81,7 @@ class Database:
                 conn.ping(reconnect=True)
                 return conn
             except Exception as e:
-                logger.warning(f"连接无效，创建新连接: {e}")
+                logger.warning("连接无效，创建新连接: %s", e)
                 # 连接无效，创建新连接
                 with self._pool_lock:
                     self._current_size -= 1
@@ -103,7 +105,7 @@ class Database:
             conn.ping(reconnect=True)
             self._pool.put_nowait(conn)
         except Exception as e:
-            logger.warning(f"归还连接失败，关闭连接: {e}")
+            logger.warning("归还连接失败，关闭连接: %s", e)
             try:
                 conn.close()
             except:
@@ -204,6 +206,14 @@ class Database:
         """
         return self._is_healthy
     
+    def _stream_cursor(self, conn):
+        """流式读取使用无缓冲的服务端游标（SSCursor），结果集不整体载入内存"""
+        return conn.cursor(SSCursor)
+    
+    def get_stats(self):
+        """存储后端统计信息（连接池状态）"""
+        return self.get_pool_stats()
+    
     def get_pool_stats(self):
         """
         获取连接池统计信息
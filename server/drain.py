@@ -0,0 +1,213 @@
+"""
+优雅停机与房间交接
+
+收到 SIGTERM 时进入排空模式：
+1. 不再处理新事件（包括创建房间），已连接的客户端收到提示
+2. 为每个玩家座位生成交接令牌，随 server_draining 事件发送给玩家
+3. 把所有房间状态和弹幕尾部写入本地快照文件（带类型标记的JSON + zlib，先写临时文件再原子替换；
+   不使用 pickle，能写入快照文件的一方不能借此在新进程中执行代码）
+4. 刷新异步写入队列（SQLite写线程、房间状态后端）
+   快照由大量小对象组成，序列化和反序列化期间暂停循环垃圾回收（否则恢复耗时约为3倍）
+5. 等待提示消息发出后退出
+
+新进程启动时读取快照恢复房间，玩家重连后在 rejoin_room 中带上令牌即可取回原座位，
+按版本号只同步缺失的增量。
+"""
+
+import gc
+import logging
+import os
+import secrets
+import signal
+import time
+import zlib
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'GHSNAP1\n'
+SNAPSHOT_VERSION = 2
+
+# 快照中每个房间保留的弹幕条数
+BARRAGE_TAIL = 20
+
+
+class _GCPaused:
+    """暂停循环垃圾回收（退出时恢复原状态）"""
+
+    def __enter__(self):
+        self.enabled = gc.isenabled()
+        gc.disable()
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            gc.enable()
+
+
+def write_snapshot(path, rooms, barrage):
+    """
+    写入房间快照
+
+    Args:
+        path: 快照文件路径
+        rooms: {room_id: 房间数据}
+        barrage: {room_id: [弹幕]}
+
+    Returns:
+        int: 文件字节数
+
+    Raises:
+        TypeError: 房间数据包含 json_codec 无法编码的值
+    """
+    with _GCPaused():
+        payload = json_codec.dumps({
+            'version': SNAPSHOT_VERSION,
+            'created_at': time.time(),
+            'rooms': rooms,
+            'barrage': barrage
+        })
+    data = SNAPSHOT_MAGIC + zlib.compress(payload, 1)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def read_snapshot(path):
+    """
+    读取房间快照
+
+    Returns:
+        dict: version, created_at, rooms, barrage
+
+    Raises:
+        ValueError: 文件格式不正确（包括旧版本的 pickle 快照）
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(SNAPSHOT_MAGIC):
+        raise ValueError(f'{path} 不是房间快照文件')
+    with _GCPaused():
+        snapshot = json_codec.loads(zlib.decompress(data[len(SNAPSHOT_MAGIC):]))
+    if not isinstance(snapshot, dict):
+        raise ValueError(f'{path} 不是房间快照文件')
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"不支持的快照版本: {snapshot.get('version')}")
+    return snapshot
+
+
+class DrainController:
+    """排空模式和快照恢复"""
+
+    def __init__(self, socketio, game_manager, barrage_manager=None, storage=None, path='room_snapshot.bin',
+                 grace=0.5):
+        """
+        Args:
+            socketio: SocketIO实例
+            game_manager: GameManager
+            barrage_manager: BarrageManager（可选）
+            storage: 存储后端（可选，有 flush() 时在退出前刷新）
+            path: 快照文件路径
+            grace: 退出前等待提示消息发出的时间（秒）
+        """
+        self.socketio = socketio
+        self.game_manager = game_manager
+        self.barrage_manager = barrage_manager
+        self.storage = storage
+        self.path = path
+        self.grace = grace
+
+    def drain(self):
+        """
+        进入排空模式并写入快照
+
+        Returns:
+            dict: rooms, bytes, seconds
+        """
+        start = time.perf_counter()
+        self.game_manager.draining = True
+
+        rooms = dict(self.game_manager.rooms)
+        for room_id, room in rooms.items():
+            self._hand_off(room_id, room)
+
+        barrage = {}
+        if self.barrage_manager:
+            barrage = self.barrage_manager.export_history(rooms, BARRAGE_TAIL)
+        size = write_snapshot(self.path, rooms, barrage)
+
+        if self.storage is not None and hasattr(self.storage, 'flush'):
+            try:
+                self.storage.flush()
+            except Exception as e:
+                logger.error(f"刷新存储写入队列失败: {e}")
+        try:
+            self.game_manager.state.flush()
+        except Exception as e:
+            logger.error(f"刷新房间状态失败: {e}")
+
+        result = {'rooms': len(rooms), 'bytes': size, 'seconds': time.perf_counter() - start}
+        logger.info(f"排空完成: {result['rooms']} 个房间写入 {self.path}（{size} 字节，"
+                    f"{result['seconds'] * 1000:.1f}ms）")
+        return result
+
+    def _hand_off(self, room_id, room):
+        """为每个玩家座位生成令牌并通知房间内的连接"""
+        tokens = [secrets.token_urlsafe(12) for _ in room['players']]
+        room['seat_tokens'] = tokens
+        for seat, (sid, token) in enumerate(zip(room['players'], tokens)):
+            self._send(sid, {'room_id': room_id, 'seat': seat, 'token': token})
+        for sid in room['spectators']:
+            self._send(sid, {'room_id': room_id})
+
+    def _send(self, sid, data):
+        try:
+            self.socketio.emit('server_draining', data, room=sid)
+        except Exception as e:
+            logger.warning("通知客户端 %s 失败: %s", sid, e)
+
+    def restore(self):
+        """
+        从快照恢复房间（恢复后删除快照，避免重复恢复过期数据）
+
+        Returns:
+            int: 恢复的房间数
+        """
+        if not os.path.exists(self.path):
+            return 0
+        start = time.perf_counter()
+        try:
+            snapshot = read_snapshot(self.path)
+        except Exception as e:
+            logger.error(f"读取房间快照失败: {e}")
+            return 0
+
+        for room_id, room in snapshot['rooms'].items():
+            self.game_manager.rooms[room_id] = room
+            self.game_manager.state.mark_dirty(room_id, room)
+        if self.barrage_manager:
+            self.barrage_manager.import_history(snapshot['barrage'])
+        os.remove(self.path)
+
+        logger.info(f"从快照恢复了 {len(snapshot['rooms'])} 个房间，"
+                    f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+        return len(snapshot['rooms'])
+
+    def shutdown(self, signum=None, frame=None):
+        """SIGTERM 处理：排空后退出进程"""
+        logger.info("收到停止信号，开始排空")
+        try:
+            self.drain()
+        except Exception as e:
+            logger.error(f"排空失败: {e}")
+        # 等待提示消息由发送线程发出
+        time.sleep(self.grace)
+        raise SystemExit(0)
+
+    def install(self):
+        """注册 SIGTERM 处理"""
+        signal.signal(signal.SIGTERM, self.shutdown)
@@ -0,0 +1,123 @@
+"""
+紧凑事件编码模块
+
+为高频事件（落子、分数）提供固定布局的二进制帧，按连接协商启用。
+未协商的客户端继续接收JSON字典。
+"""
+
+import logging
+import struct
+from flask import request
+from flask_socketio import emit, join_room, leave_room
+
+logger = logging.getLogger(__name__)
+
+# 协商了二进制编码的连接加入此房间，断开时由SocketIO自动移除
+BINARY_CODEC_ROOM = 'codec:binary'
+
+SUPPORTED_CODECS = ('json', 'binary')
+
+# 事件 -> (字段列表, 小端定长布局)；version为0表示未携带版本号
+FRAME_LAYOUTS = {
+    'move_made': (('row', 'col', 'color', 'version'), struct.Struct('<BBBI')),
+    'score_update': (('position', 'score', 'version'), struct.Struct('<BII')),
+    'player_finished': (('position', 'score', 'version'), struct.Struct('<BII')),
+}
+
+
+class EventCodec:
+    """事件编码器"""
+
+    def __init__(self, socketio, namespace='/'):
+        """
+        初始化事件编码器
+
+        Args:
+            socketio: SocketIO实例
+            namespace: 命名空间
+        """
+        self.socketio = socketio
+        self.namespace = namespace
+
+    def register_events(self):
+        """注册编码协商事件"""
+
+        @self.socketio.on('set_codec')
+        def handle_set_codec(data):
+            """客户端选择事件编码"""
+            codec = data.get('codec') if isinstance(data, dict) else None
+            if codec not in SUPPORTED_CODECS:
+                codec = 'json'
+
+            if codec == 'binary':
+                join_room(BINARY_CODEC_ROOM)
+            else:
+                leave_room(BINARY_CODEC_ROOM)
+
+            emit('codec_set', {'codec': codec, 'events': list(FRAME_LAYOUTS)})
+            logger.debug("客户端 %s 使用 %s 编码", request.sid, codec)
+
+    @staticmethod
+    def can_encode(event):
+        """事件是否有二进制帧布局"""
+        return event in FRAME_LAYOUTS
+
+    @staticmethod
+    def encode(event, data):
+        """
+        将事件数据编码为二进制帧
+
+        Args:
+            event: 事件名称
+            data: 事件数据字典
+
+        Returns:
+            bytes: 定长二进制帧
+        """
+        fields, layout = FRAME_LAYOUTS[event]
+        return layout.pack(*(data.get(field) or 0 for field in fields))
+
+    @staticmethod
+    def decode(event, frame):
+        """
+        将二进制帧解码为事件数据字典
+
+        Args:
+            event: 事件名称
+            frame: 二进制帧
+
+        Returns:
+            dict: 事件数据
+        """
+        fields, layout = FRAME_LAYOUTS[event]
+        data = dict(zip(fields, layout.unpack(frame)))
+        if not data.get('version'):
+            data.pop('version', None)
+        return data
+
+    def _binary_room(self):
+        """获取二进制编码房间的成员（sid -> eio_sid）"""
+        rooms = self.socketio.server.manager.rooms.get(self.namespace, {})
+        return rooms.get(BINARY_CODEC_ROOM) or {}
+
+    def is_binary(self, sid):
+        """连接是否协商了二进制编码"""
+        return sid in self._binary_room()
+
+    def binary_recipients(self, room):
+        """
+        获取房间内协商了二进制编码的连接
+
+        Args:
+            room: 房间ID或sid
+
+        Returns:
+            list: sid列表
+        """
+        binary_room = self._binary_room()
+        if not binary_room:
+            return []
+        return [
+            sid for sid, _ in self.socketio.server.manager.get_participants(self.namespace, room)
+            if sid in binary_room
+        ]
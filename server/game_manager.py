@@ -1,12 +1,22 @@
 import uuid
 import time
+from collections import deque
 from enum import Enum
+from itertools import islice
 
+from json_codec import register_enum
+from room_state import MemoryRoomState
+
+# 每个房间保留的状态增量条数，超出后重连方需要完整快照
+DELTA_LOG_SIZE = 256
+
+@register_enum
 class RoomStatus(Enum):
     WAITING = 'waiting'
     PLAYING = 'playing'
     FINISHED = 'finished'
 
+@register_enum
 class PlayerStatus(Enum):
     CONNECTED = 'connected'
     READY = 'ready'
@@ -14,13 +24,28 @@ class PlayerStatus(Enum):
     DISCONNECTED = 'disconnected'
 
 class GameManager:
-    def __init__(self, room_timeout=1800):
+    def __init__(self, room_timeout=1800, affinity=None, state=None):
         self.rooms = {}
         self.room_timeout = room_timeout
+        self.affinity = affinity  # 集群模式下只创建归属本进程的房间ID（cluster.RoomAffinity）
+        self.state = state or MemoryRoomState()  # 房间状态后端（room_state.RoomStateBackend）
         self.player_status = {}  # {player_id: {room_id: str, status: PlayerStatus, joined_at: float}}
+        self.draining = False  # 排空模式：进程即将退出，不再处理事件（drain.DrainController）
+    
+    def restore(self):
+        """从状态后端恢复归属本进程的房间，返回恢复的房间数"""
+        rooms = self.state.load_all(self.affinity.is_local if self.affinity else None)
+        self.rooms.update(rooms)
+        return len(rooms)
+    
+    def _touch(self, room_id):
+        """更新最后活动时间并标记房间待保存"""
+        room = self.rooms[room_id]
+        room['last_activity'] = time.time()
+        self.state.mark_dirty(room_id, room)
     
     def create_room(self, game_type, initial_state):
-        room_id = str(uuid.uuid4())[:8]
+        room_id = self.affinity.new_room_id() if self.affinity else str(uuid.uuid4())[:8]
         self.rooms[room_id] = {
             'game_type': game_type,
             'players': [],
@@ -28,8 +53,11 @@ class GameManager:
             'spectators': [],
             'status': RoomStatus.WAITING,
             'created_at': time.time(),
-            'last_activity': time.time()
+            'last_activity': time.time(),
+            'version': 0,
+            'deltas': deque(maxlen=DELTA_LOG_SIZE)
         }
+        self.state.mark_dirty(room_id, self.rooms[room_id])
         return room_id
     
     def get_room(self, room_id):
@@ -58,30 +86,64 @@ class GameManager:
         if room_id in self.rooms:
             if isinstance(status, RoomStatus):
                 self.rooms[room_id]['status'] = status
-                self.rooms[room_id]['last_activity'] = time.time()
+                self._touch(room_id)
                 return True
         return False
     
     def update_room_activity(self, room_id):
         if room_id in self.rooms:
-            self.rooms[room_id]['last_activity'] = time.time()
+            self._touch(room_id)
             return True
         return False
     
     def delete_room(self, room_id):
         if room_id in self.rooms:
             del self.rooms[room_id]
+            self.state.delete(room_id)
             return True
         return False
     
+    def record_delta(self, room_id, event, data, target=None):
+        """Append a state delta to the room log and return the new room version"""
+        room = self.rooms.get(room_id)
+        if not room:
+            return None
+        
+        room['version'] += 1
+        room['deltas'].append((room['version'], event, data, target))
+        self._touch(room_id)
+        return room['version']
+    
+    def get_room_version(self, room_id):
+        """Get the current state version of a room"""
+        room = self.rooms.get(room_id)
+        return room['version'] if room else None
+    
+    def get_deltas_since(self, room_id, version):
+        """
+        Get the deltas recorded after the given version.
+        
+        Returns None when the log no longer covers the gap (or the version is
+        unknown), in which case the caller has to fall back to a snapshot.
+        """
+        room = self.rooms.get(room_id)
+        if not room or version is None or version < 0 or version > room['version']:
+            return None
+        
+        if version == room['version']:
+            return []
+        
+        deltas = room['deltas']
+        if not deltas or deltas[0][0] > version + 1:
+            return None
+        
+        return list(islice(deltas, version + 1 - deltas[0][0], None))
+    
     def cleanup_inactive_rooms(self):
-        current_time = time.time()
-        inactive_rooms = [
-            room_id for room_id, room in self.rooms.items()
-            if current_time - room['last_activity'] > self.room_timeout
-        ]
+        """移除超时的房间（判断方式由状态后端决定：最后活动时间或存储过期）"""
+        inactive_rooms = self.state.expire(self.rooms, self.room_timeout)
         for room_id in inactive_rooms:
-            del self.rooms[room_id]
+            self.rooms.pop(room_id, None)
         return inactive_rooms
     
     def add_player(self, room_id, player_id):
@@ -119,6 +181,34 @@ class GameManager:
             return True
         return False
     
+    def reclaim_seat(self, room_id, token, player_id):
+        """
+        Take over a seat handed off by a draining process.
+        
+        The token issued for the seat is consumed, the old connection id is
+        replaced by the new one in place, so the player keeps their position.
+        Returns the seat index, or -1 when the token does not match.
+        """
+        room = self.rooms.get(room_id)
+        tokens = room.get('seat_tokens') if room else None
+        if not tokens or not isinstance(token, str) or token not in tokens:
+            return -1
+        
+        seat = tokens.index(token)
+        tokens[seat] = None
+        if not any(tokens):
+            del room['seat_tokens']
+        old_id = room['players'][seat]
+        room['players'][seat] = player_id
+        self.player_status.pop(old_id, None)
+        self.player_status[player_id] = {
+            'room_id': room_id,
+            'status': PlayerStatus.CONNECTED,
+            'joined_at': time.time()
+        }
+        self.update_room_activity(room_id)
+        return seat
+    
     def kick_player(self, room_id, player_id):
         """Kick a player from a room (explicit removal)"""
         if room_id not in self.rooms:
@@ -161,6 +251,13 @@ class GameManager:
             return player_id in self.rooms[room_id]['players']
         return False
     
+    def get_client_game(self, client_id):
+        """Get the game type of the first room a client plays or spectates in"""
+        for room in self.rooms.values():
+            if client_id in room['players'] or client_id in room['spectators']:
+                return room['game_type']
+        return None
+    
     def add_spectator(self, room_id, spectator_id):
         """Add a spectator to a room, preventing duplicates"""
         if room_id not in self.rooms:
@@ -0,0 +1,203 @@
+"""
+游戏注册表
+
+启动时发现包含 game.json 的游戏目录，按 GAME_PLUGIN_SPEC.md 校验配置，
+并生成一份带ETag的游戏清单供主页一次性获取。
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from asset_pipeline import Asset, asset_response, discover_game_dirs
+
+logger = logging.getLogger(__name__)
+
+# 游戏ID：小写字母、数字和连字符
+GAME_ID_PATTERN = re.compile(r'^[a-z0-9]+(?:-[a-z0-9]+)*$')
+
+# 服务端插件：模块路径:类名
+PLUGIN_SPEC_PATTERN = re.compile(r'^[A-Za-z_][\w.]*:[A-Za-z_]\w*$')
+
+REQUIRED_FIELDS = ('name', 'id', 'entry')
+OPTIONAL_STRING_FIELDS = ('icon', 'description', 'version', 'author')
+
+# 规范要求的目录文件（缺失时仅警告）
+EXPECTED_FILES = ('index.html', 'game.js', 'style.css')
+
+# 清单中对外公开的字段
+MANIFEST_FIELDS = ('name', 'id', 'icon', 'description', 'entry', 'version', 'author')
+
+
+def validate_game_config(config, directory, game_path):
+    """
+    按插件规范校验 game.json
+
+    Args:
+        config: 解析后的配置
+        directory: 游戏目录名
+        game_path: 游戏目录绝对路径
+
+    Returns:
+        list: 错误信息列表，为空表示通过
+    """
+    if not isinstance(config, dict):
+        return ['game.json 必须是JSON对象']
+
+    errors = []
+    for field in REQUIRED_FIELDS:
+        value = config.get(field)
+        if not isinstance(value, str) or not value.strip():
+            errors.append(f'缺少必需字段: {field}')
+
+    for field in OPTIONAL_STRING_FIELDS:
+        if field in config and not isinstance(config[field], str):
+            errors.append(f'字段类型错误: {field} 必须是字符串')
+
+    game_id = config.get('id')
+    if isinstance(game_id, str) and game_id:
+        if not GAME_ID_PATTERN.match(game_id):
+            errors.append(f'无效的游戏ID: {game_id}')
+        elif game_id != directory:
+            errors.append(f'游戏ID {game_id} 与目录名 {directory} 不一致')
+
+    entry = config.get('entry')
+    if isinstance(entry, str) and entry:
+        entry_path = os.path.normpath(os.path.join(game_path, entry))
+        if not entry_path.startswith(game_path + os.sep) or not os.path.isfile(entry_path):
+            errors.append(f'入口文件不存在: {entry}')
+
+    server = config.get('server')
+    if server is not None:
+        if not isinstance(server, dict):
+            errors.append('server 必须是JSON对象')
+        else:
+            if 'enabled' in server and not isinstance(server['enabled'], bool):
+                errors.append('server.enabled 必须是布尔值')
+            if 'file' in server and not isinstance(server['file'], str):
+                errors.append('server.file 必须是字符串')
+            plugin = server.get('plugin')
+            if plugin is not None and (not isinstance(plugin, str) or not PLUGIN_SPEC_PATTERN.match(plugin)):
+                errors.append(f'无效的server.plugin: {plugin}（格式为 模块:类名）')
+            events = server.get('events')
+            if events is not None and (not isinstance(events, list)
+                                       or not all(isinstance(e, str) and e for e in events)):
+                errors.append('server.events 必须是事件名列表')
+            if 'preload' in server and not isinstance(server['preload'], bool):
+                errors.append('server.preload 必须是布尔值')
+            port = server.get('port')
+            if port is not None and (isinstance(port, bool) or not isinstance(port, int) or not 1 <= port <= 65535):
+                errors.append(f'无效的server.port: {port}')
+
+    return errors
+
+
+class GameRegistry:
+    """游戏注册表"""
+
+    def __init__(self, root, auto_reload=False):
+        """
+        初始化游戏注册表
+
+        Args:
+            root: 项目根目录
+            auto_reload: game.json 变化时自动重新加载（开发模式使用）
+        """
+        self.root = os.path.abspath(root)
+        self.auto_reload = auto_reload
+        self.games = {}   # {game_id: 完整配置（含 directory）}
+        self.errors = {}  # {目录名: [错误信息]}
+        self.manifest = None  # 清单Asset
+        self._mtimes = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        发现、校验游戏目录并生成清单
+
+        Returns:
+            GameRegistry: self，便于链式调用
+        """
+        games = {}
+        errors = {}
+        mtimes = {}
+        for directory in discover_game_dirs(self.root):
+            game_path = os.path.join(self.root, directory)
+            config_path = os.path.join(game_path, 'game.json')
+            try:
+                mtimes[directory] = os.path.getmtime(config_path)
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+            except (OSError, ValueError) as e:
+                errors[directory] = [f'读取 game.json 失败: {e}']
+                continue
+
+            problems = validate_game_config(config, directory, game_path)
+            if problems:
+                errors[directory] = problems
+                continue
+
+            missing = [name for name in EXPECTED_FILES if not os.path.isfile(os.path.join(game_path, name))]
+            if missing:
+                logger.warning(f"游戏 {directory} 缺少规范建议的文件: {missing}")
+
+            games[config['id']] = dict(config, directory=directory)
+
+        for directory, problems in errors.items():
+            logger.error(f"游戏 {directory} 配置无效，已跳过: {'; '.join(problems)}")
+
+        manifest = {
+            'games': [
+                dict({field: game[field] for field in MANIFEST_FIELDS if field in game},
+                     directory=game['directory'])
+                for game in games.values()
+            ]
+        }
+        body = json.dumps(manifest, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        with self._lock:
+            self.games = games
+            self.errors = errors
+            self.manifest = Asset('api/games.json', None, body)
+            self._mtimes = mtimes
+
+        logger.info(f"游戏注册表加载完成: {list(games)}")
+        return self
+
+    def _reload_if_changed(self):
+        """开发模式下 game.json 变化时重新加载"""
+        mtimes = {}
+        for directory in discover_game_dirs(self.root):
+            try:
+                mtimes[directory] = os.path.getmtime(os.path.join(self.root, directory, 'game.json'))
+            except OSError:
+                pass
+        if mtimes != self._mtimes:
+            self.load()
+
+    def get(self, game_id):
+        """
+        获取游戏配置
+
+        Args:
+            game_id: 游戏ID
+
+        Returns:
+            dict: 游戏配置，不存在返回None
+        """
+        return self.games.get(game_id)
+
+    def respond(self, headers):
+        """
+        生成清单响应（支持压缩协商和304）
+
+        Args:
+            headers: 请求头
+
+        Returns:
+            Response: 清单响应
+        """
+        if self.auto_reload:
+            self._reload_if_changed()
+        return asset_response(self.manifest, headers)
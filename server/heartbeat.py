@@ -4,11 +4,117 @@ WebSocket心跳检测服务端模块
 """
 
 import logging
+import math
+import threading
 import time
 from flask_socketio import emit
 
 logger = logging.getLogger(__name__)
 
+
+class TimingWheel:
+    """
+    分层时间轮
+    
+    刷新和移除均为O(1)，推进时只处理到期的槽位，开销与到期数量成正比。
+    第L层每个槽位覆盖 tick * wheel_size**L 秒，高层槽位在轮到时下沉到低层。
+    """
+    
+    def __init__(self, tick=1.0, wheel_size=64, levels=2, now=None):
+        """
+        初始化时间轮
+        
+        Args:
+            tick: 最小时间刻度（秒）
+            wheel_size: 每层槽位数
+            levels: 层数，可覆盖 tick * wheel_size**levels 秒内的到期时间
+            now: 起始时间（默认当前时间）
+        """
+        self.tick = tick
+        self.wheel_size = wheel_size
+        self.levels = levels
+        self._wheels = [[set() for _ in range(wheel_size)] for _ in range(levels)]
+        self._entries = {}  # {key: (deadline_tick, level, slot)}
+        self._current = int((time.time() if now is None else now) / tick)
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __contains__(self, key):
+        return key in self._entries
+    
+    def _place(self, key, deadline_tick):
+        """将条目放入对应层级的槽位"""
+        delta = deadline_tick - self._current
+        for level in range(self.levels):
+            span = self.wheel_size ** (level + 1)
+            if delta < span or level == self.levels - 1:
+                # 超出最高层范围的条目先放在最高层最远的槽位，下沉时重新放置
+                target = min(deadline_tick, self._current + span - 1)
+                slot = (target // self.wheel_size ** level) % self.wheel_size
+                self._wheels[level][slot].add(key)
+                self._entries[key] = (deadline_tick, level, slot)
+                return
+    
+    def schedule(self, key, deadline):
+        """
+        设置（或刷新）条目的到期时间
+        
+        Args:
+            key: 条目标识
+            deadline: 到期时间戳（秒）
+        """
+        self.remove(key)
+        self._place(key, max(math.ceil(deadline / self.tick), self._current + 1))
+    
+    def remove(self, key):
+        """移除条目"""
+        entry = self._entries.pop(key, None)
+        if entry:
+            _, level, slot = entry
+            self._wheels[level][slot].discard(key)
+    
+    def _cascade(self, level):
+        """将高层当前槽位的条目重新放置到低层"""
+        slot = (self._current // self.wheel_size ** level) % self.wheel_size
+        bucket = self._wheels[level][slot]
+        self._wheels[level][slot] = set()
+        for key in bucket:
+            deadline_tick = self._entries.pop(key)[0]
+            self._place(key, deadline_tick)
+    
+    def advance(self, now=None):
+        """
+        推进时间轮到指定时间
+        
+        Args:
+            now: 当前时间戳（默认当前时间）
+        
+        Returns:
+            list: 已到期并被移除的条目
+        """
+        target = int((time.time() if now is None else now) / self.tick)
+        expired = []
+        while self._current < target:
+            self._current += 1
+            # 高层先下沉，保证本刻度到期的条目都已落到第0层
+            for level in range(self.levels - 1, 0, -1):
+                if self._current % self.wheel_size ** level == 0:
+                    self._cascade(level)
+            
+            slot = self._current % self.wheel_size
+            bucket = self._wheels[0][slot]
+            if not bucket:
+                continue
+            self._wheels[0][slot] = set()
+            for key in bucket:
+                deadline_tick = self._entries.pop(key)[0]
+                if deadline_tick <= self._current:
+                    expired.append(key)
+                else:
+                    self._place(key, deadline_tick)
+        return expired
+
 class HeartbeatHandler:
     """心跳处理器"""
     
@@ -23,6 +129,21 @@ class HeartbeatHandler:
         self.socketio = socketio
         self.timeout = timeout
         self.client_heartbeats = {}  # {sid: last_heartbeat_time}
+        self._wheel = TimingWheel(tick=1.0)
+        self._lock = threading.Lock()
+        self._reaper_started = False
+    
+    def touch(self, sid):
+        """
+        刷新客户端存活时间（O(1)）
+        
+        Args:
+            sid: 客户端Socket ID
+        """
+        now = time.time()
+        with self._lock:
+            self.client_heartbeats[sid] = now
+            self._wheel.schedule(sid, now + self.timeout)
         
     def register_events(self):
         """注册心跳相关事件"""
@@ -34,7 +155,7 @@ class HeartbeatHandler:
             sid = request.sid
             
             # 记录心跳时间
-            self.client_heartbeats[sid] = time.time()
+            self.touch(sid)
             
             # 响应心跳
             emit('pong', {
@@ -42,42 +163,97 @@ class HeartbeatHandler:
                 'server_time': int(time.time() * 1000)
             })
             
-            logger.debug(f"收到客户端 {sid} 心跳")
+            logger.debug("收到客户端 %s 心跳", sid)
         
         @self.socketio.on('connect')
         def handle_connect():
             """客户端连接时初始化心跳"""
             from flask import request
             sid = request.sid
-            self.client_heartbeats[sid] = time.time()
-            logger.info(f"客户端 {sid} 已连接，初始化心跳")
+            self.touch(sid)
+            logger.info("客户端 %s 已连接，初始化心跳", sid)
         
         @self.socketio.on('disconnect')
         def handle_disconnect():
             """客户端断开时清理心跳记录"""
             from flask import request
             sid = request.sid
-            if sid in self.client_heartbeats:
-                del self.client_heartbeats[sid]
-            logger.info(f"客户端 {sid} 已断开，清理心跳记录")
+            self.remove_client(sid)
+            logger.info("客户端 %s 已断开，清理心跳记录", sid)
     
-    def check_timeouts(self):
+    def check_timeouts(self, now=None):
         """
-        检查超时的客户端连接
+        推进时间轮并取出新超时的客户端连接
+        
+        每个超时的客户端只返回一次，开销与超时数量成正比。
+        
+        Args:
+            now: 当前时间戳（默认当前时间）
         
         Returns:
             list: 超时的客户端SID列表
         """
-        current_time = time.time()
-        timeout_clients = []
+        with self._lock:
+            timeout_clients = self._wheel.advance(now)
         
-        for sid, last_heartbeat in list(self.client_heartbeats.items()):
-            if current_time - last_heartbeat > self.timeout:
-                timeout_clients.append(sid)
-                logger.warning(f"客户端 {sid} 心跳超时")
+        for sid in timeout_clients:
+            logger.warning("客户端 %s 心跳超时", sid)
         
         return timeout_clients
     
+    def reap(self, on_timeout=None, now=None):
+        """
+        断开超时客户端
+        
+        先调用 on_timeout 按客户端断开处理（由游戏插件通知房间并清理房间和观战列表），
+        再断开连接。异步服务器模式下断开连接只是排入发送队列，不能依赖它触发的断开事件清理房间。
+        
+        Args:
+            on_timeout: 超时客户端的断开处理函数 on_timeout(sid)（可选，例如 PluginLoader.disconnect_client）
+            now: 当前时间戳（默认当前时间）
+        
+        Returns:
+            list: 被回收的客户端SID列表
+        """
+        timeout_clients = self.check_timeouts(now)
+        for sid in timeout_clients:
+            if on_timeout:
+                try:
+                    on_timeout(sid)
+                except Exception as e:
+                    logger.error("清理超时客户端 %s 所在房间失败: %s", sid, e)
+            
+            try:
+                self.socketio.server.disconnect(sid)
+            except Exception as e:
+                logger.error("断开超时客户端 %s 失败: %s", sid, e)
+            
+            self.remove_client(sid)
+        return timeout_clients
+    
+    def start_reaper(self, on_timeout=None, interval=1.0):
+        """
+        启动后台回收任务
+        
+        Args:
+            on_timeout: 超时客户端的断开处理函数（可选，见 reap）
+            interval: 回收间隔（秒）
+        """
+        if self._reaper_started:
+            return
+        self._reaper_started = True
+        
+        def reaper_loop():
+            while True:
+                self.socketio.sleep(interval)
+                try:
+                    self.reap(on_timeout)
+                except Exception as e:
+                    logger.error(f"心跳回收任务出错: {e}")
+        
+        self.socketio.start_background_task(reaper_loop)
+        logger.info(f"心跳回收任务已启动（每{interval}秒执行一次）")
+    
     def remove_client(self, sid):
         """
         移除客户端心跳记录
@@ -85,8 +261,9 @@ class HeartbeatHandler:
         Args:
             sid: 客户端Socket ID
         """
-        if sid in self.client_heartbeats:
-            del self.client_heartbeats[sid]
+        with self._lock:
+            self.client_heartbeats.pop(sid, None)
+            self._wheel.remove(sid)
     
     def get_client_status(self, sid):
         """
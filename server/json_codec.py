@@ -0,0 +1,122 @@
+"""
+带类型标记的JSON编码
+
+共享存储（KVRoomState 的房间哈希）和集群消息队列中的数据用JSON编码，
+不使用 pickle：能写入存储或消息代理的一方不能借此在工作进程中执行代码。
+
+JSON无法直接表示的值编码为带 "__t" 标记的对象，解码时还原：
+- tuple、set/frozenset、deque（保留 maxlen）、bytes（base64）
+- 键不全是字符串（或含有 "__t" 键）的字典，按键值对列表编码
+- 登记过的枚举（register_enum），按类名和值编码；未登记的类型编码时抛出 TypeError，
+  解码时遇到未知标记抛出 ValueError，不会导入或构造任意类型
+"""
+
+import base64
+import json
+from collections import deque
+from enum import Enum
+
+TAG = '__t'
+
+# 类名 -> 可解码的枚举类型
+ENUMS = {}
+
+
+def register_enum(cls):
+    """登记可编码的枚举类型（可用作类装饰器）"""
+    ENUMS[cls.__name__] = cls
+    return cls
+
+
+# 原样写入JSON的类型（按确切类型判断，子类和枚举走完整的转换）
+_SCALARS = frozenset({str, int, float, bool, type(None)})
+
+
+def _to_json(value):
+    """转换为JSON可表示的结构"""
+    # 房间数据以普通列表、字典和标量为主，先按确切类型处理，标量元素不再递归
+    cls = type(value)
+    if cls in _SCALARS:
+        return value
+    if cls is list:
+        return [item if type(item) in _SCALARS else _to_json(item) for item in value]
+    if cls is dict and TAG not in value:
+        result = {}
+        for key, item in value.items():
+            if type(key) is not str:
+                break
+            result[key] = item if type(item) in _SCALARS else _to_json(item)
+        else:
+            return result
+    if cls is tuple:
+        return {TAG: 'tuple', 'v': [item if type(item) in _SCALARS else _to_json(item) for item in value]}
+    if isinstance(value, Enum):
+        return _enum_to_json(value)
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, list):
+        return [_to_json(item) for item in value]
+    if isinstance(value, dict):
+        if TAG not in value and all(type(key) is str for key in value):
+            return {key: _to_json(item) for key, item in value.items()}
+        return {TAG: 'dict', 'v': [[_to_json(key), _to_json(item)] for key, item in value.items()]}
+    if isinstance(value, tuple):
+        return {TAG: 'tuple', 'v': [_to_json(item) for item in value]}
+    if isinstance(value, deque):
+        return {TAG: 'deque', 'v': [_to_json(item) for item in value], 'maxlen': value.maxlen}
+    if isinstance(value, (set, frozenset)):
+        return {TAG: 'set', 'v': [_to_json(item) for item in value]}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {TAG: 'bytes', 'v': base64.b64encode(bytes(value)).decode('ascii')}
+    raise TypeError(f'无法编码的类型: {type(value).__name__}')
+
+
+def _enum_to_json(value):
+    cls = type(value)
+    if ENUMS.get(cls.__name__) is not cls:
+        raise TypeError(f'枚举类型未登记: {cls.__name__}')
+    return {TAG: 'enum', 'type': cls.__name__, 'v': _to_json(value.value)}
+
+
+def _from_json(obj):
+    """json.loads 的 object_hook：还原带标记的对象"""
+    tag = obj.get(TAG)
+    if tag is None:
+        return obj
+    items = obj.get('v')
+    if tag == 'tuple':
+        return tuple(items)
+    if tag == 'dict':
+        return {key: item for key, item in items}
+    if tag == 'deque':
+        return deque(items, obj.get('maxlen'))
+    if tag == 'set':
+        return set(items)
+    if tag == 'bytes':
+        return base64.b64decode(items)
+    if tag == 'enum' and obj.get('type') in ENUMS:
+        return ENUMS[obj['type']](items)
+    raise ValueError(f'未知的类型标记: {tag} {obj.get("type", "")}'.rstrip())
+
+
+def dumps(value):
+    """
+    编码为JSON字节串
+
+    Raises:
+        TypeError: 包含无法编码的值
+    """
+    # _to_json 的结果是新构造的树，不需要循环引用检查
+    return json.dumps(_to_json(value), ensure_ascii=False, check_circular=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """
+    解码 dumps 的结果
+
+    Raises:
+        ValueError: 不是有效的JSON或包含未知的类型标记
+        TypeError: 标记对象的内容无效（例如不可哈希的字典键）
+    """
+    return json.loads(data, object_hook=_from_json)
@@ -0,0 +1,267 @@
+"""
+日志配置
+
+热点路径（每个事件都会执行的代码）上的日志按以下方式处理：
+- 延迟格式化：使用 logger.info("... %s", 参数) 而不是 f-string，级别未开启时不格式化，
+  消息模板同时作为限流的键
+- 后台写入：根记录器只挂一个队列处理器，格式化和写入（终端/文件I/O）在后台线程中分批进行，
+  队列满时丢弃并计数，不阻塞事件处理
+- 按消息限流：同一消息模板在时间窗口内超过限额后只保留每 N 条中的一条（ERROR 及以上不限流），
+  窗口结束后的下一条记录携带被抑制的条数
+- 结构化输出：LOG_FORMAT=json 时每条记录输出一行JSON，extra 传入的字段作为顶层字段
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# LogRecord 自带的属性（其余属性来自 extra，JSON 输出时作为顶层字段）
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出一行JSON"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    按消息键限流
+
+    键为（记录器名, 消息模板），也可以通过 extra={'log_key': ...} 指定。
+    每个键在 interval 秒内最多通过 rate 条，之后每 sample_every 条通过一条（0表示全部丢弃）。
+    """
+
+    def __init__(self, rate=20, interval=10.0, sample_every=100, min_level=logging.ERROR, max_keys=4096):
+        """
+        Args:
+            rate: 每个窗口每个键放行的条数
+            interval: 窗口长度（秒）
+            sample_every: 超出限额后的采样间隔，0表示丢弃
+            min_level: 不限流的最低级别
+            max_keys: 跟踪的键数上限（超出时淘汰最久未出现的键）
+        """
+        super().__init__()
+        self.rate = rate
+        self.interval = interval
+        self.sample_every = sample_every
+        self.min_level = min_level
+        self.max_keys = max_keys
+        self.suppressed_total = 0
+        self._windows = OrderedDict()  # {键: [窗口开始时间, 窗口内条数, 未输出的抑制条数]}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= self.min_level:
+            return True
+        key = getattr(record, 'log_key', None) or (record.name, record.msg)
+        now = record.created
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = [now, 0, 0]
+                if len(self._windows) > self.max_keys:
+                    self._windows.popitem(last=False)
+            else:
+                self._windows.move_to_end(key)
+                if now - window[0] >= self.interval:
+                    window[0], window[1] = now, 0
+            window[1] += 1
+            count = window[1]
+            if count > self.rate and not (self.sample_every and (count - self.rate) % self.sample_every == 0):
+                window[2] += 1
+                self.suppressed_total += 1
+                return False
+            suppressed, window[2] = window[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    不阻塞的队列处理器
+
+    标准库的 QueueHandler 在入队前格式化消息（为了可以跨进程传递），这里的队列只在进程内使用，
+    记录原样入队，由后台线程格式化。参数在写入时才转换为字符串，应传入不会再修改的值。
+    """
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        if record.exc_info and not record.exc_text:
+            # 异常的调用栈在后台线程格式化时可能已经变化
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SuppressedCountFormatter(logging.Formatter):
+    """文本格式：限流后的首条记录附加被抑制的条数"""
+
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        return f'{text} (此前 {suppressed} 条相同日志被抑制)' if suppressed else text
+
+
+class BatchWriter:
+    """
+    后台写入线程
+
+    取出队列中已有的全部记录，格式化后一次写入并刷新，然后等待 interval 秒再取下一批。
+    与 logging.handlers.QueueListener（每条记录唤醒一次线程、写入并刷新一次）相比，
+    事件密集时后台线程的唤醒次数和系统调用少得多，与处理事件的线程争用GIL也少。
+    """
+
+    _STOP = object()
+
+    def __init__(self, q, stream, formatter, interval=0.05, batch_size=1000):
+        """
+        Args:
+            q: 记录队列
+            stream: 输出流
+            formatter: 格式化器
+            interval: 两批之间的等待时间（秒）
+            batch_size: 每批最多写入的记录数
+        """
+        self.queue = q
+        self.stream = stream
+        self.formatter = formatter
+        self.interval = interval
+        self.batch_size = batch_size
+        self.written = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """写完队列中的记录并停止线程"""
+        if self._thread is None:
+            return
+        self.queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for record in batch:
+                if record is self._STOP:
+                    stopping = True
+                    continue
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception:
+                    # 参数无法格式化时只输出模板，不影响同一批的其他记录
+                    lines.append(f'{record.levelname} {record.name} 日志格式化失败: {record.msg!r}')
+            if lines:
+                self._write('\n'.join(lines) + '\n')
+                self.written += len(lines)
+            if not stopping and self.interval:
+                time.sleep(self.interval)
+
+    def _write(self, text):
+        try:
+            self.stream.write(text)
+            self.stream.flush()
+        except (OSError, ValueError):
+            pass
+
+
+class LoggingSetup:
+    """已安装的日志配置（队列处理器、后台写入线程和限流过滤器）"""
+
+    def __init__(self, handler, writer, rate_filter):
+        self.handler = handler
+        self.writer = writer
+        self.rate_filter = rate_filter
+
+    def get_stats(self):
+        return {
+            'queued': self.handler.queue.qsize(),
+            'written': self.writer.written,
+            'dropped': self.handler.dropped,
+            'suppressed': self.rate_filter.suppressed_total if self.rate_filter else 0,
+        }
+
+    def stop(self):
+        """写完队列中的记录并停止后台线程"""
+        self.writer.stop()
+
+
+def setup_logging(level='INFO', fmt='text', rate=20, interval=10.0, sample_every=100,
+                  queue_size=10000, stream=None):
+    """
+    配置根记录器（替换已有的处理器）
+
+    Args:
+        level: 日志级别
+        fmt: text 或 json
+        rate: 每个消息键每个窗口放行的条数，0表示不限流
+        interval: 限流窗口（秒）
+        sample_every: 超出限额后的采样间隔，0表示丢弃
+        queue_size: 队列长度，写入跟不上时丢弃新记录
+        stream: 输出流（默认标准错误）
+
+    Returns:
+        LoggingSetup: 已安装的配置（退出时自动停止后台线程）
+    """
+    handler = QueueHandler(queue.Queue(queue_size))
+    rate_filter = RateLimitFilter(rate, interval, sample_every) if rate else None
+    if rate_filter:
+        handler.addFilter(rate_filter)
+    formatter = JsonFormatter() if fmt == 'json' else SuppressedCountFormatter(TEXT_FORMAT)
+    writer = BatchWriter(handler.queue, stream or sys.stderr, formatter)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    writer.start()
+
+    installed = LoggingSetup(handler, writer, rate_filter)
+    atexit.register(installed.stop)
+    return installed
@@ -2,10 +2,24 @@ from app import create_app
 from database import Database
 from game_manager import GameManager
 from barrage_manager import BarrageManager
+from event_codec import EventCodec
 from config import Config
-from plugins.gomoku import GomokuPlugin
-from plugins.landlord import LandlordPlugin
-from plugins.racing import RacingPlugin
+from plugin_loader import PluginLoader
+from migrations import MigrationRunner, PartitionManager
+from sqlite_storage import SQLiteBackend
+from statements import STATEMENTS
+from profiler import SAMPLER, SLOW_EVENTS
+from logging_setup import setup_logging
+from metrics import (METRICS, game_manager_collector, heartbeat_collector, storage_collector,
+                     statements_collector, barrage_collector, logging_collector)
+from replay import ReplayStore, ReplayScheduler, ReplayHandler
+from cluster import ClusterManager, RoomAffinity, create_pubsub
+from room_state import create_room_state
+from drain import DrainController
+from resp import RespError
+from storage import ExecutorBackend
+from asgi_server import serve
+import atexit
 import logging
 import sys
 from flask_socketio import SocketIO
@@ -25,6 +39,105 @@ def cleanup_task(game_manager, interval=300):
         except Exception as e:
             logger.error(f"清理房间时出错: {e}")
 
+def partition_task(partition_manager, retention_months, interval=86400):
+    """每天维护游戏记录分区（创建未来月份分区、删除过期分区）的后台任务"""
+    while True:
+        time.sleep(interval)
+        try:
+            partition_manager.maintain(retention_months)
+        except Exception as e:
+            logger.error(f"维护游戏记录分区时出错: {e}")
+
+def init_mysql():
+    """连接MySQL、执行迁移并启动分区维护，不可用时返回None"""
+    db = None
+    try:
+        db = Database(
+            Config.MYSQL_CONFIG,
+            pool_size=5,
+            max_overflow=10,
+            pool_timeout=30,
+            health_check_interval=60
+        )
+        # 执行初始健康检查
+        if db.health_check():
+            logger.info("数据库连接成功，连接池已就绪")
+            stats = db.get_pool_stats()
+            logger.info(f"连接池状态: {stats}")
+            
+            # 表结构迁移（版本一致时只执行一次查询）
+            try:
+                MigrationRunner(db).migrate()
+            except Exception as e:
+                logger.error(f"数据库迁移失败，将以降级模式运行: {e}")
+                db = None
+        
+            # 分区维护失败不影响读写，下次定时任务重试
+            if db:
+                partition_manager = PartitionManager(db)
+                try:
+                    partition_manager.maintain(Config.RECORD_RETENTION_MONTHS)
+                except Exception as e:
+                    logger.error(f"游戏记录分区维护失败: {e}")
+                threading.Thread(
+                    target=partition_task,
+                    args=(partition_manager, Config.RECORD_RETENTION_MONTHS),
+                    daemon=True
+                ).start()
+        else:
+            logger.warning("数据库健康检查失败，将以降级模式运行")
+            db = None
+    except Exception as e:
+        logger.warning(f'数据库连接失败，跳过数据库功能: {e}')
+        db = None
+    return db
+
+def init_sqlite():
+    """打开本地SQLite存储，失败时返回None"""
+    try:
+        storage = SQLiteBackend(Config.SQLITE_PATH)
+        storage.migrate()
+        atexit.register(storage.close)
+        return storage
+    except Exception as e:
+        logger.error(f"SQLite存储初始化失败，将以降级模式运行: {e}")
+        return None
+
+def init_storage():
+    """按 STORAGE_BACKEND 选择存储后端"""
+    if Config.STORAGE_BACKEND == 'sqlite':
+        return init_sqlite()
+    db = init_mysql()
+    if db is None and Config.STORAGE_BACKEND == 'auto':
+        logger.info("MySQL不可用，使用本地SQLite存储游戏记录")
+        db = init_sqlite()
+    return db
+
+def init_cluster():
+    """多进程模式下创建集群客户端管理器，单进程返回None"""
+    if Config.WORKERS <= 1:
+        return None
+    affinity = RoomAffinity(Config.WORKER_ID, Config.WORKERS)
+    return ClusterManager(create_pubsub(Config.PUBSUB_URL), affinity)
+
+def init_game_manager(cluster):
+    """创建游戏管理器并从房间状态后端恢复房间，后端不可用时只使用内存"""
+    room_timeout = 1800
+    affinity = cluster.affinity if cluster else None
+    state = create_room_state(Config.ROOM_STATE_URL, ttl=room_timeout,
+                              flush_interval=Config.ROOM_STATE_FLUSH_MS / 1000)
+    game_manager = GameManager(room_timeout, affinity, state)
+    try:
+        restored = game_manager.restore()
+    except (OSError, ConnectionError, RespError) as e:
+        logger.error(f"房间状态后端不可用，房间只保存在内存中: {e}")
+        state.close()
+        return GameManager(room_timeout, affinity)
+    if restored:
+        logger.info(f"从房间状态后端恢复了 {restored} 个房间")
+    atexit.register(state.close)
+    return game_manager
+
 def main():
     """主函数：初始化并启动应用"""
     
@@ -33,20 +146,35 @@ def main():
         logger.error("配置验证失败，退出")
         sys.exit(1)
     
+    # 日志由后台线程写入，按消息模板限流
+    log_setup = setup_logging(
+        Config.LOG_LEVEL, Config.LOG_FORMAT, Config.LOG_RATE_LIMIT, Config.LOG_RATE_INTERVAL,
+        Config.LOG_SAMPLE_EVERY, Config.LOG_QUEUE_SIZE
+    )
+    
     # 记录配置
     Config.log_config()
     
-    # 创建Flask应用
-    app, socketio, heartbeat_handler = create_app(Config)
+    # 集群模式：跨进程发送经消息队列，房间只在归属的工作进程中创建
+    cluster = init_cluster()
+    
+    # 创建Flask应用（异步服务器模式下 socketio 为 AsyncSocketIO）
+    asgi = Config.SERVER_MODE == 'asgi'
+    app, socketio, heartbeat_handler = create_app(Config, client_manager=cluster, asgi=asgi)
     
     # 初始化游戏管理器
-    game_manager = GameManager()
+    game_manager = init_game_manager(cluster)
     logger.info("游戏管理器初始化完成")
     
     # 初始化弹幕管理器
     barrage_manager = BarrageManager(rate_limit=3, time_window=10)
     logger.info("弹幕管理器初始化完成")
     
+    # 初始化紧凑事件编码（客户端按连接协商）
+    event_codec = EventCodec(socketio)
+    event_codec.register_events()
+    logger.info("事件编码协商已启用")
+    
     # 启动清理任务
     cleanup_thread = threading.Thread(
         target=cleanup_task,
@@ -56,56 +184,72 @@ def main():
     cleanup_thread.start()
     logger.info("房间清理任务已启动（每5分钟执行一次）")
     
-    # 初始化数据库（可选）
-    db = None
-    try:
-        db = Database(
-            Config.MYSQL_CONFIG,
-            pool_size=5,
-            max_overflow=10,
-            pool_timeout=30,
-            health_check_interval=60
-        )
-        # 执行初始健康检查
-        if db.health_check():
-            logger.info("数据库连接成功，连接池已就绪")
-            stats = db.get_pool_stats()
-            logger.info(f"连接池状态: {stats}")
-        else:
-            logger.warning("数据库健康检查失败，将以降级模式运行")
-            db = None
-    except Exception as e:
-        logger.warning(f'数据库连接失败，跳过数据库功能: {e}')
-        db = None
+    # 初始化存储后端（可选）
+    STATEMENTS.slow_threshold = Config.SLOW_QUERY_MS / 1000
+    db = init_storage()
+    if asgi and db is not None:
+        # 异步服务器模式：数据库调用在有界线程池中执行，不阻塞事件循环
+        db = ExecutorBackend(db, Config.DB_EXECUTOR_WORKERS, Config.DB_EXECUTOR_MAX_PENDING)
     
-    # 加载游戏插件
-    plugins = []
-    try:
-        plugins.append(GomokuPlugin(app, socketio, db, game_manager, barrage_manager))
-        logger.info("五子棋插件加载成功")
-    except Exception as e:
-        logger.error(f"五子棋插件加载失败: {e}")
-    
-    try:
-        plugins.append(LandlordPlugin(app, socketio, db, game_manager, barrage_manager))
-        logger.info("斗地主插件加载成功")
-    except Exception as e:
-        logger.error(f"斗地主插件加载失败: {e}")
+    # 对局回放：按ID读取记录，由一个后台任务按倍速推送走法
+    replay_scheduler = ReplayScheduler(socketio)
+    replay_handler = ReplayHandler(
+        socketio, ReplayStore(db, cache_size=Config.REPLAY_CACHE_SIZE), replay_scheduler,
+        move_interval=Config.REPLAY_MOVE_INTERVAL_MS / 1000
+    )
+    replay_handler.register_events()
+    replay_scheduler.start()
     
-    try:
-        plugins.append(RacingPlugin(app, socketio, db, game_manager, barrage_manager))
-        logger.info("极速狂飙插件加载成功")
-    except Exception as e:
-        logger.error(f"极速狂飙插件加载失败: {e}")
+    # 停机交接：恢复上一个进程排空时写入的房间快照，SIGTERM 时排空并写入快照
+    snapshot_path = Config.DRAIN_SNAPSHOT_PATH
+    if Config.WORKERS > 1:
+        snapshot_path = f'{snapshot_path}.{Config.WORKER_ID}'
+    drain_controller = DrainController(
+        socketio, game_manager, barrage_manager, db, snapshot_path, grace=Config.DRAIN_GRACE_MS / 1000
+    )
+    drain_controller.restore()
+    if not asgi:
+        drain_controller.install()
     
-    if not plugins:
-        logger.error("没有成功加载任何游戏插件，退出")
+    # 登记游戏插件（按 game.json 的 server 配置，首次使用时才导入）
+    plugin_loader = PluginLoader(
+        app.extensions['game_registry'], app, socketio, db, game_manager,
+        barrage_manager, event_codec, heartbeat_handler,
+        default_game=Config.DEFAULT_GAME, cluster=cluster
+    )
+    if not plugin_loader.specs:
+        logger.error("没有找到任何启用的游戏插件，退出")
         sys.exit(1)
     
-    logger.info(f"成功加载 {len(plugins)} 个游戏插件")
+    plugin_loader.register_events()
+    plugin_loader.preload()
+    
+    # 启动心跳回收任务：超时连接按客户端断开处理（通知房间并清理），然后断开
+    heartbeat_handler.start_reaper(plugin_loader.disconnect_client)
+    logger.info(f"游戏插件状态: {plugin_loader.get_stats()}")
+    
+    # 运行指标：状态类指标在抓取 /metrics 时从各组件读取
+    METRICS.add_collector(game_manager_collector(game_manager))
+    METRICS.add_collector(heartbeat_collector(heartbeat_handler))
+    METRICS.add_collector(barrage_collector(barrage_manager))
+    METRICS.add_collector(statements_collector(STATEMENTS))
+    METRICS.add_collector(logging_collector(log_setup))
+    if db is not None:
+        METRICS.add_collector(storage_collector(db))
+    
+    # 性能剖析（可选）：采样剖析线程、慢事件捕获，结果由 /admin 路由提供
+    SAMPLER.interval = Config.PROFILER_INTERVAL_MS / 1000
+    SLOW_EVENTS.configure(Config.SLOW_EVENT_MS / 1000, Config.SLOW_EVENT_CAPTURES)
+    if Config.PROFILER_ENABLED:
+        SAMPLER.start()
     
     # 启动服务器
     logger.info(f'服务器启动: http://{Config.HOST}:{Config.PORT}')
+    if asgi:
+        # 异步服务器模式由 uvicorn 处理 SIGTERM：先排空房间再关闭连接
+        if not serve(socketio, Config.HOST, Config.PORT, drain_controller, 'debug' if Config.DEBUG else 'info'):
+            sys.exit(1)
+        return
     try:
         socketio.run(app, host=Config.HOST, port=Config.PORT, debug=Config.DEBUG)
     except Exception as e:
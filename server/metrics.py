@@ -0,0 +1,225 @@
+"""
+运行指标
+
+事件处理耗时在插件的统一分发中记录（GamePlugin.on），按游戏和事件分别统计次数、异常次数和
+固定对数桶的延迟直方图；热点路径上只有一次计时和一次直方图计数。
+房间、连接、连接池和弹幕等状态指标不在运行时维护，由采集函数在抓取时从各组件读取。
+
+/metrics 路由以 Prometheus 文本格式输出全部指标。
+"""
+
+import logging
+import threading
+from collections import Counter, namedtuple
+
+from statements import LatencyHistogram
+from storage import as_backend
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 一组同名指标: 名称、类型（counter/gauge/histogram）、说明、样本 [(标签字典, 值)]
+# 直方图的值为 LatencyHistogram
+MetricFamily = namedtuple('MetricFamily', ('name', 'type', 'help', 'samples'))
+
+
+class EventStats:
+    """单个（游戏, 事件）的处理统计"""
+
+    __slots__ = ('histogram', 'errors', '_lock')
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, error=False):
+        """记录一次处理耗时（处理器抛出异常时 error 为True）"""
+        self.histogram.observe(seconds)
+        if error:
+            with self._lock:
+                self.errors += 1
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self.events = {}  # {(game, event): EventStats}
+        self.collectors = []  # [返回 MetricFamily 列表的函数]
+        self._lock = threading.Lock()
+
+    def event(self, game, event):
+        """
+        获取事件统计（注册处理器时调用一次，分发时直接使用返回的对象）
+
+        Returns:
+            EventStats: 同一游戏和事件始终返回同一对象
+        """
+        key = (game, event)
+        stats = self.events.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self.events.setdefault(key, EventStats())
+        return stats
+
+    def add_collector(self, collector):
+        """
+        登记抓取时调用的采集函数
+
+        Args:
+            collector: 无参函数，返回 MetricFamily 列表
+        """
+        self.collectors.append(collector)
+
+    def collect(self):
+        """
+        采集全部指标（采集函数出错时跳过该函数，不影响其他指标）
+
+        Returns:
+            list: MetricFamily 列表
+        """
+        events = sorted(self.events.items())
+        families = [
+            MetricFamily('gamehub_event_duration_seconds', 'histogram', '事件处理耗时',
+                         [({'game': game, 'event': event}, stats.histogram) for (game, event), stats in events]),
+            MetricFamily('gamehub_event_errors_total', 'counter', '事件处理器抛出的异常次数',
+                         [({'game': game, 'event': event}, stats.errors) for (game, event), stats in events]),
+        ]
+        for collector in self.collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logger.error(f"指标采集失败 {getattr(collector, '__name__', collector)}: {e}")
+        return families
+
+    def render(self):
+        """
+        Prometheus 文本格式
+
+        Returns:
+            str: 指标文本
+        """
+        lines = []
+        for family in self.collect():
+            lines.append(f'# HELP {family.name} {family.help}')
+            lines.append(f'# TYPE {family.name} {family.type}')
+            for labels, value in family.samples:
+                if family.type == 'histogram':
+                    lines.extend(_histogram_lines(family.name, labels, value))
+                else:
+                    lines.append(f'{family.name}{_labels(labels)} {_number(value)}')
+        lines.append('')
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _histogram_lines(name, labels, histogram):
+    buckets, count, total = histogram.cumulative()
+    for bound, seen in buckets:
+        yield f"{name}_bucket{_labels({**labels, 'le': repr(bound)})} {seen}"
+    yield f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {count}"
+    yield f'{name}_sum{_labels(labels)} {_number(total)}'
+    yield f'{name}_count{_labels(labels)} {count}'
+
+
+def game_manager_collector(game_manager):
+    """房间数（按游戏和状态）、玩家数和观战者数（按游戏）"""
+    def collect():
+        rooms, players, spectators = Counter(), Counter(), Counter()
+        for room in list(game_manager.rooms.values()):
+            game = room['game_type']
+            rooms[(game, room['status'].value)] += 1
+            players[game] += len(room['players'])
+            spectators[game] += len(room['spectators'])
+        return [
+            MetricFamily('gamehub_rooms', 'gauge', '房间数',
+                         [({'game': game, 'status': status}, n) for (game, status), n in sorted(rooms.items())]),
+            MetricFamily('gamehub_players', 'gauge', '房间中的玩家数',
+                         [({'game': game}, n) for game, n in sorted(players.items())]),
+            MetricFamily('gamehub_spectators', 'gauge', '房间中的观战者数',
+                         [({'game': game}, n) for game, n in sorted(spectators.items())]),
+        ]
+    return collect
+
+
+def heartbeat_collector(heartbeat_handler):
+    """心跳登记的连接数"""
+    def collect():
+        return [MetricFamily('gamehub_connected_clients', 'gauge', '心跳登记的客户端连接数',
+                             [({}, len(heartbeat_handler.client_heartbeats))])]
+    return collect
+
+
+def storage_collector(db):
+    """存储后端统计（连接池状态等数值项，每项一个指标）"""
+    backend = as_backend(db)
+
+    def collect():
+        return [
+            MetricFamily(f'gamehub_storage_{key}', 'gauge', f'存储后端统计 {key}', [({}, value)])
+            for key, value in sorted(backend.get_stats().items())
+            if isinstance(value, (int, float))
+        ]
+    return collect
+
+
+def statements_collector(statements):
+    """已注册SQL语句的执行耗时和慢查询次数"""
+    def collect():
+        items = sorted(statements.statements.items())
+        return [
+            MetricFamily('gamehub_db_statement_duration_seconds', 'histogram', 'SQL语句执行耗时',
+                         [({'statement': name}, statement.histogram) for name, statement in items]),
+            MetricFamily('gamehub_db_slow_statements_total', 'counter', '慢查询次数',
+                         [({'statement': name}, statement.slow) for name, statement in items]),
+        ]
+    return collect
+
+
+def barrage_collector(barrage_manager):
+    """弹幕发送、限流、过滤和重复计数"""
+    def collect():
+        stats = barrage_manager.get_stats()
+        return [
+            MetricFamily('gamehub_barrages_total', 'counter', '弹幕处理次数（按结果）',
+                         [({'result': result}, n) for result, n in sorted(stats['counters'].items())]),
+            MetricFamily('gamehub_barrage_rooms', 'gauge', '有弹幕历史的房间数', [({}, stats['total_rooms'])]),
+            MetricFamily('gamehub_barrage_users', 'gauge', '有发送记录的用户数', [({}, stats['total_users'])]),
+        ]
+    return collect
+
+
+def logging_collector(log_setup):
+    """日志队列长度、队列满时丢弃和被限流的记录数"""
+    def collect():
+        stats = log_setup.get_stats()
+        return [
+            MetricFamily('gamehub_log_queue_size', 'gauge', '等待写入的日志记录数', [({}, stats['queued'])]),
+            MetricFamily('gamehub_log_records_dropped_total', 'counter', '未写入的日志记录数（按原因）',
+                         [({'reason': 'queue_full'}, stats['dropped']),
+                          ({'reason': 'rate_limited'}, stats['suppressed'])]),
+        ]
+    return collect
+
+
+# 全局指标注册表
+METRICS = MetricsRegistry()
@@ -0,0 +1,375 @@
+"""
+数据库迁移模块
+
+按版本号顺序执行的表结构迁移。已执行的版本记录在 schema_version 表中，
+启动时只需一次查询：版本一致时直接跳过，不再执行任何DDL。
+新增表结构变更时在 MIGRATIONS 末尾追加新版本，不要修改已发布的迁移。
+"""
+
+import logging
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+# MySQL错误码：表不存在
+ER_NO_SUCH_TABLE = 1146
+
+# 多个进程同时启动时串行执行迁移
+MIGRATION_LOCK = 'gamehub_schema_migration'
+MIGRATION_LOCK_TIMEOUT = 30
+
+# 按月分区：预先创建的未来月份数；超出范围的记录落入 pmax 分区
+PARTITION_MONTHS_AHEAD = 3
+MAXVALUE_PARTITION = 'pmax'
+
+Migration = namedtuple('Migration', ['version', 'description', 'apply'])
+
+SCHEMA_VERSION_TABLE = '''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    ) CHARSET=utf8mb4 ENGINE=InnoDB
+'''
+
+
+def index_exists(cursor, table, index):
+    """检查索引是否存在"""
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+        (table, index)
+    )
+    return bool(_scalar(cursor.fetchone()))
+
+
+def column_type(cursor, table, column):
+    """查询列的数据类型，列不存在返回None"""
+    cursor.execute(
+        "SELECT DATA_TYPE FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+        (table, column)
+    )
+    value = _scalar(cursor.fetchone())
+    return value.lower() if isinstance(value, str) else value
+
+
+def _create_game_records(cursor):
+    """通用游戏记录表（原各插件 init_db 中的DDL）"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS game_records (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            game_type VARCHAR(32) NOT NULL,
+            room_id VARCHAR(16) NOT NULL,
+            moves TEXT NOT NULL,
+            winner VARCHAR(32),
+            player_count INT DEFAULT 0,
+            spectator_count INT DEFAULT 0,
+            duration INT DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_game_type (game_type),
+            INDEX idx_room_id (room_id),
+            INDEX idx_created_at (created_at)
+        ) CHARSET=utf8mb4 ENGINE=InnoDB
+    ''')
+
+
+def _add_game_type_created_index(cursor):
+    """按游戏类型分页查询（WHERE game_type ORDER BY created_at）使用联合索引"""
+    if not index_exists(cursor, 'game_records', 'idx_game_type_created'):
+        cursor.execute('ALTER TABLE game_records ADD INDEX idx_game_type_created (game_type, created_at)')
+    # 联合索引的前缀已覆盖单列索引
+    if index_exists(cursor, 'game_records', 'idx_game_type'):
+        cursor.execute('ALTER TABLE game_records DROP INDEX idx_game_type')
+
+
+def _binary_moves(cursor):
+    """走法改为二进制存储，并记录编码器ID（历史JSON记录的ID为0）"""
+    if column_type(cursor, 'game_records', 'moves') != 'blob':
+        cursor.execute('ALTER TABLE game_records MODIFY moves BLOB NOT NULL')
+    if column_type(cursor, 'game_records', 'moves_codec') is None:
+        cursor.execute(
+            'ALTER TABLE game_records ADD COLUMN moves_codec TINYINT UNSIGNED NOT NULL DEFAULT 0 AFTER moves'
+        )
+
+
+def month_start(day, offset=0):
+    """day 所在月份（加 offset 个月）的第一天"""
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """月份分区名，如 p202610"""
+    return f'p{month.year:04d}{month.month:02d}'
+
+
+def month_partition_sql(months):
+    """按月份列表生成分区定义（每个分区的上界为下个月第一天），末尾追加 pmax"""
+    parts = [f"PARTITION {partition_name(m)} VALUES LESS THAN ('{month_start(m, 1).isoformat()}')"
+             for m in months]
+    parts.append(f'PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN (MAXVALUE)')
+    return ', '.join(parts)
+
+
+def list_partitions(cursor, table):
+    """
+    查询表的分区
+
+    Returns:
+        list: [(分区名, 上界date或None)]，按分区顺序；未分区的表返回空列表
+    """
+    cursor.execute(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.partitions "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION",
+        (table,)
+    )
+    partitions = []
+    for row in cursor.fetchall():
+        name, description = row.values() if isinstance(row, dict) else row
+        bound = str(description).strip("'")
+        partitions.append((name, None if bound == 'MAXVALUE' else date.fromisoformat(bound[:10])))
+    return partitions
+
+
+def _partition_game_records(cursor):
+    """
+    game_records 按 created_at 按月 RANGE 分区
+
+    分区列必须包含在主键中，主键改为 (id, created_at)。
+    从已有最早记录的月份起建分区，过期数据按分区整体删除。
+    """
+    if list_partitions(cursor, 'game_records'):
+        return
+    cursor.execute('SELECT MIN(created_at) FROM game_records')
+    earliest = _scalar(cursor.fetchone())
+    today = date.today()
+    first = month_start(earliest or today)
+    months = []
+    month = first
+    while month <= month_start(today, PARTITION_MONTHS_AHEAD):
+        months.append(month)
+        month = month_start(month, 1)
+
+    cursor.execute(
+        'ALTER TABLE game_records MODIFY created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, '
+        'DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)'
+    )
+    cursor.execute(f'ALTER TABLE game_records PARTITION BY RANGE COLUMNS(created_at) ({month_partition_sql(months)})')
+
+
+def _create_game_stats_daily(cursor):
+    """按天、游戏类型汇总的统计表（插入记录时增量更新），并回填已有记录"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS game_stats_daily (
+            stat_date DATE NOT NULL,
+            game_type VARCHAR(32) NOT NULL,
+            games INT NOT NULL DEFAULT 0,
+            total_duration BIGINT NOT NULL DEFAULT 0,
+            total_players BIGINT NOT NULL DEFAULT 0,
+            total_spectators BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (stat_date, game_type),
+            INDEX idx_game_type (game_type)
+        ) CHARSET=utf8mb4 ENGINE=InnoDB
+    ''')
+    cursor.execute('''
+        INSERT INTO game_stats_daily
+            (stat_date, game_type, games, total_duration, total_players, total_spectators)
+        SELECT DATE(created_at), game_type, COUNT(*), COALESCE(SUM(duration), 0),
+               COALESCE(SUM(player_count), 0), COALESCE(SUM(spectator_count), 0)
+        FROM game_records
+        GROUP BY DATE(created_at), game_type
+        ON DUPLICATE KEY UPDATE
+            games = VALUES(games), total_duration = VALUES(total_duration),
+            total_players = VALUES(total_players), total_spectators = VALUES(total_spectators)
+    ''')
+
+
+MIGRATIONS = [
+    Migration(1, '创建通用游戏记录表', _create_game_records),
+    Migration(2, '游戏类型+创建时间联合索引', _add_game_type_created_index),
+    Migration(3, '走法二进制编码', _binary_moves),
+    Migration(4, '游戏记录按月分区', _partition_game_records),
+    Migration(5, '每日统计汇总表', _create_game_stats_daily),
+]
+
+
+def _scalar(row):
+    """取查询结果第一列（兼容元组和字典游标）"""
+    if row is None:
+        return None
+    if isinstance(row, dict):
+        return next(iter(row.values()), None)
+    return row[0]
+
+
+@contextmanager
+def schema_lock(cursor):
+    """持有表结构变更锁（迁移和分区维护在多个进程间串行执行）"""
+    cursor.execute('SELECT GET_LOCK(%s, %s)', (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+    if _scalar(cursor.fetchone()) == 0:
+        raise TimeoutError('等待数据库迁移锁超时')
+    try:
+        yield
+    finally:
+        cursor.execute('SELECT RELEASE_LOCK(%s)', (MIGRATION_LOCK,))
+
+
+class MigrationRunner:
+    """迁移执行器"""
+
+    def __init__(self, db, migrations=None):
+        """
+        初始化迁移执行器
+
+        Args:
+            db: 数据库连接管理器
+            migrations: 迁移列表（默认 MIGRATIONS）
+        """
+        self.db = db
+        self.migrations = sorted(migrations if migrations is not None else MIGRATIONS,
+                                 key=lambda m: m.version)
+
+    @property
+    def latest_version(self):
+        """最新迁移版本号"""
+        return self.migrations[-1].version if self.migrations else 0
+
+    def current_version(self, cursor):
+        """
+        查询当前表结构版本
+
+        Returns:
+            int: 已执行的最大版本号，schema_version 表不存在时返回None
+        """
+        try:
+            cursor.execute('SELECT MAX(version) FROM schema_version')
+        except pymysql.err.ProgrammingError as e:
+            if e.args and e.args[0] == ER_NO_SUCH_TABLE:
+                return None
+            raise
+        return _scalar(cursor.fetchone()) or 0
+
+    def migrate(self):
+        """
+        执行所有未执行的迁移
+
+        Returns:
+            list: 本次执行的版本号列表（已是最新版本时为空列表）
+
+        Raises:
+            Exception: 迁移失败（已执行的迁移保留记录，下次启动从失败处继续）
+        """
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if self.current_version(cursor) == self.latest_version:
+                    logger.info(f"数据库表结构已是最新版本 v{self.latest_version}，跳过迁移")
+                    return []
+                return self._migrate_locked(conn, cursor)
+            finally:
+                cursor.close()
+
+    def _migrate_locked(self, conn, cursor):
+        """持有迁移锁执行待执行的迁移"""
+        with schema_lock(cursor):
+            cursor.execute(SCHEMA_VERSION_TABLE)
+            # 持锁后重新读取版本，其他进程可能已经完成迁移
+            current = self.current_version(cursor) or 0
+            applied = []
+            for migration in self.migrations:
+                if migration.version <= current:
+                    continue
+                logger.info(f"执行数据库迁移 v{migration.version}: {migration.description}")
+                migration.apply(cursor)
+                cursor.execute(
+                    'INSERT INTO schema_version (version, description) VALUES (%s, %s)',
+                    (migration.version, migration.description)
+                )
+                conn.commit()
+                applied.append(migration.version)
+
+            logger.info(f"数据库迁移完成，当前版本 v{max([current] + applied)}")
+            return applied
+
+
+class PartitionManager:
+    """
+    按月分区维护
+
+    提前创建未来月份的分区（从 pmax 拆分，pmax 为空时只修改元数据），
+    并按保留月数整体删除过期分区，代替逐行 DELETE。
+    每日汇总表不受影响，统计数据在原始记录过期后仍然保留。
+    """
+
+    def __init__(self, db, table='game_records', months_ahead=PARTITION_MONTHS_AHEAD):
+        """
+        初始化分区维护
+
+        Args:
+            db: 数据库连接管理器
+            table: 分区表名
+            months_ahead: 预先创建的未来月份数
+        """
+        self.db = db
+        self.table = table
+        self.months_ahead = months_ahead
+
+    def maintain(self, retention_months=0, today=None):
+        """
+        创建未来分区并删除过期分区
+
+        Args:
+            retention_months: 保留的完整月份数（不含当月），0表示永久保留
+            today: 当前日期（测试用）
+
+        Returns:
+            dict: {'added': 新建的分区名列表, 'dropped': 删除的分区名列表}
+        """
+        today = today or date.today()
+        result = {'added': [], 'dropped': []}
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                with schema_lock(cursor):
+                    partitions = list_partitions(cursor, self.table)
+                    if not partitions:
+                        logger.warning(f"{self.table} 未分区，跳过分区维护")
+                        return result
+                    result['added'] = self._add_future(cursor, partitions, today)
+                    if retention_months > 0:
+                        result['dropped'] = self._drop_expired(cursor, partitions,
+                                                               month_start(today, -retention_months))
+            finally:
+                cursor.close()
+
+        if result['added'] or result['dropped']:
+            logger.info(f"{self.table} 分区维护: 新建 {result['added']}，删除 {result['dropped']}")
+        return result
+
+    def _add_future(self, cursor, partitions, today):
+        """从 pmax 拆分出到 today + months_ahead 为止的月份分区"""
+        bounds = [bound for _, bound in partitions if bound is not None]
+        next_month = bounds[-1] if bounds else month_start(today)
+        months = []
+        while next_month <= month_start(today, self.months_ahead):
+            months.append(next_month)
+            next_month = month_start(next_month, 1)
+        if not months:
+            return []
+        cursor.execute(
+            f'ALTER TABLE {self.table} REORGANIZE PARTITION {MAXVALUE_PARTITION} '
+            f'INTO ({month_partition_sql(months)})'
+        )
+        return [partition_name(m) for m in months]
+
+    def _drop_expired(self, cursor, partitions, cutoff):
+        """删除上界不晚于 cutoff 的分区（其中所有记录都早于 cutoff）"""
+        expired = [name for name, bound in partitions if bound is not None and bound <= cutoff]
+        if expired:
+            cursor.execute(f"ALTER TABLE {self.table} DROP PARTITION {', '.join(expired)}")
+        return expired
@@ -0,0 +1,341 @@
+"""
+对局走法编码模块
+
+按游戏类型把走法列表压缩为紧凑的二进制格式存入 game_records.moves（BLOB），
+并在 moves_codec 列记录编码器ID，读取时按ID透明解码。
+
+编码器ID一经发布不可修改含义：格式变化时注册新的ID，旧ID保留用于解码历史记录。
+无法用紧凑格式无损表示的走法（字段不符、超出范围）自动回退为JSON编码。
+"""
+
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 编码器ID -> 编码器
+CODECS = {}
+
+# 游戏类型 -> 写入时使用的编码器
+GAME_CODECS = {}
+
+
+class MoveCodec:
+    """走法编码器基类"""
+
+    codec_id = None
+    game_type = None
+
+    def encode(self, moves):
+        """
+        编码走法列表
+
+        Raises:
+            ValueError: 走法无法用此格式无损表示
+        """
+        raise NotImplementedError
+
+    def decode(self, payload):
+        """解码为走法列表"""
+        raise NotImplementedError
+
+    def iter_decode(self, payload):
+        """逐步解码（回放时边解码边发送，默认一次性解码后迭代）"""
+        return iter(self.decode(payload))
+
+
+class JsonMoveCodec(MoveCodec):
+    """JSON编码（历史记录和回退格式）"""
+
+    codec_id = 0
+
+    def encode(self, moves):
+        return json.dumps(moves, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, payload):
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = bytes(payload).decode('utf-8')
+        return json.loads(payload) if payload else []
+
+
+class GomokuMoveCodec(MoveCodec):
+    """
+    五子棋：每步一个字节的格子索引（row * 15 + col）
+
+    颜色从黑棋开始黑白交替，不单独存储。
+    """
+
+    codec_id = 1
+    game_type = 'gomoku'
+    BOARD_SIZE = 15
+    COLORS = ('black', 'white')
+
+    def encode(self, moves):
+        cells = bytearray()
+        for i, move in enumerate(moves):
+            if not isinstance(move, dict) or set(move) != {'row', 'col', 'color'}:
+                raise ValueError(f'第{i}步格式不符')
+            row, col = move['row'], move['col']
+            if not (_is_int(row) and _is_int(col) and 0 <= row < self.BOARD_SIZE and 0 <= col < self.BOARD_SIZE):
+                raise ValueError(f'第{i}步坐标越界')
+            if move['color'] != self.COLORS[i % 2]:
+                raise ValueError(f'第{i}步颜色不是交替顺序')
+            cells.append(row * self.BOARD_SIZE + col)
+        return bytes(cells)
+
+    def decode(self, payload):
+        return [
+            {'row': cell // self.BOARD_SIZE, 'col': cell % self.BOARD_SIZE, 'color': self.COLORS[i % 2]}
+            for i, cell in enumerate(payload)
+        ]
+
+    def iter_decode(self, payload):
+        return (
+            {'row': cell // self.BOARD_SIZE, 'col': cell % self.BOARD_SIZE, 'color': self.COLORS[i % 2]}
+            for i, cell in enumerate(payload)
+        )
+
+
+class LandlordMoveCodec(MoveCodec):
+    """
+    斗地主：每手一个头字节（位置 << 6 | 张数）加每张牌一个字节
+
+    牌编号为 花色序号 * 13 + 点数序号，小王52、大王53；张数为0表示不出。
+    """
+
+    codec_id = 2
+    game_type = 'landlord'
+    SUITS = ('♠', '♥', '♣', '♦')
+    VALUES = ('3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A', '2')
+    JOKERS = ('joker', 'JOKER')
+    MAX_CARDS = 20
+
+    def __init__(self):
+        self.card_ids = {(s, v): i * 13 + j for i, s in enumerate(self.SUITS) for j, v in enumerate(self.VALUES)}
+        for k, joker in enumerate(self.JOKERS):
+            self.card_ids[('', joker)] = 52 + k
+        self.cards = {card_id: {'suit': s, 'value': v} for (s, v), card_id in self.card_ids.items()}
+
+    def encode(self, moves):
+        out = bytearray()
+        for i, move in enumerate(moves):
+            if not isinstance(move, dict) or set(move) != {'position', 'cards'}:
+                raise ValueError(f'第{i}手格式不符')
+            position, cards = move['position'], move['cards']
+            if not _is_int(position) or not 0 <= position < 3:
+                raise ValueError(f'第{i}手位置越界')
+            if not isinstance(cards, list) or len(cards) > self.MAX_CARDS:
+                raise ValueError(f'第{i}手牌数无效')
+            out.append(position << 6 | len(cards))
+            for card in cards:
+                if not isinstance(card, dict) or set(card) != {'suit', 'value'}:
+                    raise ValueError(f'第{i}手牌格式不符')
+                card_id = self.card_ids.get((card['suit'], card['value']))
+                if card_id is None:
+                    raise ValueError(f'第{i}手包含未知的牌')
+                out.append(card_id)
+        return bytes(out)
+
+    def decode(self, payload):
+        return list(self.iter_decode(payload))
+
+    def iter_decode(self, payload):
+        pos = 0
+        while pos < len(payload):
+            header = payload[pos]
+            count = header & 0x3F
+            cards = [dict(self.cards[c]) for c in payload[pos + 1:pos + 1 + count]]
+            yield {'position': header >> 6, 'cards': cards}
+            pos += 1 + count
+
+
+class RacingMoveCodec(MoveCodec):
+    """
+    极速狂飙：分数上报的输入磁带
+
+    每条记录依次为 varint(位置 << 1 | 完赛标记)、该位置分数增量的zigzag varint、
+    与上一条记录的时间差（毫秒）varint。分数按固定步长递增时每条约3~4字节。
+    """
+
+    codec_id = 3
+    game_type = 'racing'
+
+    def encode(self, moves):
+        tape = RacingTape()
+        for i, move in enumerate(moves):
+            keys = set(move) if isinstance(move, dict) else set()
+            if keys not in ({'position', 'score', 't'}, {'position', 'score', 't', 'finished'}):
+                raise ValueError(f'第{i}条记录格式不符')
+            position, score, t = move['position'], move['score'], move['t']
+            finished = move.get('finished', False)
+            if not (_is_int(position) and _is_int(score) and _is_int(t)) or position < 0:
+                raise ValueError(f'第{i}条记录字段类型错误')
+            if 'finished' in move and finished is not True:
+                raise ValueError(f'第{i}条记录完赛标记无效')
+            if t < tape.last_t:
+                raise ValueError(f'第{i}条记录时间倒退')
+            tape.append(position, score, t, finished)
+        return bytes(tape.payload)
+
+    def decode(self, payload):
+        return list(self.iter_decode(payload))
+
+    def iter_decode(self, payload):
+        last_scores = {}
+        last_t = 0
+        pos = 0
+        while pos < len(payload):
+            head, pos = _read_varint(payload, pos)
+            delta, pos = _read_varint(payload, pos)
+            dt, pos = _read_varint(payload, pos)
+            position = head >> 1
+            last_scores[position] = last_scores.get(position, 0) + _unzigzag(delta)
+            last_t += dt
+            move = {'position': position, 'score': last_scores[position], 't': last_t}
+            if head & 1:
+                move['finished'] = True
+            yield move
+
+
+class RacingTape:
+    """
+    对局进行中逐条追加的极速狂飙输入磁带（与 RacingMoveCodec 的格式相同）
+
+    分数上报的频率高、一局的条数没有上限，插件把磁带保存在房间状态之外，
+    房间状态的持久化和停机快照不会随对局时长反复写入整个记录；保存对局记录时直接使用编码结果。
+    """
+
+    codec_id = RacingMoveCodec.codec_id
+
+    def __init__(self):
+        self.payload = bytearray()
+        self.count = 0
+        self.last_t = 0
+        self._last_scores = {}
+
+    def __len__(self):
+        return self.count
+
+    def append(self, position, score, t, finished=False):
+        """
+        追加一条分数上报（字段由调用方保证为非负整数）
+
+        Args:
+            position: 玩家位置
+            score: 分数
+            t: 距对局开始的毫秒数（早于上一条时按上一条计）
+            finished: 是否为完赛记录
+        """
+        t = max(t, self.last_t)
+        _write_varint(self.payload, position << 1 | int(finished))
+        _write_varint(self.payload, _zigzag(score - self._last_scores.get(position, 0)))
+        _write_varint(self.payload, t - self.last_t)
+        self._last_scores[position] = score
+        self.last_t = t
+        self.count += 1
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _zigzag(n):
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+
+def _unzigzag(n):
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+
+def _write_varint(out, n):
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(payload, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = payload[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def register_codec(codec, default=True):
+    """
+    注册走法编码器
+
+    Args:
+        codec: MoveCodec实例
+        default: 是否作为该游戏类型写入时使用的编码器
+    """
+    if codec.codec_id in CODECS and type(CODECS[codec.codec_id]) is not type(codec):
+        raise ValueError(f'编码器ID {codec.codec_id} 已被 {type(CODECS[codec.codec_id]).__name__} 占用')
+    CODECS[codec.codec_id] = codec
+    if default and codec.game_type:
+        GAME_CODECS[codec.game_type] = codec
+
+
+JSON_CODEC = JsonMoveCodec()
+for _codec in (JSON_CODEC, GomokuMoveCodec(), LandlordMoveCodec(), RacingMoveCodec()):
+    register_codec(_codec)
+
+
+def encode_moves(game_type, moves):
+    """
+    按游戏类型编码走法
+
+    Args:
+        game_type: 游戏类型
+        moves: 走法列表，或已经编码的磁带（RacingTape）
+
+    Returns:
+        tuple: (编码器ID, 编码后的bytes)
+    """
+    if isinstance(moves, RacingTape):
+        return moves.codec_id, bytes(moves.payload)
+    codec = GAME_CODECS.get(game_type)
+    if codec is not None:
+        try:
+            return codec.codec_id, codec.encode(moves)
+        except ValueError as e:
+            logger.debug("%s 走法无法紧凑编码，回退为JSON: %s", game_type, e)
+    return JSON_CODEC.codec_id, JSON_CODEC.encode(moves)
+
+
+def decode_moves(codec_id, payload):
+    """
+    按编码器ID解码走法
+
+    Args:
+        codec_id: moves_codec 列的值（None视为JSON）
+        payload: moves 列的值（bytes或历史记录中的str）
+
+    Returns:
+        list: 走法列表
+
+    Raises:
+        ValueError: 未知的编码器ID
+    """
+    codec = CODECS.get(codec_id or 0)
+    if codec is None:
+        raise ValueError(f'未知的走法编码器ID: {codec_id}')
+    return codec.decode(payload)
+
+
+def iter_moves(codec_id, payload):
+    """
+    按编码器ID逐步解码走法（紧凑格式不会一次性生成整个列表）
+
+    Raises:
+        ValueError: 未知的编码器ID
+    """
+    codec = CODECS.get(codec_id or 0)
+    if codec is None:
+        raise ValueError(f'未知的走法编码器ID: {codec_id}')
+    return codec.iter_decode(payload)
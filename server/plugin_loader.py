@@ -0,0 +1,259 @@
+"""
+游戏插件加载器
+
+根据各游戏 game.json 中的 server 配置按需导入插件：启动时只登记事件路由，
+某个游戏第一次被使用（创建房间或收到该游戏的事件）时才导入并初始化插件。
+加载失败的插件只影响自己的游戏。
+"""
+
+import importlib
+import logging
+import threading
+import time
+from flask import request
+from flask_socketio import emit
+
+logger = logging.getLogger(__name__)
+
+
+class PluginLoader:
+    """按需加载游戏插件并按游戏路由事件"""
+
+    def __init__(self, registry, app, socketio, db, game_manager, barrage_manager=None,
+                 event_codec=None, heartbeat_handler=None, default_game=None, cluster=None):
+        """
+        初始化插件加载器
+
+        Args:
+            registry: 游戏注册表（GameRegistry）
+            app: Flask应用实例
+            socketio: SocketIO实例
+            db: 数据库连接管理器
+            game_manager: 游戏房间管理器
+            barrage_manager: 弹幕管理器（可选）
+            event_codec: 紧凑事件编码器（可选）
+            heartbeat_handler: 心跳处理器（可选）
+            default_game: 无法从事件判断游戏时使用的游戏ID（兼容不携带game字段的旧客户端）
+            cluster: 集群客户端管理器（ClusterManager，可选），房间不归属本进程的事件转发给归属进程
+        """
+        self.registry = registry
+        self.app = app
+        self.socketio = socketio
+        self.db = db
+        self.game_manager = game_manager
+        self.barrage_manager = barrage_manager
+        self.event_codec = event_codec
+        self.heartbeat_handler = heartbeat_handler
+        self.default_game = default_game
+        self.cluster = cluster
+        if cluster is not None:
+            cluster.router = self.dispatch_remote
+
+        self.specs = {}    # {game_id: server配置}
+        self.plugins = {}  # {game_id: 插件实例}
+        self.failed = {}   # {game_id: 错误信息}
+        self.load_times = {}  # {game_id: 加载耗时（秒）}
+        self.routes = {}  # {事件名: 路由处理器}
+        self._lock = threading.Lock()
+
+        for game_id, config in registry.games.items():
+            server = config.get('server') or {}
+            if server.get('enabled') and server.get('plugin'):
+                self.specs[game_id] = server
+
+    def events(self):
+        """
+        汇总各游戏声明的事件
+
+        Returns:
+            dict: {事件名: [game_id, ...]}
+        """
+        events = {}
+        for game_id, server in self.specs.items():
+            for event in server.get('events', []):
+                events.setdefault(event, []).append(game_id)
+        return events
+
+    def register_events(self):
+        """为所有声明的事件注册路由处理器（不导入插件）"""
+        for event, game_ids in self.events().items():
+            self.routes[event] = self._make_route(event, game_ids)
+            self.socketio.on(event)(self.routes[event])
+        logger.info(f"插件事件路由注册完成: {sorted(self.specs)}")
+
+    def preload(self):
+        """立即加载声明了 preload 的插件（例如需要注册HTTP路由的插件）"""
+        for game_id, server in self.specs.items():
+            if server.get('preload'):
+                self.get(game_id)
+
+    def get(self, game_id):
+        """
+        获取插件实例，首次调用时导入并初始化
+
+        Args:
+            game_id: 游戏ID
+
+        Returns:
+            GamePlugin: 插件实例，未配置或加载失败返回None
+        """
+        plugin = self.plugins.get(game_id)
+        if plugin is not None or game_id not in self.specs or game_id in self.failed:
+            return plugin
+
+        with self._lock:
+            if game_id in self.plugins or game_id in self.failed:
+                return self.plugins.get(game_id)
+
+            spec = self.specs[game_id]['plugin']
+            start = time.perf_counter()
+            try:
+                module_name, _, class_name = spec.partition(':')
+                plugin_class = getattr(importlib.import_module(module_name), class_name)
+                plugin = plugin_class(self.app, self.socketio, self.db, self.game_manager,
+                                      self.barrage_manager, self.event_codec, self.heartbeat_handler,
+                                      routed=True, game_id=game_id)
+            except Exception as e:
+                self.failed[game_id] = str(e)
+                logger.error(f"游戏插件 {game_id} ({spec}) 加载失败: {e}")
+                return None
+
+            self.load_times[game_id] = time.perf_counter() - start
+            self.plugins[game_id] = plugin
+
+            undeclared = set(plugin.handlers) - set(self.specs[game_id].get('events', []))
+            if undeclared:
+                logger.warning(f"游戏插件 {game_id} 的事件未在 game.json 中声明，不会被路由: {sorted(undeclared)}")
+            logger.info(f"游戏插件 {game_id} 加载成功，耗时 {self.load_times[game_id] * 1000:.1f}ms")
+            return plugin
+
+    def resolve_game(self, event, data, sid, game_ids):
+        """
+        判断事件所属的游戏
+
+        依次使用：唯一声明该事件的游戏、事件中的game字段、room_id对应房间的游戏、
+        连接所在房间的游戏、默认游戏。断开连接只按所在房间判断，不会触发插件加载。
+
+        Returns:
+            str: 游戏ID，无法判断返回None
+        """
+        if len(game_ids) == 1 and event != 'disconnect':
+            return game_ids[0]
+
+        if isinstance(data, dict):
+            game = data.get('game')
+            if game in game_ids:
+                return game
+            room_id = data.get('room_id')
+            if isinstance(room_id, str):
+                room = self.game_manager.get_room(room_id)
+                if room and room['game_type'] in game_ids:
+                    return room['game_type']
+
+        game = self.game_manager.get_client_game(sid)
+        if game in game_ids:
+            return game
+
+        if event == 'disconnect':
+            return None
+        if self.default_game in game_ids:
+            return self.default_game
+        return None
+
+    def _make_route(self, event, game_ids):
+        """创建事件路由处理器"""
+        def route(*args):
+            data = args[0] if args else None
+            if event == 'disconnect' and self.heartbeat_handler:
+                # 本路由注册后取代了心跳处理器的断开处理，由这里清理心跳记录
+                self.heartbeat_handler.remove_client(request.sid)
+            if self.game_manager.draining:
+                # 进程即将退出，房间已写入快照，由新进程继续处理
+                if event != 'disconnect':
+                    emit('error', {'msg': '服务器正在重启，请稍后重连'})
+                return
+            if self.cluster is not None and self._forward(event, args, data):
+                return
+            if event == 'rejoin_room' and isinstance(data, dict) and 'token' in data:
+                self.game_manager.reclaim_seat(data.get('room_id'), data['token'], request.sid)
+            game_id = self.resolve_game(event, data, request.sid, game_ids)
+            if game_id is None:
+                logger.debug("无法判断事件 %s 所属游戏，已忽略", event)
+                return
+
+            plugin = self.get(game_id)
+            handler = plugin.handlers.get(event) if plugin else None
+            if handler is None:
+                if event != 'disconnect':
+                    emit('error', {'msg': '游戏暂不可用'})
+                return
+            return handler(*args)
+
+        route.__name__ = f'route_{event}'
+        return route
+
+    def _forward(self, event, args, data):
+        """
+        集群模式：房间归属其他进程的事件转发给归属进程
+
+        断开连接除本进程处理外还通知其他进程，由所在房间的归属进程清理。
+        转发的事件在本进程刷新心跳（连接在本进程）。
+
+        Returns:
+            bool: 是否已转发（本进程不再处理）
+        """
+        if getattr(request, 'remote', False) is True:
+            return False
+        if event == 'disconnect':
+            self.cluster.forward(None, event, args, request.sid)
+            return False
+
+        room_id = data.get('room_id') if isinstance(data, dict) else None
+        if not isinstance(room_id, str) or self.cluster.affinity.is_local(room_id):
+            return False
+        if self.heartbeat_handler:
+            self.heartbeat_handler.touch(request.sid)
+        self.cluster.forward(self.cluster.affinity.owner(room_id), event, args, request.sid)
+        return True
+
+    def dispatch_remote(self, event, args, sid, namespace='/'):
+        """在本进程中处理其他进程转发来的事件（连接不在本进程，发送经消息队列送达）"""
+        self._dispatch(event, args, sid, namespace, remote=True)
+
+    def disconnect_client(self, sid, namespace='/'):
+        """
+        按客户端断开处理（心跳回收超时连接时调用）
+
+        经所在游戏插件的断开处理器通知房间内其他人（player_left）并清理房间和观战列表，
+        与客户端主动断开的处理相同。断开连接本身触发的断开事件随后找不到房间，不会重复处理。
+
+        Args:
+            sid: 客户端Socket ID
+            namespace: 命名空间
+        """
+        self._dispatch('disconnect', (), sid, namespace)
+
+    def _dispatch(self, event, args, sid, namespace, remote=False):
+        """在请求上下文中执行事件路由（不在SocketIO的事件处理中调用时使用）"""
+        route = self.routes.get(event)
+        if route is None:
+            return
+        with self.app.test_request_context('/socket.io/'):
+            request.sid = sid
+            request.namespace = namespace
+            if remote:
+                request.remote = True
+            route(*args)
+
+    def get_stats(self):
+        """
+        获取加载状态
+
+        Returns:
+            dict: 已加载、加载失败和未加载的插件
+        """
+        return {
+            'loaded': {game_id: round(t * 1000, 2) for game_id, t in self.load_times.items()},
+            'failed': dict(self.failed),
+            'pending': [g for g in self.specs if g not in self.plugins and g not in self.failed],
+        }
@@ -7,18 +7,106 @@
 """
 
 from abc import ABC, abstractmethod
+import asyncio
+import inspect
+from functools import wraps
 from flask import request
 from flask_socketio import emit
 import logging
 import sys
 import os
+import time
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from barrage_manager import BarrageManager
+from broadcaster import Broadcaster
+from metrics import METRICS
+from profiler import SLOW_EVENTS
+from move_codec import encode_moves, decode_moves
+from storage import as_backend
+from statements import STATEMENTS
+from validators import ValidationError
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 游戏记录查询的列顺序（元组游标的结果按此转换为字典）
+GAME_RECORD_COLUMNS = ('id', 'game_type', 'room_id', 'moves', 'moves_codec', 'winner',
+                       'player_count', 'spectator_count', 'duration', 'created_at')
+
+_RECORD_SELECT = f"SELECT {', '.join(GAME_RECORD_COLUMNS)} FROM game_records"
+_STATS_SELECT = """
+    SELECT 
+        COALESCE(SUM(games), 0) as total_games,
+        SUM(total_duration) * 1.0 / SUM(games) as avg_duration,
+        SUM(total_players) * 1.0 / SUM(games) as avg_players,
+        SUM(total_spectators) * 1.0 / SUM(games) as avg_spectators
+    FROM game_stats_daily
+"""
+
+# 游戏记录热点语句（注册一次，执行时记录延迟直方图）
+INSERT_GAME_RECORD = STATEMENTS.register('game_records.insert', """
+    INSERT INTO game_records 
+    (game_type, room_id, moves, moves_codec, winner, player_count, spectator_count, duration, created_at) 
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+""")
+SELECT_GAME_RECORDS = STATEMENTS.register('game_records.select_page', f"""
+    {_RECORD_SELECT} ORDER BY created_at DESC LIMIT %s OFFSET %s
+""")
+SELECT_GAME_RECORDS_BY_TYPE = STATEMENTS.register('game_records.select_page_by_type', f"""
+    {_RECORD_SELECT} WHERE game_type = %s ORDER BY created_at DESC LIMIT %s OFFSET %s
+""")
+SELECT_GAME_RECORD_BY_ID = STATEMENTS.register('game_records.select_by_id', f"""
+    {_RECORD_SELECT} WHERE id = %s
+""")
+
+# 每日汇总增量更新（与游戏记录在同一事务中执行）
+UPSERT_GAME_STATS_DAILY = STATEMENTS.register('game_stats_daily.upsert', """
+    INSERT INTO game_stats_daily
+        (stat_date, game_type, games, total_duration, total_players, total_spectators)
+    VALUES (%s, %s, 1, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        games = games + 1,
+        total_duration = total_duration + VALUES(total_duration),
+        total_players = total_players + VALUES(total_players),
+        total_spectators = total_spectators + VALUES(total_spectators)
+""", dialects={'sqlite': """
+    INSERT INTO game_stats_daily
+        (stat_date, game_type, games, total_duration, total_players, total_spectators)
+    VALUES (?, ?, 1, ?, ?, ?)
+    ON CONFLICT (stat_date, game_type) DO UPDATE SET
+        games = games + 1,
+        total_duration = total_duration + excluded.total_duration,
+        total_players = total_players + excluded.total_players,
+        total_spectators = total_spectators + excluded.total_spectators
+"""})
+# 批量导入时按天累加汇总
+ADD_GAME_STATS_DAILY = STATEMENTS.register('game_stats_daily.add', """
+    INSERT INTO game_stats_daily
+        (stat_date, game_type, games, total_duration, total_players, total_spectators)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        games = games + VALUES(games),
+        total_duration = total_duration + VALUES(total_duration),
+        total_players = total_players + VALUES(total_players),
+        total_spectators = total_spectators + VALUES(total_spectators)
+""", dialects={'sqlite': """
+    INSERT INTO game_stats_daily
+        (stat_date, game_type, games, total_duration, total_players, total_spectators)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (stat_date, game_type) DO UPDATE SET
+        games = games + excluded.games,
+        total_duration = total_duration + excluded.total_duration,
+        total_players = total_players + excluded.total_players,
+        total_spectators = total_spectators + excluded.total_spectators
+"""})
+SELECT_GAME_STATS = STATEMENTS.register('game_stats_daily.select', _STATS_SELECT)
+SELECT_GAME_STATS_BY_TYPE = STATEMENTS.register('game_stats_daily.select_by_type',
+                                                _STATS_SELECT + ' WHERE game_type = %s')
+
+# 重连时缺失的增量超过此数量则直接发送快照
+SYNC_MAX_DELTAS = 32
+
 
 class GamePlugin(ABC):
     """
@@ -28,22 +116,34 @@ class GamePlugin(ABC):
     提供标准的初始化流程、事件注册和错误处理。
     """
     
-    def __init__(self, app, socketio, db, game_manager, barrage_manager=None):
+    def __init__(self, app, socketio, db, game_manager, barrage_manager=None, event_codec=None,
+                 heartbeat_handler=None, routed=False, game_id=None):
         """
         标准初始化流程
         
         Args:
             app: Flask应用实例
             socketio: SocketIO实例
-            db: 数据库连接管理器
+            db: 存储后端（StorageBackend，或提供 get_connection 的数据库连接管理器）
             game_manager: 游戏房间管理器
             barrage_manager: 弹幕管理器（可选）
+            event_codec: 紧凑事件编码器（可选，未提供时只发送JSON）
+            heartbeat_handler: 心跳处理器（可选，提供时游戏事件会刷新连接存活时间）
+            routed: 为True时事件处理器只登记在 self.handlers 中，由插件加载器统一分发
+            game_id: 游戏ID（运行指标的标签，未提供时使用插件类名）
         """
         self.app = app
         self.socketio = socketio
         self.db = db
+        self.storage = as_backend(db)
         self.game_manager = game_manager
         self.barrage_manager = barrage_manager or BarrageManager()
+        self.event_codec = event_codec
+        self.heartbeat_handler = heartbeat_handler
+        self.broadcaster = Broadcaster(socketio)
+        self.routed = routed
+        self.game_id = game_id or self.__class__.__name__
+        self.handlers = {}  # {事件名: 分发函数}
         
         # 执行标准初始化流程
         try:
@@ -84,45 +184,117 @@ class GamePlugin(ABC):
         注册WebSocket事件
         
         子类必须实现此方法来注册游戏特定的WebSocket事件处理器。
-        使用 @self.socketio.on() 装饰器注册事件。
+        使用 @self.on() 装饰器注册事件，以经过统一的事件分发钩子。
         """
         pass
     
-    def init_db(self):
+    def on(self, event, schema=None):
         """
-        初始化数据库表
+        注册WebSocket事件处理器的装饰器
         
-        子类可以重写此方法来创建游戏特定的数据库表。
-        默认实现创建通用游戏记录表。
+        处理器经过统一分发：先执行 before_event 钩子，再调用处理器，
+        处理耗时和异常按游戏和事件记录到运行指标（metrics.METRICS）。
+        指定了事件数据模式（schemas.Schema）时先验证数据，处理器收到验证后的对象，
+        数据无效时向客户端发送错误，不调用处理器。
+        开启慢事件捕获（profiler.SLOW_EVENTS）时处理器在 cProfile 下运行。
+        由插件加载器管理的插件不直接注册到SocketIO，而是由加载器按游戏路由。
+        处理器可以是协程函数：异步服务器模式下返回协程由事件循环等待，
+        线程模式下在当前线程中运行完成。
         
-        验证需求: 10.2, 10.4, 10.5
+        Args:
+            event: 事件名称
+            schema: 事件数据模式（可选）
+        """
+        stats = METRICS.event(self.game_id, event)
+        
+        def decorator(handler):
+            @wraps(handler)
+            def dispatch(*args):
+                start = time.perf_counter()
+                try:
+                    self.before_event(event)
+                    if schema is not None:
+                        try:
+                            args = (schema.validate(args[0] if args else None),) + args[1:]
+                        except ValidationError as e:
+                            self.emit_error(e.message)
+                            stats.observe(time.perf_counter() - start)
+                            return None
+                    if SLOW_EVENTS.enabled:
+                        result = SLOW_EVENTS.call(self.game_id, event, self._invoke, handler, args)
+                    else:
+                        result = self._invoke(handler, args)
+                    if inspect.iscoroutine(result):
+                        return self._observed(result, stats, start)
+                except Exception:
+                    stats.observe(time.perf_counter() - start, error=True)
+                    raise
+                stats.observe(time.perf_counter() - start)
+                return result
+            
+            self.handlers[event] = dispatch
+            if not self.routed:
+                self.socketio.on(event)(dispatch)
+            return handler
+        return decorator
+    
+    def _invoke(self, handler, args):
+        """调用处理器（线程模式下协程处理器在当前线程中运行完成）"""
+        result = handler(*args)
+        if inspect.iscoroutine(result) and getattr(self.socketio, 'async_mode', None) != 'asgi':
+            return asyncio.run(result)
+        return result
+    
+    @staticmethod
+    async def _observed(coro, stats, start):
+        """等待协程处理器完成并记录耗时"""
+        try:
+            result = await coro
+        except Exception:
+            stats.observe(time.perf_counter() - start, error=True)
+            raise
+        stats.observe(time.perf_counter() - start)
+        return result
+    
+    def before_event(self, event):
         """
-        if not self.db:
-            return
+        入站事件分发钩子
         
-        # 创建通用游戏记录表
-        schema = ['''
-            CREATE TABLE IF NOT EXISTS game_records (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                game_type VARCHAR(32) NOT NULL,
-                room_id VARCHAR(16) NOT NULL,
-                moves TEXT NOT NULL,
-                winner VARCHAR(32),
-                player_count INT DEFAULT 0,
-                spectator_count INT DEFAULT 0,
-                duration INT DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_game_type (game_type),
-                INDEX idx_room_id (room_id),
-                INDEX idx_created_at (created_at)
-            ) CHARSET=utf8mb4 ENGINE=InnoDB;
-        ''']
+        任何游戏事件都视为客户端存活的证明，刷新心跳时间，
+        使活跃客户端无需再发送应用层ping。
         
-        try:
-            self.db.init_tables(schema)
-            logger.info(f"{self.__class__.__name__}: 通用游戏记录表初始化完成")
-        except Exception as e:
-            logger.error(f"{self.__class__.__name__}: 数据库表初始化失败: {e}")
+        Args:
+            event: 事件名称
+        """
+        # 集群中转发来的事件由连接所在的进程刷新心跳
+        if self.heartbeat_handler and event != 'disconnect' and getattr(request, 'remote', False) is not True:
+            self.heartbeat_handler.touch(request.sid)
+    
+    async def run_blocking(self, fn, *args):
+        """
+        在线程池中执行阻塞调用（协程处理器中使用，例如同步的数据库查询）
+        
+        Args:
+            fn: 函数
+            *args: 参数
+        
+        Returns:
+            函数返回值
+        """
+        if getattr(self.socketio, 'async_mode', None) == 'asgi':
+            return await self.socketio.run_blocking(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(None, lambda: fn(*args))
+    
+    def init_db(self):
+        """
+        插件数据库初始化钩子
+        
+        表结构由迁移系统（migrations.py）在启动时统一创建和升级，
+        默认实现不执行任何DDL。插件需要专用表时应在 migrations.py 中追加迁移。
+        
+        验证需求: 10.2, 10.4, 10.5
+        """
+        pass
     
     def handle_error(self, error, context=""):
         """
@@ -175,6 +347,14 @@ class GamePlugin(ABC):
             **kwargs: 其他emit参数
         """
         try:
+            # 协商了二进制编码的接收者单独发送二进制帧，其余接收者仍发送JSON
+            binary_sids = self._binary_recipients(event, room)
+            if binary_sids:
+                self._emit_frame(event, data, binary_sids)
+                if not room:
+                    return
+                kwargs['skip_sid'] = binary_sids
+            
             if room:
                 emit(event, data, room=room, **kwargs)
             else:
@@ -182,6 +362,16 @@ class GamePlugin(ABC):
         except Exception as e:
             logger.error(f"{self.__class__.__name__} - 发送事件失败 {event}: {e}")
     
+    def _binary_recipients(self, event, room):
+        """获取应接收二进制帧的sid列表（未启用编码器或事件无帧布局时为空）"""
+        if not self.event_codec or not self.event_codec.can_encode(event):
+            return []
+        return self.event_codec.binary_recipients(room or request.sid)
+    
+    def _emit_frame(self, event, data, sids):
+        """将事件编码为二进制帧（每次广播只编码一次）并发送给指定sid"""
+        self.broadcaster.emit(event, self.event_codec.encode(event, data), sids=sids)
+    
     def validate_room(self, room_id):
         """
         验证房间是否存在
@@ -243,27 +433,43 @@ class GamePlugin(ABC):
         安全的数据库保存操作（带健康检查和优雅降级）
         
         Args:
-            query: SQL查询语句
+            query: 已注册的 Statement 或SQL语句
             params: 查询参数
         
         Returns:
             bool: 是否保存成功
         """
         if not self.db:
-            logger.debug(f"{self.__class__.__name__}: 数据库不可用，跳过保存")
+            logger.debug("%s: 数据库不可用，跳过保存", self.__class__.__name__)
             return False
         
         # 检查数据库健康状态
         if not self.db.is_healthy():
-            logger.warning(f"{self.__class__.__name__}: 数据库不健康，跳过保存")
+            logger.warning("%s: 数据库不健康，跳过保存", self.__class__.__name__)
+            return False
+        
+        return self.save_batch_to_db([(query, params)])
+    
+    def save_batch_to_db(self, statements):
+        """
+        在同一事务中执行多条写入语句（任一失败则全部回滚）
+        
+        Args:
+            statements: [(Statement或SQL语句, 参数)] 列表
+        
+        Returns:
+            bool: 是否保存成功
+        """
+        if not self.db:
+            logger.debug("%s: 数据库不可用，跳过保存", self.__class__.__name__)
+            return False
+        
+        if not self.db.is_healthy():
+            logger.warning("%s: 数据库不健康，跳过保存", self.__class__.__name__)
             return False
         
         try:
-            with self.db.get_connection() as conn:
-                cur = conn.cursor()
-                cur.execute(query, params)
-                cur.close()
-            return True
+            return self.storage.write(statements)
         except Exception as e:
             logger.error(f"{self.__class__.__name__} - 数据库保存失败: {e}")
             # 数据库操作失败不影响游戏继续运行
@@ -274,31 +480,23 @@ class GamePlugin(ABC):
         安全的数据库查询操作（带健康检查和优雅降级）
         
         Args:
-            query: SQL查询语句
+            query: 已注册的 Statement 或SQL语句
             params: 查询参数（可选）
         
         Returns:
             list: 查询结果，失败返回空列表
         """
         if not self.db:
-            logger.debug(f"{self.__class__.__name__}: 数据库不可用，返回空结果")
+            logger.debug("%s: 数据库不可用，返回空结果", self.__class__.__name__)
             return []
         
         # 检查数据库健康状态
         if not self.db.is_healthy():
-            logger.warning(f"{self.__class__.__name__}: 数据库不健康，返回空结果")
+            logger.warning("%s: 数据库不健康，返回空结果", self.__class__.__name__)
             return []
         
         try:
-            with self.db.get_connection() as conn:
-                cur = conn.cursor()
-                if params:
-                    cur.execute(query, params)
-                else:
-                    cur.execute(query)
-                results = cur.fetchall()
-                cur.close()
-            return results
+            return self.storage.query(query, params)
         except Exception as e:
             logger.error(f"{self.__class__.__name__} - 数据库查询失败: {e}")
             # 数据库操作失败不影响游戏继续运行
@@ -326,14 +524,15 @@ class GamePlugin(ABC):
             self.emit_error('加入观战失败')
             return None
         
-        logger.info(f"{self.__class__.__name__}: 观战者 {spectator_id} 加入房间 {room_id}")
+        logger.info("%s: 观战者 %s 加入房间 %s", self.__class__.__name__, spectator_id, room_id)
         
         # 返回当前游戏状态供子类使用
         return {
             'room_id': room_id,
             'state': room['state'],
             'players': room['players'],
-            'spectators': room['spectators']
+            'spectators': room['spectators'],
+            'version': room.get('version', 0)
         }
     
     def broadcast_to_room(self, event, data, room_id, include_spectators=True):
@@ -350,11 +549,13 @@ class GamePlugin(ABC):
             # 使用room参数会自动发送给房间内所有人（玩家+观战者）
             self.safe_emit(event, data, room=room_id)
         else:
-            # 只发送给玩家
+            # 只发送给玩家：每种编码只序列化一次
             room = self.game_manager.get_room(room_id)
             if room:
-                for player_id in room['players']:
-                    self.socketio.emit(event, data, room=player_id)
+                binary_sids = set(self._binary_recipients(event, room_id))
+                if binary_sids:
+                    self._emit_frame(event, data, [p for p in room['players'] if p in binary_sids])
+                self.broadcaster.emit(event, data, sids=room['players'], exclude=binary_sids)
     
     def is_spectator(self, room_id, user_id):
         """
@@ -393,7 +594,7 @@ class GamePlugin(ABC):
             bool: 是否成功移除
         """
         if self.game_manager.remove_spectator(room_id, spectator_id):
-            logger.info(f"{self.__class__.__name__}: 观战者 {spectator_id} 离开房间 {room_id}")
+            logger.info("%s: 观战者 %s 离开房间 %s", self.__class__.__name__, spectator_id, room_id)
             
             # 通知房间内其他人观战者列表更新
             spectators = self.get_spectator_list(room_id)
@@ -418,6 +619,109 @@ class GamePlugin(ABC):
             **state_data
         }, room=spectator_id)
     
+    def build_snapshot(self, room, player_idx=-1):
+        """
+        构建房间状态快照
+        
+        默认返回状态的浅拷贝。状态中包含私有信息（如手牌）或可以压缩存储的
+        子类应重写此方法。
+        
+        Args:
+            room: 房间数据
+            player_idx: 请求快照的玩家位置（观战者为-1）
+        
+        Returns:
+            dict: 可直接发送给客户端的快照
+        """
+        return dict(room['state'])
+    
+    def record_delta(self, room_id, event, data, target=None):
+        """
+        记录一条状态增量
+        
+        Args:
+            room_id: 房间ID
+            event: 客户端用于应用该增量的事件名称
+            data: 事件数据
+            target: 仅对该位置的玩家可见（None表示公开）
+        
+        Returns:
+            int: 记录后的房间版本号，房间不存在返回None
+        """
+        return self.game_manager.record_delta(room_id, event, data, target)
+    
+    def broadcast_delta(self, event, data, room_id):
+        """
+        记录状态增量并附带版本号广播给房间内所有人
+        
+        Args:
+            event: 事件名称
+            data: 事件数据
+            room_id: 房间ID
+        """
+        version = self.record_delta(room_id, event, data)
+        self.broadcast_to_room(event, {**data, 'version': version}, room_id)
+    
+    def emit_delta_to_player(self, event, data, room_id, player_idx):
+        """
+        记录仅对某个玩家可见的状态增量并单独发送给该玩家
+        
+        Args:
+            event: 事件名称
+            data: 事件数据
+            room_id: 房间ID
+            player_idx: 玩家位置
+        """
+        room = self.game_manager.get_room(room_id)
+        if not room or player_idx >= len(room['players']):
+            return
+        version = self.record_delta(room_id, event, data, target=player_idx)
+        self.socketio.emit(event, {**data, 'version': version}, room=room['players'][player_idx])
+    
+    def sync_since(self, room_id, version, player_idx=-1):
+        """
+        计算客户端从指定版本追上当前状态所需的数据
+        
+        缺失增量较少时只返回增量，否则（或版本未知时）返回完整快照。
+        
+        Args:
+            room_id: 房间ID
+            version: 客户端已知的版本号（None表示无本地状态）
+            player_idx: 玩家位置，用于过滤私有增量
+        
+        Returns:
+            dict: state_sync 事件数据，房间不存在返回None
+        """
+        room = self.game_manager.get_room(room_id)
+        if not room:
+            return None
+        
+        payload = {'room_id': room_id, 'version': room.get('version', 0)}
+        deltas = self.game_manager.get_deltas_since(room_id, version)
+        
+        if deltas is not None and len(deltas) <= SYNC_MAX_DELTAS:
+            payload['deltas'] = [
+                [event, data]
+                for _, event, data, target in deltas
+                if target is None or target == player_idx
+            ]
+        else:
+            payload['snapshot'] = self.build_snapshot(room, player_idx)
+        return payload
+    
+    def emit_state_sync(self, room_id, version, player_idx=-1):
+        """
+        向当前客户端发送一条 state_sync 消息，替代逐条重放历史事件
+        
+        Args:
+            room_id: 房间ID
+            version: 客户端已知的版本号
+            player_idx: 玩家位置
+        """
+        payload = self.sync_since(room_id, version, player_idx)
+        if payload is not None:
+            self.safe_emit('state_sync', payload)
+    
     def prevent_spectator_action(self, room_id, user_id):
         """
         阻止观战者执行游戏操作
@@ -431,7 +735,7 @@ class GamePlugin(ABC):
         """
         if self.is_spectator(room_id, user_id):
             self.emit_error('观战者不能执行游戏操作')
-            logger.warning(f"{self.__class__.__name__}: 观战者 {user_id} 尝试执行游戏操作")
+            logger.warning("%s: 观战者 %s 尝试执行游戏操作", self.__class__.__name__, user_id)
             return True
         return False
     
@@ -472,7 +776,7 @@ class GamePlugin(ABC):
         # 广播弹幕
         self.broadcast_to_room('new_comment', {'comment': filtered_text}, room_id)
         
-        logger.info(f"{self.__class__.__name__}: 用户 {user_id} 在房间 {room_id} 发送弹幕")
+        logger.info("%s: 用户 %s 在房间 %s 发送弹幕", self.__class__.__name__, user_id, room_id)
         return True
     
     def get_barrage_history(self, room_id, limit=50):
@@ -501,11 +805,11 @@ class GamePlugin(ABC):
         """
         标准化游戏记录保存接口
         
-        保存游戏记录到通用游戏记录表。
+        保存游戏记录到通用游戏记录表，并在同一事务中更新每日汇总。
         
         Args:
             room_id: 房间ID
-            moves: 游戏走法/操作记录（将被转换为JSON）
+            moves: 游戏走法/操作记录（按游戏类型编码存储）
             winner: 获胜者标识（可选）
             duration: 游戏时长（秒，可选）
         
@@ -515,42 +819,39 @@ class GamePlugin(ABC):
         验证需求: 10.2, 10.4, 10.5
         """
         if not self.db:
-            logger.debug(f"{self.__class__.__name__}: 数据库不可用，跳过游戏记录保存")
+            logger.debug("%s: 数据库不可用，跳过游戏记录保存", self.__class__.__name__)
             return False
         
         # 检查数据库健康状态
         if not self.db.is_healthy():
-            logger.warning(f"{self.__class__.__name__}: 数据库不健康，跳过游戏记录保存")
+            logger.warning("%s: 数据库不健康，跳过游戏记录保存", self.__class__.__name__)
             return False
         
         try:
-            import json
             from datetime import datetime
             
             # 获取房间信息
             room = self.game_manager.get_room(room_id)
             if not room:
-                logger.warning(f"{self.__class__.__name__}: 房间 {room_id} 不存在，无法保存记录")
+                logger.warning("%s: 房间 %s 不存在，无法保存记录", self.__class__.__name__, room_id)
                 return False
             
             game_type = room.get('game_type', 'unknown')
             player_count = len(room.get('players', []))
             spectator_count = len(room.get('spectators', []))
             
-            # 将走法转换为JSON字符串
-            moves_json = json.dumps(moves, ensure_ascii=False)
+            # 按游戏类型紧凑编码走法（无法紧凑表示时回退为JSON）
+            moves_codec, moves_blob = encode_moves(game_type, moves)
             
-            # 保存到数据库
-            query = """
-                INSERT INTO game_records 
-                (game_type, room_id, moves, winner, player_count, spectator_count, duration, created_at) 
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            params = (game_type, room_id, moves_json, winner, player_count, spectator_count, duration, datetime.now())
+            # 保存到数据库，同一事务中增量更新每日汇总
+            created_at = datetime.now()
+            params = (game_type, room_id, moves_blob, moves_codec, winner, player_count, spectator_count,
+                      duration, created_at)
+            rollup_params = (created_at.date(), game_type, duration, player_count, spectator_count)
             
-            success = self.save_to_db(query, params)
+            success = self.save_batch_to_db([(INSERT_GAME_RECORD, params), (UPSERT_GAME_STATS_DAILY, rollup_params)])
             if success:
-                logger.info(f"{self.__class__.__name__}: 游戏记录已保存 - 房间: {room_id}, 游戏类型: {game_type}")
+                logger.info("%s: 游戏记录已保存 - 房间: %s, 游戏类型: %s", self.__class__.__name__, room_id, game_type)
             return success
             
         except Exception as e:
@@ -574,37 +875,22 @@ class GamePlugin(ABC):
         验证需求: 10.2, 10.4, 10.5
         """
         if not self.db:
-            logger.debug(f"{self.__class__.__name__}: 数据库不可用，返回空结果")
+            logger.debug("%s: 数据库不可用，返回空结果", self.__class__.__name__)
             return []
         
         # 检查数据库健康状态
         if not self.db.is_healthy():
-            logger.warning(f"{self.__class__.__name__}: 数据库不健康，返回空结果")
+            logger.warning("%s: 数据库不健康，返回空结果", self.__class__.__name__)
             return []
         
         try:
             if game_type:
-                query = """
-                    SELECT id, game_type, room_id, moves, winner, 
-                           player_count, spectator_count, duration, created_at
-                    FROM game_records 
-                    WHERE game_type = %s 
-                    ORDER BY created_at DESC 
-                    LIMIT %s OFFSET %s
-                """
-                params = (game_type, limit, offset)
+                query, params = SELECT_GAME_RECORDS_BY_TYPE, (game_type, limit, offset)
             else:
-                query = """
-                    SELECT id, game_type, room_id, moves, winner, 
-                           player_count, spectator_count, duration, created_at
-                    FROM game_records 
-                    ORDER BY created_at DESC 
-                    LIMIT %s OFFSET %s
-                """
-                params = (limit, offset)
+                query, params = SELECT_GAME_RECORDS, (limit, offset)
             
-            results = self.query_from_db(query, params)
-            logger.info(f"{self.__class__.__name__}: 查询到 {len(results)} 条游戏记录")
+            results = [self._decode_record(r) for r in self.query_from_db(query, params)]
+            logger.info("%s: 查询到 %s 条游戏记录", self.__class__.__name__, len(results))
             return results
             
         except Exception as e:
@@ -624,38 +910,47 @@ class GamePlugin(ABC):
         验证需求: 10.2, 10.4, 10.5
         """
         if not self.db:
-            logger.debug(f"{self.__class__.__name__}: 数据库不可用，返回空结果")
+            logger.debug("%s: 数据库不可用，返回空结果", self.__class__.__name__)
             return None
         
         # 检查数据库健康状态
         if not self.db.is_healthy():
-            logger.warning(f"{self.__class__.__name__}: 数据库不健康，返回空结果")
+            logger.warning("%s: 数据库不健康，返回空结果", self.__class__.__name__)
             return None
         
         try:
-            query = """
-                SELECT id, game_type, room_id, moves, winner, 
-                       player_count, spectator_count, duration, created_at
-                FROM game_records 
-                WHERE id = %s
-            """
-            results = self.query_from_db(query, (record_id,))
+            results = self.query_from_db(SELECT_GAME_RECORD_BY_ID, (record_id,))
             
             if results:
-                logger.info(f"{self.__class__.__name__}: 查询到记录 ID={record_id}")
-                return results[0]
+                logger.info("%s: 查询到记录 ID=%s", self.__class__.__name__, record_id)
+                return self._decode_record(results[0])
             else:
-                logger.info(f"{self.__class__.__name__}: 记录 ID={record_id} 不存在")
+                logger.info("%s: 记录 ID=%s 不存在", self.__class__.__name__, record_id)
                 return None
                 
         except Exception as e:
             logger.error(f"{self.__class__.__name__} - 查询游戏记录失败: {e}")
             return None
     
+    def _decode_record(self, record):
+        """将记录中的走法按编码器ID解码为列表（解码失败时保留原值）"""
+        if isinstance(record, (tuple, list)) and len(record) == len(GAME_RECORD_COLUMNS):
+            record = dict(zip(GAME_RECORD_COLUMNS, record))
+        if not isinstance(record, dict) or 'moves' not in record:
+            return record
+        record = dict(record)
+        try:
+            record['moves'] = decode_moves(record.pop('moves_codec', 0), record['moves'])
+        except (ValueError, IndexError, KeyError) as e:
+            logger.error(f"{self.__class__.__name__} - 解码游戏记录 {record.get('id')} 的走法失败: {e}")
+        return record
+    
     def query_game_stats(self, game_type=None):
         """
         查询游戏统计信息
         
+        统计来自每日汇总表，包含已按保留策略删除分区的历史对局。
+        
         Args:
             game_type: 游戏类型（可选，None表示查询所有类型）
         
@@ -665,42 +960,26 @@ class GamePlugin(ABC):
         验证需求: 10.2, 10.4, 10.5
         """
         if not self.db:
-            logger.debug(f"{self.__class__.__name__}: 数据库不可用，返回空结果")
+            logger.debug("%s: 数据库不可用，返回空结果", self.__class__.__name__)
             return {}
         
         # 检查数据库健康状态
         if not self.db.is_healthy():
-            logger.warning(f"{self.__class__.__name__}: 数据库不健康，返回空结果")
+            logger.warning("%s: 数据库不健康，返回空结果", self.__class__.__name__)
             return {}
         
         try:
+            # 从每日汇总表读取，不扫描原始记录
             if game_type:
-                query = """
-                    SELECT 
-                        COUNT(*) as total_games,
-                        AVG(duration) as avg_duration,
-                        AVG(player_count) as avg_players,
-                        AVG(spectator_count) as avg_spectators
-                    FROM game_records 
-                    WHERE game_type = %s
-                """
-                params = (game_type,)
+                query, params = SELECT_GAME_STATS_BY_TYPE, (game_type,)
             else:
-                query = """
-                    SELECT 
-                        COUNT(*) as total_games,
-                        AVG(duration) as avg_duration,
-                        AVG(player_count) as avg_players,
-                        AVG(spectator_count) as avg_spectators
-                    FROM game_records
-                """
-                params = None
+                query, params = SELECT_GAME_STATS, None
             
             results = self.query_from_db(query, params)
             
             if results:
                 stats = results[0]
-                logger.info(f"{self.__class__.__name__}: 查询到统计信息")
+                logger.info("%s: 查询到统计信息", self.__class__.__name__)
                 return stats
             else:
                 return {}
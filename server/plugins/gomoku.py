@@ -3,18 +3,18 @@ from flask_socketio import emit, join_room
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from validators import InputValidator, ValidationError
 from game_manager import RoomStatus
 from plugins.base import GamePlugin
+from schemas import Schema, RoomId, Int, JOIN_ROOM, SEND_COMMENT, REJOIN_ROOM
+
+# 落子坐标（15x15棋盘）
+COORDINATE = dict(min=0, max=14, missing_error="坐标必须是整数", type_error="坐标必须是整数",
+                  min_error="坐标超出范围 (0-14)", max_error="坐标超出范围 (0-14)")
+MAKE_MOVE = Schema('MakeMove', room_id=RoomId(), row=Int(**COORDINATE), col=Int(**COORDINATE))
 
 class GomokuPlugin(GamePlugin):
     """五子棋游戏插件"""
     
-    def init_db(self):
-        """初始化五子棋游戏记录表"""
-        # 使用基类的通用游戏记录表
-        super().init_db()
-    
     def register_routes(self):
         """注册五子棋HTTP路由"""
         @self.app.route('/save_game', methods=['POST'])
@@ -38,8 +38,8 @@ class GomokuPlugin(GamePlugin):
     
     def register_events(self):
         """注册五子棋WebSocket事件"""
-        @self.socketio.on('create_room')
-        def handle_create_room():
+        @self.on('create_room')
+        def handle_create_room(data=None):
             initial_state = {
                 'board': [[0]*15 for _ in range(15)],
                 'current': 1,
@@ -50,19 +50,16 @@ class GomokuPlugin(GamePlugin):
             join_room(room_id)
             self.safe_emit('room_created', {'room_id': room_id, 'color': 1})
         
-        @self.socketio.on('join_room')
+        @self.on('join_room', schema=JOIN_ROOM)
         def handle_join_room(data):
+            room_id = data.room_id
             try:
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
                 room = self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
             except ValueError as e:
                 self.emit_error(str(e))
                 return
             
-            is_spectator = data.get('spectator', False)
+            is_spectator = data.spectator
             
             if is_spectator:
                 # 使用统一的观战者加入处理
@@ -74,7 +71,8 @@ class GomokuPlugin(GamePlugin):
                         'room_id': room_id,
                         'board': spectator_data['state']['board'],
                         'current': spectator_data['state']['current'],
-                        'moves': spectator_data['state']['moves']
+                        'moves': spectator_data['state']['moves'],
+                        'version': spectator_data['version']
                     })
                     # 通知房间内其他人有新观战者
                     self.broadcast_to_room('spectator_list_updated', {
@@ -92,16 +90,12 @@ class GomokuPlugin(GamePlugin):
             self.game_manager.update_room_status(room_id, RoomStatus.PLAYING)
             self.broadcast_to_room('game_start', {}, room_id)
         
-        @self.socketio.on('make_move')
+        @self.on('make_move', schema=MAKE_MOVE)
         def handle_move(data):
+            room_id, r, c = data.room_id, data.row, data.col
             try:
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
-                r, c = InputValidator.validate_coordinates(data.get('row'), data.get('col'))
                 room = self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
-            except (ValueError, TypeError) as e:
+            except ValueError as e:
                 self.emit_error(str(e))
                 return
             
@@ -124,39 +118,31 @@ class GomokuPlugin(GamePlugin):
             state['current'] = 3 - color
             
             # 广播给所有人（包括观战者）
-            self.broadcast_to_room('move_made', {'row': r, 'col': c, 'color': color}, room_id)
+            self.broadcast_delta('move_made', {'row': r, 'col': c, 'color': color}, room_id)
             
             if self.check_win(state['board'], r, c, color):
                 winner = 'black' if color == 1 else 'white'
                 self.game_manager.update_room_status(room_id, RoomStatus.FINISHED)
-                self.broadcast_to_room('game_over', {'winner': color}, room_id)
+                self.broadcast_delta('game_over', {'winner': color}, room_id)
                 # 使用标准化接口保存游戏记录
                 self.save_game_record(room_id, state['moves'], winner)
         
-        @self.socketio.on('send_comment')
+        @self.on('send_comment', schema=SEND_COMMENT)
         def handle_comment(data):
             try:
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
-                comment = InputValidator.sanitize_comment(data.get('comment'))
-                self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
+                self.validate_room(data.room_id)
             except ValueError as e:
                 self.emit_error(str(e))
                 return
             
             # 使用统一的弹幕处理（包含限流和过滤）
-            self.handle_barrage(room_id, request.sid, comment)
+            self.handle_barrage(data.room_id, request.sid, data.comment)
         
-        @self.socketio.on('rejoin_room')
+        @self.on('rejoin_room', schema=REJOIN_ROOM)
         def handle_rejoin_room(data):
+            room_id, version = data.room_id, data.version
             try:
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
                 room = self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
             except ValueError as e:
                 self.emit_error(str(e))
                 return
@@ -169,17 +155,11 @@ class GomokuPlugin(GamePlugin):
             if player_idx != -1:
                 color = player_idx + 1
                 self.safe_emit('room_joined', {'room_id': room_id, 'color': color})
-                self.safe_emit('game_start', {})
                 
-                # 重放所有走法
-                for move in room['state']['moves']:
-                    self.safe_emit('move_made', {
-                        'row': move['row'],
-                        'col': move['col'],
-                        'color': 1 if move['color'] == 'black' else 2
-                    })
+                # 只发送缺失的走法，差距过大时发送压缩棋盘快照
+                self.emit_state_sync(room_id, version, player_idx)
         
-        @self.socketio.on('disconnect')
+        @self.on('disconnect')
         def handle_disconnect():
             for room_id, room in list(self.game_manager.rooms.items()):
                 if request.sid in room['players']:
@@ -191,6 +171,20 @@ class GomokuPlugin(GamePlugin):
                     self.handle_spectator_leave(room_id, request.sid)
                     break
     
+    def build_snapshot(self, room, player_idx=-1):
+        """
+        构建五子棋快照
+        
+        棋盘按行展开为225个字符（'0'空, '1'黑, '2'白），替代逐步重放走法。
+        """
+        state = room['state']
+        return {
+            'board': ''.join(str(cell) for row in state['board'] for cell in row),
+            'current': state['current'],
+            'move_count': len(state['moves']),
+            'finished': room['status'] == RoomStatus.FINISHED
+        }
+    
     def check_win(self, board, r, c, color):
         """
         检查是否获胜（优化版本）
@@ -4,8 +4,17 @@ import random
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from validators import InputValidator, ValidationError
 from plugins.base import GamePlugin
+from schemas import Schema, RoomId, Int, List, Mapping, JOIN_ROOM, ROOM_ACTION, SEND_COMMENT, REJOIN_ROOM
+
+# 叫牌 (需求13.3)
+BID = Schema('Bid', room_id=RoomId(),
+             bid=Int(min=0, max=3, min_error="叫牌值必须在0-3之间", max_error="叫牌值必须在0-3之间"))
+# 出牌：1-20张（顺子等），每张牌包含花色和点数
+CARD = Mapping(('suit', 'value'), type_error="牌格式错误", missing_keys_error="牌缺少必需字段")
+PLAY_CARDS = Schema('PlayCards', room_id=RoomId(),
+                    cards=List(CARD, min_len=1, max_len=20, min_len_error="出牌不能为空",
+                               max_len_error="出牌数量过多"))
 
 class LandlordPlugin(GamePlugin):
     """斗地主游戏插件"""
@@ -16,7 +25,7 @@ class LandlordPlugin(GamePlugin):
     
     def register_events(self):
         """注册斗地主WebSocket事件"""
-        @self.socketio.on('create_room')
+        @self.on('create_room')
         def handle_create_room(data):
             if data.get('game') != 'landlord':
                 return
@@ -26,34 +35,33 @@ class LandlordPlugin(GamePlugin):
                 'cards': {},
                 'bottom_cards': [],
                 'landlord': None,
-                'current_turn': 0,
+                'current_turn': None,
+                'bid_turn': None,
                 'last_play': [],
                 'last_play_position': None,
                 'bids': {},
                 'bid_multiplier': 1,
-                'pass_count': 0
+                'pass_count': 0,
+                'moves': []
             }
             room_id = self.game_manager.create_room('landlord', initial_state)
             self.game_manager.add_player(room_id, request.sid)
             join_room(room_id)
             self.safe_emit('room_created', {'room_id': room_id, 'position': 0})
         
-        @self.socketio.on('join_room')
+        @self.on('join_room', schema=JOIN_ROOM)
         def handle_join_room(data):
-            if data.get('game') != 'landlord':
+            if data.game != 'landlord':
                 return
             
+            room_id = data.room_id
             try:
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
                 room = self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
             except ValueError as e:
                 self.emit_error(str(e))
                 return
             
-            if data.get('spectator'):
+            if data.spectator:
                 # 使用统一的观战者加入处理
                 spectator_data = self.handle_spectator_join(room_id, request.sid)
                 if spectator_data:
@@ -63,7 +71,8 @@ class LandlordPlugin(GamePlugin):
                         'room_id': room_id,
                         'landlord': spectator_data['state']['landlord'],
                         'current_turn': spectator_data['state']['current_turn'],
-                        'last_play': spectator_data['state']['last_play']
+                        'last_play': spectator_data['state']['last_play'],
+                        'version': spectator_data['version']
                     })
                     # 通知房间内其他人有新观战者
                     self.broadcast_to_room('spectator_list_updated', {
@@ -83,19 +92,11 @@ class LandlordPlugin(GamePlugin):
             if len(room['players']) == 3:
                 self.start_game(room_id, room)
         
-        @self.socketio.on('bid')
+        @self.on('bid', schema=BID)
         def handle_bid(data):
+            room_id, bid = data.room_id, data.bid
             try:
-                # 验证房间ID (需求11.2)
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
-                # 验证叫牌值 (需求11.1, 11.3, 需求13.3)
-                bid = InputValidator.validate_dict_field(data, 'bid', required=True, field_type=int)
-                if bid < 0 or bid > 3:
-                    raise ValidationError("叫牌值必须在0-3之间", 'bid', bid)
                 room = self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
             except ValueError as e:
                 self.emit_error(str(e))
                 return
@@ -112,7 +113,7 @@ class LandlordPlugin(GamePlugin):
             room['state']['bids'][player_idx] = bid
             
             # 广播叫牌信息给所有人
-            self.broadcast_to_room('player_bid', {
+            self.broadcast_delta('player_bid', {
                 'position': player_idx,
                 'bid': bid
             }, room_id)
@@ -124,7 +125,7 @@ class LandlordPlugin(GamePlugin):
                 
                 # 如果所有人都不叫(bid=0)，重新开始
                 if max_bid == 0:
-                    self.broadcast_to_room('no_landlord', {}, room_id)
+                    self.broadcast_delta('no_landlord', {}, room_id)
                     return
                 
                 # 确定地主（如果多人叫同样分数，取最先叫的）
@@ -136,54 +137,40 @@ class LandlordPlugin(GamePlugin):
                 
                 room['state']['landlord'] = landlord
                 room['state']['current_turn'] = landlord
+                room['state']['bid_turn'] = None
                 room['state']['bid_multiplier'] = max_bid
                 
                 # 将底牌给地主 (需求13.4)
                 room['state']['cards'][landlord].extend(room['state']['bottom_cards'])
                 
                 # 广播地主确定信息给所有人（包括观战者）
-                self.broadcast_to_room('landlord_decided', {
+                self.broadcast_delta('landlord_decided', {
                     'landlord': landlord,
                     'bottom_cards': room['state']['bottom_cards'],
                     'bid_multiplier': max_bid
                 }, room_id)
                 
                 # 通知地主更新手牌
-                self.socketio.emit('update_cards', {
+                self.emit_delta_to_player('update_cards', {
                     'cards': room['state']['cards'][landlord]
-                }, room=room['players'][landlord])
+                }, room_id, landlord)
                 
                 # 地主先出牌
-                self.broadcast_to_room('play_turn', {
+                self.broadcast_delta('play_turn', {
                     'position': landlord,
                     'can_pass': False
                 }, room_id)
             else:
                 # 下一位玩家叫牌
                 next_player = (player_idx + 1) % 3
-                self.broadcast_to_room('bid_turn', {'position': next_player}, room_id)
+                room['state']['bid_turn'] = next_player
+                self.broadcast_delta('bid_turn', {'position': next_player}, room_id)
         
-        @self.socketio.on('play_cards')
+        @self.on('play_cards', schema=PLAY_CARDS)
         def handle_play_cards(data):
+            room_id, cards = data.room_id, data.cards
             try:
-                # 验证房间ID (需求11.2)
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
-                # 验证出牌数据 (需求11.1, 11.3)
-                cards = InputValidator.validate_dict_field(data, 'cards', required=True, field_type=list)
-                if not cards:
-                    raise ValidationError("出牌不能为空", 'cards', cards)
-                if len(cards) > 20:  # 最多20张牌（顺子等）
-                    raise ValidationError("出牌数量过多", 'cards', cards)
-                # 验证每张牌的格式
-                for card in cards:
-                    if not isinstance(card, dict):
-                        raise ValidationError("牌格式错误", 'cards', card)
-                    if 'suit' not in card or 'value' not in card:
-                        raise ValidationError("牌缺少必需字段", 'cards', card)
                 room = self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
             except ValueError as e:
                 self.emit_error(str(e))
                 return
@@ -215,9 +202,10 @@ class LandlordPlugin(GamePlugin):
                 return
             
             remaining = len(room['state']['cards'][player_idx])
+            room['state'].setdefault('moves', []).append({'position': player_idx, 'cards': cards})
             
             # 广播出牌信息给所有人（包括观战者）
-            self.broadcast_to_room('cards_played', {
+            self.broadcast_delta('cards_played', {
                 'position': player_idx,
                 'cards': cards,
                 'remaining': remaining
@@ -238,12 +226,15 @@ class LandlordPlugin(GamePlugin):
                     multiplier *= 2
                 
                 # 广播游戏结束
-                self.broadcast_to_room('game_over', {
+                self.broadcast_delta('game_over', {
                     'winner': player_idx,
                     'spring': spring,
                     'multiplier': multiplier,
                     'is_landlord': player_idx == room['state']['landlord']
                 }, room_id)
+                # 使用标准化接口保存游戏记录
+                winner = 'landlord' if player_idx == room['state']['landlord'] else 'farmers'
+                self.save_game_record(room_id, room['state']['moves'], winner)
                 return
             
             # 下一位玩家出牌
@@ -252,20 +243,16 @@ class LandlordPlugin(GamePlugin):
             # 判断下一位玩家是否可以pass（如果上家是自己则不能pass）
             can_pass = True
             
-            self.broadcast_to_room('play_turn', {
+            self.broadcast_delta('play_turn', {
                 'position': room['state']['current_turn'],
                 'can_pass': can_pass
             }, room_id)
         
-        @self.socketio.on('pass')
+        @self.on('pass', schema=ROOM_ACTION)
         def handle_pass(data):
+            room_id = data.room_id
             try:
-                # 验证房间ID (需求11.2)
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
                 room = self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
             except ValueError as e:
                 self.emit_error(str(e))
                 return
@@ -285,9 +272,10 @@ class LandlordPlugin(GamePlugin):
             
             # 增加pass计数
             room['state']['pass_count'] = room['state'].get('pass_count', 0) + 1
+            room['state'].setdefault('moves', []).append({'position': player_idx, 'cards': []})
             
             # 广播pass信息
-            self.broadcast_to_room('player_passed', {
+            self.broadcast_delta('player_passed', {
                 'position': player_idx
             }, room_id)
             
@@ -303,35 +291,27 @@ class LandlordPlugin(GamePlugin):
                 room['state']['pass_count'] = 0
                 can_pass = False  # 新一轮开始，不能pass
             
-            self.broadcast_to_room('play_turn', {
+            self.broadcast_delta('play_turn', {
                 'position': next_player,
                 'can_pass': can_pass
             }, room_id)
         
-        @self.socketio.on('send_comment')
+        @self.on('send_comment', schema=SEND_COMMENT)
         def handle_comment(data):
             try:
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
-                comment = InputValidator.sanitize_comment(data.get('comment'))
-                self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
+                self.validate_room(data.room_id)
             except ValueError as e:
                 self.emit_error(str(e))
                 return
             
             # 使用统一的弹幕处理（包含限流和过滤）
-            self.handle_barrage(room_id, request.sid, comment)
+            self.handle_barrage(data.room_id, request.sid, data.comment)
         
-        @self.socketio.on('rejoin_room')
+        @self.on('rejoin_room', schema=REJOIN_ROOM)
         def handle_rejoin_room(data):
+            room_id, version = data.room_id, data.version
             try:
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
                 room = self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
             except ValueError as e:
                 self.emit_error(str(e))
                 return
@@ -342,27 +322,10 @@ class LandlordPlugin(GamePlugin):
             if player_idx != -1:
                 self.safe_emit('room_joined', {'room_id': room_id, 'position': player_idx})
                 
-                # 同步游戏状态
-                if player_idx in room['state']['cards']:
-                    self.safe_emit('game_start', {'cards': room['state']['cards'][player_idx]})
-                
-                if room['state']['landlord'] is not None:
-                    self.safe_emit('landlord_decided', {
-                        'landlord': room['state']['landlord'],
-                        'bottom_cards': room['state']['bottom_cards']
-                    })
-                
-                if room['state']['last_play']:
-                    self.safe_emit('cards_played', {
-                        'position': -1,
-                        'cards': room['state']['last_play'],
-                        'remaining': 0
-                    })
-                
-                if room['state']['current_turn'] is not None:
-                    self.safe_emit('play_turn', {'position': room['state']['current_turn']})
+                # 同步游戏状态（增量或快照，一条消息）
+                self.emit_state_sync(room_id, version, player_idx)
         
-        @self.socketio.on('disconnect')
+        @self.on('disconnect')
         def handle_disconnect():
             for room_id, room in list(self.game_manager.rooms.items()):
                 if request.sid in room['players']:
@@ -384,13 +347,37 @@ class LandlordPlugin(GamePlugin):
         for i in range(3):
             room['state']['cards'][i] = deck[3 + i*17:3 + (i+1)*17]
         
-        for i, player_sid in enumerate(room['players']):
-            self.socketio.emit('game_start', {
+        for i in range(len(room['players'])):
+            self.emit_delta_to_player('game_start', {
                 'cards': room['state']['cards'][i]
-            }, room=player_sid)
+            }, room_id, i)
         
         # 广播给所有人（包括观战者）
-        self.broadcast_to_room('bid_turn', {'position': 0}, room_id)
+        room['state']['bid_turn'] = 0
+        self.broadcast_delta('bid_turn', {'position': 0}, room_id)
+    
+    def build_snapshot(self, room, player_idx=-1):
+        """
+        构建斗地主快照，只包含请求者自己的手牌
+        
+        叫牌阶段（已发牌、地主未确定）current_turn 为 None，bid_turn 为下一位叫牌的玩家。
+        """
+        state = room['state']
+        landlord = state['landlord']
+        bidding = bool(state['cards']) and landlord is None
+        return {
+            'game_started': bool(state['cards']),
+            'bidding': bidding,
+            'bid_turn': state.get('bid_turn') if bidding else None,
+            'cards': state['cards'].get(player_idx, []),
+            'card_counts': {pos: len(cards) for pos, cards in state['cards'].items()},
+            'landlord': landlord,
+            'bottom_cards': state['bottom_cards'] if landlord is not None else [],
+            'bid_multiplier': state['bid_multiplier'],
+            'current_turn': state['current_turn'] if landlord is not None else None,
+            'last_play': state['last_play'],
+            'last_play_position': state['last_play_position']
+        }
     
     def create_deck(self):
         """创建一副牌"""
@@ -1,10 +1,16 @@
+import time
 from flask import request
 from flask_socketio import emit, join_room
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from validators import InputValidator, ValidationError
 from plugins.base import GamePlugin
+from move_codec import RacingTape
+from schemas import Schema, RoomId, Int, JOIN_ROOM, SEND_COMMENT, REJOIN_ROOM
+
+# 分数上报和完赛（合理的分数上限为100万）
+SCORE = Schema('Score', room_id=RoomId(),
+               score=Int(min=0, max=1000000, min_error="分数不能为负数", max_error="分数超出合理范围"))
 
 class RacingPlugin(GamePlugin):
     """极速狂飙游戏插件"""
@@ -15,7 +21,10 @@ class RacingPlugin(GamePlugin):
     
     def register_events(self):
         """注册极速狂飙WebSocket事件"""
-        @self.socketio.on('create_room')
+        # 各房间的分数上报磁带，不放在房间状态中（见 record_move）
+        self.tapes = {}  # {room_id: RacingTape}
+        
+        @self.on('create_room')
         def handle_create_room(data):
             if data.get('game') != 'racing':
                 return
@@ -23,29 +32,27 @@ class RacingPlugin(GamePlugin):
             initial_state = {
                 'players_ready': 0,
                 'scores': {},
-                'game_started': False
+                'game_started': False,
+                'finished': []
             }
             room_id = self.game_manager.create_room('racing', initial_state)
             self.game_manager.add_player(room_id, request.sid)
             join_room(room_id)
             self.safe_emit('room_created', {'room_id': room_id, 'position': 0})
         
-        @self.socketio.on('join_room')
+        @self.on('join_room', schema=JOIN_ROOM)
         def handle_join_room(data):
-            if data.get('game') != 'racing':
+            if data.game != 'racing':
                 return
             
+            room_id = data.room_id
             try:
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
                 room = self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
             except ValueError as e:
                 self.emit_error(str(e))
                 return
             
-            if data.get('spectator'):
+            if data.spectator:
                 # 使用统一的观战者加入处理
                 spectator_data = self.handle_spectator_join(room_id, request.sid)
                 if spectator_data:
@@ -54,7 +61,8 @@ class RacingPlugin(GamePlugin):
                     self.safe_emit('spectator_joined', {
                         'room_id': room_id,
                         'game_started': spectator_data['state']['game_started'],
-                        'scores': spectator_data['state']['scores']
+                        'scores': spectator_data['state']['scores'],
+                        'version': spectator_data['version']
                     })
                     # 通知房间内其他人有新观战者
                     self.broadcast_to_room('spectator_list_updated', {
@@ -73,23 +81,14 @@ class RacingPlugin(GamePlugin):
             self.broadcast_to_room('player_joined', {'players': len(room['players'])}, room_id)
             
             if len(room['players']) == 2:
-                self.broadcast_to_room('game_start', {}, room_id)
+                room['state']['game_started'] = True
+                self.broadcast_delta('game_start', {}, room_id)
         
-        @self.socketio.on('update_score')
+        @self.on('update_score', schema=SCORE)
         def handle_update_score(data):
+            room_id, score = data.room_id, data.score
             try:
-                # 验证房间ID (需求11.2)
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
-                # 验证分数 (需求11.1, 11.3)
-                score = InputValidator.validate_dict_field(data, 'score', required=True, field_type=int)
-                if score < 0:
-                    raise ValidationError("分数不能为负数", 'score', score)
-                if score > 1000000:  # 合理的分数上限
-                    raise ValidationError("分数超出合理范围", 'score', score)
                 room = self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
             except ValueError as e:
                 self.emit_error(str(e))
                 return
@@ -103,28 +102,19 @@ class RacingPlugin(GamePlugin):
                 return
             
             room['state']['scores'][player_idx] = score
+            self.record_move(room_id, room, player_idx, score)
             
             # 广播给所有人（包括观战者）
-            self.broadcast_to_room('score_update', {
+            self.broadcast_delta('score_update', {
                 'position': player_idx,
                 'score': score
             }, room_id)
         
-        @self.socketio.on('game_over')
+        @self.on('game_over', schema=SCORE)
         def handle_game_over(data):
+            room_id, score = data.room_id, data.score
             try:
-                # 验证房间ID (需求11.2)
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
-                # 验证分数 (需求11.1, 11.3)
-                score = InputValidator.validate_dict_field(data, 'score', required=True, field_type=int)
-                if score < 0:
-                    raise ValidationError("分数不能为负数", 'score', score)
-                if score > 1000000:  # 合理的分数上限
-                    raise ValidationError("分数超出合理范围", 'score', score)
                 room = self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
             except ValueError as e:
                 self.emit_error(str(e))
                 return
@@ -137,38 +127,43 @@ class RacingPlugin(GamePlugin):
             if player_idx == -1:
                 return
             
-            room['state']['scores'][player_idx] = score
+            state = room['state']
+            state['scores'][player_idx] = score
+            finished = state.setdefault('finished', [])
+            first_finish = player_idx not in finished
+            if first_finish:
+                finished.append(player_idx)
+                self.record_move(room_id, room, player_idx, score, finished=True)
             
             # 广播给所有人（包括观战者）
-            self.broadcast_to_room('player_finished', {
+            self.broadcast_delta('player_finished', {
                 'position': player_idx,
                 'score': score
             }, room_id)
+            
+            # 全部玩家完赛后保存游戏记录，最高分获胜
+            if first_finish and len(finished) >= len(room['players']):
+                winner = max(state['scores'], key=state['scores'].get)
+                tape = self.tapes.pop(room_id, None)
+                self.save_game_record(room_id, tape if tape is not None else RacingTape(), str(winner),
+                                      duration=int(time.time() - room['created_at']))
         
-        @self.socketio.on('send_comment')
+        @self.on('send_comment', schema=SEND_COMMENT)
         def handle_comment(data):
             try:
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
-                comment = InputValidator.sanitize_comment(data.get('comment'))
-                self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
+                self.validate_room(data.room_id)
             except ValueError as e:
                 self.emit_error(str(e))
                 return
             
             # 使用统一的弹幕处理（包含限流和过滤）
-            self.handle_barrage(room_id, request.sid, comment)
+            self.handle_barrage(data.room_id, request.sid, data.comment)
         
-        @self.socketio.on('rejoin_room')
+        @self.on('rejoin_room', schema=REJOIN_ROOM)
         def handle_rejoin_room(data):
+            room_id, version = data.room_id, data.version
             try:
-                room_id = InputValidator.validate_room_id(data.get('room_id'))
                 room = self.validate_room(room_id)
-            except ValidationError as e:
-                self.emit_error(e.message)
-                return
             except ValueError as e:
                 self.emit_error(str(e))
                 return
@@ -179,22 +174,33 @@ class RacingPlugin(GamePlugin):
             if player_idx != -1:
                 self.safe_emit('room_joined', {'room_id': room_id, 'position': player_idx})
                 
-                # 同步游戏状态
-                if room['state']['game_started']:
-                    self.safe_emit('game_start', {})
-                
-                # 同步分数
-                for pos, score in room['state']['scores'].items():
-                    self.safe_emit('score_update', {'position': pos, 'score': score})
+                # 同步游戏状态和分数（增量或快照，一条消息）
+                self.emit_state_sync(room_id, version, player_idx)
         
-        @self.socketio.on('disconnect')
+        @self.on('disconnect')
         def handle_disconnect():
             for room_id, room in list(self.game_manager.rooms.items()):
                 if request.sid in room['players']:
                     self.safe_emit('player_left', {}, room=room_id)
                     self.game_manager.delete_room(room_id)
+                    self.tapes.pop(room_id, None)
                     break
                 elif request.sid in room['spectators']:
                     # 处理观战者离开
                     self.handle_spectator_leave(room_id, request.sid)
                     break
+    
+    def record_move(self, room_id, room, player_idx, score, finished=False):
+        """
+        记录分数上报（t为距房间创建的毫秒数），供保存对局记录
+        
+        分数上报没有条数上限，追加到本进程的输入磁带（已按 move_codec 格式编码），
+        不写入房间状态：房间状态每次修改都会整体持久化，走法列表放在其中会使写入量随对局时长平方增长。
+        """
+        tape = self.tapes.get(room_id)
+        if tape is None:
+            # 新对局开始时顺带丢弃已不存在的房间（超时清理等）的磁带
+            for stale in [key for key in self.tapes if key not in self.game_manager.rooms]:
+                del self.tapes[stale]
+            tape = self.tapes[room_id] = RacingTape()
+        tape.append(player_idx, score, max(0, int((time.time() - room['created_at']) * 1000)), finished)
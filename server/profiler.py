@@ -0,0 +1,255 @@
+"""
+性能剖析
+
+两种可选的剖析方式（默认都关闭，由 Config 开启）：
+- 采样剖析：后台线程按固定间隔读取所有线程的调用栈（sys._current_frames），
+  按调用栈聚合次数，输出火焰图工具可直接使用的折叠栈格式（"根;...;叶 次数"）。
+  被剖析的代码不插桩，开销只与采样频率和线程数有关。
+- 慢事件捕获：事件处理器在 cProfile 下运行，耗时超过阈值时保存该次调用的完整剖析结果，
+  只保留最近的若干次（环形缓冲）。cProfile 会让处理器变慢数倍，只在排查问题时开启。
+
+结果由 /admin/profile 和 /admin/slow_events 路由提供（app._register_admin_routes，只在设置了 ADMIN_TOKEN 时注册）。
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+# 聚合的不同调用栈数量上限，超出后的样本计入同一个 TRUNCATED 栈
+MAX_STACKS = 20000
+TRUNCATED = '[其他调用栈]'
+
+
+class SamplingProfiler:
+    """采样剖析器"""
+
+    def __init__(self, interval=0.01, max_depth=64):
+        """
+        Args:
+            interval: 采样间隔（秒）
+            max_depth: 每个调用栈保留的最大深度（超出的部分从根部截断）
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()  # {(code对象id, ...): 次数}，从叶到根，输出时才转换为标签
+        self._codes = {}  # {id: code对象}（持有引用，id不会被复用）
+        self.samples = 0
+        self.sampling_time = 0.0  # 采样本身消耗的时间（秒）
+        self.started_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动采样线程（已在运行时不做任何事）"""
+        if self.running:
+            return
+        self._stop.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        logger.info(f"采样剖析已启动: 间隔 {self.interval * 1000:.0f}ms")
+
+    def stop(self):
+        """停止采样（保留已聚合的结果）"""
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        logger.info(f"采样剖析已停止: {self.samples} 次采样")
+
+    def reset(self):
+        """清空聚合结果"""
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+            self.sampling_time = 0.0
+            self.started_at = time.time() if self.running else None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(exclude=own)
+
+    def sample(self, exclude=None):
+        """采集一次所有线程（exclude 指定的线程除外）的调用栈"""
+        start = time.perf_counter()
+        stacks = [self._stack(frame) for ident, frame in sys._current_frames().items() if ident != exclude]
+        with self._lock:
+            for stack in stacks:
+                if stack not in self.stacks and len(self.stacks) >= MAX_STACKS:
+                    stack = (None,)
+                self.stacks[stack] += 1
+            self.samples += 1
+            self.sampling_time += time.perf_counter() - start
+
+    def _stack(self, frame):
+        # code对象的哈希需要计算其内容，聚合时使用id
+        codes = self._codes
+        ids = []
+        while frame is not None and len(ids) < self.max_depth:
+            code = frame.f_code
+            key = id(code)
+            if key not in codes:
+                codes[key] = code
+            ids.append(key)
+            frame = frame.f_back
+        return tuple(ids)
+
+    def _label(self, key):
+        code = self._codes.get(key)
+        if code is None:
+            return TRUNCATED
+        return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+    def collapsed(self):
+        """
+        折叠栈格式（flamegraph.pl / speedscope 可直接读取）
+
+        Returns:
+            str: 每行 "根;...;叶 次数"，按次数降序
+        """
+        with self._lock:
+            items = self.stacks.most_common()
+        labels = {}
+        lines = []
+        for stack, count in items:
+            for key in stack:
+                if key not in labels:
+                    labels[key] = self._label(key)
+            lines.append(f"{';'.join(labels[key] for key in reversed(stack))} {count}\n")
+        return ''.join(lines)
+
+    def profile_for(self, seconds):
+        """
+        临时采样指定时间（采样线程未运行时使用，不影响持续采样的结果）
+
+        Returns:
+            str: 折叠栈格式
+        """
+        profiler = SamplingProfiler(self.interval, self.max_depth)
+        profiler.start()
+        time.sleep(seconds)
+        profiler.stop()
+        return profiler.collapsed()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'running': self.running,
+                'interval_ms': self.interval * 1000,
+                'samples': self.samples,
+                'stacks': len(self.stacks),
+                'sampling_ms': round(self.sampling_time * 1000, 1),
+                'started_at': self.started_at,
+            }
+
+
+class SlowEventRecorder:
+    """慢事件捕获：在 cProfile 下运行处理器，保存超过阈值的调用的剖析结果"""
+
+    def __init__(self, threshold=None, capacity=20, limit=40):
+        """
+        Args:
+            threshold: 耗时阈值（秒），None 表示关闭
+            capacity: 保留的捕获数
+            limit: 每个捕获保留的函数行数（按累计耗时排序）
+        """
+        self.threshold = threshold
+        self.limit = limit
+        self.captures = deque(maxlen=capacity)
+        self.profiled = 0
+        self.skipped = 0  # 其他剖析工具正在运行而未能剖析的调用数
+
+    @property
+    def enabled(self):
+        return self.threshold is not None
+
+    def configure(self, threshold, capacity=None):
+        """
+        设置阈值和缓冲大小（保留已有的捕获）
+
+        Args:
+            threshold: 耗时阈值（秒），None 或 0 表示关闭
+            capacity: 保留的捕获数
+        """
+        self.threshold = threshold or None
+        if capacity is not None and capacity != self.captures.maxlen:
+            self.captures = deque(self.captures, maxlen=capacity)
+
+    def call(self, game, event, fn, *args):
+        """
+        在 cProfile 下调用函数
+
+        Args:
+            game: 游戏ID
+            event: 事件名称
+            fn: 处理函数
+            *args: 参数
+
+        Returns:
+            函数返回值（异常原样抛出，超过阈值时同样保存剖析结果）
+        """
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 同一时间只能有一个剖析工具（例如另一个线程中的慢事件剖析，Python 3.12+）
+            self.skipped += 1
+            return fn(*args)
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - start
+            self.profiled += 1
+            if elapsed >= self.threshold:
+                self._capture(game, event, elapsed, profile)
+
+    def _capture(self, game, event, elapsed, profile):
+        output = io.StringIO()
+        pstats.Stats(profile, stream=output).sort_stats('cumulative').print_stats(self.limit)
+        self.captures.append({
+            'game': game,
+            'event': event,
+            'ms': round(elapsed * 1000, 2),
+            'time': time.time(),
+            'profile': output.getvalue(),
+        })
+        logger.warning("慢事件 %s.%s: %.1fms，已保存剖析结果", game, event, elapsed * 1000)
+
+    def get_captures(self):
+        """
+        Returns:
+            list: 捕获列表（最新的在前）
+        """
+        return list(reversed(self.captures))
+
+    def get_stats(self):
+        return {
+            'enabled': self.enabled,
+            'threshold_ms': self.threshold * 1000 if self.enabled else None,
+            'captures': len(self.captures),
+            'capacity': self.captures.maxlen,
+            'profiled': self.profiled,
+            'skipped': self.skipped,
+        }
+
+
+# 全局剖析器（main 按 Config 配置和启动）
+SAMPLER = SamplingProfiler()
+SLOW_EVENTS = SlowEventRecorder()
@@ -0,0 +1,342 @@
+"""
+游戏记录批量导出/导入工具
+
+导出使用流式游标（MySQL为无缓冲的 SSCursor）逐批读取 game_records，
+按固定行数切分写入分块文件，内存占用与表大小无关：
+- ndjson：每行一条记录，走法解码为JSON列表，便于其他工具处理
+- columnar：按列压缩存储的分块文件，走法保留原始编码字节，导入时无需重新编码
+  （一个分块在内存中整体组装，内存占用由 --chunk-rows 决定）
+
+导入使用多行 INSERT 分批写入，并按天累加 game_stats_daily 汇总。
+
+用法:
+    python records_cli.py export 输出目录 [--format ndjson|columnar] [--chunk-rows N] [--game-type 类型]
+    python records_cli.py import 目录或文件... [--batch-rows N] [--keep-ids]
+"""
+
+import argparse
+import base64
+import glob
+import json
+import logging
+import os
+import struct
+import sys
+import time
+import zlib
+from datetime import datetime
+from functools import lru_cache
+
+from config import Config
+from move_codec import encode_moves, decode_moves
+from plugins.base import GAME_RECORD_COLUMNS, ADD_GAME_STATS_DAILY
+from statements import STATEMENTS
+
+logger = logging.getLogger(__name__)
+
+EXPORT_RECORDS = STATEMENTS.register('game_records.export', f"""
+    SELECT {', '.join(GAME_RECORD_COLUMNS)} FROM game_records ORDER BY id
+""")
+EXPORT_RECORDS_BY_TYPE = STATEMENTS.register('game_records.export_by_type', f"""
+    SELECT {', '.join(GAME_RECORD_COLUMNS)} FROM game_records WHERE game_type = %s ORDER BY id
+""")
+
+FORMATS = {'ndjson': '.ndjson', 'columnar': '.gcol'}
+COLUMNAR_MAGIC = b'GHCOL1\n'
+# 按列存储时以原始字节存储的列，其余列按JSON数组存储
+BYTES_COLUMNS = ('moves',)
+
+DEFAULT_CHUNK_ROWS = 100000
+DEFAULT_BATCH_ROWS = 1000
+
+
+def _timestamp(value):
+    """datetime（MySQL）和字符串（SQLite）统一为 'YYYY-MM-DD HH:MM:SS'"""
+    if isinstance(value, datetime):
+        return value.isoformat(' ', 'seconds')
+    return str(value)[:19] if value is not None else None
+
+
+class NdjsonChunkWriter:
+    """NDJSON分块：每行一条记录，走法解码为列表（无法解码时以base64保留原始字节）"""
+
+    extension = FORMATS['ndjson']
+
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, row):
+        record = dict(zip(GAME_RECORD_COLUMNS, row))
+        record['created_at'] = _timestamp(record['created_at'])
+        codec_id = record.pop('moves_codec')
+        moves = record['moves']
+        try:
+            record['moves'] = decode_moves(codec_id, moves)
+        except (ValueError, IndexError, KeyError):
+            record['moves'] = None
+            raw = moves.encode('utf-8') if isinstance(moves, str) else bytes(moves)
+            record['moves_raw'] = base64.b64encode(raw).decode()
+            record['moves_codec'] = codec_id
+        self.file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self.file.write('\n')
+
+    def close(self):
+        self.file.close()
+
+
+class ColumnarChunkWriter:
+    """
+    按列压缩的分块文件
+
+    格式: 魔数、一行JSON头（行数、各列名称/类型/压缩后长度），随后依次为各列的zlib压缩块。
+    bytes列的块为 uint32 偏移数组加拼接的原始字节，其余列为JSON数组。
+    """
+
+    extension = FORMATS['columnar']
+
+    def __init__(self, path):
+        self.path = path
+        self.columns = {name: [] for name in GAME_RECORD_COLUMNS}
+
+    def write(self, row):
+        for name, value in zip(GAME_RECORD_COLUMNS, row):
+            if name == 'created_at':
+                value = _timestamp(value)
+            elif name in BYTES_COLUMNS and isinstance(value, str):
+                value = value.encode('utf-8')
+            self.columns[name].append(value)
+
+    def close(self):
+        blocks = []
+        header = {'rows': len(self.columns['id']), 'columns': []}
+        for name in GAME_RECORD_COLUMNS:
+            values = self.columns[name]
+            if name in BYTES_COLUMNS:
+                offsets = [0]
+                for value in values:
+                    offsets.append(offsets[-1] + len(value))
+                raw = struct.pack(f'<{len(offsets)}I', *offsets) + b''.join(bytes(v) for v in values)
+                kind = 'bytes'
+            else:
+                raw = json.dumps(values, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                kind = 'json'
+            block = zlib.compress(raw, 6)
+            blocks.append(block)
+            header['columns'].append({'name': name, 'type': kind, 'length': len(block)})
+        with open(self.path, 'wb') as f:
+            f.write(COLUMNAR_MAGIC)
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            for block in blocks:
+                f.write(block)
+
+
+WRITERS = {'ndjson': NdjsonChunkWriter, 'columnar': ColumnarChunkWriter}
+
+
+def read_ndjson(path):
+    """
+    读取NDJSON分块
+
+    Yields:
+        dict: 记录（moves 为原始编码字节，带 moves_codec）
+    """
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get('moves') is None and 'moves_raw' in record:
+                record['moves'] = base64.b64decode(record.pop('moves_raw'))
+            else:
+                record['moves_codec'], record['moves'] = encode_moves(record['game_type'], record['moves'])
+            yield record
+
+
+def read_columnar(path):
+    """读取按列存储的分块"""
+    with open(path, 'rb') as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f'{path} 不是按列存储的记录文件')
+        header = json.loads(f.readline())
+        rows = header['rows']
+        columns = {}
+        for column in header['columns']:
+            raw = zlib.decompress(f.read(column['length']))
+            if column['type'] == 'bytes':
+                offsets = struct.unpack_from(f'<{rows + 1}I', raw)
+                data = memoryview(raw)[(rows + 1) * 4:]
+                columns[column['name']] = [bytes(data[offsets[i]:offsets[i + 1]]) for i in range(rows)]
+            else:
+                columns[column['name']] = json.loads(raw)
+    names = list(columns)
+    for values in zip(*(columns[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+READERS = {FORMATS['ndjson']: read_ndjson, FORMATS['columnar']: read_columnar}
+
+
+def export_records(storage, out_dir, fmt='ndjson', chunk_rows=DEFAULT_CHUNK_ROWS, game_type=None,
+                   prefix='game_records'):
+    """
+    流式导出游戏记录到分块文件
+
+    Returns:
+        dict: {'rows': 行数, 'files': 文件列表, 'seconds': 耗时}
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    writer_class = WRITERS[fmt]
+    if game_type:
+        rows = storage.stream(EXPORT_RECORDS_BY_TYPE, (game_type,))
+    else:
+        rows = storage.stream(EXPORT_RECORDS)
+
+    start = time.perf_counter()
+    files = []
+    count = 0
+    writer = None
+    try:
+        for row in rows:
+            if writer is None:
+                path = os.path.join(out_dir, f'{prefix}-{len(files):05d}{writer_class.extension}')
+                writer = writer_class(path)
+                files.append(path)
+                chunk_count = 0
+            writer.write(row)
+            count += 1
+            chunk_count += 1
+            if chunk_count >= chunk_rows:
+                writer.close()
+                writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+    return {'rows': count, 'files': files, 'seconds': time.perf_counter() - start}
+
+
+@lru_cache(maxsize=8)
+def _multi_row_insert(columns, rows):
+    """rows 行的多行 INSERT"""
+    placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    return f"INSERT INTO game_records ({', '.join(columns)}) VALUES {', '.join([placeholders] * rows)}"
+
+
+def _record_files(paths):
+    """展开目录为其中的分块文件（按文件名排序）"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for extension in READERS:
+                files.extend(glob.glob(os.path.join(path, f'*{extension}')))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def import_records(storage, paths, batch_rows=DEFAULT_BATCH_ROWS, keep_ids=False):
+    """
+    从分块文件批量导入游戏记录
+
+    每批一条多行 INSERT；按 (日期, 游戏类型) 累加的汇总在全部记录写入后一次性更新。
+
+    Returns:
+        dict: {'rows': 行数, 'files': 文件数, 'seconds': 耗时}
+    """
+    columns = tuple(c for c in GAME_RECORD_COLUMNS if keep_ids or c != 'id')
+    rollups = {}
+    batch = []
+    count = 0
+    files = _record_files(paths)
+    start = time.perf_counter()
+
+    def flush():
+        params = [value for record in batch for value in record]
+        storage.write([(_multi_row_insert(columns, len(batch)), params)])
+        batch.clear()
+
+    for path in files:
+        reader = READERS.get(os.path.splitext(path)[1])
+        if reader is None:
+            logger.warning(f"跳过未知格式的文件: {path}")
+            continue
+        for record in reader(path):
+            batch.append(tuple(record.get(c) for c in columns))
+            key = (record['created_at'][:10], record['game_type'])
+            totals = rollups.setdefault(key, [0, 0, 0, 0])
+            totals[0] += 1
+            totals[1] += record.get('duration') or 0
+            totals[2] += record.get('player_count') or 0
+            totals[3] += record.get('spectator_count') or 0
+            count += 1
+            if len(batch) >= batch_rows:
+                flush()
+    if batch:
+        flush()
+    if rollups:
+        storage.write([(ADD_GAME_STATS_DAILY, key + tuple(totals)) for key, totals in rollups.items()])
+    if hasattr(storage, 'flush'):
+        storage.flush()
+    return {'rows': count, 'files': len(files), 'seconds': time.perf_counter() - start}
+
+
+def open_storage(backend):
+    """打开存储后端（不启动分区维护等后台任务）"""
+    if backend in ('mysql', 'auto'):
+        from database import Database
+        from migrations import MigrationRunner
+        try:
+            db = Database(Config.MYSQL_CONFIG, pool_size=1, max_overflow=1)
+            if db.health_check():
+                MigrationRunner(db).migrate()
+                return db
+            db.close()
+        except Exception as e:
+            logger.warning(f"MySQL不可用: {e}")
+        if backend == 'mysql':
+            return None
+    from sqlite_storage import SQLiteBackend
+    storage = SQLiteBackend(Config.SQLITE_PATH, wait_for_commit=True)
+    storage.migrate()
+    return storage
+
+
+def _report(action, result):
+    rate = result['rows'] / result['seconds'] if result['seconds'] else 0
+    print(f"{action} {result['rows']} 行，{result['seconds']:.2f}s，{rate:.0f} 行/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='游戏记录批量导出/导入')
+    parser.add_argument('--backend', choices=('auto', 'mysql', 'sqlite'), default=Config.STORAGE_BACKEND)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help='流式导出到分块文件')
+    export_parser.add_argument('out_dir')
+    export_parser.add_argument('--format', choices=sorted(WRITERS), default='ndjson')
+    export_parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    export_parser.add_argument('--game-type')
+
+    import_parser = commands.add_parser('import', help='从分块文件批量导入')
+    import_parser.add_argument('paths', nargs='+')
+    import_parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS)
+    import_parser.add_argument('--keep-ids', action='store_true', help='保留原记录ID（目标表为空时使用）')
+
+    args = parser.parse_args(argv)
+    storage = open_storage(args.backend)
+    if storage is None:
+        print('存储后端不可用', file=sys.stderr)
+        return 1
+    try:
+        if args.command == 'export':
+            result = export_records(storage, args.out_dir, args.format, args.chunk_rows, args.game_type)
+            _report('导出', result)
+            print(f"写入 {len(result['files'])} 个文件到 {args.out_dir}")
+        else:
+            _report('导入', import_records(storage, args.paths, args.batch_rows, args.keep_ids))
+    finally:
+        storage.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
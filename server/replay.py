@@ -0,0 +1,375 @@
+"""
+对局回放模块
+
+按ID读取一条已结束对局的记录，把走法按节奏推送给观看回放的连接：
+- ReplayStore：只按主键读取单条记录，不加载记录列表；走法按编码器边迭代边解码，
+  完整播放过一次的对局把解码结果放入LRU缓存，热门回放不再查库和解码
+- ReplayScheduler：每个回放是一个生成器，yield 到下一步的间隔，
+  单个后台任务按到期时间驱动所有回放，倍速在播放中随时可调
+- ReplayHandler：replay_start / replay_speed / replay_stop 事件
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from flask import request
+
+from move_codec import iter_moves
+from statements import STATEMENTS
+from storage import as_backend
+
+logger = logging.getLogger(__name__)
+
+SELECT_REPLAY = STATEMENTS.register('game_records.select_replay', """
+    SELECT id, game_type, moves, moves_codec, winner, player_count, duration, created_at
+    FROM game_records WHERE id = %s
+""")
+
+# 处理器中同步读取记录的事件（异步服务器模式下在线程池中执行）
+BLOCKING_EVENTS = ('replay_start',)
+_REPLAY_COLUMNS = ('id', 'game_type', 'moves', 'moves_codec', 'winner', 'player_count', 'duration', 'created_at')
+
+# 倍速范围
+MIN_SPEED = 0.25
+MAX_SPEED = 16.0
+
+# 带时间戳的走法（极速狂飙）两步之间的最大间隔（秒，1倍速），跳过长时间无操作的片段
+MAX_MOVE_GAP = 3.0
+
+# 调度器后台任务最长的休眠时间（秒），新回放最多等待这么久开始
+IDLE_INTERVAL = 0.2
+
+
+class Replay:
+    """一局回放：记录信息和走法（第一次完整迭代后保存为元组，之后不再解码）"""
+
+    def __init__(self, info, codec_id, payload, on_decoded=None):
+        """
+        Args:
+            info: 记录信息（发送给客户端）
+            codec_id: 走法编码器ID
+            payload: 编码后的走法
+            on_decoded: 完整解码后的回调，参数为本回放
+        """
+        self.info = info
+        self.moves = None
+        self._codec_id = codec_id
+        self._payload = payload
+        self._on_decoded = on_decoded
+
+    def __iter__(self):
+        if self.moves is not None:
+            return iter(self.moves)
+        return self._decode()
+
+    def _decode(self):
+        decoded = []
+        for move in iter_moves(self._codec_id, self._payload):
+            decoded.append(move)
+            yield move
+        if self.moves is None:
+            self.moves = tuple(decoded)
+            self._payload = None
+            if self._on_decoded:
+                self._on_decoded(self)
+
+
+class ReplayStore:
+    """按ID读取回放，缓存已解码的走法"""
+
+    def __init__(self, db, cache_size=128):
+        """
+        Args:
+            db: 存储后端（None时回放不可用）
+            cache_size: 缓存的对局数，0表示不缓存
+        """
+        self.db = db
+        self.storage = as_backend(db)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # {record_id: Replay}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, record_id):
+        """
+        获取回放
+
+        Returns:
+            Replay: 记录不存在或存储不可用时返回None
+        """
+        with self._lock:
+            replay = self._cache.get(record_id)
+            if replay is not None:
+                self._cache.move_to_end(record_id)
+                self.hits += 1
+                return replay
+            self.misses += 1
+
+        if not self.db or not self.db.is_healthy():
+            logger.warning("存储不可用，无法读取回放 %s", record_id)
+            return None
+        try:
+            rows = self.storage.query(SELECT_REPLAY, (record_id,))
+        except Exception as e:
+            logger.error(f"读取回放 {record_id} 失败: {e}")
+            return None
+        if not rows:
+            return None
+
+        row = rows[0]
+        if not isinstance(row, dict):
+            row = dict(zip(_REPLAY_COLUMNS, row))
+        created_at = row['created_at']
+        info = {
+            'record_id': row['id'],
+            'game_type': row['game_type'],
+            'winner': row['winner'],
+            'player_count': row['player_count'],
+            'duration': row['duration'],
+            'created_at': created_at.isoformat(' ', 'seconds') if isinstance(created_at, datetime) else created_at
+        }
+        return Replay(info, row['moves_codec'], row['moves'], self._cache_replay)
+
+    def _cache_replay(self, replay):
+        """完整解码的回放放入缓存，超出容量时淘汰最久未使用的"""
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[replay.info['record_id']] = replay
+            self._cache.move_to_end(replay.info['record_id'])
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def get_stats(self):
+        """缓存统计"""
+        return {'cached': len(self._cache), 'capacity': self.cache_size, 'hits': self.hits, 'misses': self.misses}
+
+
+class _Task:
+    """调度中的回放"""
+
+    __slots__ = ('generator', 'speed', 'seq')
+
+    def __init__(self, generator, speed, seq):
+        self.generator = generator
+        self.speed = speed
+        self.seq = seq
+
+
+def clamp_speed(speed):
+    """倍速限制在 [MIN_SPEED, MAX_SPEED]，无效值视为1倍速"""
+    if not isinstance(speed, (int, float)) or isinstance(speed, bool) or speed != speed:
+        return 1.0
+    return min(max(float(speed), MIN_SPEED), MAX_SPEED)
+
+
+class ReplayScheduler:
+    """
+    生成器驱动的回放调度器
+
+    回放生成器每次被推进时发送若干步，然后 yield 到下一步的间隔（1倍速，秒）。
+    所有回放按到期时间放在一个堆里，由同一个后台任务推进，不为每个观看者创建线程。
+    """
+
+    def __init__(self, socketio=None, clock=time.monotonic):
+        """
+        Args:
+            socketio: SocketIO实例（用于启动后台任务）
+            clock: 单调时钟
+        """
+        self.socketio = socketio
+        self.clock = clock
+        self._heap = []   # [(到期时间, 序号, key)]，序号与任务不一致的条目已失效
+        self._tasks = {}  # {key: _Task}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def schedule(self, key, generator, speed=1.0):
+        """开始回放（同一key已有回放时替换）"""
+        with self._lock:
+            task = self._tasks[key] = _Task(generator, clamp_speed(speed), next(self._seq))
+            heapq.heappush(self._heap, (self.clock(), task.seq, key))
+
+    def set_speed(self, key, speed):
+        """调整倍速（从下一步起生效）"""
+        task = self._tasks.get(key)
+        if task is None:
+            return False
+        task.speed = clamp_speed(speed)
+        return True
+
+    def cancel(self, key):
+        """停止回放"""
+        with self._lock:
+            return self._tasks.pop(key, None) is not None
+
+    def __contains__(self, key):
+        return key in self._tasks
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def run_pending(self, now=None):
+        """
+        推进所有已到期的回放
+
+        Returns:
+            int: 推进的次数
+        """
+        now = self.clock() if now is None else now
+        ran = 0
+        while True:
+            with self._lock:
+                if not self._heap or self._heap[0][0] > now:
+                    return ran
+                due, seq, key = heapq.heappop(self._heap)
+                task = self._tasks.get(key)
+                if task is None or task.seq != seq:
+                    continue
+
+            ran += 1
+            try:
+                delay = next(task.generator)
+            except StopIteration:
+                delay = None
+            except Exception as e:
+                logger.error(f"回放 {key} 出错: {e}")
+                delay = None
+
+            with self._lock:
+                if self._tasks.get(key) is not task:
+                    continue
+                if delay is None:
+                    del self._tasks[key]
+                    continue
+                # 从上一步的到期时间累加，不因调度延迟而漂移
+                task.seq = next(self._seq)
+                heapq.heappush(self._heap, (due + delay / task.speed, task.seq, key))
+
+    def next_delay(self, now=None):
+        """距离下一个回放到期的秒数，没有回放时返回None"""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(self._heap[0][0] - (self.clock() if now is None else now), 0.0)
+
+    def start(self):
+        """启动后台调度任务"""
+        if self._started:
+            return
+        self._started = True
+
+        def scheduler_loop():
+            while True:
+                try:
+                    self.run_pending()
+                except Exception as e:
+                    logger.error(f"回放调度任务出错: {e}")
+                delay = self.next_delay()
+                self.socketio.sleep(IDLE_INTERVAL if delay is None else min(delay, IDLE_INTERVAL))
+
+        self.socketio.start_background_task(scheduler_loop)
+        logger.info("回放调度任务已启动")
+
+    def get_stats(self):
+        return {'active': len(self._tasks)}
+
+
+class ReplayHandler:
+    """回放事件处理器"""
+
+    def __init__(self, socketio, store, scheduler, move_interval=0.8, namespace='/'):
+        """
+        Args:
+            socketio: SocketIO实例
+            store: ReplayStore
+            scheduler: ReplayScheduler
+            move_interval: 1倍速下没有时间戳的走法每步间隔（秒）
+            namespace: 命名空间
+        """
+        self.socketio = socketio
+        self.store = store
+        self.scheduler = scheduler
+        self.move_interval = move_interval
+        self.namespace = namespace
+
+    def register_events(self):
+        """注册回放事件"""
+
+        @self.socketio.on('replay_start')
+        def handle_replay_start(data):
+            """开始观看回放: {record_id, speed}"""
+            self.start(request.sid, data)
+
+        @self.socketio.on('replay_speed')
+        def handle_replay_speed(data):
+            """调整倍速: {speed}"""
+            speed = data.get('speed') if isinstance(data, dict) else None
+            if self.scheduler.set_speed(request.sid, speed):
+                self._send(request.sid, 'replay_speed', {'speed': clamp_speed(speed)})
+
+        @self.socketio.on('replay_stop')
+        def handle_replay_stop(data=None):
+            """停止回放"""
+            self.scheduler.cancel(request.sid)
+
+    def start(self, sid, data):
+        """
+        为连接开始一个回放（替换该连接正在播放的回放）
+
+        Returns:
+            bool: 是否开始
+        """
+        record_id = data.get('record_id') if isinstance(data, dict) else None
+        if not isinstance(record_id, int) or isinstance(record_id, bool) or record_id <= 0:
+            self._send(sid, 'error', {'msg': '无效的回放记录ID'})
+            return False
+
+        replay = self.store.get(record_id)
+        if replay is None:
+            self._send(sid, 'error', {'msg': '回放不存在'})
+            return False
+
+        self.scheduler.schedule(sid, self.playback(sid, replay), data.get('speed', 1.0))
+        logger.info("客户端 %s 开始观看回放 %s", sid, record_id)
+        return True
+
+    def playback(self, sid, replay):
+        """
+        回放生成器：发送开始信息和每一步走法，每步之前 yield 与上一步的间隔
+
+        连接断开后停止，剩余的走法不再解码。
+        """
+        record_id = replay.info['record_id']
+        self._send(sid, 'replay_started', replay.info)
+        count = 0
+        last_t = None
+        for move in replay:
+            t = move.get('t') if isinstance(move, dict) else None
+            if isinstance(t, int):
+                gap = 0 if last_t is None else min(max(t - last_t, 0) / 1000, MAX_MOVE_GAP)
+                last_t = t
+            else:
+                gap = self.move_interval if count else 0
+            if gap:
+                yield gap
+            if not self._connected(sid):
+                return
+            self._send(sid, 'replay_move', {'record_id': record_id, 'index': count, 'move': move})
+            count += 1
+        self._send(sid, 'replay_finished', {'record_id': record_id, 'moves': count})
+
+    def _connected(self, sid):
+        try:
+            return self.socketio.server.manager.is_connected(sid, self.namespace)
+        except Exception:
+            return False
+
+    def _send(self, sid, event, data):
+        self.socketio.emit(event, data, room=sid, namespace=self.namespace)
@@ -0,0 +1,656 @@
+"""
+Redis协议（RESP）客户端和本地代理
+
+不依赖 redis 包，直接按RESP2协议与Redis兼容的服务通信：
+- RespClient：请求/应答命令，支持流水线
+- RespSubscriber：订阅频道并逐条读取消息（独占一个连接）
+- RespBroker：本地的Redis协议服务，实现发布/订阅、哈希键、过期和乐观事务命令，
+  用于单机多进程部署和测试（生产环境可直接换成Redis）
+"""
+
+import fnmatch
+import itertools
+import logging
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 6379
+
+
+class RespError(Exception):
+    """服务端返回的错误应答"""
+
+
+def encode_command(*args):
+    """将命令编码为RESP数组（参数为 bytes/str/数字）"""
+    out = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode('utf-8')
+        elif isinstance(arg, (int, float)):
+            arg = str(arg).encode()
+        out.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(out)
+
+
+def encode_reply(value):
+    """将应答编码为RESP（服务端使用）"""
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, RespError):
+        return b'-%s\r\n' % str(value).encode('utf-8')
+    if isinstance(value, bool):
+        return b':%d\r\n' % int(value)
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, str):
+        if '\r' not in value and '\n' not in value and value.isupper():
+            return b'+%s\r\n' % value.encode()
+        value = value.encode('utf-8')
+    if isinstance(value, (bytes, bytearray)):
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+    if isinstance(value, (list, tuple)):
+        return b'*%d\r\n' % len(value) + b''.join(encode_reply(v) for v in value)
+    raise TypeError(f'无法编码的应答类型: {type(value).__name__}')
+
+
+def read_reply(reader):
+    """
+    从缓冲读取器读取一个RESP值
+
+    Returns:
+        bytes/int/list/None，错误应答返回 RespError 实例（由调用方决定是否抛出）
+
+    Raises:
+        ConnectionError: 连接已关闭
+    """
+    line = reader.readline()
+    if not line:
+        raise ConnectionError('连接已关闭')
+    kind, body = line[:1], line[1:-2]
+    if kind == b'+':
+        return body
+    if kind == b'-':
+        return RespError(body.decode('utf-8', 'replace'))
+    if kind == b':':
+        return int(body)
+    if kind == b'$':
+        length = int(body)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) < length + 2:
+            raise ConnectionError('连接已关闭')
+        return data[:-2]
+    if kind == b'*':
+        length = int(body)
+        if length < 0:
+            return None
+        return [read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f'无法解析的应答: {line[:32]!r}')
+
+
+def parse_url(url):
+    """
+    解析 redis://[:密码@]主机[:端口][/库] 地址
+
+    Returns:
+        dict: host, port, password, db
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('redis', 'resp'):
+        raise ValueError(f'不支持的地址: {url}')
+    db = parsed.path.lstrip('/')
+    return {
+        'host': parsed.hostname or '127.0.0.1',
+        'port': parsed.port or DEFAULT_PORT,
+        'password': parsed.password,
+        'db': int(db) if db else 0
+    }
+
+
+class RespClient:
+    """RESP请求/应答客户端（线程安全，断线后下一次命令自动重连）"""
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, password=None, db=0, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.db = db
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        return cls(**parse_url(url), **kwargs)
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile('rb')
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        for reply in self._roundtrip(setup):
+            if isinstance(reply, RespError):
+                raise reply
+
+    def _roundtrip(self, commands):
+        if not commands:
+            return []
+        self._sock.sendall(b''.join(encode_command(*command) for command in commands))
+        return [read_reply(self._reader) for _ in commands]
+
+    def pipeline(self, commands):
+        """
+        一次发送多条命令并按顺序读取应答（一个网络往返）
+
+        Args:
+            commands: [(命令, 参数...)] 列表
+
+        Returns:
+            list: 各命令的应答，错误应答为 RespError 实例
+        """
+        with self._lock:
+            for attempt in (0, 1):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._roundtrip(commands)
+                except (OSError, ConnectionError):
+                    self._close()
+                    if attempt:
+                        raise
+
+    def execute(self, *args):
+        """
+        执行一条命令
+
+        Raises:
+            RespError: 服务端返回错误
+        """
+        reply = self.pipeline([args])[0]
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    def transaction(self, keys, reads, build):
+        """
+        WATCH/MULTI/EXEC 乐观事务
+
+        先 WATCH keys 并执行 reads，由 build(reads的应答) 返回要在事务中执行的命令；
+        WATCH 之后这些键被其他连接修改时事务放弃。连接错误不重试（由调用方决定）。
+
+        Args:
+            keys: 监视的键
+            reads: [(命令, 参数...)]，在 WATCH 之后读取当前值
+            build: 回调，返回命令列表，返回空时不执行事务
+
+        Returns:
+            list: 事务中各命令的应答；放弃（键被修改）时返回None，build 返回空时返回 []
+        """
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                replies = self._roundtrip([('WATCH', *keys)] + list(reads))
+                if isinstance(replies[0], RespError):
+                    raise replies[0]
+                commands = build(replies[1:])
+                if not commands:
+                    self._roundtrip([('UNWATCH',)])
+                    return []
+                replies = self._roundtrip([('MULTI',)] + list(commands) + [('EXEC',)])
+            except (OSError, ConnectionError):
+                self._close()
+                raise
+            result = replies[-1]
+            if isinstance(result, RespError):
+                raise result
+            return result
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+class RespSubscriber:
+    """订阅连接：构造时完成订阅，迭代得到 (频道, 消息) 直到关闭"""
+
+    def __init__(self, client, *channels):
+        """
+        Args:
+            client: 提供连接参数的 RespClient（订阅使用独立连接）
+            channels: 频道名
+        """
+        self._client = RespClient(client.host, client.port, client.password, client.db, timeout=client.timeout)
+        self._client._connect()
+        self._client._sock.settimeout(None)
+        self._closed = False
+        self._client._sock.sendall(encode_command('SUBSCRIBE', *channels))
+        for _ in channels:
+            reply = read_reply(self._client._reader)
+            if isinstance(reply, RespError):
+                raise reply
+
+    def __iter__(self):
+        while not self._closed:
+            try:
+                reply = read_reply(self._client._reader)
+            except (OSError, ValueError, ConnectionError):
+                if not self._closed:
+                    logger.error("订阅连接已断开")
+                return
+            if isinstance(reply, list) and len(reply) == 3 and reply[0] == b'message':
+                yield reply[1].decode('utf-8'), reply[2]
+
+    def close(self):
+        self._closed = True
+        sock = self._client._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._client.close()
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    """代理的连接处理：读取命令数组并应答"""
+
+    def setup(self):
+        super().setup()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.write_lock = threading.Lock()
+        self.channels = set()
+        self.watched = {}    # {键: WATCH时的修改序号}
+        self.queued = None   # MULTI 之后排队的命令，None表示不在事务中
+
+    def send(self, data):
+        with self.write_lock:
+            self.wfile.write(data)
+
+    def handle(self):
+        broker = self.server.broker
+        try:
+            while True:
+                try:
+                    command = read_reply(self.rfile)
+                except (ConnectionError, ValueError):
+                    return
+                if not isinstance(command, list) or not command:
+                    self.send(encode_reply(RespError('ERR 命令格式错误')))
+                    continue
+                name = command[0].decode('utf-8', 'replace').upper()
+                if name == 'QUIT':
+                    self.send(encode_reply('OK'))
+                    return
+                self.send(broker.dispatch(self, name, command[1:]))
+        except OSError:
+            pass
+        finally:
+            broker.unsubscribe_all(self)
+
+
+class _Replies(list):
+    """一条命令产生的多个应答（SUBSCRIBE/UNSUBSCRIBE 每个频道一个）"""
+
+
+# 事务中不排队、立即执行的命令
+_TRANSACTION_COMMANDS = ('MULTI', 'EXEC', 'DISCARD', 'WATCH', 'UNWATCH')
+
+
+class RespBroker:
+    """
+    本地Redis协议服务
+
+    实现发布/订阅（PUBLISH、SUBSCRIBE、UNSUBSCRIBE）、字符串和哈希键（GET、SET、HSET、HGETALL等）、
+    过期（EXPIRE、PEXPIRE、TTL）、SCAN 以及 WATCH/MULTI/EXEC 乐观事务。
+    所有键命令在一把锁下执行，EXEC 中排队的命令整体原子执行；过期的键在访问时删除。
+    子类通过 cmd_<命令名> 方法扩展其他命令。
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        """
+        Args:
+            host: 监听地址
+            port: 监听端口（0表示自动分配）
+        """
+        self._subscribers = {}  # {频道: set(连接)}
+        self._lock = threading.Lock()
+        self._data = {}         # {键: bytes 或 {字段: bytes}}
+        self._expires = {}      # {键: 过期的单调时间}
+        self._revisions = {}    # {键: 修改序号}，用于 WATCH
+        self._revision = itertools.count(1)
+        self._kv_lock = threading.RLock()
+        self._server = socketserver.ThreadingTCPServer((host, port), _BrokerHandler, bind_and_activate=False)
+        self._server.allow_reuse_address = True
+        self._server.daemon_threads = True
+        self._server.server_bind()
+        self._server.server_activate()
+        self._server.broker = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    @property
+    def url(self):
+        host, port = self.address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        """在后台线程中开始服务"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='resp-broker', daemon=True)
+        self._thread.start()
+        logger.info(f"本地消息代理已启动: {self.url}")
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def dispatch(self, conn, name, args):
+        """执行命令并返回编码后的应答"""
+        method = getattr(self, f'cmd_{name.lower()}', None)
+        if method is None:
+            if conn.queued is not None:
+                conn.queued = None
+                conn.watched = {}
+                return encode_reply(RespError(f"EXECABORT unknown command '{name}'"))
+            return encode_reply(RespError(f"ERR unknown command '{name}'"))
+        if conn.queued is not None and name not in _TRANSACTION_COMMANDS:
+            conn.queued.append((name, method, args))
+            return encode_reply('QUEUED')
+        result = self._call(name, method, conn, args)
+        if isinstance(result, _Replies):
+            return b''.join(encode_reply(reply) for reply in result)
+        return encode_reply(result)
+
+    def _call(self, name, method, conn, args):
+        try:
+            return method(conn, *args)
+        except TypeError:
+            return RespError(f"ERR wrong number of arguments for '{name}'")
+        except ValueError:
+            return RespError('ERR value is not an integer or out of range')
+
+    # ---- 发布/订阅 ----
+
+    def cmd_ping(self, conn, message=None):
+        return 'PONG' if message is None else message
+
+    def cmd_echo(self, conn, message):
+        return message
+
+    def cmd_select(self, conn, db):
+        return 'OK'
+
+    def cmd_publish(self, conn, channel, message):
+        with self._lock:
+            receivers = list(self._subscribers.get(channel, ()))
+        frame = encode_reply([b'message', channel, message])
+        delivered = 0
+        for receiver in receivers:
+            try:
+                receiver.send(frame)
+                delivered += 1
+            except OSError:
+                self.unsubscribe_all(receiver)
+        return delivered
+
+    def cmd_subscribe(self, conn, *channels):
+        if not channels:
+            raise TypeError
+        replies = _Replies()
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(conn)
+                conn.channels.add(channel)
+                replies.append([b'subscribe', channel, len(conn.channels)])
+        return replies
+
+    def cmd_unsubscribe(self, conn, *channels):
+        replies = _Replies()
+        with self._lock:
+            for channel in channels or tuple(conn.channels):
+                self._subscribers.get(channel, set()).discard(conn)
+                conn.channels.discard(channel)
+                replies.append([b'unsubscribe', channel, len(conn.channels)])
+        return replies or [b'unsubscribe', None, 0]
+
+    def unsubscribe_all(self, conn):
+        with self._lock:
+            for channel in getattr(conn, 'channels', ()):
+                subscribers = self._subscribers.get(channel)
+                if subscribers:
+                    subscribers.discard(conn)
+                    if not subscribers:
+                        del self._subscribers[channel]
+            if hasattr(conn, 'channels'):
+                conn.channels.clear()
+
+    # ---- 键 ----
+
+    def _get(self, key, kind=None):
+        """读取未过期的键（过期时删除），类型不符时抛出 RespError"""
+        deadline = self._expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self._delete(key)
+        value = self._data.get(key)
+        if value is not None and kind is not None and not isinstance(value, kind):
+            raise RespError('WRONGTYPE Operation against a key holding the wrong kind of value')
+        return value
+
+    def _touch(self, key):
+        self._revisions[key] = next(self._revision)
+
+    def _delete(self, key):
+        if key in self._data:
+            del self._data[key]
+            self._expires.pop(key, None)
+            self._touch(key)
+            return True
+        return False
+
+    def _kv(self, fn):
+        with self._kv_lock:
+            try:
+                return fn()
+            except RespError as e:
+                return e
+
+    def cmd_get(self, conn, key):
+        return self._kv(lambda: self._get(key, bytes))
+
+    def cmd_set(self, conn, key, value):
+        def run():
+            self._data[key] = value
+            self._expires.pop(key, None)
+            self._touch(key)
+            return 'OK'
+        return self._kv(run)
+
+    def cmd_del(self, conn, *keys):
+        if not keys:
+            raise TypeError
+        return self._kv(lambda: sum(self._get(key) is not None and self._delete(key) for key in keys))
+
+    def cmd_exists(self, conn, *keys):
+        if not keys:
+            raise TypeError
+        return self._kv(lambda: sum(self._get(key) is not None for key in keys))
+
+    def cmd_hset(self, conn, key, *pairs):
+        if not pairs or len(pairs) % 2:
+            raise TypeError
+
+        def run():
+            fields = self._get(key, dict)
+            if fields is None:
+                fields = self._data[key] = {}
+            added = 0
+            for field, value in zip(pairs[::2], pairs[1::2]):
+                added += field not in fields
+                fields[field] = value
+            self._touch(key)
+            return added
+        return self._kv(run)
+
+    def cmd_hget(self, conn, key, field):
+        return self._kv(lambda: (self._get(key, dict) or {}).get(field))
+
+    def cmd_hmget(self, conn, key, *fields):
+        if not fields:
+            raise TypeError
+
+        def run():
+            values = self._get(key, dict) or {}
+            return [values.get(field) for field in fields]
+        return self._kv(run)
+
+    def cmd_hgetall(self, conn, key):
+        def run():
+            return [item for pair in (self._get(key, dict) or {}).items() for item in pair]
+        return self._kv(run)
+
+    def cmd_hdel(self, conn, key, *fields):
+        if not fields:
+            raise TypeError
+
+        def run():
+            values = self._get(key, dict)
+            if not values:
+                return 0
+            removed = sum(values.pop(field, None) is not None for field in fields)
+            if not values:
+                self._delete(key)
+            elif removed:
+                self._touch(key)
+            return removed
+        return self._kv(run)
+
+    def cmd_pexpire(self, conn, key, milliseconds):
+        milliseconds = int(milliseconds)
+
+        def run():
+            if self._get(key) is None:
+                return 0
+            if milliseconds <= 0:
+                self._delete(key)
+            else:
+                self._expires[key] = time.monotonic() + milliseconds / 1000
+                self._touch(key)
+            return 1
+        return self._kv(run)
+
+    def cmd_expire(self, conn, key, seconds):
+        return self.cmd_pexpire(conn, key, int(seconds) * 1000)
+
+    def cmd_pttl(self, conn, key):
+        def run():
+            if self._get(key) is None:
+                return -2
+            deadline = self._expires.get(key)
+            return -1 if deadline is None else max(int((deadline - time.monotonic()) * 1000), 0)
+        return self._kv(run)
+
+    def cmd_ttl(self, conn, key):
+        ttl = self.cmd_pttl(conn, key)
+        return ttl if ttl < 0 else (ttl + 500) // 1000
+
+    def cmd_scan(self, conn, cursor, *options):
+        """按键名排序遍历，游标为下一个位置"""
+        cursor = int(cursor)
+        pattern, count = b'*', 10
+        for option, value in zip(options[::2], options[1::2]):
+            option = option.upper()
+            if option == b'MATCH':
+                pattern = value
+            elif option == b'COUNT':
+                count = int(value)
+        pattern = pattern.decode('utf-8', 'surrogateescape')
+
+        def run():
+            keys = sorted(self._data)
+            batch = keys[cursor:cursor + count]
+            next_cursor = cursor + count if cursor + count < len(keys) else 0
+            return [str(next_cursor).encode(),
+                    [key for key in batch if self._get(key) is not None
+                     and fnmatch.fnmatchcase(key.decode('utf-8', 'surrogateescape'), pattern)]]
+        return self._kv(run)
+
+    def cmd_dbsize(self, conn):
+        return self._kv(lambda: sum(self._get(key) is not None for key in list(self._data)))
+
+    def cmd_flushdb(self, conn):
+        def run():
+            for key in list(self._data):
+                self._delete(key)
+            return 'OK'
+        return self._kv(run)
+
+    # ---- 事务 ----
+
+    def cmd_watch(self, conn, *keys):
+        if not keys:
+            raise TypeError
+        if conn.queued is not None:
+            return RespError('ERR WATCH inside MULTI is not allowed')
+        with self._kv_lock:
+            for key in keys:
+                self._get(key)
+                conn.watched.setdefault(key, self._revisions.get(key, 0))
+        return 'OK'
+
+    def cmd_unwatch(self, conn):
+        conn.watched = {}
+        return 'OK'
+
+    def cmd_multi(self, conn):
+        if conn.queued is not None:
+            return RespError('ERR MULTI calls can not be nested')
+        conn.queued = []
+        return 'OK'
+
+    def cmd_discard(self, conn):
+        if conn.queued is None:
+            return RespError('ERR DISCARD without MULTI')
+        conn.queued = None
+        conn.watched = {}
+        return 'OK'
+
+    def cmd_exec(self, conn):
+        """执行排队的命令；WATCH 的键在此期间被修改（含过期）时放弃并返回空"""
+        if conn.queued is None:
+            return RespError('ERR EXEC without MULTI')
+        queued, watched = conn.queued, conn.watched
+        conn.queued, conn.watched = None, {}
+        with self._kv_lock:
+            for key, revision in watched.items():
+                self._get(key)
+                if self._revisions.get(key, 0) != revision:
+                    return None
+            return [self._call(name, method, conn, args) for name, method, args in queued]
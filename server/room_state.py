@@ -0,0 +1,303 @@
+"""
+房间状态后端
+
+GameManager.rooms 始终是本进程房间的工作集，插件直接读写其中的数据；
+状态后端负责持久化和过期：
+- MemoryRoomState（默认）：房间只在内存字典中，按最后活动时间清理超时房间
+- KVRoomState：每个房间一个Redis哈希（Redis协议，可用 resp.RespBroker 代替），
+  重启或换进程后可恢复。房间被修改时只标记为脏，后台线程每 flush_interval 把所有脏房间
+  批量写入一次，每个房间最多每个间隔写一次，落子时不访问网络。
+  写入时用哈希中的 rev 字段做乐观版本检查（WATCH/MULTI/EXEC），存储中的版本
+  与本进程上次写入的不一致时说明房间已被其他进程接管，本进程不再覆盖并丢弃该房间；
+  每次写入刷新键的过期时间，超时无活动的房间由存储过期删除，代替按最后活动时间扫描。
+
+房间各字段以带类型标记的JSON存储（json_codec，与集群消息一致），
+读取时不会执行存储中的代码。
+"""
+
+import logging
+import threading
+import time
+
+import json_codec
+from resp import RespClient, RespError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PREFIX = 'gamehub:room:'
+REV_FIELD = b'rev'
+
+
+class RoomStateBackend:
+    """房间状态后端接口"""
+
+    def load_all(self, owns=None):
+        """
+        加载已保存的房间
+
+        Args:
+            owns: 过滤函数 owns(room_id)，只加载归属本进程的房间
+
+        Returns:
+            dict: {room_id: 房间数据}
+        """
+        return {}
+
+    def mark_dirty(self, room_id, room):
+        """房间数据已修改（由后端决定何时写入）"""
+
+    def delete(self, room_id):
+        """房间已删除"""
+
+    def expire(self, rooms, timeout):
+        """
+        找出应清理的房间（调用方从工作集中移除，不再调用 delete）
+
+        Args:
+            rooms: 工作集 {room_id: 房间数据}
+            timeout: 无活动超时（秒）
+
+        Returns:
+            list: 房间ID列表
+        """
+        current_time = time.time()
+        return [
+            room_id for room_id, room in list(rooms.items())
+            if current_time - room['last_activity'] > timeout
+        ]
+
+    def flush(self):
+        """立即写入所有待写入的修改"""
+
+    def close(self):
+        pass
+
+    def get_stats(self):
+        return {'backend': 'memory'}
+
+
+class MemoryRoomState(RoomStateBackend):
+    """房间只保存在内存中（进程重启后丢失）"""
+
+
+class KVRoomState(RoomStateBackend):
+    """Redis协议键值存储中的房间状态，写入合并到后台批量执行"""
+
+    def __init__(self, client, ttl=1800, flush_interval=0.2, prefix=DEFAULT_PREFIX, start=True):
+        """
+        Args:
+            client: RespClient
+            ttl: 房间键的过期时间（秒），每次写入时刷新
+            flush_interval: 写入间隔（秒），同一房间在一个间隔内的多次修改只写入一次
+            prefix: 键名前缀
+            start: 是否启动后台写入线程（为False时只在 flush() 时写入）
+        """
+        self.client = client
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.prefix = prefix
+        self._revs = {}          # {room_id: 本进程上次写入/加载的版本}
+        self._dirty = {}         # {room_id: 房间数据}
+        self._deleted = set()
+        self._conflicts = set()  # 已被其他进程接管的房间
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.stats = {'writes': 0, 'flushes': 0, 'deletes': 0, 'conflicts': 0, 'errors': 0}
+        self._thread = None
+        if start:
+            self._thread = threading.Thread(target=self._flush_loop, name='room-state-flush', daemon=True)
+            self._thread.start()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        return cls(RespClient.from_url(url), **kwargs)
+
+    def _key(self, room_id):
+        return f'{self.prefix}{room_id}'
+
+    def load_all(self, owns=None):
+        keys = []
+        cursor = b'0'
+        while True:
+            cursor, batch = self.client.execute('SCAN', cursor, 'MATCH', f'{self.prefix}*', 'COUNT', 1000)
+            keys.extend(batch)
+            if cursor == b'0':
+                break
+
+        prefix = self.prefix.encode('utf-8')
+        room_ids = [key[len(prefix):].decode('utf-8') for key in keys]
+        if owns is not None:
+            room_ids = [room_id for room_id in room_ids if owns(room_id)]
+
+        rooms = {}
+        replies = self.client.pipeline([('HGETALL', self._key(room_id)) for room_id in room_ids])
+        for room_id, reply in zip(room_ids, replies):
+            if isinstance(reply, RespError) or not reply:
+                continue
+            try:
+                fields = dict(zip(reply[::2], reply[1::2]))
+                rev = int(fields.pop(REV_FIELD))
+                room = {field.decode('utf-8'): json_codec.loads(value) for field, value in fields.items()}
+            except Exception as e:
+                logger.error(f"无法恢复房间 {room_id}: {e}")
+                continue
+            rooms[room_id] = room
+            self._revs[room_id] = rev
+        return rooms
+
+    def mark_dirty(self, room_id, room):
+        with self._lock:
+            if room_id not in self._conflicts:
+                self._dirty[room_id] = room
+
+    def delete(self, room_id):
+        with self._lock:
+            self._dirty.pop(room_id, None)
+            if room_id in self._conflicts:
+                # 存储中的房间属于接管它的进程
+                self._conflicts.discard(room_id)
+                self._revs.pop(room_id, None)
+            elif room_id in self._revs:
+                self._deleted.add(room_id)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"写入房间状态出错: {e}")
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+                deleted, self._deleted = self._deleted, set()
+            if not dirty and not deleted:
+                return
+
+            snapshots = {}
+            for room_id, room in dirty.items():
+                try:
+                    snapshots[room_id] = [item for field, value in room.items()
+                                          for item in (field, json_codec.dumps(value))]
+                except RuntimeError:
+                    # 序列化时房间正被修改，留到下一次
+                    self.mark_dirty(room_id, room)
+                except TypeError as e:
+                    self.stats['errors'] += 1
+                    logger.error("房间 %s 包含无法保存的数据: %s", room_id, e)
+
+            try:
+                self._write(snapshots, deleted)
+            except (OSError, ConnectionError, RespError) as e:
+                self.stats['errors'] += 1
+                logger.error(f"写入房间状态失败，稍后重试: {e}")
+                with self._lock:
+                    for room_id, room in dirty.items():
+                        self._dirty.setdefault(room_id, room)
+                    self._deleted |= deleted - set(self._dirty)
+                return
+            self.stats['flushes'] += 1
+
+    def _write(self, snapshots, deleted):
+        """一个事务写入所有房间；有房间被并发修改时逐个房间重试"""
+        if self._transaction(snapshots, deleted) is None:
+            for room_id, fields in snapshots.items():
+                if room_id in self._conflicts:
+                    continue
+                if self._transaction({room_id: fields}, ()) is None:
+                    self._conflict(room_id)
+            if deleted:
+                self._transaction({}, deleted)
+
+    def _transaction(self, snapshots, deleted):
+        room_ids = list(snapshots)
+        keys = [self._key(room_id) for room_id in room_ids]
+        written = []
+        ttl_ms = int(self.ttl * 1000)
+
+        def build(revs):
+            commands = []
+            for room_id, key, stored in zip(room_ids, keys, revs):
+                expected = self._revs.get(room_id, 0)
+                if int(stored or 0) != expected:
+                    self._conflict(room_id)
+                    continue
+                commands.append(('HSET', key, REV_FIELD, expected + 1, *snapshots[room_id]))
+                commands.append(('PEXPIRE', key, ttl_ms))
+                written.append(room_id)
+            for room_id in deleted:
+                commands.append(('DEL', self._key(room_id)))
+            return commands
+
+        if keys:
+            result = self.client.transaction(keys, [('HGET', key, REV_FIELD) for key in keys], build)
+        else:
+            result = self.client.pipeline([('MULTI',)] + build([]) + [('EXEC',)])[-1]
+        if result is None:
+            return None
+
+        for room_id in written:
+            self._revs[room_id] = self._revs.get(room_id, 0) + 1
+        for room_id in deleted:
+            self._revs.pop(room_id, None)
+        self.stats['writes'] += len(written)
+        self.stats['deletes'] += len(deleted)
+        return result
+
+    def _conflict(self, room_id):
+        self.stats['conflicts'] += 1
+        logger.warning("房间 %s 已被其他进程修改，本进程不再保存", room_id)
+        with self._lock:
+            self._conflicts.add(room_id)
+            self._dirty.pop(room_id, None)
+
+    def expire(self, rooms, timeout):
+        """存储中已过期（超过 ttl 没有写入）或已被其他进程接管的房间"""
+        with self._lock:
+            conflicts = [room_id for room_id in self._conflicts if room_id in rooms]
+            self._conflicts.difference_update(conflicts)
+            candidates = [room_id for room_id in self._revs
+                          if room_id in rooms and room_id not in self._dirty and room_id not in conflicts]
+        for room_id in conflicts:
+            self._revs.pop(room_id, None)
+        if not candidates:
+            return conflicts
+        try:
+            exists = self.client.pipeline([('EXISTS', self._key(room_id)) for room_id in candidates])
+        except (OSError, ConnectionError) as e:
+            logger.error(f"检查房间过期失败，按最后活动时间清理: {e}")
+            return conflicts + super().expire(rooms, timeout)
+
+        expired = [room_id for room_id, found in zip(candidates, exists) if found == 0]
+        for room_id in expired:
+            self._revs.pop(room_id, None)
+        return conflicts + expired
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 1)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"关闭时写入房间状态失败: {e}")
+        self.client.close()
+
+    def get_stats(self):
+        with self._lock:
+            pending = len(self._dirty)
+        return dict(self.stats, backend='kv', rooms=len(self._revs), pending=pending)
+
+
+def create_room_state(url='', ttl=1800, flush_interval=0.2):
+    """
+    按地址创建房间状态后端
+
+    Args:
+        url: 空字符串表示内存，否则为 redis://主机:端口/库
+    """
+    if not url:
+        return MemoryRoomState()
+    return KVRoomState.from_url(url, ttl=ttl, flush_interval=flush_interval)
@@ -0,0 +1,338 @@
+"""
+事件数据模式
+
+事件数据的格式按字段声明（RoomId、Int、Comment 等），在模块加载时编译一次：
+每个字段编译为一个检查函数（正则预编译，合法值先做一次类型/范围/正则判断后直接返回），
+整个模式按字段数编译为一个验证函数：三个字段以内逐个调用检查函数（不经过循环），
+更多字段时在一个循环中依次检查，返回以字段名为属性的命名元组。
+同一房间的事件反复携带同一个房间ID，最近通过检查的房间ID记在集合中，命中时不再匹配正则。
+
+插件注册处理器时指定模式（@self.on('make_move', schema=MAKE_MOVE)），
+分发时先验证，处理器收到的是验证后的对象；验证失败时向客户端发送错误，处理器不会被调用。
+错误消息与 InputValidator 一致。
+"""
+
+from collections import namedtuple
+
+from validators import InputValidator, ValidationError
+
+_MISSING = object()
+
+
+class Field:
+    """字段声明"""
+
+    # 检查函数是否可能转换合法值（为 False 时合法值原样返回，列表逐项检查后不必复制）
+    converts = True
+
+    def __init__(self, required=True, default=None, missing_error=None):
+        """
+        Args:
+            required: 是否必需
+            default: 非必需字段缺失时的值
+            missing_error: 必需字段缺失时的错误消息（默认"缺少必需字段: 字段名"）
+        """
+        self.required = required
+        self.default = default
+        self.missing_error = missing_error
+
+    def compile(self, name):
+        """
+        编译检查函数
+
+        Returns:
+            callable: check(value) 返回转换后的值（字段缺失时 value 为 _MISSING），
+                      无效时抛出 ValidationError
+        """
+        raise NotImplementedError
+
+    def missing(self, name):
+        """编译字段缺失时调用的函数（返回默认值或抛出 ValidationError）"""
+        if not self.required:
+            default = self.default
+            return lambda: default
+        message = self.missing_error or f"缺少必需字段: {name}"
+
+        def missing():
+            raise ValidationError(message, name, None)
+        return missing
+
+
+class Value(Field):
+    """不做检查的字段（默认非必需）"""
+
+    converts = False
+
+    def __init__(self, required=False, default=None):
+        super().__init__(required, default)
+
+    def compile(self, name):
+        missing = self.missing(name)
+        return lambda value: missing() if value is _MISSING else value
+
+
+class Flag(Field):
+    """布尔开关（按真值转换，默认非必需且为False）"""
+
+    def __init__(self, default=False):
+        super().__init__(False, default)
+
+    def compile(self, name):
+        default = self.default
+        return lambda value: default if value is _MISSING else bool(value)
+
+
+class RoomId(Field):
+    """房间ID"""
+
+    converts = False
+
+    # 最近通过检查的房间ID（所有 RoomId 字段共用，达到上限时清空）
+    VALID_IDS = set()
+    VALID_IDS_LIMIT = 4096
+
+    def __init__(self):
+        super().__init__(missing_error="房间ID不能为空")
+
+    def compile(self, name):
+        length = InputValidator.ROOM_ID_LENGTH
+        match = InputValidator.ROOM_ID_RE.match
+        valid, limit = self.VALID_IDS, self.VALID_IDS_LIMIT
+        missing = self.missing(name)
+
+        def check(value):
+            if type(value) is str:
+                if value in valid:
+                    return value
+                if len(value) == length and match(value):
+                    if len(valid) >= limit:
+                        valid.clear()
+                    valid.add(value)
+                    return value
+            if value is _MISSING:
+                return missing()
+            # 无效时按 InputValidator 的检查顺序给出错误
+            return InputValidator.validate_room_id(value)
+        return check
+
+
+class Int(Field):
+    """整数（不接受布尔值）"""
+
+    converts = False
+
+    def __init__(self, min=None, max=None, required=True, default=None, missing_error=None,
+                 type_error=None, min_error=None, max_error=None):
+        """
+        Args:
+            min: 最小值（含）
+            max: 最大值（含）
+            type_error: 类型错误消息（默认"字段类型错误: 字段名 应为 int"）
+            min_error: 小于最小值的错误消息
+            max_error: 大于最大值的错误消息
+        """
+        super().__init__(required, default, missing_error)
+        self.min = min
+        self.max = max
+        self.type_error = type_error
+        self.min_error = min_error
+        self.max_error = max_error
+
+    def compile(self, name):
+        low, high = self.min, self.max
+        type_error = self.type_error or f"字段类型错误: {name} 应为 int"
+        min_error = self.min_error or f"{name} 不能小于 {low}"
+        max_error = self.max_error or f"{name} 不能大于 {high}"
+        missing = self.missing(name)
+
+        def check(value):
+            if type(value) is not int:
+                if value is _MISSING:
+                    return missing()
+                raise ValidationError(type_error, name, value)
+            if low is not None and value < low:
+                raise ValidationError(min_error, name, value)
+            if high is not None and value > high:
+                raise ValidationError(max_error, name, value)
+            return value
+        return check
+
+
+class Comment(Field):
+    """弹幕内容（按 InputValidator.sanitize_comment 清理，缺失时为空字符串）"""
+
+    def __init__(self):
+        super().__init__(False, '')
+
+    def compile(self, name):
+        limit = InputValidator.MAX_COMMENT_LENGTH
+        special = InputValidator.SPECIAL_CHARS_RE.search
+        sanitize = InputValidator.sanitize_comment
+        default = self.default
+
+        def check(value):
+            # 不含 HTML 标签和特殊字符（标签必然含有 '<'）且未超长时，清理结果只是去掉首尾空白
+            if type(value) is str and len(value) <= limit and not special(value):
+                return value.strip()
+            if value is _MISSING:
+                return default
+            return sanitize(value)
+        return check
+
+
+class Mapping(Field):
+    """必须包含指定键的字典（原样返回）"""
+
+    converts = False
+
+    def __init__(self, keys, type_error=None, missing_keys_error=None, **kwargs):
+        """
+        Args:
+            keys: 必需的键
+            type_error: 不是字典时的错误消息
+            missing_keys_error: 缺少键时的错误消息
+        """
+        super().__init__(**kwargs)
+        self.keys = tuple(keys)
+        self.type_error = type_error
+        self.missing_keys_error = missing_keys_error
+
+    def compile(self, name):
+        keys = frozenset(self.keys)
+        type_error = self.type_error or f"字段类型错误: {name} 应为 dict"
+        missing_keys_error = self.missing_keys_error or f"{name} 缺少必需字段"
+        missing = self.missing(name)
+
+        def check(value):
+            if type(value) is not dict:
+                if value is _MISSING:
+                    return missing()
+                raise ValidationError(type_error, name, value)
+            if not keys <= value.keys():
+                raise ValidationError(missing_keys_error, name, value)
+            return value
+        return check
+
+
+class List(Field):
+    """列表（逐项检查）"""
+
+    def __init__(self, item=None, min_len=None, max_len=None, required=True, default=None, missing_error=None,
+                 type_error=None, min_len_error=None, max_len_error=None):
+        """
+        Args:
+            item: 每一项的字段声明（None 表示不检查）
+            min_len: 最少项数
+            max_len: 最多项数
+        """
+        super().__init__(required, default, missing_error)
+        self.item = item
+        self.min_len = min_len
+        self.max_len = max_len
+        self.type_error = type_error
+        self.min_len_error = min_len_error
+        self.max_len_error = max_len_error
+
+    def compile(self, name):
+        low, high = self.min_len, self.max_len
+        type_error = self.type_error or f"字段类型错误: {name} 应为 list"
+        min_len_error = self.min_len_error or f"{name} 至少 {low} 项"
+        max_len_error = self.max_len_error or f"{name} 最多 {high} 项"
+        item = self.item.compile(name) if self.item is not None else None
+        copy = item is not None and self.item.converts
+        # 最多两个必需键的字典项（例如牌）在循环中直接判断类型和键，只有无效项才调用检查函数给出错误
+        inline = isinstance(self.item, Mapping) and 1 <= len(self.item.keys) <= 2
+        k0, k1 = (self.item.keys * 2)[:2] if inline else (None, None)
+        missing = self.missing(name)
+
+        def check(value):
+            if type(value) is not list:
+                if value is _MISSING:
+                    return missing()
+                raise ValidationError(type_error, name, value)
+            if low is not None and len(value) < low:
+                raise ValidationError(min_len_error, name, value)
+            if high is not None and len(value) > high:
+                raise ValidationError(max_len_error, name, value)
+            if inline:
+                for entry in value:
+                    if type(entry) is not dict or k0 not in entry or k1 not in entry:
+                        item(entry)
+            elif copy:
+                return [item(entry) for entry in value]
+            elif item is not None:
+                for entry in value:
+                    item(entry)
+            return value
+        return check
+
+
+class Schema:
+    """事件数据模式"""
+
+    def __init__(self, name, /, **fields):
+        """
+        Args:
+            name: 模式名称（验证结果的类型名）
+            **fields: 字段名到字段声明（按声明顺序检查）
+        """
+        self.name = name
+        self.fields = fields
+        self.type = namedtuple(name, fields)
+        self.checks = tuple((key, field.compile(key)) for key, field in fields.items())
+        # validate(data): 返回验证和转换后的命名元组，数据无效时抛出 ValidationError
+        self.validate = _compile_validate(self.type, self.checks)
+
+    def __call__(self, data):
+        return self.validate(data)
+
+
+def _compile_validate(result_type, checks):
+    """
+    按字段数编译验证函数
+
+    直接构造元组，不经过命名元组按参数名构造的开销；
+    三个字段以内展开为逐个调用（事件数据大多只有两三个字段），避免循环和中间列表。
+    """
+    new = tuple.__new__
+
+    def invalid(data):
+        raise ValidationError("请求数据格式错误", None, data)
+
+    if len(checks) == 1:
+        (k0, c0), = checks
+
+        def validate(data):
+            if type(data) is not dict:
+                invalid(data)
+            return new(result_type, (c0(data.get(k0, _MISSING)),))
+    elif len(checks) == 2:
+        (k0, c0), (k1, c1) = checks
+
+        def validate(data):
+            if type(data) is not dict:
+                invalid(data)
+            get = data.get
+            return new(result_type, (c0(get(k0, _MISSING)), c1(get(k1, _MISSING))))
+    elif len(checks) == 3:
+        (k0, c0), (k1, c1), (k2, c2) = checks
+
+        def validate(data):
+            if type(data) is not dict:
+                invalid(data)
+            get = data.get
+            return new(result_type, (c0(get(k0, _MISSING)), c1(get(k1, _MISSING)), c2(get(k2, _MISSING))))
+    else:
+        def validate(data):
+            if type(data) is not dict:
+                invalid(data)
+            get = data.get
+            return new(result_type, [check(get(key, _MISSING)) for key, check in checks])
+    return validate
+
+
+# 各游戏共用的事件
+JOIN_ROOM = Schema('JoinRoom', room_id=RoomId(), spectator=Flag(), game=Value())
+ROOM_ACTION = Schema('RoomAction', room_id=RoomId())
+SEND_COMMENT = Schema('SendComment', room_id=RoomId(), comment=Comment())
+REJOIN_ROOM = Schema('RejoinRoom', room_id=RoomId(), version=Int(required=False))
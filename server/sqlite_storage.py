@@ -0,0 +1,307 @@
+"""
+SQLite存储后端
+
+单机部署和测试使用的嵌入式存储，无需外部数据库服务：
+- WAL模式：读写互不阻塞，synchronous=NORMAL 下每次提交只追加WAL
+- 专用写线程：写入请求进入队列立即返回，写线程把队列中积累的请求合并为一个事务提交
+- 每个读线程一个只读连接，查询不经过写队列
+"""
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+from statements import resolve
+from storage import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+# 按 PRAGMA user_version 记录的表结构版本执行（对应 migrations.py 中MySQL表结构的最新版本）
+SQLITE_MIGRATIONS = [
+    (1, [
+        '''CREATE TABLE IF NOT EXISTS game_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            game_type TEXT NOT NULL,
+            room_id TEXT NOT NULL,
+            moves BLOB NOT NULL,
+            moves_codec INTEGER NOT NULL DEFAULT 0,
+            winner TEXT,
+            player_count INTEGER DEFAULT 0,
+            spectator_count INTEGER DEFAULT 0,
+            duration INTEGER DEFAULT 0,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_game_type_created ON game_records (game_type, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_room_id ON game_records (room_id)',
+        'CREATE INDEX IF NOT EXISTS idx_created_at ON game_records (created_at)',
+        '''CREATE TABLE IF NOT EXISTS game_stats_daily (
+            stat_date TEXT NOT NULL,
+            game_type TEXT NOT NULL,
+            games INTEGER NOT NULL DEFAULT 0,
+            total_duration INTEGER NOT NULL DEFAULT 0,
+            total_players INTEGER NOT NULL DEFAULT 0,
+            total_spectators INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (stat_date, game_type)
+        )''',
+    ]),
+]
+
+# 每个连接缓存的已编译语句数（按SQL文本复用，已注册语句的文本固定）
+STATEMENT_CACHE_SIZE = 256
+
+# 写线程停止标记
+_STOP = object()
+
+
+class _WriteRequest:
+    """一次写入请求（同一请求中的语句原子执行），statements 为 [(SQL, 参数, Statement或None)]"""
+
+    __slots__ = ('statements', 'done', 'ok')
+
+    def __init__(self, statements):
+        self.statements = statements
+        self.done = threading.Event()
+        self.ok = False
+
+
+def _adapt(value):
+    """datetime/date 按ISO格式存储（与 CURRENT_TIMESTAMP 格式一致，可按字符串排序）"""
+    if isinstance(value, datetime):
+        return value.isoformat(' ', 'seconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class SQLiteBackend(StorageBackend):
+    """SQLite存储后端"""
+
+    dialect = 'sqlite'
+
+    def __init__(self, path, batch_size=256, queue_size=10000, wait_for_commit=False, busy_timeout=5.0):
+        """
+        初始化SQLite存储后端
+
+        Args:
+            path: 数据库文件路径（WAL模式不支持 :memory:）
+            batch_size: 一个事务最多合并的写入请求数
+            queue_size: 写队列容量，队列满时写入失败而不是阻塞游戏逻辑
+            wait_for_commit: write() 是否等待提交完成（False时入队即返回）
+            busy_timeout: 等待数据库锁的秒数
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.wait_for_commit = wait_for_commit
+        self.busy_timeout = busy_timeout
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._closed = False
+        self._stats = {'writes': 0, 'batches': 0, 'failed': 0, 'rejected': 0, 'max_batch': 0}
+
+        self._writer_conn = self._connect()
+        self._writer_conn.execute('PRAGMA journal_mode=WAL')
+        self._writer_conn.execute('PRAGMA synchronous=NORMAL')
+        self._writer = threading.Thread(target=self._writer_loop, name='sqlite-writer', daemon=True)
+        self._writer.start()
+        logger.info(f"SQLite存储已启用: {path}（WAL，批量大小 {batch_size}）")
+
+    def _connect(self, readonly=False):
+        """创建连接（自动提交模式，事务由写线程显式控制）"""
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+        if readonly:
+            conn.execute('PRAGMA query_only=ON')
+        return conn
+
+    def migrate(self):
+        """
+        按 user_version 执行表结构迁移
+
+        Returns:
+            list: 本次执行的版本号列表
+        """
+        conn = self._connect()
+        try:
+            current = conn.execute('PRAGMA user_version').fetchone()[0]
+            applied = []
+            for version, statements in SQLITE_MIGRATIONS:
+                if version <= current:
+                    continue
+                conn.execute('BEGIN IMMEDIATE')
+                for sql in statements:
+                    conn.execute(sql)
+                conn.execute(f'PRAGMA user_version = {int(version)}')
+                conn.execute('COMMIT')
+                applied.append(version)
+            if applied:
+                logger.info(f"SQLite表结构迁移完成，当前版本 v{applied[-1]}")
+            return applied
+        finally:
+            conn.close()
+
+    def is_healthy(self):
+        return not self._closed and self._writer.is_alive()
+
+    def write(self, statements, wait=None):
+        """
+        提交写入请求到写线程
+
+        Args:
+            statements: [(Statement或SQL语句, 参数)] 列表，在同一事务中原子执行
+            wait: 是否等待提交完成（默认使用 wait_for_commit）
+
+        Returns:
+            bool: 等待时表示是否提交成功，否则表示是否已入队
+        """
+        if self._closed:
+            return False
+        request = _WriteRequest([resolve(query, self.dialect) + (tuple(_adapt(p) for p in params or ()),)
+                                 for query, params in statements])
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            self._stats['rejected'] += 1
+            logger.warning("SQLite写队列已满，丢弃写入")
+            return False
+        if wait if wait is not None else self.wait_for_commit:
+            request.done.wait()
+            return request.ok
+        return True
+
+    def flush(self, timeout=None):
+        """
+        等待此前提交的所有写入完成
+
+        Returns:
+            bool: 是否在超时前完成
+        """
+        if self._closed:
+            return True
+        marker = _WriteRequest([])
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def query(self, query, params=None):
+        """使用当前线程的只读连接查询"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect(readonly=True)
+            with self._readers_lock:
+                self._readers.append(conn)
+        sql, statement = resolve(query, self.dialect)
+        start = time.perf_counter()
+        rows = conn.execute(sql, tuple(_adapt(p) for p in params or ())).fetchall()
+        if statement:
+            statement.observe(time.perf_counter() - start)
+        return rows
+
+    def stream(self, query, params=None, size=1000):
+        """使用独立的只读连接逐批读取（迭代期间不占用当前线程的查询连接）"""
+        sql, _ = resolve(query, self.dialect)
+        conn = self._connect(readonly=True)
+        try:
+            cur = conn.execute(sql, tuple(_adapt(p) for p in params or ()))
+            while True:
+                rows = cur.fetchmany(size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+
+    def _writer_loop(self):
+        """写线程：取出队列中已积累的请求，合并为一个事务提交"""
+        while True:
+            request = self._queue.get()
+            if request is _STOP:
+                return
+            batch = [request]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is _STOP:
+                    stop = True
+                    break
+                batch.append(request)
+            self._commit_batch(batch)
+            if stop:
+                return
+
+    def _commit_batch(self, batch):
+        """批量提交；单个请求失败只回滚该请求的保存点"""
+        conn = self._writer_conn
+        try:
+            conn.execute('BEGIN')
+            for request in batch:
+                if not request.statements:
+                    request.ok = True
+                    continue
+                conn.execute('SAVEPOINT request')
+                try:
+                    for sql, statement, params in request.statements:
+                        start = time.perf_counter()
+                        conn.execute(sql, params)
+                        if statement:
+                            statement.observe(time.perf_counter() - start)
+                    request.ok = True
+                except sqlite3.Error as e:
+                    conn.execute('ROLLBACK TO request')
+                    logger.error(f"SQLite写入失败: {e}")
+                finally:
+                    conn.execute('RELEASE request')
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            logger.error(f"SQLite批量提交失败: {e}")
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for request in batch:
+                request.ok = False
+        finally:
+            ok = sum(1 for request in batch if request.ok and request.statements)
+            self._stats['writes'] += ok
+            self._stats['failed'] += sum(1 for request in batch if not request.ok)
+            self._stats['batches'] += 1
+            self._stats['max_batch'] = max(self._stats['max_batch'], len(batch))
+            for request in batch:
+                request.done.set()
+
+    def get_stats(self):
+        """写入和连接统计"""
+        stats = dict(self._stats)
+        stats.update({
+            'backend': 'sqlite',
+            'queued': self._queue.qsize(),
+            'read_connections': len(self._readers),
+            'is_healthy': self.is_healthy()
+        })
+        return stats
+
+    def get_pool_stats(self):
+        """与 Database.get_pool_stats 同名的统计接口"""
+        return self.get_stats()
+
+    def close(self):
+        """写完队列中剩余的请求后关闭所有连接"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._writer_conn.close()
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        logger.info("SQLite存储已关闭")
@@ -0,0 +1,181 @@
+"""
+SQL语句注册表
+
+热点查询在模块加载时按名称注册一次：SQL文本规范化并按存储后端方言缓存，
+调用时不再拼接或转换字符串（SQLite 连接按SQL文本复用已编译的语句）。
+存储后端执行已注册语句时记录耗时到该语句的延迟直方图，超过阈值的慢查询记录警告日志。
+"""
+
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 直方图桶上界（秒）：0.05ms 起按2倍递增到约13秒
+LATENCY_BUCKETS = tuple(0.00005 * 2 ** i for i in range(19))
+
+# 默认慢查询阈值（秒）
+DEFAULT_SLOW_THRESHOLD = 0.2
+
+
+class LatencyHistogram:
+    """固定桶的延迟直方图（分位数为所在桶的上界）"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        """记录一次耗时"""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, p):
+        """
+        估算分位数
+
+        Args:
+            p: 0~100
+
+        Returns:
+            float: 秒（落在最后一个桶之外时返回最大值）
+        """
+        if not self.count:
+            return 0.0
+        target = self.count * p / 100
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target and n:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def cumulative(self):
+        """
+        累计桶计数（Prometheus 直方图格式）
+
+        Returns:
+            tuple: ([(桶上界, 不超过该上界的次数)], 总次数, 总耗时)，总次数即 +Inf 桶
+        """
+        with self._lock:
+            counts, count, total = list(self.counts), self.count, self.total
+        buckets = []
+        seen = 0
+        for bound, n in zip(self.buckets, counts):
+            seen += n
+            buckets.append((bound, seen))
+        return buckets, count, total
+
+    def snapshot(self):
+        """统计快照（毫秒）"""
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p95_ms': round(self.percentile(95) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3)
+        }
+
+
+class Statement:
+    """已注册的SQL语句"""
+
+    __slots__ = ('name', 'sql', 'dialect_sql', 'histogram', 'slow', 'registry')
+
+    def __init__(self, name, sql, dialects=None, registry=None):
+        """
+        Args:
+            name: 语句名称（统计和日志中使用）
+            sql: 使用 %s 占位符的SQL
+            dialects: {方言: SQL} 需要不同写法的方言
+            registry: 所属注册表
+        """
+        self.name = name
+        self.sql = ' '.join(sql.split())
+        self.dialect_sql = {dialect: ' '.join(text.split()) for dialect, text in (dialects or {}).items()}
+        self.histogram = LatencyHistogram()
+        self.slow = 0
+        self.registry = registry
+
+    def sql_for(self, dialect):
+        """按方言取SQL（结果缓存，只在首次调用时转换）"""
+        sql = self.dialect_sql.get(dialect)
+        if sql is None:
+            sql = self.sql.replace('%s', '?') if dialect == 'sqlite' else self.sql
+            self.dialect_sql[dialect] = sql
+        return sql
+
+    def observe(self, seconds):
+        """记录一次执行耗时，超过慢查询阈值时记录警告"""
+        self.histogram.observe(seconds)
+        threshold = self.registry.slow_threshold if self.registry else DEFAULT_SLOW_THRESHOLD
+        if seconds >= threshold:
+            self.slow += 1
+            logger.warning("慢查询 %s: %.1fms", self.name, seconds * 1000)
+
+    def __repr__(self):
+        return f'Statement({self.name!r})'
+
+
+class StatementRegistry:
+    """语句注册表"""
+
+    def __init__(self, slow_threshold=DEFAULT_SLOW_THRESHOLD):
+        self.slow_threshold = slow_threshold
+        self.statements = {}
+
+    def register(self, name, sql, dialects=None):
+        """
+        注册语句（同名重复注册返回已有语句）
+
+        Returns:
+            Statement: 已注册的语句
+        """
+        statement = self.statements.get(name)
+        if statement is None:
+            statement = self.statements[name] = Statement(name, sql, dialects, self)
+        return statement
+
+    def get(self, name):
+        return self.statements.get(name)
+
+    def get_stats(self):
+        """各语句的执行次数、延迟分位数和慢查询次数"""
+        stats = {}
+        for name, statement in self.statements.items():
+            entry = statement.histogram.snapshot()
+            entry['slow'] = statement.slow
+            stats[name] = entry
+        return stats
+
+
+def resolve(query, dialect):
+    """
+    解析要执行的SQL
+
+    Args:
+        query: Statement 或SQL字符串
+        dialect: 存储后端方言
+
+    Returns:
+        tuple: (SQL字符串, Statement或None)
+    """
+    if isinstance(query, Statement):
+        return query.sql_for(dialect), query
+    # 未注册的语句每次转换（只用于非热点路径）
+    return (query.replace('%s', '?') if dialect == 'sqlite' else query), None
+
+
+# 全局语句注册表
+STATEMENTS = StatementRegistry()
@@ -0,0 +1,256 @@
+"""
+存储后端抽象
+
+GamePlugin.save_to_db/query_from_db 通过此接口读写，不依赖具体数据库。
+后端提供 write（同一事务中执行多条写入）和 query（只读查询）；
+SQL统一使用 %s 占位符；语句可以是SQL字符串或 statements.py 中注册的 Statement，
+后者按 dialect 取SQL并记录执行耗时。
+
+- Database（database.py）：MySQL连接池
+- SQLiteBackend（sqlite_storage.py）：嵌入式SQLite，无需外部服务
+- ExecutorBackend：包装以上后端，在有界线程池中执行（异步服务器模式）
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
+from statements import resolve
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend:
+    """
+    存储后端基类
+
+    默认实现基于 get_connection() 上下文管理器（DB-API连接，退出时提交），
+    连接池类后端只需提供 get_connection 和 is_healthy。
+    """
+
+    dialect = 'mysql'
+
+    def is_healthy(self):
+        """后端是否可用"""
+        raise NotImplementedError
+
+    def get_connection(self):
+        """获取连接的上下文管理器（退出时提交，异常时回滚）"""
+        raise NotImplementedError
+
+    def write(self, statements):
+        """
+        在同一事务中执行多条写入语句
+
+        Args:
+            statements: [(Statement或SQL语句, 参数)] 列表
+
+        Returns:
+            bool: 是否成功（异步后端表示已接受写入）
+
+        Raises:
+            Exception: 写入失败，事务已回滚
+        """
+        with self.get_connection() as conn:
+            cur = conn.cursor()
+            for query, params in statements:
+                sql, statement = resolve(query, self.dialect)
+                start = time.perf_counter()
+                cur.execute(sql, params)
+                if statement:
+                    statement.observe(time.perf_counter() - start)
+            cur.close()
+        return True
+
+    def query(self, query, params=None):
+        """
+        执行只读查询
+
+        Returns:
+            list: 查询结果行
+        """
+        sql, statement = resolve(query, self.dialect)
+        with self.get_connection() as conn:
+            cur = conn.cursor()
+            start = time.perf_counter()
+            if params:
+                cur.execute(sql, params)
+            else:
+                cur.execute(sql)
+            results = cur.fetchall()
+            if statement:
+                statement.observe(time.perf_counter() - start)
+            cur.close()
+        return results
+
+    def stream(self, query, params=None, size=1000):
+        """
+        逐行读取查询结果（不一次性取出全部结果）
+
+        Args:
+            query: Statement或SQL语句
+            params: 查询参数
+            size: 每次从服务端取出的行数
+
+        Yields:
+            tuple: 结果行
+        """
+        sql, _ = resolve(query, self.dialect)
+        with self.get_connection() as conn:
+            cur = self._stream_cursor(conn)
+            try:
+                cur.execute(sql, params)
+                while True:
+                    rows = cur.fetchmany(size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                cur.close()
+
+    def _stream_cursor(self, conn):
+        """流式读取使用的游标"""
+        return conn.cursor()
+
+    def get_stats(self):
+        """后端统计信息"""
+        return {}
+
+    def close(self):
+        """释放后端资源"""
+
+
+class ConnectionBackend(StorageBackend):
+    """将只提供 get_connection/is_healthy 的数据库对象适配为存储后端"""
+
+    def __init__(self, db):
+        self.db = db
+        self.dialect = getattr(db, 'dialect', StorageBackend.dialect)
+
+    def is_healthy(self):
+        return self.db.is_healthy()
+
+    def get_connection(self):
+        return self.db.get_connection()
+
+    def get_stats(self):
+        get_pool_stats = getattr(self.db, 'get_pool_stats', None)
+        return get_pool_stats() if callable(get_pool_stats) else {}
+
+
+def as_backend(db):
+    """
+    将数据库对象转换为存储后端
+
+    Returns:
+        StorageBackend: 已是存储后端时原样返回，db为None时返回None
+    """
+    if db is None or isinstance(db, StorageBackend):
+        return db
+    return ConnectionBackend(db)
+
+
+class ExecutorBackend(StorageBackend):
+    """
+    在有界线程池中执行数据库调用的后端包装（异步服务器模式使用，数据库调用不阻塞事件循环）
+
+    写入提交到线程池后立即返回，等待执行的写入超过 max_pending 时直接丢弃（与SQLite写队列满时一致）；
+    协程中的查询使用 aquery，同步调用的 query/stream 仍在调用线程中执行。
+    """
+
+    def __init__(self, backend, max_workers=4, max_pending=1000):
+        """
+        Args:
+            backend: 被包装的存储后端
+            max_workers: 线程池大小（不超过连接池大小）
+            max_pending: 最多等待执行的写入数
+        """
+        self.backend = backend
+        self.dialect = backend.dialect
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='storage')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'rejected': 0, 'failed': 0}
+
+    def is_healthy(self):
+        return self.backend.is_healthy()
+
+    def write(self, statements):
+        """
+        提交写入到线程池
+
+        Returns:
+            bool: 是否已接受（队列已满时为False）
+        """
+        if not self._slots.acquire(blocking=False):
+            self._stats['rejected'] += 1
+            logger.warning("数据库写入队列已满，丢弃写入")
+            return False
+        try:
+            future = self._executor.submit(self._write, statements)
+        except RuntimeError:
+            self._slots.release()
+            return False
+        self._stats['submitted'] += 1
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return True
+
+    def _write(self, statements):
+        try:
+            self.backend.write(statements)
+        except Exception as e:
+            self._stats['failed'] += 1
+            logger.error(f"数据库写入失败: {e}")
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+        self._slots.release()
+
+    def query(self, query, params=None):
+        return self.backend.query(query, params)
+
+    def stream(self, query, params=None, size=1000):
+        return self.backend.stream(query, params, size)
+
+    async def aquery(self, query, params=None):
+        """在线程池中执行只读查询（协程）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.backend.query, query, params)
+
+    async def awrite(self, statements):
+        """在线程池中执行写入并等待完成（协程）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.backend.write, statements)
+
+    def flush(self, timeout=None):
+        """
+        等待已提交的写入完成（被包装的后端有 flush 时再刷新它）
+
+        Returns:
+            bool: 是否在超时前完成
+        """
+        with self._lock:
+            pending = list(self._pending)
+        done = not futures.wait(pending, timeout).not_done
+        flush = getattr(self.backend, 'flush', None)
+        if callable(flush):
+            flush()
+        return done
+
+    def get_stats(self):
+        stats = dict(self.backend.get_stats())
+        stats.update(self._stats, pending=len(self._pending))
+        return stats
+
+    def close(self):
+        """写完已提交的写入后关闭线程池和被包装的后端"""
+        self._executor.shutdown(wait=True)
+        self.backend.close()
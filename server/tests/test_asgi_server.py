@@ -0,0 +1,187 @@
+"""
+异步服务器模式测试
+
+在事件循环中直接向 AsyncServer 投递 Engine.IO 消息，测试插件、心跳在异步模式下的行为，
+以及数据库线程池和HTTP桥接
+"""
+
+import asyncio
+import json
+import threading
+import unittest
+from collections import defaultdict
+from types import SimpleNamespace
+
+from flask import Flask, jsonify, request
+
+from asgi_server import AsyncSocketIO, WSGIBridge
+from game_manager import GameManager
+from heartbeat import HeartbeatHandler
+from plugin_loader import PluginLoader
+from plugins.base import GamePlugin
+from storage import ExecutorBackend, StorageBackend
+
+GOMOKU_EVENTS = ['create_room', 'join_room', 'make_move', 'disconnect']
+
+
+class LookupPlugin(GamePlugin):
+    """协程处理器插件"""
+
+    def register_routes(self):
+        pass
+
+    def register_events(self):
+        @self.on('lookup')
+        async def handle_lookup(data):
+            value, thread = await self.run_blocking(lambda: (data['value'] * 2, threading.current_thread().name))
+            self.safe_emit('lookup_result', {'value': value, 'thread': thread})
+
+
+class TestAsyncSocketIO(unittest.IsolatedAsyncioTestCase):
+    """测试 AsyncSocketIO 上的插件事件"""
+
+    async def asyncSetUp(self):
+        self.sent = defaultdict(list)
+        self.app = Flask('asgi-test')
+        self.socketio = AsyncSocketIO(self.app, async_handlers=False)
+
+        async def send(eio_sid, pkt):
+            self.sent[eio_sid].append(pkt.data)
+
+        self.socketio.sio.eio.send_packet = send
+        self.socketio.attach()
+        self.game_manager = GameManager()
+        self.heartbeat = HeartbeatHandler(self.socketio, timeout=60)
+        self.heartbeat.register_events()
+
+    async def connect(self, eio_sid):
+        await self.socketio.sio._handle_eio_connect(eio_sid, {})
+        await self.socketio.sio._handle_eio_message(eio_sid, '0')
+        await self.socketio.flush()
+        return self.socketio.sio.manager.sid_from_eio_sid(eio_sid, '/')
+
+    async def send(self, eio_sid, event, data):
+        await self.socketio.sio._handle_eio_message(eio_sid, '2' + json.dumps([event, data]))
+        await self.socketio.flush()
+
+    def received(self, eio_sid, event):
+        prefix = f'2["{event}",'
+        return [json.loads(data[1:])[1] for data in self.sent[eio_sid] if data.startswith(prefix)]
+
+    async def test_gomoku_game(self):
+        registry = SimpleNamespace(games={'gomoku': {'id': 'gomoku', 'server': {
+            'enabled': True, 'plugin': 'plugins.gomoku:GomokuPlugin', 'events': GOMOKU_EVENTS}}})
+        loader = PluginLoader(registry, self.app, self.socketio, None, self.game_manager,
+                              heartbeat_handler=self.heartbeat, default_game='gomoku')
+        loader.register_events()
+
+        p1 = await self.connect('eio1')
+        p2 = await self.connect('eio2')
+        self.assertIn(p1, self.heartbeat.client_heartbeats)
+
+        await self.send('eio1', 'create_room', {})
+        room_id = self.received('eio1', 'room_created')[0]['room_id']
+        await self.send('eio2', 'join_room', {'room_id': room_id})
+        await self.send('eio1', 'make_move', {'room_id': room_id, 'row': 7, 'col': 7})
+
+        self.assertEqual(self.game_manager.rooms[room_id]['players'], [p1, p2])
+        self.assertEqual(self.received('eio2', 'move_made')[0]['row'], 7)
+        self.assertEqual(self.received('eio1', 'move_made')[0]['row'], 7)
+
+        # 断开连接由插件清理房间并通知对手
+        await self.socketio.sio._handle_eio_disconnect('eio2')
+        await self.socketio.flush()
+        self.assertEqual(len(self.received('eio1', 'player_left')), 1)
+
+    async def test_async_handler_offloads_blocking_call(self):
+        LookupPlugin(self.app, self.socketio, None, self.game_manager)
+        await self.connect('eio1')
+        await self.send('eio1', 'lookup', {'value': 21})
+        result = self.received('eio1', 'lookup_result')[0]
+        self.assertEqual(result['value'], 42)
+        self.assertTrue(result['thread'].startswith('asgi'))
+
+    async def test_emit_from_other_thread(self):
+        sid = await self.connect('eio1')
+        thread = threading.Thread(target=self.socketio.emit, args=('tick', {'n': 1}), kwargs={'room': sid})
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0)
+        await self.socketio.flush()
+        self.assertEqual(self.received('eio1', 'tick'), [{'n': 1}])
+
+
+class SlowBackend(StorageBackend):
+    """写入等待放行的存储后端"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.written = []
+
+    def is_healthy(self):
+        return True
+
+    def write(self, statements):
+        self.release.wait(5)
+        self.written.append(statements)
+        return True
+
+    def query(self, query, params=None):
+        return [(query, params)]
+
+
+class TestExecutorBackend(unittest.TestCase):
+    """测试有界线程池存储后端"""
+
+    def test_bounded_pending_writes(self):
+        inner = SlowBackend()
+        backend = ExecutorBackend(inner, max_workers=1, max_pending=2)
+        self.assertTrue(backend.write([('a', ())]))
+        self.assertTrue(backend.write([('b', ())]))
+        self.assertFalse(backend.write([('c', ())]))
+
+        inner.release.set()
+        self.assertTrue(backend.flush(timeout=5))
+        self.assertEqual(len(inner.written), 2)
+        stats = backend.get_stats()
+        self.assertEqual((stats['submitted'], stats['rejected'], stats['pending']), (2, 1, 0))
+        self.assertTrue(backend.write([('d', ())]))
+        backend.close()
+        self.assertEqual(len(inner.written), 3)
+
+    def test_async_query(self):
+        backend = ExecutorBackend(SlowBackend())
+        self.assertEqual(asyncio.run(backend.aquery('SELECT 1', (2,))), [('SELECT 1', (2,))])
+        backend.close()
+
+
+class TestWSGIBridge(unittest.TestCase):
+    """测试普通HTTP请求交给 Flask 应用处理"""
+
+    def test_request(self):
+        app = Flask('bridge-test')
+
+        @app.route('/api/echo', methods=['POST'])
+        def echo():
+            return jsonify({'body': request.get_json(), 'q': request.args.get('q')})
+
+        messages = [{'type': 'http.request', 'body': b'{"a":', 'more_body': True},
+                    {'type': 'http.request', 'body': b' 1}'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'POST', 'path': '/api/echo', 'query_string': b'q=x',
+                 'headers': [(b'content-type', b'application/json')]}
+        bridge = WSGIBridge(app, None)
+        asyncio.run(bridge(scope, receive, send))
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(json.loads(sent[1]['body']), {'body': {'a': 1}, 'q': 'x'})
+
+
+if __name__ == '__main__':
+    unittest.main()
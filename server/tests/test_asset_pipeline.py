@@ -0,0 +1,143 @@
+"""
+静态资源管线测试
+
+在临时目录中构建资源，通过Flask测试客户端验证压缩协商、ETag和缓存头
+"""
+
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from flask import Flask
+
+import asset_pipeline
+from asset_pipeline import AssetPipeline, IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL
+
+SCRIPT = b'console.log("hello");\n' * 40
+
+
+class TestAssetPipeline(unittest.TestCase):
+    """测试静态资源管线"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.write('index.html', b'<html></html>')
+        self.write('heartbeat.js', SCRIPT)
+        self.write('secret.env', b'DB_PASSWORD=x')
+        self.write('demo/game.json', b'{"name": "demo", "id": "demo", "entry": "index.html"}')
+        self.write('demo/game.js', SCRIPT)
+        self.write('demo/index.html',
+                   b'<script src="/heartbeat.js"></script><script src="game.js"></script>'
+                   b'<script src="https://cdn.example.com/lib.js"></script>')
+        self.write('notagame/readme.js', SCRIPT)
+
+        self.pipeline = AssetPipeline(self.root).build()
+        app = Flask(__name__)
+
+        @app.route('/<path:path>')
+        def serve(path):
+            from flask import request
+            return self.pipeline.respond(path, request.headers) or ('', 404)
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, path, body):
+        full = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, 'wb') as f:
+            f.write(body)
+
+    def test_discovers_game_dirs_only(self):
+        """测试只扫描包含 game.json 的目录和根目录公共资源"""
+        self.assertEqual(self.pipeline.game_dirs, ['demo'])
+        self.assertIn('demo/game.js', self.pipeline.assets)
+        self.assertNotIn('notagame/readme.js', self.pipeline.assets)
+        self.assertEqual(self.client.get('/secret.env').status_code, 404)
+
+    def test_html_references_rewritten_to_hashed_urls(self):
+        """测试HTML中的本地引用改写为哈希URL，外部URL保持不变"""
+        html = self.pipeline.assets['demo/index.html'].body.decode()
+        game = self.pipeline.assets['demo/game.js']
+        heartbeat = self.pipeline.assets['heartbeat.js']
+
+        self.assertIn(f'src="/{game.hashed_path}"', html)
+        self.assertIn(f'src="/{heartbeat.hashed_path}"', html)
+        self.assertIn('https://cdn.example.com/lib.js', html)
+
+    def test_encoding_negotiation(self):
+        """测试按 Accept-Encoding 选择预压缩版本"""
+        response = self.client.get('/demo/game.js', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response.data), SCRIPT)
+
+        response = self.client.get('/demo/game.js')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data, SCRIPT)
+
+        response = self.client.get('/demo/game.js', headers={'Accept-Encoding': 'gzip;q=0'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    @unittest.skipIf(asset_pipeline.brotli is None, 'brotli未安装')
+    def test_brotli_preferred(self):
+        """测试同时支持时优先brotli"""
+        response = self.client.get('/demo/game.js', headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(asset_pipeline.brotli.decompress(response.data), SCRIPT)
+
+    def test_small_files_not_compressed(self):
+        """测试小文件只保留原始版本"""
+        self.assertEqual(list(self.pipeline.assets['index.html'].variants), ['identity'])
+
+    def test_cache_headers(self):
+        """测试哈希URL永久缓存，原始URL需重新验证"""
+        game = self.pipeline.assets['demo/game.js']
+
+        response = self.client.get('/' + game.hashed_path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+
+        response = self.client.get('/demo/game.js')
+        self.assertEqual(response.headers['Cache-Control'], REVALIDATE_CACHE_CONTROL)
+
+    def test_conditional_request_returns_304(self):
+        """测试 If-None-Match 命中时返回304"""
+        headers = {'Accept-Encoding': 'gzip'}
+        etag = self.client.get('/demo/game.js', headers=headers).headers['ETag']
+
+        response = self.client.get('/demo/game.js', headers={**headers, 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+
+        response = self.client.get('/demo/game.js', headers={**headers, 'If-None-Match': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_differs_per_encoding(self):
+        """测试不同编码的表示使用不同的强ETag"""
+        identity = self.client.get('/demo/game.js').headers['ETag']
+        gzipped = self.client.get('/demo/game.js', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+        self.assertNotEqual(identity, gzipped)
+        self.assertFalse(identity.startswith('W/'))
+
+    def test_auto_reload_picks_up_changes(self):
+        """测试开发模式下源文件修改后重建并更新哈希"""
+        pipeline = AssetPipeline(self.root, auto_reload=True).build()
+        old_hash = pipeline.assets['demo/game.js'].hashed_path
+
+        self.write('demo/game.js', b'console.log("changed");')
+        source = os.path.join(self.root, 'demo/game.js')
+        os.utime(source, (pipeline._built_mtime + 10, pipeline._built_mtime + 10))
+
+        asset, _ = pipeline.get('demo/game.js')
+        self.assertEqual(asset.body, b'console.log("changed");')
+        self.assertNotEqual(asset.hashed_path, old_hash)
+        self.assertIn(asset.hashed_path, pipeline.assets['demo/index.html'].body.decode())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+一次编码广播测试
+
+使用真实的SocketIO服务端对象，拦截Engine.IO发送以验证编码次数和接收者
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import socketio
+
+from broadcaster import Broadcaster
+
+
+class TestBroadcaster(unittest.TestCase):
+    """测试一次编码广播"""
+    
+    def setUp(self):
+        self.server = socketio.Server()
+        self.sent = []
+        self.server.eio.send_packet = lambda eio_sid, pkt: self.sent.append((eio_sid, pkt))
+        self.broadcaster = Broadcaster(Mock(server=self.server))
+        
+        # 模拟已连接的客户端
+        self.sids = {}
+        for name in ['p1', 'p2', 's1']:
+            self.sids[name] = self.server.manager.connect('eio-' + name, '/')
+        for name in ['p1', 'p2', 's1']:
+            self.server.manager.enter_room(self.sids[name], '/', 'room1')
+    
+    def recipients(self):
+        return sorted(eio_sid for eio_sid, _ in self.sent)
+    
+    def test_emit_to_sids_encodes_once(self):
+        """测试发送给明确接收者集合时只编码一次"""
+        with patch.object(self.server, 'packet_class', wraps=self.server.packet_class) as packet_class:
+            sent = self.broadcaster.emit('score_update', {'score': 1},
+                                         sids=[self.sids['p1'], self.sids['p2']])
+        
+        self.assertEqual(sent, 2)
+        packet_class.assert_called_once()
+        self.assertEqual(self.recipients(), ['eio-p1', 'eio-p2'])
+        # 所有接收者共享同一个数据包对象
+        self.assertIs(self.sent[0][1], self.sent[1][1])
+    
+    def test_emit_to_room_with_exclusions(self):
+        """测试发送给房间并排除部分接收者"""
+        sent = self.broadcaster.emit('move_made', {'row': 1}, room='room1',
+                                     exclude={self.sids['s1']})
+        
+        self.assertEqual(sent, 2)
+        self.assertEqual(self.recipients(), ['eio-p1', 'eio-p2'])
+    
+    def test_emit_binary_payload(self):
+        """测试二进制数据按附件拆分为多个数据包"""
+        self.broadcaster.emit('move_made', b'\x01\x02', sids=[self.sids['p1']])
+        
+        self.assertEqual(len(self.sent), 2)
+        self.assertTrue(self.sent[1][1].binary)
+    
+    def test_unknown_sid_skipped(self):
+        """测试已断开的sid被跳过"""
+        sent = self.broadcaster.emit('score_update', {}, sids=['gone', self.sids['p1']])
+        
+        self.assertEqual(sent, 1)
+    
+    def test_empty_recipients(self):
+        """测试空接收者集合不编码"""
+        with patch.object(self.server, 'packet_class') as packet_class:
+            self.assertEqual(self.broadcaster.emit('score_update', {}, sids=[]), 0)
+        packet_class.assert_not_called()
+
+    
+    def test_fallback_without_engineio_send(self):
+        """测试服务端对象没有 Engine.IO 发送接口时退回为 emit"""
+        server = Mock(spec=['manager', 'emit', 'packet_class'])
+        server.manager = self.server.manager
+        sent = Broadcaster(Mock(server=server)).emit('move_made', {'row': 1}, sids=[self.sids['p1']],
+                                                     exclude={self.sids['s1']})
+        
+        self.assertEqual(sent, 1)
+        server.emit.assert_called_once_with('move_made', {'row': 1}, to=[self.sids['p1']],
+                                            skip_sid=[self.sids['s1']], namespace='/')
+        self.assertEqual(self.sent, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+"""
+集群模式测试
+
+测试Redis协议客户端与本地代理、房间归属，以及两个工作进程（同一进程内的两个服务器实例）
+之间的事件转发和跨进程发送
+"""
+
+import pickle
+import time
+import unittest
+from collections import defaultdict
+from types import SimpleNamespace
+
+from flask import Flask, request
+from flask_socketio import SocketIO
+
+import json_codec
+from cluster import DEFAULT_CHANNEL, ClusterManager, LocalPubSub, RespPubSub, RoomAffinity
+from game_manager import GameManager
+from plugin_loader import PluginLoader
+from resp import RespBroker, RespClient, RespError, parse_url
+
+GOMOKU_EVENTS = ['create_room', 'join_room', 'make_move', 'send_comment', 'rejoin_room', 'disconnect']
+
+
+class Exploit:
+    """反序列化时执行代码的对象"""
+    executed = False
+
+    def __reduce__(self):
+        return (setattr, (Exploit, 'executed', True))
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestResp(unittest.TestCase):
+    """测试Redis协议客户端和本地代理"""
+
+    def setUp(self):
+        self.broker = RespBroker().start()
+        self.client = RespClient.from_url(self.broker.url)
+
+    def tearDown(self):
+        self.client.close()
+        self.broker.close()
+
+    def test_commands_and_pipeline(self):
+        """测试命令应答、流水线和错误应答"""
+        self.assertEqual(self.client.execute('PING'), b'PONG')
+        replies = self.client.pipeline([('ECHO', 'a'), ('NO_SUCH_COMMAND',)])
+        self.assertEqual(replies[0], b'a')
+        self.assertIsInstance(replies[1], RespError)
+        with self.assertRaises(RespError):
+            self.client.execute('NO_SUCH_COMMAND')
+
+    def test_publish_subscribe(self):
+        """测试订阅生效后发布的消息按顺序送达"""
+        pubsub = RespPubSub(self.broker.url)
+        subscription = pubsub.subscribe('room')
+        received = []
+        iterator = iter(subscription)
+
+        self.assertEqual(pubsub.publish('room', b'\x00one'), 1)
+        pubsub.publish('room', b'two')
+        received.append(next(iterator))
+        received.append(next(iterator))
+        subscription.close()
+        pubsub.close()
+
+        self.assertEqual(received, [b'\x00one', b'two'])
+
+    def test_parse_url(self):
+        self.assertEqual(parse_url('redis://:secret@cache:6380/2'),
+                         {'host': 'cache', 'port': 6380, 'password': 'secret', 'db': 2})
+
+
+class TestRoomAffinity(unittest.TestCase):
+    """测试房间归属"""
+
+    def test_rooms_created_on_owner(self):
+        """测试每个进程只创建归属自己的房间ID，归属与进程无关地一致"""
+        affinities = [RoomAffinity(i, 3) for i in range(3)]
+        for affinity in affinities:
+            game_manager = GameManager(affinity=affinity)
+            for _ in range(20):
+                room_id = game_manager.create_room('gomoku', {})
+                self.assertEqual(len(room_id), 8)
+                self.assertEqual({a.owner(room_id) for a in affinities}, {affinity.worker_id})
+
+    def test_invalid_worker(self):
+        with self.assertRaises(ValueError):
+            RoomAffinity(2, 2)
+
+
+class TestClusterRouting(unittest.TestCase):
+    """测试两个工作进程之间的事件转发"""
+
+    def setUp(self):
+        registry = SimpleNamespace(games={'gomoku': {'id': 'gomoku', 'server': {
+            'enabled': True, 'plugin': 'plugins.gomoku:GomokuPlugin', 'events': GOMOKU_EVENTS}}})
+        self.hub = hub = LocalPubSub()
+        self.sent = defaultdict(list)
+        self.workers = []
+        for worker_id in range(2):
+            app = Flask(f'worker{worker_id}')
+            cluster = ClusterManager(hub, RoomAffinity(worker_id, 2))
+            socketio = SocketIO(app, client_manager=cluster)
+            socketio.server.eio.send_packet = lambda eio_sid, pkt: self.sent[eio_sid].append(pkt.data)
+            cluster.initialize()
+            socketio.server.manager_initialized = True
+            game_manager = GameManager(affinity=cluster.affinity)
+            loader = PluginLoader(registry, app, socketio, None, game_manager, default_game='gomoku',
+                                  cluster=cluster)
+            loader.register_events()
+            self.workers.append(SimpleNamespace(app=app, socketio=socketio, cluster=cluster,
+                                                game_manager=game_manager, loader=loader))
+
+    def tearDown(self):
+        for worker in self.workers:
+            worker.cluster.close()
+
+    def connect(self, worker, eio_sid):
+        return worker.socketio.server.manager.connect(eio_sid, '/')
+
+    def send(self, worker, sid, event, *args):
+        with worker.app.test_request_context('/socket.io/'):
+            request.sid = sid
+            request.namespace = '/'
+            worker.loader.routes[event](*args)
+
+    def received(self, eio_sid, event):
+        return [data for data in self.sent[eio_sid] if data.startswith(f'2["{event}"')]
+
+    def test_events_routed_to_room_owner(self):
+        """测试连接在其他进程的玩家加入、落子由房间归属进程处理，广播送达两个进程的连接"""
+        owner, other = self.workers
+        player1 = self.connect(owner, 'eio1')
+        player2 = self.connect(other, 'eio2')
+        spectator = self.connect(other, 'eio3')
+
+        self.send(owner, player1, 'create_room', {})
+        room_id = next(iter(owner.game_manager.rooms))
+        self.send(other, player2, 'join_room', {'room_id': room_id})
+        self.assertTrue(wait_until(lambda: len(owner.game_manager.rooms[room_id]['players']) == 2))
+        self.assertEqual(owner.game_manager.rooms[room_id]['players'], [player1, player2])
+        self.assertEqual(other.game_manager.rooms, {})
+
+        self.send(owner, player1, 'make_move', {'room_id': room_id, 'row': 7, 'col': 7})
+        self.send(other, player2, 'make_move', {'room_id': room_id, 'row': 7, 'col': 8})
+        moves = owner.game_manager.rooms[room_id]['state']['moves']
+        self.assertTrue(wait_until(lambda: len(moves) == 2))
+        self.assertTrue(wait_until(lambda: len(self.received('eio2', 'move_made')) == 2))
+        self.assertEqual(len(self.received('eio2', 'room_joined')), 1)
+        # 发给本进程连接的事件不经消息队列
+        self.assertGreater(owner.cluster.get_stats()['local'], 0)
+
+        # 只发给玩家的广播（Broadcaster）经消息队列送达其他进程的连接
+        self.send(other, spectator, 'join_room', {'room_id': room_id, 'spectator': True})
+        self.assertTrue(wait_until(lambda: self.received('eio2', 'spectator_list_updated')))
+        self.assertEqual(len(self.received('eio1', 'spectator_list_updated')), 1)
+        self.assertEqual(self.received('eio3', 'spectator_list_updated'), [])
+
+    def test_disconnect_reaches_owner(self):
+        """测试其他进程的连接断开时，房间归属进程清理该玩家"""
+        owner, other = self.workers
+        player1 = self.connect(owner, 'eio1')
+        player2 = self.connect(other, 'eio2')
+        self.send(owner, player1, 'create_room', {})
+        room_id = next(iter(owner.game_manager.rooms))
+        self.send(other, player2, 'join_room', {'room_id': room_id})
+        self.assertTrue(wait_until(lambda: len(owner.game_manager.rooms[room_id]['players']) == 2))
+
+        self.send(other, player2, 'disconnect')
+        self.assertTrue(wait_until(lambda: room_id not in owner.game_manager.rooms
+                                   or player2 not in owner.game_manager.rooms[room_id]['players']))
+        self.assertEqual(other.cluster.get_stats()['forwarded'], 2)
+
+
+    def test_messages_are_json(self):
+        """测试集群消息以JSON编码：元组和二进制参数原样送达，pickle 数据不会被反序列化"""
+        owner, other = self.workers
+        routed = []
+        other.cluster.router = lambda event, args, sid, namespace: routed.append((event, args, sid))
+
+        with self.assertLogs('cluster', 'ERROR') as logs:
+            self.hub.publish(DEFAULT_CHANNEL, pickle.dumps(Exploit()))
+            self.hub.publish(DEFAULT_CHANNEL, json_codec.dumps(pickle.dumps(Exploit())))
+            owner.cluster.forward(other.cluster.affinity.worker_id, 'make_move',
+                                  ({'frame': b'\x00\x01'}, (1, 2)), 'sid1')
+            self.assertTrue(wait_until(lambda: routed and owner.cluster.get_stats()['received'] == 3))
+
+        self.assertEqual(routed, [('make_move', [{'frame': b'\x00\x01'}, (1, 2)], 'sid1')])
+        self.assertFalse(Exploit.executed)
+        self.assertEqual(len(logs.records), 4)  # 两个进程各有两条无法解析的消息
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+停机交接测试
+
+旧进程排空并写入快照，新进程恢复后玩家凭令牌重新加入并继续对局
+"""
+
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import zlib
+from collections import defaultdict
+from types import SimpleNamespace
+
+from flask import Flask, request
+from flask_socketio import SocketIO
+
+from barrage_manager import BarrageManager
+from drain import SNAPSHOT_MAGIC, SNAPSHOT_VERSION, DrainController, read_snapshot, write_snapshot
+from game_manager import GameManager, RoomStatus
+from plugin_loader import PluginLoader
+
+GOMOKU_EVENTS = ['create_room', 'join_room', 'make_move', 'send_comment', 'rejoin_room', 'disconnect']
+
+
+class TestSnapshotFile(unittest.TestCase):
+    """测试快照文件读写"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'snapshot.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_round_trip(self):
+        rooms = {'r1': {'players': ['a'], 'state': {'moves': [(7, 7)]}}}
+        write_snapshot(self.path, rooms, {'r1': [{'text': 'hi'}]})
+        snapshot = read_snapshot(self.path)
+        self.assertEqual(snapshot['rooms'], rooms)
+        self.assertEqual(snapshot['barrage'], {'r1': [{'text': 'hi'}]})
+        self.assertFalse(os.path.exists(f'{self.path}.tmp'))
+
+    def test_room_types_round_trip(self):
+        """测试房间中的 deque、枚举和座位令牌原样恢复，快照不含 pickle 数据"""
+        game_manager = GameManager()
+        room_id = game_manager.create_room('gomoku', {'board': [[0, 1], [2, 0]], 'moves': [(0, 1), (1, 0)]})
+        game_manager.add_player(room_id, 'p1')
+        game_manager.add_player(room_id, 'p2')
+        game_manager.update_room_status(room_id, RoomStatus.PLAYING)
+        game_manager.record_delta(room_id, 'move_made', {'row': 0, 'col': 1}, target=room_id)
+        room = game_manager.get_room(room_id)
+        room['seat_tokens'] = ['tok-a', 'tok-b']
+        write_snapshot(self.path, {room_id: room}, {})
+
+        restored = read_snapshot(self.path)['rooms'][room_id]
+        self.assertEqual(restored, room)
+        self.assertIs(restored['status'], RoomStatus.PLAYING)
+        self.assertEqual(restored['deltas'].maxlen, room['deltas'].maxlen)
+        self.assertEqual(restored['seat_tokens'], ['tok-a', 'tok-b'])
+        self.assertEqual(restored['state']['moves'], [(0, 1), (1, 0)])
+        with open(self.path, 'rb') as f:
+            payload = zlib.decompress(f.read()[len(SNAPSHOT_MAGIC):])
+        self.assertEqual(json.loads(payload)['version'], SNAPSHOT_VERSION)
+
+    def test_invalid_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a snapshot')
+        with self.assertRaises(ValueError):
+            read_snapshot(self.path)
+        # 旧格式（pickle）的快照不会被反序列化
+        with open(self.path, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC + zlib.compress(pickle.dumps({'version': 1, 'rooms': {}})))
+        with self.assertRaises(ValueError):
+            read_snapshot(self.path)
+
+
+class TestDrainHandOff(unittest.TestCase):
+    """测试排空、恢复和凭令牌重新加入"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'room_snapshot.bin')
+        self.sent = defaultdict(list)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def make_server(self):
+        registry = SimpleNamespace(games={'gomoku': {'id': 'gomoku', 'server': {
+            'enabled': True, 'plugin': 'plugins.gomoku:GomokuPlugin', 'events': GOMOKU_EVENTS}}})
+        app = Flask('drain-test')
+        socketio = SocketIO(app)
+        socketio.server.eio.send_packet = lambda eio_sid, pkt: self.sent[eio_sid].append(pkt.data)
+        socketio.server.manager.initialize()
+        socketio.server.manager_initialized = True
+        game_manager = GameManager()
+        barrage_manager = BarrageManager()
+        loader = PluginLoader(registry, app, socketio, None, game_manager, barrage_manager,
+                              default_game='gomoku')
+        loader.register_events()
+        controller = DrainController(socketio, game_manager, barrage_manager, path=self.path, grace=0)
+        return SimpleNamespace(app=app, socketio=socketio, game_manager=game_manager,
+                               barrage_manager=barrage_manager, loader=loader, drain=controller)
+
+    def send(self, server, sid, event, *args):
+        with server.app.test_request_context('/socket.io/'):
+            request.sid = sid
+            request.namespace = '/'
+            server.loader.routes[event](*args)
+
+    def received(self, eio_sid, event):
+        prefix = f'2["{event}",'
+        return [json.loads(data[1:])[1] for data in self.sent[eio_sid] if data.startswith(prefix)]
+
+    def test_rejoin_after_restart(self):
+        old = self.make_server()
+        p1 = old.socketio.server.manager.connect('eio1', '/')
+        p2 = old.socketio.server.manager.connect('eio2', '/')
+        self.send(old, p1, 'create_room', {})
+        room_id = next(iter(old.game_manager.rooms))
+        self.send(old, p2, 'join_room', {'room_id': room_id})
+        self.send(old, p1, 'make_move', {'room_id': room_id, 'row': 7, 'col': 7})
+        self.send(old, p2, 'make_move', {'room_id': room_id, 'row': 7, 'col': 8})
+        self.send(old, p1, 'send_comment', {'room_id': room_id, 'comment': '加油'})
+
+        result = old.drain.drain()
+        self.assertEqual(result['rooms'], 1)
+        token1 = self.received('eio1', 'server_draining')[0]['token']
+        token2 = self.received('eio2', 'server_draining')[0]['token']
+
+        # 排空后不再处理事件
+        self.send(old, p1, 'make_move', {'room_id': room_id, 'row': 0, 'col': 0})
+        self.send(old, p1, 'create_room', {})
+        self.assertEqual(len(old.game_manager.rooms[room_id]['state']['moves']), 2)
+        self.assertEqual(len(old.game_manager.rooms), 1)
+
+        new = self.make_server()
+        self.assertEqual(new.drain.restore(), 1)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(new.barrage_manager.get_room_history(room_id)[0]['text'], '加油')
+
+        n1 = new.socketio.server.manager.connect('eio3', '/')
+        n2 = new.socketio.server.manager.connect('eio4', '/')
+        self.send(new, n1, 'rejoin_room', {'room_id': room_id, 'version': 1, 'token': 'wrong'})
+        self.assertEqual(new.game_manager.rooms[room_id]['players'], [p1, p2])
+
+        self.send(new, n1, 'rejoin_room', {'room_id': room_id, 'version': 1, 'token': token1})
+        self.send(new, n2, 'rejoin_room', {'room_id': room_id, 'version': 2, 'token': token2})
+        room = new.game_manager.rooms[room_id]
+        self.assertEqual(room['players'], [n1, n2])
+        self.assertNotIn('seat_tokens', room)
+        self.assertEqual(self.received('eio3', 'room_joined'), [{'room_id': room_id, 'color': 1}])
+        self.assertEqual(self.received('eio3', 'state_sync')[0]['version'], 2)
+
+        # 令牌只能使用一次，对局继续
+        self.send(new, n2, 'rejoin_room', {'room_id': room_id, 'token': token1})
+        self.assertEqual(room['players'], [n1, n2])
+        self.send(new, n1, 'make_move', {'room_id': room_id, 'row': 8, 'col': 8})
+        self.assertEqual(len(room['state']['moves']), 3)
+        self.assertEqual(self.received('eio4', 'move_made')[-1]['version'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
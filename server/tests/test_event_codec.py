@@ -0,0 +1,125 @@
+"""
+紧凑事件编码测试
+
+测试二进制帧编解码和按连接协商的广播分流
+"""
+
+import json
+import unittest
+from unittest.mock import Mock, patch
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from event_codec import EventCodec, BINARY_CODEC_ROOM, FRAME_LAYOUTS
+from plugins.base import GamePlugin
+from game_manager import GameManager
+
+
+def make_socketio(rooms):
+    """构造带房间成员信息的模拟SocketIO"""
+    socketio = Mock()
+    manager = socketio.server.manager
+    manager.rooms = {'/': {room: {sid: 'eio-' + sid for sid in sids} for room, sids in rooms.items()}}
+    manager.get_participants = lambda namespace, room: iter(
+        list(manager.rooms[namespace].get(room, {}).items())
+    )
+    return socketio
+
+
+class CodecPluginImpl(GamePlugin):
+    """测试用游戏插件实现"""
+    def register_routes(self):
+        pass
+    
+    def register_events(self):
+        pass
+
+
+class TestEventCodec(unittest.TestCase):
+    """测试二进制帧编解码"""
+    
+    def test_move_round_trip(self):
+        """测试落子事件编解码"""
+        data = {'row': 14, 'col': 3, 'color': 2, 'version': 180}
+        frame = EventCodec.encode('move_made', data)
+        
+        self.assertEqual(len(frame), 7)
+        self.assertEqual(EventCodec.decode('move_made', frame), data)
+    
+    def test_score_round_trip(self):
+        """测试分数事件编解码"""
+        data = {'position': 1, 'score': 1000000, 'version': 7}
+        frame = EventCodec.encode('score_update', data)
+        
+        self.assertEqual(EventCodec.decode('score_update', frame), data)
+        self.assertLess(len(frame), len(json.dumps(data)))
+    
+    def test_missing_version_omitted(self):
+        """测试未携带版本号的事件解码后不包含版本号"""
+        frame = EventCodec.encode('move_made', {'row': 1, 'col': 2, 'color': 1})
+        self.assertEqual(EventCodec.decode('move_made', frame), {'row': 1, 'col': 2, 'color': 1})
+    
+    def test_can_encode(self):
+        """测试只有定义了布局的事件可编码"""
+        for event in FRAME_LAYOUTS:
+            self.assertTrue(EventCodec.can_encode(event))
+        self.assertFalse(EventCodec.can_encode('new_comment'))
+    
+    def test_binary_recipients(self):
+        """测试只返回房间内协商了二进制编码的连接"""
+        socketio = make_socketio({'room1': ['a', 'b', 'c'], BINARY_CODEC_ROOM: ['b', 'x']})
+        codec = EventCodec(socketio)
+        
+        self.assertEqual(codec.binary_recipients('room1'), ['b'])
+        self.assertTrue(codec.is_binary('x'))
+        self.assertFalse(codec.is_binary('a'))
+
+
+class TestCodecBroadcast(unittest.TestCase):
+    """测试插件广播按编码分流"""
+    
+    def setUp(self):
+        self.game_manager = GameManager()
+        self.room_id = self.game_manager.create_room('gomoku', {})
+        self.game_manager.add_player(self.room_id, 'a')
+        self.game_manager.add_player(self.room_id, 'b')
+        self.socketio = make_socketio({self.room_id: ['a', 'b', 's'], BINARY_CODEC_ROOM: ['b', 's']})
+        self.plugin = CodecPluginImpl(Mock(), self.socketio, None, self.game_manager,
+                                      event_codec=EventCodec(self.socketio))
+        self.plugin.broadcaster = Mock()
+    
+    @patch('plugins.base.emit')
+    def test_room_broadcast_splits_by_codec(self, mock_emit):
+        """测试房间广播：二进制帧只编码一次，JSON接收者跳过二进制连接"""
+        data = {'row': 7, 'col': 7, 'color': 1, 'version': 1}
+        with patch.object(EventCodec, 'encode', wraps=EventCodec.encode) as mock_encode:
+            self.plugin.broadcast_to_room('move_made', data, self.room_id)
+        
+        mock_encode.assert_called_once()
+        frame = EventCodec.encode('move_made', data)
+        self.plugin.broadcaster.emit.assert_called_once_with('move_made', frame, sids=['b', 's'])
+        mock_emit.assert_called_once_with('move_made', data, room=self.room_id, skip_sid=['b', 's'])
+    
+    def test_players_only_broadcast(self):
+        """测试只发给玩家的广播按连接选择编码"""
+        data = {'position': 0, 'score': 10, 'version': 2}
+        self.plugin.broadcast_to_room('score_update', data, self.room_id, include_spectators=False)
+        
+        self.plugin.broadcaster.emit.assert_any_call(
+            'score_update', EventCodec.encode('score_update', data), sids=['b'])
+        self.plugin.broadcaster.emit.assert_any_call(
+            'score_update', data, sids=['a', 'b'], exclude={'b', 's'})
+        self.assertEqual(self.plugin.broadcaster.emit.call_count, 2)
+    
+    @patch('plugins.base.emit')
+    def test_unencodable_event_uses_json(self, mock_emit):
+        """测试没有帧布局的事件保持JSON"""
+        self.plugin.broadcast_to_room('new_comment', {'comment': 'hi'}, self.room_id)
+        
+        mock_emit.assert_called_once_with('new_comment', {'comment': 'hi'}, room=self.room_id)
+        self.plugin.broadcaster.emit.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+插件事件分发测试
+
+测试 GamePlugin.on 注册的处理器经过统一分发钩子
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from plugins.base import GamePlugin
+from game_manager import GameManager
+
+
+class DispatchPluginImpl(GamePlugin):
+    """测试用游戏插件实现"""
+    def register_routes(self):
+        pass
+    
+    def register_events(self):
+        self.calls = []
+        
+        @self.on('make_move')
+        def handle_move(data):
+            self.calls.append(data)
+            return 'handled'
+        
+        @self.on('disconnect')
+        def handle_disconnect():
+            self.calls.append('disconnect')
+        
+        @self.on('load_record')
+        async def handle_load_record(data):
+            record = await self.run_blocking(lambda: {'id': data['id']})
+            self.calls.append(record)
+            return 'loaded'
+
+
+class TestEventDispatch(unittest.TestCase):
+    """测试事件分发钩子"""
+    
+    def setUp(self):
+        self.socketio = Mock()
+        self.handlers = {}
+        self.socketio.on = lambda event: lambda fn: self.handlers.setdefault(event, fn)
+        self.heartbeat = Mock()
+        self.plugin = DispatchPluginImpl(Mock(), self.socketio, None, GameManager(),
+                                         heartbeat_handler=self.heartbeat)
+    
+    @patch('plugins.base.request', new=Mock(sid='sid1'))
+    def test_game_event_refreshes_heartbeat(self):
+        """测试游戏事件刷新连接存活时间"""
+        result = self.handlers['make_move']({'row': 1})
+        
+        self.assertEqual(result, 'handled')
+        self.assertEqual(self.plugin.calls, [{'row': 1}])
+        self.heartbeat.touch.assert_called_once_with('sid1')
+    
+    @patch('plugins.base.request', new=Mock(sid='sid1'))
+    def test_disconnect_does_not_refresh_heartbeat(self):
+        """测试断开事件不会重新登记心跳"""
+        self.handlers['disconnect']()
+        
+        self.assertEqual(self.plugin.calls, ['disconnect'])
+        self.heartbeat.touch.assert_not_called()
+    
+    def test_handler_name_preserved(self):
+        """测试注册的分发函数保留原处理器名称"""
+        self.assertEqual(self.handlers['make_move'].__name__, 'handle_move')
+    
+    @patch('plugins.base.request', new=Mock(sid='sid1'))
+    def test_async_handler_in_threading_mode(self):
+        """测试线程模式下协程处理器在当前线程中运行完成"""
+        self.assertEqual(self.handlers['load_record']({'id': 7}), 'loaded')
+        self.assertEqual(self.plugin.calls, [{'id': 7}])
+    
+    @patch('plugins.base.request', new=Mock(sid='sid1'))
+    def test_without_heartbeat_handler(self):
+        """测试未提供心跳处理器时正常分发"""
+        self.plugin.heartbeat_handler = None
+        self.assertEqual(self.handlers['make_move']({}), 'handled')
+
+
+if __name__ == '__main__':
+    unittest.main()
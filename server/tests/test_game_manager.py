@@ -1,6 +1,6 @@
 import unittest
 import time
-from game_manager import GameManager, RoomStatus, PlayerStatus
+from game_manager import GameManager, RoomStatus, PlayerStatus, DELTA_LOG_SIZE
 
 
 class TestGameManager(unittest.TestCase):
@@ -272,6 +272,46 @@ class TestGameManager(unittest.TestCase):
         status = self.manager.get_player_status('player1')
         self.assertIsNone(status)
 
+    
+    def test_record_delta_bumps_version(self):
+        """Test that every recorded delta advances the room version"""
+        room_id = self.manager.create_room('gomoku', {})
+        self.assertEqual(self.manager.get_room_version(room_id), 0)
+        
+        self.assertEqual(self.manager.record_delta(room_id, 'move_made', {'row': 0}), 1)
+        self.assertEqual(self.manager.record_delta(room_id, 'move_made', {'row': 1}), 2)
+        self.assertEqual(self.manager.get_room_version(room_id), 2)
+        
+        # Non-existent room
+        self.assertIsNone(self.manager.record_delta('nonexistent', 'move_made', {}))
+    
+    def test_get_deltas_since(self):
+        """Test fetching only the deltas a client is missing"""
+        room_id = self.manager.create_room('gomoku', {})
+        for i in range(5):
+            self.manager.record_delta(room_id, 'move_made', {'row': i})
+        
+        deltas = self.manager.get_deltas_since(room_id, 3)
+        self.assertEqual([d[0] for d in deltas], [4, 5])
+        self.assertEqual(deltas[0][2], {'row': 3})
+        
+        # Up to date
+        self.assertEqual(self.manager.get_deltas_since(room_id, 5), [])
+        
+        # Unknown or future versions require a snapshot
+        self.assertIsNone(self.manager.get_deltas_since(room_id, None))
+        self.assertIsNone(self.manager.get_deltas_since(room_id, 6))
+    
+    def test_get_deltas_since_truncated_log(self):
+        """Test that a gap older than the delta log falls back to a snapshot"""
+        room_id = self.manager.create_room('racing', {})
+        for i in range(DELTA_LOG_SIZE + 10):
+            self.manager.record_delta(room_id, 'score_update', {'score': i})
+        
+        self.assertIsNone(self.manager.get_deltas_since(room_id, 5))
+        deltas = self.manager.get_deltas_since(room_id, DELTA_LOG_SIZE + 8)
+        self.assertEqual(len(deltas), 2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,95 @@
+"""
+游戏注册表测试
+
+在临时目录中构造游戏目录，验证规范校验、清单内容和ETag
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from flask import Flask
+
+from game_registry import GameRegistry, validate_game_config
+
+
+class TestGameRegistry(unittest.TestCase):
+    """测试游戏注册表"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.add_game('alpha', {'name': 'Alpha', 'id': 'alpha', 'icon': 'A', 'entry': 'index.html',
+                                'server': {'enabled': True, 'file': 'server.py', 'port': 5000}})
+        self.add_game('beta', {'name': 'Beta', 'id': 'beta', 'entry': 'index.html'})
+
+        self.app = Flask(__name__)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def add_game(self, directory, config, files=('index.html', 'game.js', 'style.css')):
+        path = os.path.join(self.root, directory)
+        os.makedirs(path, exist_ok=True)
+        for name in files:
+            open(os.path.join(path, name), 'w').close()
+        with open(os.path.join(path, 'game.json'), 'w', encoding='utf-8') as f:
+            f.write(config if isinstance(config, str) else json.dumps(config))
+
+    def respond(self, registry, headers=None):
+        with self.app.test_request_context(headers=headers or {}):
+            return registry.respond(headers or {})
+
+    def test_manifest_lists_valid_games(self):
+        """测试清单包含所有有效游戏及目录信息，不暴露server配置"""
+        registry = GameRegistry(self.root).load()
+        manifest = json.loads(registry.manifest.body)
+
+        self.assertEqual([g['id'] for g in manifest['games']], ['alpha', 'beta'])
+        self.assertEqual(manifest['games'][0]['directory'], 'alpha')
+        self.assertNotIn('server', manifest['games'][0])
+        self.assertEqual(registry.get('alpha')['server']['port'], 5000)
+
+    def test_invalid_games_skipped(self):
+        """测试校验失败的游戏被跳过并记录错误"""
+        self.add_game('broken', '{not json')
+        self.add_game('mismatch', {'name': 'M', 'id': 'other', 'entry': 'index.html'})
+        self.add_game('noentry', {'name': 'N', 'id': 'noentry', 'entry': 'missing.html'})
+
+        registry = GameRegistry(self.root).load()
+
+        self.assertEqual(sorted(registry.games), ['alpha', 'beta'])
+        self.assertEqual(sorted(registry.errors), ['broken', 'mismatch', 'noentry'])
+
+    def test_validate_game_config(self):
+        """测试规范字段校验"""
+        path = os.path.join(self.root, 'alpha')
+        self.assertEqual(validate_game_config({'name': 'A', 'id': 'alpha', 'entry': 'index.html'}, 'alpha', path), [])
+
+        errors = validate_game_config({'id': 'Alpha_1', 'entry': '../beta/index.html',
+                                       'icon': 1, 'server': {'port': 70000, 'enabled': 'yes'}}, 'alpha', path)
+        self.assertEqual(len(errors), 6)
+        self.assertEqual(validate_game_config([], 'alpha', path), ['game.json 必须是JSON对象'])
+
+    def test_etag_and_not_modified(self):
+        """测试清单带ETag，命中时返回304"""
+        registry = GameRegistry(self.root).load()
+
+        response = self.respond(registry)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/json')
+        etag = response.headers['ETag']
+
+        response = self.respond(registry, {'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_manifest_changes_with_content(self):
+        """测试配置变化后ETag随之变化"""
+        before = GameRegistry(self.root).load().manifest.etags()
+        self.add_game('gamma', {'name': 'Gamma', 'id': 'gamma', 'entry': 'index.html'})
+        after = GameRegistry(self.root).load().manifest.etags()
+        self.assertFalse(before & after)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+"""
+心跳检测测试
+
+测试时间轮的刷新、到期和分层下沉，以及超时连接回收（经插件的断开处理通知房间）
+"""
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from flask import Flask
+from flask_socketio import SocketIO
+
+from heartbeat import TimingWheel, HeartbeatHandler
+from game_manager import GameManager
+from plugin_loader import PluginLoader
+
+
+class TestTimingWheel(unittest.TestCase):
+    """测试分层时间轮"""
+    
+    def test_expire_at_deadline(self):
+        """测试条目在到期时间后被取出"""
+        wheel = TimingWheel(tick=1.0, now=0)
+        wheel.schedule('a', 5)
+        wheel.schedule('b', 10)
+        
+        self.assertEqual(wheel.advance(4), [])
+        self.assertEqual(wheel.advance(5), ['a'])
+        self.assertEqual(wheel.advance(20), ['b'])
+        self.assertEqual(len(wheel), 0)
+    
+    def test_schedule_refreshes_deadline(self):
+        """测试重复调度会刷新到期时间"""
+        wheel = TimingWheel(tick=1.0, now=0)
+        wheel.schedule('a', 5)
+        wheel.advance(3)
+        wheel.schedule('a', 8)
+        
+        self.assertEqual(wheel.advance(7), [])
+        self.assertEqual(wheel.advance(8), ['a'])
+    
+    def test_remove(self):
+        """测试移除的条目不会到期"""
+        wheel = TimingWheel(tick=1.0, now=0)
+        wheel.schedule('a', 5)
+        wheel.remove('a')
+        wheel.remove('missing')
+        
+        self.assertNotIn('a', wheel)
+        self.assertEqual(wheel.advance(10), [])
+    
+    def test_cascade_from_higher_level(self):
+        """测试超过第0层范围的条目下沉后按时到期"""
+        wheel = TimingWheel(tick=1.0, wheel_size=4, levels=2, now=0)
+        deadlines = {f'k{d}': d for d in range(1, 16)}
+        for key, deadline in deadlines.items():
+            wheel.schedule(key, deadline)
+        
+        for t in range(1, 16):
+            self.assertEqual(wheel.advance(t), [f'k{t}'])
+    
+    def test_deadline_beyond_range(self):
+        """测试超出所有层范围的条目仍然按时到期"""
+        wheel = TimingWheel(tick=1.0, wheel_size=4, levels=2, now=0)
+        wheel.schedule('far', 50)
+        
+        self.assertEqual(wheel.advance(49), [])
+        self.assertEqual(wheel.advance(50), ['far'])
+    
+    def test_many_entries_only_expired_returned(self):
+        """测试大量条目中只返回到期的部分"""
+        wheel = TimingWheel(tick=1.0, now=0)
+        for i in range(10000):
+            wheel.schedule(i, 60 + i % 30)
+        
+        expired = wheel.advance(60)
+        self.assertEqual(len(expired), 334)
+        self.assertEqual(len(wheel), 10000 - 334)
+
+
+class TestHeartbeatReaper(unittest.TestCase):
+    """测试超时连接回收"""
+    
+    def setUp(self):
+        self.socketio = Mock()
+        self.routes = {}
+        self.socketio.on = lambda event: lambda fn: self.routes.setdefault(event, fn)
+        self.handler = HeartbeatHandler(self.socketio, timeout=60)
+        self.game_manager = GameManager()
+        registry = SimpleNamespace(games={'gomoku': {'id': 'gomoku', 'server': {
+            'enabled': True, 'plugin': 'plugins.gomoku:GomokuPlugin', 'events': ['join_room', 'disconnect']}}})
+        self.loader = PluginLoader(registry, Flask(__name__), self.socketio, None, self.game_manager,
+                                   default_game='gomoku')
+        self.loader.register_events()
+    
+    def test_touch_and_reap(self):
+        """测试只回收超时客户端，先按断开处理再断开连接"""
+        calls = []
+        self.socketio.server.disconnect.side_effect = lambda sid: calls.append(('disconnect', sid))
+        self.handler.touch('alive')
+        self.handler.touch('dead')
+        
+        # 存活客户端续期
+        now = self.handler.client_heartbeats['alive']
+        self.handler._wheel.schedule('alive', now + 120)
+        
+        reaped = self.handler.reap(lambda sid: calls.append(('timeout', sid)), now=now + 61)
+        
+        self.assertEqual(reaped, ['dead'])
+        self.assertEqual(calls, [('timeout', 'dead'), ('disconnect', 'dead')])
+        self.assertNotIn('dead', self.handler.client_heartbeats)
+        self.assertIn('alive', self.handler.client_heartbeats)
+    
+    @patch('plugins.base.emit')
+    def test_reaped_player_notifies_opponent(self, emit):
+        """测试超时玩家经插件的断开处理通知对手（player_left）并删除房间"""
+        room_id = self.game_manager.create_room('gomoku', {'board': [], 'current': 1, 'moves': []})
+        self.game_manager.add_player(room_id, 'dead')
+        self.game_manager.add_player(room_id, 'opponent')
+        self.handler.touch('dead')
+        now = self.handler.client_heartbeats['dead']
+        
+        self.assertEqual(self.handler.reap(self.loader.disconnect_client, now=now + 61), ['dead'])
+        
+        emit.assert_any_call('player_left', {}, room=room_id)
+        self.assertIsNone(self.game_manager.get_room(room_id))
+        self.socketio.server.disconnect.assert_called_once_with('dead')
+    
+    @patch('plugins.base.emit')
+    def test_reaped_spectator_removed(self, emit):
+        """测试超时观战者从观战列表移除，房间保留"""
+        room_id = self.game_manager.create_room('gomoku', {'board': [], 'current': 1, 'moves': []})
+        self.game_manager.add_player(room_id, 'player')
+        self.game_manager.add_spectator(room_id, 'dead')
+        self.handler.touch('dead')
+        now = self.handler.client_heartbeats['dead']
+        
+        self.handler.reap(self.loader.disconnect_client, now=now + 61)
+        
+        self.assertEqual(self.game_manager.get_spectators(room_id), [])
+        self.assertIsNotNone(self.game_manager.get_room(room_id))
+        self.assertNotIn('player_left', [c.args[0] for c in emit.call_args_list])
+    
+    def test_reap_is_one_shot(self):
+        """测试同一超时客户端只回收一次"""
+        self.handler.touch('dead')
+        now = self.handler.client_heartbeats['dead']
+        
+        self.assertEqual(self.handler.check_timeouts(now + 61), ['dead'])
+        self.assertEqual(self.handler.check_timeouts(now + 120), [])
+    
+    def test_removed_client_not_reaped(self):
+        """测试正常断开的客户端不会被回收"""
+        self.handler.touch('gone')
+        now = self.handler.client_heartbeats['gone']
+        self.handler.remove_client('gone')
+        
+        self.assertEqual(self.handler.reap(self.loader.disconnect_client, now=now + 61), [])
+        self.socketio.server.disconnect.assert_not_called()
+
+
+class TestDisconnectRoute(unittest.TestCase):
+    """测试插件的断开路由取代心跳处理器的断开处理后仍清理心跳记录"""
+    
+    def test_disconnect_removes_heartbeat(self):
+        """测试断开连接后心跳记录和时间轮条目被移除"""
+        app = Flask(__name__)
+        socketio = SocketIO(app)
+        handler = HeartbeatHandler(socketio, timeout=60)
+        handler.register_events()
+        registry = SimpleNamespace(games={'gomoku': {'id': 'gomoku', 'server': {
+            'enabled': True, 'plugin': 'plugins.gomoku:GomokuPlugin', 'events': ['join_room', 'disconnect']}}})
+        # 与 main.py 相同，插件路由在心跳事件之后注册
+        PluginLoader(registry, app, socketio, None, GameManager(), heartbeat_handler=handler,
+                     default_game='gomoku').register_events()
+        
+        client = socketio.test_client(app)
+        sid = socketio.server.manager.sid_from_eio_sid(client.eio_sid, '/')
+        self.assertIn(sid, handler.client_heartbeats)
+        
+        client.disconnect()
+        
+        self.assertNotIn(sid, handler.client_heartbeats)
+        self.assertNotIn(sid, handler._wheel)
+        self.assertEqual(handler.check_timeouts(handler._wheel._current + 120), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+带类型标记的JSON编码测试
+
+测试非JSON原生类型的往返、标记冲突和不可信数据的拒绝
+"""
+
+import unittest
+from collections import deque
+from enum import Enum
+
+import json_codec
+from game_manager import RoomStatus
+
+
+class Color(Enum):
+    """未登记的枚举"""
+    RED = 1
+
+
+class TestJsonCodec(unittest.TestCase):
+    """测试编码和解码"""
+
+    def test_round_trip(self):
+        value = {
+            'players': ['p1', None], 'cards': {0: ['3'], 1: []}, 'pair': (1, ('a', b'\x00\xff')),
+            'log': deque([(1, 'move', {'row': 7}, None)], maxlen=4), 'seen': {1, (2, 3)},
+            'status': RoomStatus.PLAYING, 'score': 1.5, 'ok': True,
+        }
+        decoded = json_codec.loads(json_codec.dumps(value))
+        self.assertEqual(decoded, value)
+        self.assertEqual(decoded['log'].maxlen, 4)
+        self.assertIs(decoded['status'], RoomStatus.PLAYING)
+
+    def test_tag_key_in_data(self):
+        """测试数据中本身含有标记键的字典不会被误解码"""
+        value = {'__t': 'bytes', 'v': 'AA=='}
+        self.assertEqual(json_codec.loads(json_codec.dumps(value)), value)
+
+    def test_plain_json(self):
+        self.assertEqual(json_codec.dumps({'a': [1, '好']}), '{"a":[1,"好"]}'.encode('utf-8'))
+
+    def test_rejects_unknown_types(self):
+        with self.assertRaises(TypeError):
+            json_codec.dumps(object())
+        with self.assertRaises(TypeError):
+            json_codec.dumps(Color.RED)
+        with self.assertRaises(ValueError):
+            json_codec.loads(b'{"__t":"enum","type":"Color","v":1}')
+        with self.assertRaises(ValueError):
+            json_codec.loads(b'{"__t":"object","v":"os.system"}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+日志配置测试
+
+测试JSON格式输出、按消息限流和采样、队列处理器的延迟格式化和队列满时的丢弃
+"""
+
+import io
+import json
+import logging
+import queue
+import sys
+import unittest
+
+from logging_setup import JsonFormatter, RateLimitFilter, QueueHandler, BatchWriter, setup_logging
+
+
+def make_record(msg, *args, level=logging.INFO, created=1000.0, **extra):
+    record = logging.LogRecord('gamehub.test', level, __file__, 1, msg, args, None)
+    record.created = created
+    record.__dict__.update(extra)
+    return record
+
+
+class Unprintable:
+    """转换为字符串时计数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return '对象'
+
+
+class TestJsonFormatter(unittest.TestCase):
+    """测试JSON格式"""
+
+    def test_fields(self):
+        record = make_record('用户 %s 发送弹幕', 'u1', room_id='room1')
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry['msg'], '用户 u1 发送弹幕')
+        self.assertEqual(entry['level'], 'INFO')
+        self.assertEqual(entry['logger'], 'gamehub.test')
+        self.assertEqual(entry['room_id'], 'room1')
+        self.assertTrue(entry['time'].startswith('1970-01-01T00:16:40.000'))
+        self.assertNotIn('args', entry)
+
+    def test_exception(self):
+        try:
+            raise ValueError('坏数据')
+        except ValueError:
+            record = logging.LogRecord('gamehub.test', logging.ERROR, __file__, 1, '失败', (), sys.exc_info())
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertIn('ValueError: 坏数据', entry['exc'])
+
+
+class TestRateLimitFilter(unittest.TestCase):
+    """测试按消息限流"""
+
+    def test_limit_and_sampling(self):
+        rate_filter = RateLimitFilter(rate=3, interval=10, sample_every=5)
+        passed = [rate_filter.filter(make_record('用户 %s 发送弹幕', i)) for i in range(13)]
+        # 前3条通过，之后每5条通过一条
+        self.assertEqual([i for i, ok in enumerate(passed) if ok], [0, 1, 2, 7, 12])
+        self.assertEqual(rate_filter.suppressed_total, 8)
+
+        # 其他消息模板单独计数
+        self.assertTrue(rate_filter.filter(make_record('观战者 %s 加入房间', 1)))
+
+    def test_window_reset_reports_suppressed(self):
+        rate_filter = RateLimitFilter(rate=1, interval=10, sample_every=0)
+        self.assertTrue(rate_filter.filter(make_record('心跳超时 %s', 1)))
+        for i in range(4):
+            self.assertFalse(rate_filter.filter(make_record('心跳超时 %s', i, created=1001.0)))
+
+        record = make_record('心跳超时 %s', 9, created=1011.0)
+        self.assertTrue(rate_filter.filter(record))
+        self.assertEqual(record.suppressed, 4)
+
+    def test_errors_and_explicit_key(self):
+        rate_filter = RateLimitFilter(rate=1, interval=10, sample_every=0)
+        for _ in range(3):
+            self.assertTrue(rate_filter.filter(make_record('失败', level=logging.ERROR)))
+        self.assertTrue(rate_filter.filter(make_record('a', log_key='same')))
+        self.assertFalse(rate_filter.filter(make_record('b', log_key='same')))
+
+    def test_key_limit(self):
+        rate_filter = RateLimitFilter(rate=1, max_keys=2)
+        for msg in ('a', 'b', 'c'):
+            rate_filter.filter(make_record(msg))
+        self.assertEqual(len(rate_filter._windows), 2)
+
+
+class TestQueueHandler(unittest.TestCase):
+    """测试队列处理器"""
+
+    def test_lazy_formatting(self):
+        handler = QueueHandler(queue.Queue())
+        value = Unprintable()
+        handler.handle(make_record('值 %s', value))
+        self.assertEqual(value.calls, 0)
+        record = handler.queue.get_nowait()
+        self.assertEqual(record.getMessage(), '值 对象')
+
+    def test_drop_when_full(self):
+        handler = QueueHandler(queue.Queue(2))
+        for i in range(5):
+            handler.handle(make_record('消息 %s', i))
+        self.assertEqual(handler.queue.qsize(), 2)
+        self.assertEqual(handler.dropped, 3)
+
+
+class TestBatchWriter(unittest.TestCase):
+    """测试后台写入"""
+
+    def test_bad_arguments_do_not_drop_batch(self):
+        q = queue.Queue()
+        stream = io.StringIO()
+        writer = BatchWriter(q, stream, logging.Formatter('%(message)s'), interval=0)
+        q.put(make_record('房间 %d', 'abc'))
+        q.put(make_record('房间 %s', 'abc'))
+        writer.start()
+        writer.stop()
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('日志格式化失败', lines[0])
+        self.assertEqual(lines[1], '房间 abc')
+        self.assertEqual(writer.written, 2)
+
+
+class TestSetupLogging(unittest.TestCase):
+    """测试根记录器配置"""
+
+    def setUp(self):
+        root = logging.getLogger()
+        self.saved = (list(root.handlers), root.level)
+
+    def tearDown(self):
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in self.saved[0]:
+            root.addHandler(handler)
+        root.setLevel(self.saved[1])
+
+    def test_json_output_through_writer(self):
+        stream = io.StringIO()
+        installed = setup_logging('INFO', 'json', rate=2, interval=60, sample_every=0, stream=stream)
+        log = logging.getLogger('gamehub.setup_test')
+        for i in range(5):
+            log.info('用户 %s 发送弹幕', i)
+        log.debug('不输出')
+        installed.stop()
+
+        entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([entry['msg'] for entry in entries], ['用户 0 发送弹幕', '用户 1 发送弹幕'])
+        self.assertEqual(installed.get_stats()['suppressed'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+运行指标测试
+
+测试插件分发记录的事件指标、各组件的采集函数和 /metrics 路由的文本格式
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+
+from flask import Flask
+
+from barrage_manager import BarrageManager
+from game_manager import GameManager, RoomStatus
+from metrics import (MetricsRegistry, METRICS, game_manager_collector, barrage_collector,
+                     storage_collector)
+from plugins.base import GamePlugin
+from storage import StorageBackend
+
+
+class MetricsPluginImpl(GamePlugin):
+    """测试用游戏插件实现"""
+    def register_routes(self):
+        pass
+
+    def register_events(self):
+        @self.on('make_move')
+        def handle_move(data):
+            if data.get('bad'):
+                raise ValueError('坏数据')
+
+
+class PoolBackend(StorageBackend):
+    """只提供统计信息的存储后端"""
+
+    def is_healthy(self):
+        return True
+
+    def get_stats(self):
+        return {'pool_size': 5, 'in_use': 2, 'is_healthy': True, 'dialect': 'mysql'}
+
+
+def samples(text, name):
+    """取出指定指标名的样本行"""
+    return [line for line in text.splitlines() if line.startswith(name + '{') or line.startswith(name + ' ')]
+
+
+class TestEventMetrics(unittest.TestCase):
+    """测试事件处理指标"""
+
+    @patch('plugins.base.request', new=Mock(sid='sid1'))
+    def test_dispatch_records_latency_and_errors(self):
+        plugin = MetricsPluginImpl(Mock(), Mock(), None, GameManager(), routed=True, game_id='metrics_test')
+        stats = METRICS.event('metrics_test', 'make_move')
+        before = stats.histogram.count
+
+        plugin.handlers['make_move']({'row': 1})
+        with self.assertRaises(ValueError):
+            plugin.handlers['make_move']({'bad': True})
+
+        self.assertEqual(stats.histogram.count, before + 2)
+        self.assertEqual(stats.errors, 1)
+        text = METRICS.render()
+        self.assertIn('gamehub_event_errors_total{game="metrics_test",event="make_move"} 1', text)
+        self.assertIn(f'gamehub_event_duration_seconds_count{{game="metrics_test",event="make_move"}} {before + 2}',
+                      text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        stats = registry.event('gomoku', 'make_move')
+        for seconds in (0.00001, 0.0003, 0.0003, 20):
+            stats.observe(seconds)
+
+        lines = samples(registry.render(), 'gamehub_event_duration_seconds_bucket')
+        counts = [int(line.rsplit(' ', 1)[1]) for line in lines]
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(lines[0], 'gamehub_event_duration_seconds_bucket{game="gomoku",event="make_move",le="5e-05"} 1')
+        self.assertEqual(lines[-1], 'gamehub_event_duration_seconds_bucket{game="gomoku",event="make_move",le="+Inf"} 4')
+        self.assertEqual(counts[-2], 3)
+
+
+class TestCollectors(unittest.TestCase):
+    """测试状态指标采集"""
+
+    def test_game_manager_gauges(self):
+        game_manager = GameManager()
+        room_id = game_manager.create_room('gomoku', {})
+        game_manager.add_player(room_id, 'p1')
+        game_manager.add_player(room_id, 'p2')
+        game_manager.add_spectator(room_id, 's1')
+        game_manager.update_room_status(room_id, RoomStatus.PLAYING)
+        game_manager.create_room('landlord', {})
+
+        registry = MetricsRegistry()
+        registry.add_collector(game_manager_collector(game_manager))
+        text = registry.render()
+        self.assertIn('gamehub_rooms{game="gomoku",status="playing"} 1', text)
+        self.assertIn('gamehub_rooms{game="landlord",status="waiting"} 1', text)
+        self.assertIn('gamehub_players{game="gomoku"} 2', text)
+        self.assertIn('gamehub_spectators{game="gomoku"} 1', text)
+
+    def test_barrage_counters(self):
+        manager = BarrageManager(rate_limit=1)
+        manager.check_rate_limit('u1')
+        manager.check_rate_limit('u1')
+        manager.add_barrage('room1', 'u1', '好棋')
+        manager.check_duplicate('room1', 'u1', '好棋')
+
+        registry = MetricsRegistry()
+        registry.add_collector(barrage_collector(manager))
+        text = registry.render()
+        self.assertIn('gamehub_barrages_total{result="sent"} 1', text)
+        self.assertIn('gamehub_barrages_total{result="rate_limited"} 1', text)
+        self.assertIn('gamehub_barrages_total{result="duplicate"} 1', text)
+
+    def test_storage_stats_and_failing_collector(self):
+        registry = MetricsRegistry()
+        registry.add_collector(Mock(side_effect=RuntimeError('采集失败'), __name__='broken'))
+        registry.add_collector(storage_collector(PoolBackend()))
+        text = registry.render()
+        self.assertIn('gamehub_storage_in_use 2', text)
+        self.assertIn('gamehub_storage_is_healthy 1', text)
+        self.assertNotIn('gamehub_storage_dialect', text)
+
+
+class TestMetricsRoute(unittest.TestCase):
+    """测试 /metrics 路由"""
+
+    def test_route(self):
+        from app import _register_metrics_route
+        app = Flask('metrics-test')
+        _register_metrics_route(app)
+        response = app.test_client().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE gamehub_event_duration_seconds histogram', response.get_data(as_text=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+"""
+数据库迁移测试
+
+使用内存中的模拟连接记录执行的SQL，验证版本记录、跳过和幂等性
+"""
+
+import re
+import unittest
+from contextlib import contextmanager
+from datetime import date
+import pymysql
+
+from migrations import MigrationRunner, PartitionManager, MIGRATIONS, Migration, ER_NO_SUCH_TABLE
+
+
+class FakeSchema:
+    """模拟数据库中的表、索引和已执行版本"""
+
+    def __init__(self):
+        self.tables = set()
+        self.indexes = set()
+        self.columns = {}
+        self.partitions = []
+        self.versions = {}
+        self.executed = []
+        self.commits = 0
+
+
+class FakeCursor:
+    """按SQL前缀模拟查询结果"""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.result = None
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.schema.executed.append(sql)
+        self.result = None
+
+        if sql.startswith('SELECT MAX(version) FROM schema_version'):
+            if 'schema_version' not in self.schema.tables:
+                raise pymysql.err.ProgrammingError(ER_NO_SUCH_TABLE, "Table 'schema_version' doesn't exist")
+            self.result = (max(self.schema.versions, default=None),)
+        elif sql.startswith('CREATE TABLE IF NOT EXISTS'):
+            table = sql.split()[5]
+            if table == 'game_records' and table not in self.schema.tables:
+                self.schema.indexes |= {'idx_game_type', 'idx_room_id', 'idx_created_at'}
+                self.schema.columns['moves'] = 'text'
+            self.schema.tables.add(table)
+        elif 'information_schema.statistics' in sql:
+            self.result = (int(params[1] in self.schema.indexes),)
+        elif 'information_schema.partitions' in sql:
+            self.rows = [(name, 'MAXVALUE' if bound is None else f"'{bound} 00:00:00'")
+                         for name, bound in self.schema.partitions]
+        elif sql.startswith('SELECT MIN(created_at)'):
+            self.result = (None,)
+        elif 'PARTITION BY RANGE' in sql:
+            self.schema.partitions = self.parse_partitions(sql)
+        elif 'REORGANIZE PARTITION pmax' in sql:
+            self.schema.partitions = self.schema.partitions[:-1] + self.parse_partitions(sql)
+        elif 'DROP PARTITION' in sql:
+            dropped = sql.split('DROP PARTITION ')[1].split(', ')
+            self.schema.partitions = [p for p in self.schema.partitions if p[0] not in dropped]
+        elif 'information_schema.columns' in sql:
+            self.result = (self.schema.columns.get(params[1]),)
+        elif sql.startswith('ALTER TABLE game_records MODIFY'):
+            self.schema.columns[sql.split()[4]] = sql.split()[5].lower()
+        elif sql.startswith('ALTER TABLE game_records ADD COLUMN'):
+            self.schema.columns[sql.split()[5]] = sql.split()[6].lower()
+        elif sql.startswith('ALTER TABLE game_records ADD INDEX'):
+            self.schema.indexes.add(sql.split()[5])
+        elif sql.startswith('ALTER TABLE game_records DROP INDEX'):
+            self.schema.indexes.discard(sql.split()[5])
+        elif sql.startswith('INSERT INTO schema_version'):
+            self.schema.versions[params[0]] = params[1]
+        elif sql.startswith('SELECT GET_LOCK') or sql.startswith('SELECT RELEASE_LOCK'):
+            self.result = (1,)
+
+    @staticmethod
+    def parse_partitions(sql):
+        return [(name, None if bound == 'MAXVALUE' else date.fromisoformat(bound.strip("'")))
+                for name, bound in re.findall(r"PARTITION (\w+) VALUES LESS THAN \(([^)]+)\)", sql)]
+
+    def fetchone(self):
+        return self.result
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """模拟数据库连接管理器"""
+
+    def __init__(self):
+        self.schema = FakeSchema()
+
+    @contextmanager
+    def get_connection(self):
+        yield self
+
+    def cursor(self):
+        return FakeCursor(self.schema)
+
+    def commit(self):
+        self.schema.commits += 1
+
+
+class TestMigrationRunner(unittest.TestCase):
+    """测试迁移执行器"""
+
+    def setUp(self):
+        self.db = FakeDatabase()
+        self.runner = MigrationRunner(self.db)
+
+    def test_fresh_database_applies_all(self):
+        """测试新数据库按顺序执行全部迁移并记录版本"""
+        applied = self.runner.migrate()
+
+        self.assertEqual(applied, [m.version for m in MIGRATIONS])
+        self.assertEqual(sorted(self.db.schema.versions), applied)
+        self.assertIn('game_records', self.db.schema.tables)
+        self.assertIn('idx_game_type_created', self.db.schema.indexes)
+        self.assertNotIn('idx_game_type', self.db.schema.indexes)
+        self.assertEqual(self.db.schema.columns['moves'], 'blob')
+        self.assertEqual(self.db.schema.columns['moves_codec'], 'tinyint')
+        self.assertIn('game_stats_daily', self.db.schema.tables)
+        self.assertEqual(self.db.schema.partitions[-1], ('pmax', None))
+        self.assertEqual(len(self.db.schema.partitions), 5)
+        self.assertEqual(self.db.schema.commits, len(MIGRATIONS))
+
+    def test_up_to_date_skips_with_single_query(self):
+        """测试版本一致时只执行一次查询，不执行DDL"""
+        self.runner.migrate()
+        self.db.schema.executed.clear()
+
+        self.assertEqual(self.runner.migrate(), [])
+        self.assertEqual(self.db.schema.executed, ['SELECT MAX(version) FROM schema_version'])
+
+    def test_resumes_from_recorded_version(self):
+        """测试只执行记录版本之后的迁移"""
+        MigrationRunner(self.db, MIGRATIONS[:1]).migrate()
+
+        self.assertEqual(self.runner.migrate(), [2, 3, 4, 5])
+        self.assertEqual(sorted(self.db.schema.versions), [1, 2, 3, 4, 5])
+
+    def test_migrations_idempotent_on_existing_schema(self):
+        """测试已有表结构（旧版本插件创建）的数据库可以安全执行迁移"""
+        cursor = self.db.cursor()
+        for migration in MIGRATIONS:
+            migration.apply(cursor)
+        applied_before = len(self.db.schema.executed)
+
+        self.assertEqual(self.runner.migrate(), [m.version for m in MIGRATIONS])
+        self.assertEqual(
+            [sql for sql in self.db.schema.executed[applied_before:] if sql.startswith('ALTER')], []
+        )
+
+    def test_failed_migration_keeps_earlier_versions(self):
+        """测试迁移失败时已完成的版本保留，锁被释放"""
+        def fail(cursor):
+            raise RuntimeError('boom')
+
+        runner = MigrationRunner(self.db, MIGRATIONS[:1] + [Migration(2, 'broken', fail)])
+        with self.assertRaises(RuntimeError):
+            runner.migrate()
+
+        self.assertEqual(list(self.db.schema.versions), [1])
+        self.assertTrue(self.db.schema.executed[-1].startswith('SELECT RELEASE_LOCK'))
+
+    def test_other_errors_propagate(self):
+        """测试表不存在以外的错误不会被当作未初始化"""
+        cursor = self.db.cursor()
+        cursor.execute = lambda sql, params=None: (_ for _ in ()).throw(
+            pymysql.err.ProgrammingError(1064, 'syntax error'))
+
+        with self.assertRaises(pymysql.err.ProgrammingError):
+            self.runner.current_version(cursor)
+
+
+class TestPartitionManager(unittest.TestCase):
+    """测试按月分区维护"""
+
+    def setUp(self):
+        self.db = FakeDatabase()
+        self.db.schema.partitions = [('p202607', date(2026, 8, 1)), ('p202608', date(2026, 9, 1)),
+                                     ('p202609', date(2026, 10, 1)), ('p202610', date(2026, 11, 1)),
+                                     ('pmax', None)]
+        self.manager = PartitionManager(self.db, months_ahead=2)
+
+    def names(self):
+        return [name for name, _ in self.db.schema.partitions]
+
+    def test_adds_future_partitions_from_pmax(self):
+        """测试从 pmax 拆分出未来月份分区"""
+        result = self.manager.maintain(today=date(2026, 10, 19))
+
+        self.assertEqual(result, {'added': ['p202611', 'p202612'], 'dropped': []})
+        self.assertEqual(self.names()[-3:], ['p202611', 'p202612', 'pmax'])
+        self.assertEqual(self.db.schema.partitions[-2], ('p202612', date(2027, 1, 1)))
+
+    def test_no_change_when_up_to_date(self):
+        """测试分区已覆盖时不执行DDL"""
+        self.manager.maintain(today=date(2026, 10, 19))
+        self.db.schema.executed.clear()
+
+        self.assertEqual(self.manager.maintain(today=date(2026, 10, 20)), {'added': [], 'dropped': []})
+        self.assertFalse([sql for sql in self.db.schema.executed if sql.startswith('ALTER')])
+
+    def test_retention_drops_whole_partitions(self):
+        """测试按保留月数删除过期分区，不逐行DELETE"""
+        result = self.manager.maintain(retention_months=2, today=date(2026, 10, 19))
+
+        self.assertEqual(result['dropped'], ['p202607'])
+        self.assertEqual(self.names()[:2], ['p202608', 'p202609'])
+        self.assertFalse([sql for sql in self.db.schema.executed if sql.startswith('DELETE')])
+        self.assertTrue(self.db.schema.executed[-1].startswith('SELECT RELEASE_LOCK'))
+
+    def test_unpartitioned_table_skipped(self):
+        """测试未分区的表跳过维护"""
+        self.db.schema.partitions = []
+
+        self.assertEqual(self.manager.maintain(retention_months=1), {'added': [], 'dropped': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
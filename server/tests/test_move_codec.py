@@ -0,0 +1,103 @@
+"""
+对局走法编码测试
+
+测试各游戏编码器的往返一致性、JSON回退和历史记录解码
+"""
+
+import json
+import unittest
+
+from move_codec import (encode_moves, decode_moves, iter_moves, register_codec, MoveCodec,
+                        GomokuMoveCodec, LandlordMoveCodec, RacingMoveCodec, RacingTape)
+
+
+class TestMoveCodec(unittest.TestCase):
+    """测试走法编码"""
+
+    def assert_round_trip(self, game_type, moves, codec_id):
+        encoded_id, payload = encode_moves(game_type, moves)
+        self.assertEqual(encoded_id, codec_id)
+        self.assertIsInstance(payload, bytes)
+        self.assertEqual(decode_moves(encoded_id, payload), moves)
+        self.assertEqual(list(iter_moves(encoded_id, payload)), moves)
+        return payload
+
+    def test_gomoku_one_byte_per_move(self):
+        """测试五子棋每步编码为一个字节"""
+        moves = [{'row': 7, 'col': 7, 'color': 'black'}, {'row': 0, 'col': 14, 'color': 'white'},
+                 {'row': 14, 'col': 0, 'color': 'black'}]
+        payload = self.assert_round_trip('gomoku', moves, GomokuMoveCodec.codec_id)
+        self.assertEqual(len(payload), 3)
+
+    def test_landlord_round_trip(self):
+        """测试斗地主出牌、不出和大小王"""
+        moves = [
+            {'position': 0, 'cards': [{'suit': '♠', 'value': '3'}, {'suit': '♦', 'value': '3'}]},
+            {'position': 1, 'cards': []},
+            {'position': 2, 'cards': [{'suit': '', 'value': 'joker'}, {'suit': '', 'value': 'JOKER'}]},
+            {'position': 0, 'cards': [{'suit': '♥', 'value': '10'}]},
+        ]
+        payload = self.assert_round_trip('landlord', moves, LandlordMoveCodec.codec_id)
+        self.assertEqual(len(payload), 4 + 5)
+
+    def test_racing_round_trip(self):
+        """测试极速狂飙分数上报磁带"""
+        moves = [
+            {'position': 0, 'score': 30, 't': 500},
+            {'position': 1, 'score': 30, 't': 510},
+            {'position': 0, 'score': 60, 't': 1000},
+            {'position': 0, 'score': 45, 't': 1000, 'finished': True},
+            {'position': 1, 'score': 90000, 't': 250000, 'finished': True},
+        ]
+        self.assert_round_trip('racing', moves, RacingMoveCodec.codec_id)
+
+    def test_racing_tape(self):
+        """测试逐条追加的磁带与整体编码结果相同，保存时直接使用"""
+        moves = [{'position': 0, 'score': 30, 't': 500}, {'position': 1, 'score': 30, 't': 510},
+                 {'position': 0, 'score': 45, 't': 1000, 'finished': True}]
+        tape = RacingTape()
+        for move in moves:
+            tape.append(move['position'], move['score'], move['t'], move.get('finished', False))
+
+        self.assertEqual(len(tape), 3)
+        self.assertEqual(encode_moves('racing', tape), encode_moves('racing', moves))
+        # 时间倒退的上报按上一条的时间记录
+        tape.append(1, 60, 900)
+        self.assertEqual(decode_moves(*encode_moves('racing', tape))[-1], {'position': 1, 'score': 60, 't': 1000})
+
+    def test_unrepresentable_moves_fall_back_to_json(self):
+        """测试无法紧凑表示的走法回退为JSON"""
+        cases = [
+            ('gomoku', [{'row': 7, 'col': 7, 'color': 'white'}]),
+            ('gomoku', [{'row': 15, 'col': 0, 'color': 'black'}]),
+            ('landlord', [{'position': 0, 'cards': [{'suit': '?', 'value': '3'}]}]),
+            ('racing', [{'position': 0, 'score': 1, 't': 10}, {'position': 0, 'score': 2, 't': 5}]),
+            ('unknown_game', [{'move': 1}]),
+        ]
+        for game_type, moves in cases:
+            with self.subTest(game_type=game_type):
+                self.assert_round_trip(game_type, moves, 0)
+
+    def test_legacy_json_text(self):
+        """测试迁移前以TEXT存储的JSON记录（编码器ID为0或NULL）"""
+        moves = [{'row': 1, 'col': 2, 'color': 'black'}]
+        self.assertEqual(decode_moves(0, json.dumps(moves)), moves)
+        self.assertEqual(decode_moves(None, json.dumps(moves).encode()), moves)
+        self.assertEqual(decode_moves(0, ''), [])
+
+    def test_unknown_codec_id(self):
+        """测试未知编码器ID报错"""
+        with self.assertRaises(ValueError):
+            decode_moves(200, b'\x00')
+
+    def test_codec_id_conflict(self):
+        """测试不同编码器不能占用同一ID"""
+        class Conflicting(MoveCodec):
+            codec_id = GomokuMoveCodec.codec_id
+
+        with self.assertRaises(ValueError):
+            register_codec(Conflicting())
+
+
+if __name__ == '__main__':
+    unittest.main()
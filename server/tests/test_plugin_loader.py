@@ -0,0 +1,161 @@
+"""
+插件加载器测试
+
+测试按需导入、加载失败隔离和事件路由
+"""
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from plugins.base import GamePlugin
+from game_manager import GameManager
+from plugin_loader import PluginLoader
+
+
+class LoaderTestPlugin(GamePlugin):
+    """测试用游戏插件，记录构造次数和收到的事件"""
+    instances = []
+
+    def register_routes(self):
+        pass
+
+    def register_events(self):
+        LoaderTestPlugin.instances.append(self)
+        self.calls = []
+
+        @self.on('create_room')
+        def handle_create_room(data=None):
+            self.calls.append(('create_room', data))
+
+        @self.on('disconnect')
+        def handle_disconnect():
+            self.calls.append(('disconnect', None))
+
+
+class OtherTestPlugin(LoaderTestPlugin):
+    """第二个测试用游戏插件"""
+
+
+def make_registry(**servers):
+    """构造只包含 server 配置的注册表"""
+    return SimpleNamespace(games={game_id: {'id': game_id, 'server': server} for game_id, server in servers.items()})
+
+
+def server(plugin, events=('create_room', 'disconnect'), **extra):
+    return dict({'enabled': True, 'plugin': f'tests.test_plugin_loader:{plugin}', 'events': list(events)}, **extra)
+
+
+class TestPluginLoader(unittest.TestCase):
+    """测试插件加载器"""
+
+    def setUp(self):
+        LoaderTestPlugin.instances = []
+        self.socketio = Mock()
+        self.routes = {}
+        self.socketio.on = lambda event: lambda fn: self.routes.setdefault(event, fn)
+        self.game_manager = GameManager()
+        self.registry = make_registry(
+            alpha=server('LoaderTestPlugin'),
+            beta=server('OtherTestPlugin', preload=True),
+            broken={'enabled': True, 'plugin': 'no_such_module:Plugin', 'events': ['create_room']},
+            static={'enabled': False, 'plugin': 'tests.test_plugin_loader:LoaderTestPlugin'},
+        )
+        self.loader = PluginLoader(self.registry, Mock(), self.socketio, None, self.game_manager,
+                                   default_game='alpha')
+
+    def test_register_events_does_not_import(self):
+        """测试登记路由时不加载任何插件"""
+        self.loader.register_events()
+
+        self.assertEqual(sorted(self.routes), ['create_room', 'disconnect'])
+        self.assertEqual(LoaderTestPlugin.instances, [])
+        self.assertEqual(sorted(self.loader.get_stats()['pending']), ['alpha', 'beta', 'broken'])
+        self.assertNotIn('static', self.loader.specs)
+
+    def test_preload(self):
+        """测试声明 preload 的插件在启动时加载"""
+        self.loader.preload()
+
+        self.assertEqual(list(self.loader.plugins), ['beta'])
+        self.assertIsInstance(self.loader.plugins['beta'], OtherTestPlugin)
+
+    def test_get_loads_once(self):
+        """测试插件只导入和初始化一次"""
+        plugin = self.loader.get('alpha')
+
+        self.assertIs(self.loader.get('alpha'), plugin)
+        self.assertEqual(len(LoaderTestPlugin.instances), 1)
+        self.assertTrue(plugin.routed)
+        self.assertIn('alpha', self.loader.get_stats()['loaded'])
+
+    def test_broken_plugin_isolated(self):
+        """测试加载失败的插件不影响其他游戏，且不会重复尝试"""
+        self.assertIsNone(self.loader.get('broken'))
+        self.assertIsNone(self.loader.get('broken'))
+        self.assertIn('broken', self.loader.failed)
+        self.assertIsNotNone(self.loader.get('alpha'))
+
+    @patch('plugin_loader.request', new=Mock(sid='sid1'))
+    @patch('plugins.base.request', new=Mock(sid='sid1'))
+    def test_route_by_game_field(self):
+        """测试按事件中的game字段路由并按需加载"""
+        self.loader.register_events()
+        self.routes['create_room']({'game': 'beta'})
+
+        self.assertEqual(list(self.loader.plugins), ['beta'])
+        self.assertEqual(self.loader.plugins['beta'].calls, [('create_room', {'game': 'beta'})])
+
+    @patch('plugin_loader.request', new=Mock(sid='sid1'))
+    @patch('plugins.base.request', new=Mock(sid='sid1'))
+    def test_route_falls_back_to_default_game(self):
+        """测试不携带game字段的事件路由到默认游戏"""
+        self.loader.register_events()
+        self.routes['create_room']()
+
+        self.assertEqual(self.loader.plugins['alpha'].calls, [('create_room', None)])
+
+    @patch('plugin_loader.emit')
+    @patch('plugin_loader.request', new=Mock(sid='sid1'))
+    def test_route_to_broken_plugin_reports_error(self, mock_emit):
+        """测试路由到加载失败的插件时返回错误"""
+        self.loader.register_events()
+        self.routes['create_room']({'game': 'broken'})
+
+        mock_emit.assert_called_once_with('error', {'msg': '游戏暂不可用'})
+
+    @patch('plugin_loader.request', new=Mock(sid='sid1'))
+    @patch('plugins.base.request', new=Mock(sid='sid1'))
+    def test_disconnect_routed_by_client_room(self):
+        """测试断开连接按所在房间路由，不在房间时不加载插件"""
+        self.loader.register_events()
+        self.routes['disconnect']()
+        self.assertEqual(self.loader.plugins, {})
+
+        room_id = self.game_manager.create_room('beta', {})
+        self.game_manager.add_player(room_id, 'sid1')
+        self.routes['disconnect']()
+        self.assertEqual(self.loader.plugins['beta'].calls, [('disconnect', None)])
+
+    def test_resolve_game_by_room_id(self):
+        """测试按room_id所属房间判断游戏"""
+        room_id = self.game_manager.create_room('beta', {})
+
+        game = self.loader.resolve_game('create_room', {'room_id': room_id}, 'sid1', ['alpha', 'beta'])
+        self.assertEqual(game, 'beta')
+
+    def test_loading_plugins_runs_no_ddl(self):
+        """测试加载插件不执行建表（由迁移系统在启动时统一执行）"""
+        db = Mock()
+        loader = PluginLoader(self.registry, Mock(), self.socketio, db, self.game_manager)
+        loader.get('alpha')
+        loader.get('beta')
+
+        db.init_tables.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
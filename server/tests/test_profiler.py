@@ -0,0 +1,150 @@
+"""
+性能剖析测试
+
+测试采样剖析的折叠栈输出、慢事件捕获的环形缓冲和管理路由的访问控制
+"""
+
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from flask import Flask
+
+from game_manager import GameManager
+from plugins.base import GamePlugin
+from profiler import SamplingProfiler, SlowEventRecorder, SLOW_EVENTS
+
+
+def busy_worker(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class SlowPluginImpl(GamePlugin):
+    """测试用游戏插件实现"""
+    def register_routes(self):
+        pass
+
+    def register_events(self):
+        @self.on('make_move')
+        def handle_move(data):
+            time.sleep(data['sleep'])
+            return 'moved'
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """测试采样剖析"""
+
+    def test_collapsed_stacks(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_worker, args=(stop,))
+        worker.start()
+        profiler = SamplingProfiler(interval=0.001)
+        try:
+            for _ in range(20):
+                profiler.sample(exclude=threading.get_ident())
+        finally:
+            stop.set()
+            worker.join()
+
+        lines = profiler.collapsed().splitlines()
+        worker_lines = [line for line in lines if 'busy_worker (test_profiler.py:' in line]
+        self.assertTrue(worker_lines)
+        stack, count = worker_lines[0].rsplit(' ', 1)
+        self.assertTrue(stack.startswith('_bootstrap (threading.py:'))
+        self.assertGreater(int(count), 0)
+        # 本线程被排除
+        self.assertFalse(any('test_collapsed_stacks' in line for line in lines))
+        self.assertEqual(profiler.get_stats()['samples'], 20)
+
+        profiler.reset()
+        self.assertEqual(profiler.collapsed(), '')
+
+    def test_background_thread(self):
+        profiler = SamplingProfiler(interval=0.001)
+        profiler.start()
+        time.sleep(0.05)
+        profiler.stop()
+        self.assertFalse(profiler.running)
+        self.assertGreater(profiler.samples, 0)
+        self.assertIn('test_background_thread', profiler.collapsed())
+
+
+class TestSlowEventRecorder(unittest.TestCase):
+    """测试慢事件捕获"""
+
+    def test_only_slow_calls_are_kept(self):
+        recorder = SlowEventRecorder(threshold=0.02, capacity=2)
+        self.assertEqual(recorder.call('gomoku', 'make_move', time.sleep, 0), None)
+        self.assertEqual(len(recorder.captures), 0)
+
+        for _ in range(3):
+            recorder.call('gomoku', 'make_move', time.sleep, 0.03)
+        captures = recorder.get_captures()
+        self.assertEqual(len(captures), 2)
+        self.assertEqual(captures[0]['event'], 'make_move')
+        self.assertGreaterEqual(captures[0]['ms'], 20)
+        self.assertIn('sleep', captures[0]['profile'])
+        self.assertEqual(recorder.get_stats()['profiled'], 4)
+
+    def test_exception_is_raised(self):
+        recorder = SlowEventRecorder(threshold=0)
+        recorder.configure(0.0001)
+
+        def fail():
+            time.sleep(0.001)
+            raise ValueError('坏数据')
+
+        with self.assertRaises(ValueError):
+            recorder.call('gomoku', 'make_move', fail)
+        self.assertEqual(len(recorder.captures), 1)
+
+    @patch('plugins.base.request', new=Mock(sid='sid1'))
+    def test_plugin_dispatch(self):
+        plugin = SlowPluginImpl(Mock(), Mock(), None, GameManager(), routed=True, game_id='slow_test')
+        SLOW_EVENTS.configure(0.01, 5)
+        try:
+            self.assertEqual(plugin.handlers['make_move']({'sleep': 0}), 'moved')
+            self.assertEqual(plugin.handlers['make_move']({'sleep': 0.02}), 'moved')
+            captures = [c for c in SLOW_EVENTS.get_captures() if c['game'] == 'slow_test']
+            self.assertEqual(len(captures), 1)
+        finally:
+            SLOW_EVENTS.configure(None)
+        self.assertFalse(SLOW_EVENTS.enabled)
+
+
+class TestAdminRoutes(unittest.TestCase):
+    """测试管理路由"""
+
+    def make_client(self, token='secret'):
+        from app import _register_admin_routes
+        app = Flask('admin-test')
+        _register_admin_routes(app, token)
+        return app.test_client()
+
+    def test_not_registered_without_token(self):
+        """测试未设置令牌时不注册管理路由（本机来源的请求也无法访问）"""
+        client = self.make_client('')
+        self.assertEqual(client.get('/admin/slow_events').status_code, 404)
+        self.assertEqual(client.get('/admin/profile?seconds=0.05').status_code, 404)
+
+    def test_token(self):
+        client = self.make_client()
+        self.assertEqual(client.get('/admin/slow_events').status_code, 403)
+        self.assertEqual(client.get('/admin/slow_events', headers={'X-Admin-Token': 'wrong'}).status_code, 403)
+        response = client.get('/admin/slow_events', headers={'X-Admin-Token': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('sampler', response.get_json())
+
+    def test_temporary_profile(self):
+        client = self.make_client()
+        headers = {'X-Admin-Token': 'secret'}
+        self.assertEqual(client.get('/admin/profile?seconds=0', headers=headers).status_code, 400)
+        response = client.get('/admin/profile?seconds=0.05', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+游戏记录导出/导入工具测试
+
+测试流式分块导出、两种格式的往返导入、多行INSERT批次和汇总累加
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from pymysql.cursors import SSCursor
+
+from database import Database
+from move_codec import encode_moves
+from plugins.base import INSERT_GAME_RECORD, UPSERT_GAME_STATS_DAILY
+from records_cli import export_records, import_records, read_columnar, _multi_row_insert
+from sqlite_storage import SQLiteBackend
+
+GOMOKU_MOVES = [{'row': 7, 'col': 7, 'color': 'black'}, {'row': 7, 'col': 8, 'color': 'white'}]
+LANDLORD_MOVES = [{'position': 0, 'cards': ['3♠', '3♥']}, {'position': 1, 'cards': []}]
+
+
+class TestRecordsCli(unittest.TestCase):
+    """测试记录导出/导入"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = self.open('source.db')
+        self.target = self.open('target.db')
+        statements = []
+        for i in range(25):
+            game_type, moves = ('gomoku', GOMOKU_MOVES) if i % 5 else ('landlord', LANDLORD_MOVES)
+            codec_id, payload = encode_moves(game_type, moves)
+            created_at = datetime(2026, 10, 1 + i % 2, 12, 0, i)
+            statements.append((INSERT_GAME_RECORD, (game_type, f'room{i}', payload, codec_id, 'black', 2, i, 60,
+                                                    created_at)))
+            statements.append((UPSERT_GAME_STATS_DAILY, (created_at.date(), game_type, 60, 2, i)))
+        self.assertTrue(self.source.write(statements))
+
+    def tearDown(self):
+        self.source.close()
+        self.target.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def open(self, name):
+        storage = SQLiteBackend(os.path.join(self.tmpdir, name), wait_for_commit=True)
+        storage.migrate()
+        return storage
+
+    def round_trip(self, fmt):
+        out_dir = os.path.join(self.tmpdir, fmt)
+        exported = export_records(self.source, out_dir, fmt, chunk_rows=10)
+        self.assertEqual(exported['rows'], 25)
+        self.assertEqual(len(exported['files']), 3)
+
+        imported = import_records(self.target, [out_dir], batch_rows=7)
+        self.assertEqual((imported['rows'], imported['files']), (25, 3))
+
+        columns = 'game_type, room_id, moves, moves_codec, winner, player_count, spectator_count, duration, created_at'
+        select = f'SELECT {columns} FROM game_records ORDER BY id'
+        self.assertEqual(self.target.query(select), self.source.query(select))
+        stats = 'SELECT * FROM game_stats_daily ORDER BY stat_date, game_type'
+        self.assertEqual(self.target.query(stats), self.source.query(stats))
+
+    def test_ndjson_round_trip(self):
+        """测试NDJSON分块导出后导入，记录和汇总与源库一致"""
+        self.round_trip('ndjson')
+
+    def test_columnar_round_trip(self):
+        """测试按列分块导出后导入，记录和汇总与源库一致"""
+        self.round_trip('columnar')
+
+    def test_export_by_game_type(self):
+        """测试按游戏类型导出，按列文件保留原始编码字节"""
+        out_dir = os.path.join(self.tmpdir, 'landlord')
+        result = export_records(self.source, out_dir, 'columnar', game_type='landlord')
+
+        records = list(read_columnar(result['files'][0]))
+        self.assertEqual(len(records), 5)
+        self.assertEqual({r['game_type'] for r in records}, {'landlord'})
+        self.assertEqual((records[0]['moves_codec'], records[0]['moves']), encode_moves('landlord', LANDLORD_MOVES))
+
+    def test_multi_row_insert(self):
+        """测试每批一条多行INSERT，SQL按行数缓存"""
+        sql = _multi_row_insert(('a', 'b'), 3)
+        self.assertEqual(sql, 'INSERT INTO game_records (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)')
+        self.assertIs(_multi_row_insert(('a', 'b'), 3), sql)
+
+    def test_mysql_stream_uses_sscursor(self):
+        """测试MySQL流式读取使用无缓冲的服务端游标"""
+        conn = MagicMock()
+        self.assertIs(Database._stream_cursor(None, conn), conn.cursor.return_value)
+        conn.cursor.assert_called_once_with(SSCursor)
+
+
+if __name__ == '__main__':
+    unittest.main()
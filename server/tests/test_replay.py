@@ -0,0 +1,135 @@
+"""
+对局回放测试
+
+测试按ID读取回放、逐步解码与LRU缓存、生成器调度的倍速和连接断开后停止
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from move_codec import encode_moves
+from plugins.base import INSERT_GAME_RECORD
+from replay import ReplayStore, ReplayScheduler, ReplayHandler, MAX_MOVE_GAP, MAX_SPEED
+from sqlite_storage import SQLiteBackend
+
+GOMOKU_MOVES = [{'row': 7, 'col': c, 'color': ('black', 'white')[c % 2]} for c in range(5)]
+RACING_MOVES = [{'position': 0, 'score': 10, 't': 1000}, {'position': 1, 'score': 10, 't': 1500},
+                {'position': 0, 'score': 20, 't': 60000, 'finished': True}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestReplay(unittest.TestCase):
+    """测试对局回放"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.storage = SQLiteBackend(os.path.join(self.tmpdir, 'replay.db'), wait_for_commit=True)
+        self.storage.migrate()
+        self.gomoku_id = self.insert('gomoku', GOMOKU_MOVES)
+        self.racing_id = self.insert('racing', RACING_MOVES)
+
+        self.socketio = MagicMock()
+        self.connected = {'viewer'}
+        self.socketio.server.manager.is_connected.side_effect = lambda sid, namespace: sid in self.connected
+        self.clock = FakeClock()
+        self.scheduler = ReplayScheduler(self.socketio, clock=self.clock)
+        self.store = ReplayStore(self.storage, cache_size=1)
+        self.handler = ReplayHandler(self.socketio, self.store, self.scheduler, move_interval=1.0)
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def insert(self, game_type, moves):
+        codec_id, payload = encode_moves(game_type, moves)
+        self.storage.write([(INSERT_GAME_RECORD, (game_type, 'room', payload, codec_id, '0', 2, 0, 60,
+                                                  datetime(2026, 10, 1, 12)))])
+        return self.storage.query('SELECT MAX(id) FROM game_records')[0][0]
+
+    def sent(self, event):
+        return [c.args[1] for c in self.socketio.emit.call_args_list if c.args[0] == event]
+
+    def advance(self, seconds):
+        self.clock.now += seconds
+        self.scheduler.run_pending()
+
+    def test_cached_after_full_decode(self):
+        """测试只有完整解码过的回放进入缓存，命中时不再查库"""
+        replay = self.store.get(self.gomoku_id)
+        self.assertEqual(replay.info['created_at'], '2026-10-01 12:00:00')
+        next(iter(replay))
+        self.assertIsNone(replay.moves)
+        self.assertEqual(self.store.get_stats()['cached'], 0)
+
+        self.assertEqual(list(replay), GOMOKU_MOVES)
+        self.storage.close()
+        self.assertIs(self.store.get(self.gomoku_id), replay)
+        self.assertEqual(self.store.get_stats()['hits'], 1)
+
+    def test_lru_eviction(self):
+        """测试超出容量时淘汰最久未使用的回放"""
+        list(self.store.get(self.gomoku_id))
+        list(self.store.get(self.racing_id))
+
+        self.assertEqual(list(self.store._cache), [self.racing_id])
+        self.assertIsNone(self.store.get(9999))
+
+    def test_playback_at_speed(self):
+        """测试按倍速推送走法，播放中调整倍速从下一步生效"""
+        self.assertTrue(self.handler.start('viewer', {'record_id': self.gomoku_id, 'speed': 2}))
+        self.scheduler.run_pending()
+        self.assertEqual(self.sent('replay_started')[0]['game_type'], 'gomoku')
+        self.assertEqual(len(self.sent('replay_move')), 1)
+
+        self.advance(0.4)
+        self.assertEqual(len(self.sent('replay_move')), 1)
+        self.advance(0.1)
+        self.assertEqual(len(self.sent('replay_move')), 2)
+
+        self.scheduler.set_speed('viewer', 100)
+        self.advance(0.5)
+        self.advance(1 / MAX_SPEED * 2)
+        self.assertEqual([m['move'] for m in self.sent('replay_move')], GOMOKU_MOVES)
+        self.assertEqual(self.sent('replay_finished'), [{'record_id': self.gomoku_id, 'moves': 5}])
+        self.assertNotIn('viewer', self.scheduler)
+
+    def test_timestamped_moves_use_recorded_gaps(self):
+        """测试带时间戳的走法按记录的间隔播放，长时间间隔被截断"""
+        self.handler.start('viewer', {'record_id': self.racing_id})
+        self.scheduler.run_pending()
+        self.advance(0.5)
+        self.assertEqual(len(self.sent('replay_move')), 2)
+        self.advance(MAX_MOVE_GAP)
+        self.assertEqual(len(self.sent('replay_finished')), 1)
+
+    def test_disconnect_stops_playback(self):
+        """测试连接断开后停止回放"""
+        self.handler.start('viewer', {'record_id': self.gomoku_id})
+        self.scheduler.run_pending()
+        self.connected.clear()
+        self.advance(10)
+
+        self.assertEqual(len(self.sent('replay_move')), 1)
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_invalid_requests(self):
+        """测试无效的记录ID和不存在的记录返回错误"""
+        self.assertFalse(self.handler.start('viewer', {'record_id': '1'}))
+        self.assertFalse(self.handler.start('viewer', {'record_id': 9999}))
+        self.assertEqual(len(self.sent('error')), 2)
+        self.assertFalse(self.scheduler.cancel('viewer'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+"""
+房间状态后端测试
+
+KVRoomState 与本地 RespBroker 通信，测试保存/恢复（JSON编码）、写入合并、乐观版本和过期
+"""
+
+import pickle
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from game_manager import DELTA_LOG_SIZE, GameManager, RoomStatus
+from move_codec import decode_moves
+from plugins.racing import RacingPlugin
+from room_state import DEFAULT_PREFIX, KVRoomState, MemoryRoomState
+from resp import RespBroker, RespClient
+
+
+class Exploit:
+    """反序列化时执行代码的对象"""
+    executed = False
+
+    def __reduce__(self):
+        return (setattr, (Exploit, 'executed', True))
+
+
+class TestBrokerKeys(unittest.TestCase):
+    """测试代理的哈希键、过期和事务命令"""
+
+    def setUp(self):
+        self.broker = RespBroker().start()
+        self.client = RespClient.from_url(self.broker.url)
+        self.other = RespClient.from_url(self.broker.url)
+
+    def tearDown(self):
+        self.client.close()
+        self.other.close()
+        self.broker.close()
+
+    def test_hash_and_expiry(self):
+        self.assertEqual(self.client.execute('HSET', 'k', 'a', 1, 'b', 2), 2)
+        self.assertEqual(self.client.execute('HGETALL', 'k'), [b'a', b'1', b'b', b'2'])
+        self.assertEqual(self.client.execute('TTL', 'k'), -1)
+        self.client.execute('PEXPIRE', 'k', 50)
+        time.sleep(0.1)
+        self.assertEqual(self.client.execute('EXISTS', 'k'), 0)
+        self.assertEqual(self.client.execute('HGETALL', 'k'), [])
+
+    def test_transaction_aborts_on_concurrent_write(self):
+        """测试 WATCH 之后键被其他连接修改时事务放弃"""
+        self.client.execute('HSET', 'k', 'rev', 1)
+
+        def build(replies):
+            self.other.execute('HSET', 'k', 'rev', 5)
+            return [('HSET', 'k', 'rev', int(replies[0]) + 1)]
+
+        self.assertIsNone(self.client.transaction(['k'], [('HGET', 'k', 'rev')], build))
+        self.assertEqual(self.client.execute('HGET', 'k', 'rev'), b'5')
+        result = self.client.transaction(['k'], [('HGET', 'k', 'rev')],
+                                         lambda replies: [('HSET', 'k', 'rev', int(replies[0]) + 1)])
+        self.assertEqual(result, [0])
+        self.assertEqual(self.client.execute('HGET', 'k', 'rev'), b'6')
+
+
+class TestKVRoomState(unittest.TestCase):
+    """测试键值存储房间状态"""
+
+    def setUp(self):
+        self.broker = RespBroker().start()
+        self.backends = []
+
+    def tearDown(self):
+        for backend in self.backends:
+            backend.close()
+        self.broker.close()
+
+    def make_manager(self, room_timeout=1800, **kwargs):
+        kwargs.setdefault('start', False)
+        backend = KVRoomState.from_url(self.broker.url, ttl=room_timeout, **kwargs)
+        self.backends.append(backend)
+        return GameManager(room_timeout, state=backend)
+
+    def test_restore_after_restart(self):
+        """测试房间状态、增量日志和状态枚举在新进程中恢复"""
+        manager = self.make_manager()
+        room_id = manager.create_room('gomoku', {'board': [[0] * 15 for _ in range(15)], 'moves': []})
+        manager.add_player(room_id, 'p1')
+        manager.rooms[room_id]['state']['moves'].append((7, 7))
+        manager.record_delta(room_id, 'move_made', {'row': 7, 'col': 7})
+        manager.update_room_status(room_id, RoomStatus.PLAYING)
+        manager.state.flush()
+
+        restored = self.make_manager()
+        self.assertEqual(restored.restore(), 1)
+        room = restored.rooms[room_id]
+        self.assertEqual(room['players'], ['p1'])
+        self.assertEqual(room['status'], RoomStatus.PLAYING)
+        self.assertEqual(room['state']['moves'], [(7, 7)])
+        self.assertEqual(restored.get_deltas_since(room_id, 0), [(1, 'move_made', {'row': 7, 'col': 7}, None)])
+
+        restored.delete_room(room_id)
+        restored.state.flush()
+        self.assertEqual(self.make_manager().restore(), 0)
+
+    def test_restore_non_json_types(self):
+        """测试整数键字典、元组、集合和增量日志长度上限按JSON存储后原样恢复"""
+        manager = self.make_manager()
+        state = {'cards': {0: [{'suit': '♠', 'value': '3'}], 1: []}, 'bids': {2: 3}, 'seen': {'a', 'b'},
+                 'last_play': ('3', '3'), '__t': 'tuple'}
+        room_id = manager.create_room('landlord', state)
+        manager.state.flush()
+
+        other = self.make_manager()
+        other.restore()
+        restored = other.rooms[room_id]
+        self.assertEqual(restored['state'], state)
+        self.assertEqual(restored['deltas'].maxlen, manager.rooms[room_id]['deltas'].maxlen)
+        self.assertEqual(restored['status'], RoomStatus.WAITING)
+
+    def test_untrusted_payload_not_executed(self):
+        """测试存储中的 pickle 数据不会被反序列化，无法解析的房间被跳过"""
+        client = RespClient.from_url(self.broker.url)
+        payload = pickle.dumps(Exploit())
+        client.execute('HSET', f'{DEFAULT_PREFIX}evil0000', 'rev', 1, 'state', payload)
+        client.close()
+
+        with self.assertLogs('room_state', 'ERROR'):
+            self.assertEqual(self.make_manager().restore(), 0)
+        self.assertFalse(Exploit.executed)
+
+    def test_writes_coalesced(self):
+        """测试一个写入间隔内的多次修改只写入一次"""
+        manager = self.make_manager(flush_interval=0.05, start=True)
+        room_id = manager.create_room('gomoku', {'moves': []})
+        for i in range(50):
+            manager.record_delta(room_id, 'move_made', {'i': i})
+        time.sleep(0.2)
+        stats = manager.state.get_stats()
+        self.assertEqual(stats['pending'], 0)
+        self.assertLessEqual(stats['writes'], 2)
+
+        restored = self.make_manager()
+        restored.restore()
+        self.assertEqual(restored.get_room_version(room_id), 50)
+
+    def test_racing_flush_size_bounded(self):
+        """测试分数上报不随对局时长增大每次写入的房间数据，完赛时磁带写入对局记录"""
+        manager = self.make_manager()
+        plugin = RacingPlugin(Mock(), Mock(), None, manager)
+        room_id = manager.create_room('racing', {'players_ready': 0, 'scores': {}, 'game_started': True,
+                                                 'finished': []})
+        manager.add_player(room_id, 'p0')
+        manager.add_player(room_id, 'p1')
+        client = RespClient.from_url(self.broker.url)
+        self.addCleanup(client.close)
+
+        def report(count, event='update_score', sid='p0'):
+            request = Mock(sid=sid)
+            with patch('plugins.base.request', new=request), patch('plugins.racing.request', new=request), \
+                    patch('plugins.base.emit'):
+                for i in range(count):
+                    plugin.handlers[event]({'room_id': room_id, 'score': 100000 + i})
+            manager.state.flush()
+            reply = client.execute('HGETALL', f'{DEFAULT_PREFIX}{room_id}')
+            return sum(len(item) for item in reply)
+
+        # 增量日志填满后，写入量不再随上报次数增长（只有版本号和分数的位数变化）
+        size = report(DELTA_LOG_SIZE)
+        self.assertLess(report(DELTA_LOG_SIZE * 4), size * 1.05)
+        self.assertNotIn('moves', manager.rooms[room_id]['state'])
+
+        with patch.object(plugin, 'save_game_record') as save:
+            report(1, 'game_over')
+            report(1, 'game_over', sid='p1')
+        tape = save.call_args.args[1]
+        self.assertEqual(len(tape), DELTA_LOG_SIZE * 5 + 2)
+        moves = decode_moves(tape.codec_id, bytes(tape.payload))
+        self.assertEqual([(m['position'], m['score'], m.get('finished')) for m in moves[-2:]],
+                         [(0, 100000, True), (1, 100000, True)])
+        self.assertNotIn(room_id, plugin.tapes)
+
+    def test_conflicting_owner_is_not_overwritten(self):
+        """测试房间被其他进程接管后，本进程不覆盖存储中的状态并在清理时丢弃该房间"""
+        first = self.make_manager()
+        room_id = first.create_room('gomoku', {})
+        first.state.flush()
+
+        second = self.make_manager()
+        second.restore()
+        second.record_delta(room_id, 'move_made', {'by': 'second'})
+        second.state.flush()
+
+        first.record_delta(room_id, 'move_made', {'by': 'first'})
+        first.state.flush()
+        self.assertEqual(first.state.get_stats()['conflicts'], 1)
+        self.assertEqual(first.cleanup_inactive_rooms(), [room_id])
+        self.assertNotIn(room_id, first.rooms)
+
+        check = self.make_manager()
+        check.restore()
+        self.assertEqual(check.get_deltas_since(room_id, 0)[0][2], {'by': 'second'})
+
+    def test_ttl_expiry_replaces_scan(self):
+        """测试超过 ttl 没有写入的房间由存储过期，清理时移出工作集"""
+        manager = self.make_manager(room_timeout=0.1)
+        idle = manager.create_room('gomoku', {})
+        active = manager.create_room('gomoku', {})
+        manager.state.flush()
+        time.sleep(0.06)
+        manager.update_room_activity(active)
+        manager.state.flush()
+        time.sleep(0.06)
+
+        self.assertEqual(manager.cleanup_inactive_rooms(), [idle])
+        self.assertEqual(list(manager.rooms), [active])
+
+
+class TestMemoryRoomState(unittest.TestCase):
+    """默认后端保持原有的按最后活动时间清理"""
+
+    def test_default_backend(self):
+        manager = GameManager(room_timeout=60)
+        self.assertIsInstance(manager.state, MemoryRoomState)
+        room_id = manager.create_room('gomoku', {})
+        manager.rooms[room_id]['last_activity'] -= 120
+        self.assertEqual(manager.cleanup_inactive_rooms(), [room_id])
+        self.assertEqual(manager.restore(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+事件数据模式测试
+
+测试编译后的验证函数的结果类型和错误消息，以及插件分发时的验证
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+
+from game_manager import GameManager
+from plugins.base import GamePlugin
+from plugins.gomoku import MAKE_MOVE
+from plugins.landlord import PLAY_CARDS
+from schemas import Schema, RoomId, Int, Flag, Comment, List, JOIN_ROOM, REJOIN_ROOM
+from validators import ValidationError
+
+
+class SchemaPluginImpl(GamePlugin):
+    """测试用游戏插件实现"""
+    def register_routes(self):
+        pass
+
+    def register_events(self):
+        self.calls = []
+
+        @self.on('make_move', schema=MAKE_MOVE)
+        def handle_move(data):
+            self.calls.append(data)
+
+
+class TestSchema(unittest.TestCase):
+    """测试模式编译"""
+
+    def assertInvalid(self, schema, data, message):
+        with self.assertRaises(ValidationError) as ctx:
+            schema(data)
+        self.assertEqual(ctx.exception.message, message)
+
+    def test_typed_result(self):
+        move = MAKE_MOVE({'room_id': 'ab12-cd3', 'row': 3, 'col': 14, 'extra': 1})
+        self.assertEqual(type(move).__name__, 'MakeMove')
+        self.assertEqual((move.room_id, move.row, move.col), ('ab12-cd3', 3, 14))
+
+    def test_optional_fields_and_defaults(self):
+        join = JOIN_ROOM({'room_id': 'ab12cd34'})
+        self.assertEqual((join.spectator, join.game), (False, None))
+        self.assertTrue(JOIN_ROOM({'room_id': 'ab12cd34', 'spectator': 1}).spectator)
+        self.assertIsNone(REJOIN_ROOM({'room_id': 'ab12cd34'}).version)
+
+    def test_room_id_errors_match_input_validator(self):
+        self.assertInvalid(MAKE_MOVE, {'row': 1, 'col': 1}, '房间ID不能为空')
+        self.assertInvalid(MAKE_MOVE, {'room_id': '', 'row': 1, 'col': 1}, '房间ID不能为空')
+        self.assertInvalid(MAKE_MOVE, {'room_id': 12345678, 'row': 1, 'col': 1}, '房间ID必须是字符串')
+        self.assertInvalid(MAKE_MOVE, {'room_id': 'abc', 'row': 1, 'col': 1}, '房间ID长度必须为8位')
+        self.assertInvalid(MAKE_MOVE, {'room_id': 'ab12cd3!', 'row': 1, 'col': 1}, '房间ID格式错误')
+
+    def test_int_errors(self):
+        self.assertInvalid(MAKE_MOVE, {'room_id': 'ab12cd34', 'col': 1}, '坐标必须是整数')
+        self.assertInvalid(MAKE_MOVE, {'room_id': 'ab12cd34', 'row': '1', 'col': 1}, '坐标必须是整数')
+        self.assertInvalid(MAKE_MOVE, {'room_id': 'ab12cd34', 'row': True, 'col': 1}, '坐标必须是整数')
+        self.assertInvalid(MAKE_MOVE, {'room_id': 'ab12cd34', 'row': 1, 'col': 15}, '坐标超出范围 (0-14)')
+        self.assertInvalid(REJOIN_ROOM, {'room_id': 'ab12cd34', 'version': 1.5}, '字段类型错误: version 应为 int')
+
+    def test_cards(self):
+        cards = [{'suit': '♠', 'value': '3'}]
+        self.assertEqual(PLAY_CARDS({'room_id': 'ab12cd34', 'cards': cards}).cards, cards)
+        self.assertInvalid(PLAY_CARDS, {'room_id': 'ab12cd34'}, '缺少必需字段: cards')
+        self.assertInvalid(PLAY_CARDS, {'room_id': 'ab12cd34', 'cards': {}}, '字段类型错误: cards 应为 list')
+        self.assertInvalid(PLAY_CARDS, {'room_id': 'ab12cd34', 'cards': []}, '出牌不能为空')
+        self.assertInvalid(PLAY_CARDS, {'room_id': 'ab12cd34', 'cards': cards * 21}, '出牌数量过多')
+        self.assertInvalid(PLAY_CARDS, {'room_id': 'ab12cd34', 'cards': ['♠3']}, '牌格式错误')
+        self.assertInvalid(PLAY_CARDS, {'room_id': 'ab12cd34', 'cards': [{'suit': '♠'}]}, '牌缺少必需字段')
+
+    def test_not_a_dict(self):
+        self.assertInvalid(MAKE_MOVE, None, '请求数据格式错误')
+        self.assertInvalid(MAKE_MOVE, ['ab12cd34', 1, 1], '请求数据格式错误')
+
+    def test_custom_schema(self):
+        schema = Schema('Custom', name=Comment(), tags=List(Int(min=1)), on=Flag(default=True))
+        result = schema({'name': '<b>好棋</b>', 'tags': [1, 2]})
+        self.assertEqual(result, ('好棋', [1, 2], True))
+        self.assertInvalid(schema, {'tags': [0]}, 'tags 不能小于 1')
+
+    def test_field_counts(self):
+        # 一至三个字段展开调用，更多字段在循环中检查
+        fields = {f'f{i}': Int(required=False, default=i) for i in range(5)}
+        for count in range(1, 6):
+            schema = Schema(f'Fields{count}', **dict(list(fields.items())[:count]))
+            self.assertEqual(schema({'f0': 9}), (9,) + tuple(range(1, count)))
+            self.assertInvalid(schema, {f'f{count - 1}': 'x'}, f'字段类型错误: f{count - 1} 应为 int')
+            self.assertInvalid(schema, 'x', '请求数据格式错误')
+
+    def test_room_id_cache(self):
+        with patch.object(RoomId, 'VALID_IDS', set()), patch.object(RoomId, 'VALID_IDS_LIMIT', 2):
+            schema = Schema('Room', room_id=RoomId())
+            for room_id in ('aaaa1111', 'bbbb2222', 'aaaa1111'):
+                self.assertEqual(schema({'room_id': room_id}).room_id, room_id)
+            self.assertInvalid(schema, {'room_id': 'ab12cd3!'}, '房间ID格式错误')
+            self.assertEqual(RoomId.VALID_IDS, {'aaaa1111', 'bbbb2222'})
+            schema({'room_id': 'cccc3333'})
+            self.assertEqual(RoomId.VALID_IDS, {'cccc3333'})
+
+
+class TestSchemaDispatch(unittest.TestCase):
+    """测试插件分发时的验证"""
+
+    def setUp(self):
+        self.plugin = SchemaPluginImpl(Mock(), Mock(), None, GameManager(), routed=True, game_id='schema_test')
+
+    @patch('plugins.base.request', new=Mock(sid='sid1'))
+    def test_handler_receives_validated_object(self):
+        self.plugin.handlers['make_move']({'room_id': 'ab12cd34', 'row': 7, 'col': 7})
+        self.assertEqual(self.plugin.calls, [MAKE_MOVE.type('ab12cd34', 7, 7)])
+
+    @patch('plugins.base.request', new=Mock(sid='sid1'))
+    def test_invalid_data_is_rejected(self):
+        with patch.object(self.plugin, 'emit_error') as emit_error:
+            self.assertIsNone(self.plugin.handlers['make_move']({'room_id': 'ab12cd34', 'row': -1, 'col': 7}))
+            self.plugin.handlers['make_move']()
+        self.assertEqual(self.plugin.calls, [])
+        self.assertEqual([c.args[0] for c in emit_error.call_args_list], ['坐标超出范围 (0-14)', '请求数据格式错误'])
+
+
+if __name__ == '__main__':
+    unittest.main()
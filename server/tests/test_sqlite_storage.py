@@ -0,0 +1,136 @@
+"""
+SQLite存储后端测试
+
+测试WAL模式、写线程批量提交、每线程只读连接，以及与游戏插件记录接口的集成
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock
+
+from game_manager import GameManager
+from plugins.base import GamePlugin
+from sqlite_storage import SQLiteBackend, _WriteRequest
+from statements import STATEMENTS
+
+INSERT = 'INSERT INTO game_records (game_type, room_id, moves) VALUES (%s, %s, %s)'
+SQL = INSERT.replace('%s', '?')
+
+
+class RecordPlugin(GamePlugin):
+    """测试用游戏插件"""
+
+    def register_routes(self):
+        pass
+
+    def register_events(self):
+        pass
+
+
+class TestSQLiteBackend(unittest.TestCase):
+    """测试SQLite存储后端"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'records.db')
+        self.storage = self.open()
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def open(self, **kwargs):
+        storage = SQLiteBackend(self.path, **kwargs)
+        storage.migrate()
+        return storage
+
+    def count(self):
+        return self.storage.query('SELECT COUNT(*) FROM game_records')[0][0]
+
+    def test_migrate_once_with_wal(self):
+        """测试建表只执行一次，数据库为WAL模式"""
+        self.assertEqual(self.storage.migrate(), [])
+        self.assertEqual(self.storage.query('PRAGMA journal_mode')[0][0], 'wal')
+
+    def test_write_and_read(self):
+        """测试 %s 占位符写入后可读"""
+        self.assertTrue(self.storage.write([(INSERT, ('gomoku', 'room1', b'\x70'))], wait=True))
+
+        self.assertEqual(self.storage.query('SELECT room_id, moves FROM game_records WHERE game_type = %s',
+                                            ('gomoku',)), [('room1', b'\x70')])
+
+    def test_async_writes_flushed(self):
+        """测试异步写入入队即返回，flush后全部提交"""
+        for i in range(500):
+            self.assertTrue(self.storage.write([(INSERT, ('gomoku', f'r{i}', b''))]))
+        self.assertTrue(self.storage.flush(timeout=5))
+
+        self.assertEqual(self.count(), 500)
+        stats = self.storage.get_stats()
+        self.assertEqual(stats['writes'], 500)
+        self.assertLessEqual(stats['batches'], 501)
+
+    def test_failed_request_rolls_back_only_itself(self):
+        """测试同一批次中失败的请求只回滚自身"""
+        requests = [
+            _WriteRequest([(SQL, None, ('gomoku', 'ok1', b''))]),
+            _WriteRequest([(SQL, None, ('gomoku', 'bad', b'')),
+                           ('INSERT INTO missing_table VALUES (?)', None, (1,))]),
+            _WriteRequest([(SQL, None, ('gomoku', 'ok2', b''))]),
+        ]
+        self.storage.flush()
+        self.storage._commit_batch(requests)
+
+        self.assertEqual([r.ok for r in requests], [True, False, True])
+        self.assertEqual(sorted(r[0] for r in self.storage.query('SELECT room_id FROM game_records')),
+                         ['ok1', 'ok2'])
+
+    def test_read_connection_per_thread(self):
+        """测试每个读线程使用独立的只读连接"""
+        self.storage.query('SELECT 1')
+        thread = threading.Thread(target=self.storage.query, args=('SELECT 1',))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(self.storage.get_stats()['read_connections'], 2)
+        with self.assertRaises(Exception):
+            self.storage.query("DELETE FROM game_records")
+
+    def test_close_drains_queue(self):
+        """测试关闭前写完队列中的请求，重新打开后数据仍在"""
+        for i in range(100):
+            self.storage.write([(INSERT, ('racing', f'r{i}', b''))])
+        self.storage.close()
+        self.assertFalse(self.storage.write([(INSERT, ('racing', 'late', b''))]))
+
+        self.storage = self.open()
+        self.assertEqual(self.count(), 100)
+
+    def test_game_plugin_records(self):
+        """测试游戏插件通过SQLite后端保存、查询记录和统计"""
+        game_manager = GameManager()
+        plugin = RecordPlugin(Mock(), Mock(), self.storage, game_manager)
+        room_id = game_manager.create_room('gomoku', {})
+        game_manager.add_player(room_id, 'p1')
+        game_manager.add_player(room_id, 'p2')
+        moves = [{'row': 7, 'col': 7, 'color': 'black'}]
+        inserts = STATEMENTS.get('game_records.insert').histogram.count
+
+        self.assertTrue(plugin.save_game_record(room_id, moves, 'black', 30))
+        self.assertTrue(plugin.save_game_record(room_id, moves, 'black', 60))
+        self.storage.flush()
+
+        records = plugin.query_game_records('gomoku')
+        self.assertEqual(len(records), 2)
+        self.assertEqual(plugin.query_game_record_by_id(records[0]['id'])['moves'], moves)
+        total_games, avg_duration, avg_players, _ = plugin.query_game_stats('gomoku')
+        self.assertEqual((total_games, avg_duration, avg_players), (2, 45.0, 2.0))
+        # 写线程执行已注册语句时记录耗时
+        self.assertEqual(STATEMENTS.get('game_records.insert').histogram.count, inserts + 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+"""
+房间状态同步测试
+
+测试版本化房间状态、增量同步和快照回退
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from plugins.base import GamePlugin, SYNC_MAX_DELTAS
+from plugins.gomoku import GomokuPlugin
+from plugins.landlord import LandlordPlugin
+from game_manager import GameManager, RoomStatus
+
+
+class SyncPluginImpl(GamePlugin):
+    """测试用游戏插件实现"""
+    def register_routes(self):
+        pass
+    
+    def register_events(self):
+        pass
+
+
+class TestStateSync(unittest.TestCase):
+    """测试基类状态同步接口"""
+    
+    def setUp(self):
+        self.game_manager = GameManager()
+        self.plugin = SyncPluginImpl(Mock(), Mock(), None, self.game_manager)
+        self.room_id = self.game_manager.create_room('test_game', {'score': 0})
+    
+    def test_sync_since_returns_missing_deltas(self):
+        """测试只返回缺失的增量"""
+        for i in range(3):
+            self.plugin.record_delta(self.room_id, 'score_update', {'score': i})
+        
+        payload = self.plugin.sync_since(self.room_id, 1)
+        
+        self.assertEqual(payload['version'], 3)
+        self.assertEqual(payload['deltas'], [
+            ['score_update', {'score': 1}],
+            ['score_update', {'score': 2}]
+        ])
+        self.assertNotIn('snapshot', payload)
+    
+    def test_sync_since_without_version_sends_snapshot(self):
+        """测试客户端无本地状态时发送快照"""
+        self.plugin.record_delta(self.room_id, 'score_update', {'score': 1})
+        
+        payload = self.plugin.sync_since(self.room_id, None)
+        
+        self.assertEqual(payload['version'], 1)
+        self.assertEqual(payload['snapshot'], {'score': 0})
+        self.assertNotIn('deltas', payload)
+    
+    def test_sync_since_large_gap_sends_snapshot(self):
+        """测试缺失增量过多时发送快照"""
+        for i in range(SYNC_MAX_DELTAS + 1):
+            self.plugin.record_delta(self.room_id, 'score_update', {'score': i})
+        
+        payload = self.plugin.sync_since(self.room_id, 0)
+        
+        self.assertIn('snapshot', payload)
+    
+    def test_sync_since_filters_private_deltas(self):
+        """测试私有增量只发送给目标玩家"""
+        self.plugin.record_delta(self.room_id, 'update_cards', {'cards': []}, target=0)
+        self.plugin.record_delta(self.room_id, 'play_turn', {'position': 0})
+        
+        self.assertEqual(len(self.plugin.sync_since(self.room_id, 0, player_idx=0)['deltas']), 2)
+        self.assertEqual(
+            self.plugin.sync_since(self.room_id, 0, player_idx=1)['deltas'],
+            [['play_turn', {'position': 0}]]
+        )
+    
+    def test_sync_since_room_not_exist(self):
+        """测试房间不存在时返回None"""
+        self.assertIsNone(self.plugin.sync_since('nonexist', 0))
+    
+    @patch('plugins.base.emit')
+    def test_broadcast_delta_attaches_version(self, mock_emit):
+        """测试广播的增量附带版本号"""
+        self.plugin.broadcast_delta('score_update', {'score': 5}, self.room_id)
+        
+        mock_emit.assert_called_once_with(
+            'score_update', {'score': 5, 'version': 1}, room=self.room_id
+        )
+    
+    @patch('plugins.base.emit')
+    def test_emit_state_sync_is_single_message(self, mock_emit):
+        """测试重连同步只发送一条消息"""
+        for i in range(SYNC_MAX_DELTAS * 4):
+            self.plugin.record_delta(self.room_id, 'score_update', {'score': i})
+        
+        self.plugin.emit_state_sync(self.room_id, None)
+        
+        mock_emit.assert_called_once()
+        self.assertEqual(mock_emit.call_args[0][0], 'state_sync')
+
+
+class TestGameSnapshots(unittest.TestCase):
+    """测试各游戏的快照格式"""
+    
+    def setUp(self):
+        self.game_manager = GameManager()
+    
+    def test_gomoku_packed_board_snapshot(self):
+        """测试五子棋棋盘压缩为225字符"""
+        plugin = GomokuPlugin(Mock(), Mock(), None, self.game_manager)
+        board = [[0] * 15 for _ in range(15)]
+        board[7][7] = 1
+        board[7][8] = 2
+        room_id = self.game_manager.create_room('gomoku', {
+            'board': board,
+            'current': 1,
+            'moves': [{'row': 7, 'col': 7, 'color': 'black'}, {'row': 7, 'col': 8, 'color': 'white'}]
+        })
+        
+        snapshot = plugin.build_snapshot(self.game_manager.get_room(room_id))
+        
+        self.assertEqual(len(snapshot['board']), 225)
+        self.assertEqual(snapshot['board'][7 * 15 + 7], '1')
+        self.assertEqual(snapshot['board'][7 * 15 + 8], '2')
+        self.assertEqual(snapshot['move_count'], 2)
+        self.assertFalse(snapshot['finished'])
+        
+        self.game_manager.update_room_status(room_id, RoomStatus.FINISHED)
+        self.assertTrue(plugin.build_snapshot(self.game_manager.get_room(room_id))['finished'])
+    
+    def test_landlord_snapshot_hides_other_hands(self):
+        """测试斗地主快照只包含自己的手牌"""
+        plugin = LandlordPlugin(Mock(), Mock(), None, self.game_manager)
+        room_id = self.game_manager.create_room('landlord', {
+            'cards': {0: [{'suit': '♠', 'value': '3'}], 1: [], 2: []},
+            'bottom_cards': [{'suit': '♥', 'value': '4'}],
+            'landlord': None,
+            'current_turn': 0,
+            'last_play': [],
+            'last_play_position': None,
+            'bid_multiplier': 1
+        })
+        room = self.game_manager.get_room(room_id)
+        
+        snapshot = plugin.build_snapshot(room, player_idx=0)
+        self.assertEqual(snapshot['cards'], [{'suit': '♠', 'value': '3'}])
+        self.assertEqual(snapshot['card_counts'], {0: 1, 1: 0, 2: 0})
+        # 地主未确定前不暴露底牌
+        self.assertEqual(snapshot['bottom_cards'], [])
+        
+        self.assertEqual(plugin.build_snapshot(room, player_idx=-1)['cards'], [])
+    
+    def bid(self, plugin, room_id, sid, bid):
+        request = Mock(sid=sid)
+        with patch('plugins.base.request', new=request), patch('plugins.landlord.request', new=request):
+            plugin.handlers['bid']({'room_id': room_id, 'bid': bid})
+    
+    @patch('plugins.base.emit')
+    def test_landlord_rejoin_during_bidding(self, mock_emit):
+        """测试叫牌阶段重连的快照给出叫牌顺序而不是出牌顺序"""
+        plugin = LandlordPlugin(Mock(), Mock(), None, self.game_manager)
+        room_id = self.game_manager.create_room('landlord', {
+            'cards': {}, 'bottom_cards': [], 'landlord': None, 'current_turn': None, 'bid_turn': None,
+            'last_play': [], 'last_play_position': None, 'bids': {}, 'bid_multiplier': 1, 'pass_count': 0,
+            'moves': []
+        })
+        for sid in ('p0', 'p1', 'p2'):
+            self.game_manager.add_player(room_id, sid)
+        room = self.game_manager.get_room(room_id)
+        plugin.start_game(room_id, room)
+        
+        self.bid(plugin, room_id, 'p0', 1)
+        
+        snapshot = plugin.sync_since(room_id, None, player_idx=1)['snapshot']
+        self.assertTrue(snapshot['bidding'])
+        self.assertEqual(snapshot['bid_turn'], 1)
+        self.assertIsNone(snapshot['current_turn'])
+        self.assertEqual(len(snapshot['cards']), 17)
+        
+        # 地主确定后进入出牌阶段
+        self.bid(plugin, room_id, 'p1', 3)
+        self.bid(plugin, room_id, 'p2', 0)
+        snapshot = plugin.sync_since(room_id, None, player_idx=1)['snapshot']
+        self.assertFalse(snapshot['bidding'])
+        self.assertIsNone(snapshot['bid_turn'])
+        self.assertEqual(snapshot['current_turn'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+SQL语句注册表测试
+
+测试方言SQL缓存、延迟直方图分位数、慢查询统计（警告限流）和存储后端的耗时记录
+"""
+
+import logging
+import unittest
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+from logging_setup import RateLimitFilter
+from statements import StatementRegistry, LatencyHistogram, resolve
+from storage import ConnectionBackend
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """测试延迟直方图"""
+
+    def test_percentiles(self):
+        """测试分位数落在对应的桶上界"""
+        histogram = LatencyHistogram(buckets=(0.001, 0.01, 0.1))
+        for _ in range(90):
+            histogram.observe(0.0005)
+        for _ in range(9):
+            histogram.observe(0.005)
+        histogram.observe(0.5)
+
+        self.assertEqual(histogram.percentile(50), 0.001)
+        self.assertEqual(histogram.percentile(95), 0.01)
+        self.assertEqual(histogram.percentile(100), 0.5)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 100)
+        self.assertEqual(snapshot['max_ms'], 500.0)
+
+    def test_empty(self):
+        """测试没有数据时分位数为0"""
+        self.assertEqual(LatencyHistogram().snapshot()['p99_ms'], 0.0)
+
+
+class TestStatementRegistry(unittest.TestCase):
+    """测试语句注册表"""
+
+    def setUp(self):
+        self.registry = StatementRegistry(slow_threshold=0.1)
+
+    def test_register_once(self):
+        """测试同名语句只注册一次，SQL规范化空白"""
+        statement = self.registry.register('records.by_id', """
+            SELECT id
+            FROM game_records WHERE id = %s
+        """)
+
+        self.assertIs(self.registry.register('records.by_id', 'SELECT 1'), statement)
+        self.assertEqual(statement.sql, 'SELECT id FROM game_records WHERE id = %s')
+
+    def test_dialect_sql_cached(self):
+        """测试方言SQL只转换一次，可以为方言指定专用写法"""
+        statement = self.registry.register('upsert', 'INSERT INTO t VALUES (%s) ON DUPLICATE KEY UPDATE n = n + 1',
+                                           dialects={'sqlite': 'INSERT INTO t VALUES (?) ON CONFLICT DO NOTHING'})
+        select = self.registry.register('select', 'SELECT * FROM t WHERE a = %s AND b = %s')
+
+        self.assertEqual(resolve(statement, 'sqlite'), ('INSERT INTO t VALUES (?) ON CONFLICT DO NOTHING', statement))
+        self.assertEqual(select.sql_for('sqlite'), 'SELECT * FROM t WHERE a = ? AND b = ?')
+        self.assertIs(select.sql_for('sqlite'), select.sql_for('sqlite'))
+        self.assertEqual(select.sql_for('mysql'), select.sql)
+        self.assertEqual(resolve('SELECT %s', 'sqlite'), ('SELECT ?', None))
+
+    def test_slow_queries_counted(self):
+        """测试超过阈值的执行计入慢查询并记录警告"""
+        statement = self.registry.register('slow', 'SELECT SLEEP(1)')
+        with self.assertLogs('statements', level='WARNING') as logs:
+            statement.observe(0.25)
+        statement.observe(0.01)
+
+        stats = self.registry.get_stats()['slow']
+        self.assertEqual((stats['count'], stats['slow']), (2, 1))
+        self.assertIn('slow', logs.output[0])
+
+    def test_slow_query_warnings_rate_limited(self):
+        """测试同一语句的慢查询警告共用一个限流键（耗时作为参数，不拼入消息模板）"""
+        statement = self.registry.register('slow', 'SELECT SLEEP(1)')
+        rate_filter = RateLimitFilter(rate=3, interval=10, sample_every=0)
+        with self.assertLogs('statements', level='WARNING') as logs:
+            logging.getLogger('statements').addFilter(rate_filter)
+            try:
+                for i in range(20):
+                    statement.observe(0.2 + i / 1000)
+            finally:
+                logging.getLogger('statements').removeFilter(rate_filter)
+
+        self.assertEqual(len(logs.records), 3)
+        self.assertEqual(rate_filter.suppressed_total, 17)
+        self.assertEqual(logs.records[1].getMessage(), '慢查询 slow: 201.0ms')
+        self.assertEqual(statement.slow, 20)
+
+    def test_backend_observes_statements(self):
+        """测试存储后端执行已注册语句时记录耗时"""
+        conn = MagicMock()
+        conn.cursor.return_value.fetchall.return_value = [(1,)]
+        db = MagicMock()
+
+        @contextmanager
+        def get_connection():
+            yield conn
+        db.get_connection = get_connection
+        backend = ConnectionBackend(db)
+        insert = self.registry.register('insert', 'INSERT INTO t VALUES (%s)')
+        select = self.registry.register('select', 'SELECT 1 FROM t WHERE a = %s')
+
+        backend.write([(insert, (1,)), ('DELETE FROM t', ())])
+        self.assertEqual(backend.query(select, (1,)), [(1,)])
+
+        self.assertEqual(insert.histogram.count, 1)
+        self.assertEqual(select.histogram.count, 1)
+        conn.cursor.return_value.execute.assert_any_call('INSERT INTO t VALUES (%s)', (1,))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -64,13 +64,13 @@ class TestUnifiedDataModel(unittest.TestCase):
         self.socketio = Mock()
         self.game_manager = GameManager()
         
-    def test_init_db_creates_unified_table(self):
-        """测试初始化创建通用游戏记录表"""
+    def test_init_db_runs_no_ddl(self):
+        """测试插件初始化不再执行DDL（表结构由迁移系统统一管理）"""
         db = MockDatabase()
         plugin = TestGamePluginImpl(self.app, self.socketio, db, self.game_manager)
         
-        # 验证数据库初始化被调用
-        self.assertTrue(db.init_called)
+        # 验证插件没有逐个建表
+        self.assertFalse(db.init_called)
     
     def test_save_game_record_success(self):
         """测试保存游戏记录成功"""
@@ -88,6 +88,23 @@ class TestUnifiedDataModel(unittest.TestCase):
         # 验证保存成功
         self.assertTrue(result)
     
+    def test_save_game_record_updates_daily_rollup(self):
+        """测试保存记录时在同一连接中增量更新每日汇总"""
+        db = MockDatabase()
+        cursor = db.cursor()
+        db.cursor = Mock(return_value=cursor)
+        plugin = TestGamePluginImpl(self.app, self.socketio, db, self.game_manager)
+        room_id = self.game_manager.create_room('test_game', {})
+        self.game_manager.add_player(room_id, 'player1')
+        
+        self.assertTrue(plugin.save_game_record(room_id, [], 'player1', 120))
+        
+        self.assertEqual(db.cursor.call_count, 1)
+        (record_sql, _), (rollup_sql, rollup_params) = [c.args for c in cursor.execute.call_args_list]
+        self.assertIn('INSERT INTO game_records', record_sql)
+        self.assertIn('game_stats_daily', rollup_sql)
+        self.assertEqual(rollup_params[1:], ('test_game', 120, 1, 0))
+    
     def test_save_game_record_no_db(self):
         """测试无数据库时保存游戏记录"""
         plugin = TestGamePluginImpl(self.app, self.socketio, None, self.game_manager)
@@ -194,6 +211,23 @@ class TestUnifiedDataModel(unittest.TestCase):
         self.assertIsNotNone(result)
         self.assertEqual(result['id'], 1)
     
+    def test_query_game_record_by_id_decodes_moves(self):
+        """测试查询结果按编码器ID透明解码走法（元组游标）"""
+        from move_codec import encode_moves
+        moves = [{'row': 7, 'col': 7, 'color': 'black'}, {'row': 7, 'col': 8, 'color': 'white'}]
+        codec_id, payload = encode_moves('gomoku', moves)
+        db = MockDatabase()
+        db.records = [
+            (1, 'gomoku', 'room1', payload, codec_id, 'black', 2, 0, 120, '2024-01-01')
+        ]
+        plugin = TestGamePluginImpl(self.app, self.socketio, db, self.game_manager)
+        
+        result = plugin.query_game_record_by_id(1)
+        
+        self.assertEqual(result['moves'], moves)
+        self.assertNotIn('moves_codec', result)
+        self.assertEqual(result['winner'], 'black')
+    
     def test_query_game_record_by_id_not_found(self):
         """测试查询不存在的记录"""
         db = MockDatabase()
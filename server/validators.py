@@ -29,13 +29,19 @@ class InputValidator:
     MAX_COMMENT_LENGTH = 200  # 需求11.6: 限制弹幕长度不超过200字符
     MAX_PLAYER_NAME_LENGTH = 50
     
+    # 预编译的正则（每次验证都会使用）
+    ROOM_ID_RE = re.compile(ROOM_ID_PATTERN)
+    GAME_ID_RE = re.compile(GAME_ID_PATTERN)
+    HTML_TAG_RE = re.compile(r'<[^>]*>')
+    SPECIAL_CHARS_RE = re.compile(r'[<>\"\'&]')
+    
     @staticmethod
     def _log_validation(field, value, success, error_msg=None):
-        """记录验证日志"""
+        """记录验证日志（每次验证都会调用，参数在日志实际输出时才格式化）"""
         if success:
-            logger.debug(f"验证成功: {field}={value}")
+            logger.debug("验证成功: %s=%s", field, value)
         else:
-            logger.warning(f"验证失败: {field}={value}, 错误: {error_msg}")
+            logger.warning("验证失败: %s=%s, 错误: %s", field, value, error_msg)
     
     @staticmethod
     def validate_game_id(game_id):
@@ -57,7 +63,7 @@ class InputValidator:
                 raise ValidationError("游戏ID包含非法路径字符", field, game_id)
             
             # 只允许字母、数字、下划线和连字符
-            if not re.match(InputValidator.GAME_ID_PATTERN, game_id):
+            if not InputValidator.GAME_ID_RE.match(game_id):
                 raise ValidationError("游戏ID包含非法字符", field, game_id)
             
             # 长度限制
@@ -95,7 +101,7 @@ class InputValidator:
                 )
             
             # 只允许字母数字和连字符
-            if not re.match(InputValidator.ROOM_ID_PATTERN, room_id):
+            if not InputValidator.ROOM_ID_RE.match(room_id):
                 raise ValidationError("房间ID格式错误", field, room_id)
             
             InputValidator._log_validation(field, room_id, True)
@@ -123,17 +129,17 @@ class InputValidator:
             
             # 限制长度 (需求11.6)
             if len(comment) > InputValidator.MAX_COMMENT_LENGTH:
-                logger.info(f"评论被截断: 原长度={len(comment)}, 限制={InputValidator.MAX_COMMENT_LENGTH}")
+                logger.info("评论被截断: 原长度=%d, 限制=%d", len(comment), InputValidator.MAX_COMMENT_LENGTH)
                 comment = comment[:InputValidator.MAX_COMMENT_LENGTH]
             
             # 移除潜在的HTML标签 (需求11.4)
-            comment = re.sub(r'<[^>]*>', '', comment)
+            comment = InputValidator.HTML_TAG_RE.sub('', comment)
             
             # 移除特殊字符 (需求11.4)
-            comment = re.sub(r'[<>\"\'&]', '', comment)
+            comment = InputValidator.SPECIAL_CHARS_RE.sub('', comment)
             
             result = comment.strip()
-            InputValidator._log_validation(field, f"{len(result)}字符", True)
+            logger.debug("验证成功: %s=%d字符", field, len(result))
             return result
             
         except Exception as e:
@@ -161,7 +167,7 @@ class InputValidator:
                     f"({row}, {col})"
                 )
             
-            InputValidator._log_validation(field, f"({row}, {col})", True)
+            InputValidator._log_validation(field, (row, col), True)
             return row, col
             
         except ValidationError as e:
@@ -192,7 +198,7 @@ class InputValidator:
                 )
             
             # 移除特殊字符
-            if re.search(r'[<>\"\'&]', name):
+            if InputValidator.SPECIAL_CHARS_RE.search(name):
                 raise ValidationError("玩家名称包含非法字符", field, name)
             
             InputValidator._log_validation(field, name, True)